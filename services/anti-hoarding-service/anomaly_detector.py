@@ -18,8 +18,13 @@ from models import (
     AnomalySeverity, DetectionMethod, AnomalyDetectionConfig,
     SupplyDemandBalance, GeoLocation
 )
+from price_history_store import PriceHistoryStore, PriceFrame, InventoryFrame
+from regional_correlation import RegionalCorrelationEngine
+from sampled_logging import SampledLogger
 
 logger = structlog.get_logger()
+# Per-anomaly events from the detection loops are sampled and rate limited
+detection_log = SampledLogger.from_env(logger)
 
 @dataclass
 class PriceDataPoint:
@@ -46,6 +51,51 @@ class InventoryDataPoint:
     timestamp: datetime
     storage_capacity: Optional[float] = None
 
+def price_points_from_rows(rows: List[Dict[str, Any]]) -> List[PriceDataPoint]:
+    """Convert price rows from the data access layer into detection data points"""
+    return [
+        PriceDataPoint(
+            commodity=p["commodity"],
+            variety=p.get("variety"),
+            price=p["price"],
+            quantity=p["quantity"],
+            mandi_id=p["mandi_id"],
+            mandi_name=p["mandi_name"],
+            location=GeoLocation(
+                latitude=0.0,  # Mock coordinates
+                longitude=0.0,
+                district=p.get("district", ""),
+                state=p.get("state", ""),
+                country="India"
+            ),
+            timestamp=p["timestamp"],
+            confidence=p["confidence"]
+        )
+        for p in rows
+    ]
+
+def inventory_points_from_rows(rows: List[Dict[str, Any]]) -> List[InventoryDataPoint]:
+    """Convert inventory rows from the data access layer into detection data points"""
+    return [
+        InventoryDataPoint(
+            commodity=i["commodity"],
+            variety=i.get("variety"),
+            inventory_level=i["inventory_level"],
+            mandi_id=i["mandi_id"],
+            mandi_name=i["mandi_name"],
+            location=GeoLocation(
+                latitude=0.0,  # Mock coordinates
+                longitude=0.0,
+                district=i.get("district", ""),
+                state=i.get("state", ""),
+                country="India"
+            ),
+            timestamp=i["timestamp"],
+            storage_capacity=i.get("storage_capacity")
+        )
+        for i in rows
+    ]
+
 @dataclass
 class StatisticalAnalysis:
     """Statistical analysis results"""
@@ -120,6 +170,22 @@ class StatisticalAnalyzer:
         
         return moving_averages
     
+    @staticmethod
+    def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+        """Moving average as an array, in one cumulative-sum pass.
+        
+        Element i is the mean of values[i:i + window], matching
+        calculate_moving_average. Values are shifted by the first element
+        before summing so flat series stay exact.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) < window:
+            return np.empty(0, dtype=np.float64)
+        
+        shift = values[0]
+        sums = np.concatenate(([0.0], np.cumsum(values - shift)))
+        return (sums[window:] - sums[:-window]) / window + shift
+    
     @staticmethod
     def calculate_z_score(value: float, mean: float, std_dev: float) -> float:
         """Calculate z-score for a value"""
@@ -161,8 +227,9 @@ class StatisticalAnalyzer:
 class PriceSpikeDetector:
     """Statistical price spike detection algorithm"""
     
-    def __init__(self, config: AnomalyDetectionConfig):
+    def __init__(self, config: AnomalyDetectionConfig, vectorized: bool = True):
         self.config = config
+        self.vectorized = vectorized
         self.statistical_analyzer = StatisticalAnalyzer()
     
     async def detect_price_spikes(
@@ -180,27 +247,36 @@ class PriceSpikeDetector:
             if not price_data:
                 return []
             
-            # Filter data for specific commodity and variety
-            filtered_data = [
-                p for p in price_data 
-                if p.commodity == commodity and (variety is None or p.variety == variety)
-            ]
+            frame = PriceFrame.from_points(price_data, commodity, variety)
+            return await self.detect_price_spikes_in_frame(frame, commodity, variety)
             
-            if len(filtered_data) < self.config.min_data_points:
-                logger.warning(
+        except Exception as e:
+            logger.error("Error in price spike detection", error=str(e))
+            return []
+    
+    async def detect_price_spikes_in_frame(
+        self,
+        frame: PriceFrame,
+        commodity: str,
+        variety: Optional[str] = None
+    ) -> List[PriceAnomaly]:
+        """Detect price spikes in a timestamp-sorted price frame of one commodity"""
+        try:
+            if len(frame) < self.config.min_data_points:
+                detection_log.warning(
                     "Insufficient data for price spike detection",
                     commodity=commodity,
                     variety=variety,
-                    data_points=len(filtered_data),
+                    data_points=len(frame),
                     min_required=self.config.min_data_points
                 )
                 return []
             
-            # Sort by timestamp
-            filtered_data.sort(key=lambda x: x.timestamp)
+            if self.vectorized:
+                return self._detect_price_spikes_vectorized(frame, commodity, variety)
             
             # Extract prices and calculate moving average
-            prices = [p.price for p in filtered_data]
+            prices = frame.prices.tolist()
             moving_averages = self.statistical_analyzer.calculate_moving_average(
                 prices, self.config.moving_average_window_days
             )
@@ -220,11 +296,10 @@ class PriceSpikeDetector:
             for i, moving_avg in enumerate(moving_averages):
                 # Get the corresponding data point (moving avg i corresponds to price at index i + window_size - 1)
                 data_point_index = i + window_size - 1
-                if data_point_index >= len(filtered_data):
+                if data_point_index >= len(frame):
                     continue
                     
-                data_point = filtered_data[data_point_index]
-                current_price = data_point.price
+                current_price = prices[data_point_index]
                 
                 # Calculate deviation from moving average
                 price_deviation = current_price - moving_avg
@@ -242,61 +317,23 @@ class PriceSpikeDetector:
                 )
                 
                 if is_spike:
-                    # Determine severity
-                    severity = self._determine_price_spike_severity(
-                        deviation_percentage, z_score
-                    )
-                    
-                    # Calculate confidence score
-                    confidence_score = self._calculate_price_spike_confidence(
-                        deviation_percentage, z_score, len(filtered_data)
-                    )
-                    
-                    # Identify contributing factors
-                    contributing_factors = self._identify_price_spike_factors(
-                        data_point, deviation_percentage, z_score, stats
-                    )
-                    
-                    # Create anomaly record
-                    anomaly = PriceAnomaly(
-                        commodity=commodity,
-                        variety=variety,
-                        mandi_id=data_point.mandi_id,
-                        mandi_name=data_point.mandi_name,
-                        location=data_point.location,
-                        anomaly_type=AnomalyType.PRICE_SPIKE,
-                        detection_method=DetectionMethod.STATISTICAL_ANALYSIS,
-                        severity=severity,
-                        current_price=current_price,
-                        baseline_price=moving_avg,
-                        price_deviation=price_deviation,
-                        deviation_percentage=deviation_percentage,
-                        moving_average_30d=moving_avg,
-                        standard_deviation=stats.std_dev,
-                        z_score=z_score,
-                        confidence_score=confidence_score,
-                        analysis_period_days=self.config.moving_average_window_days,
-                        evidence={
-                            "statistical_analysis": stats.__dict__,
-                            "moving_average_window": self.config.moving_average_window_days,
-                            "data_points_analyzed": len(filtered_data),
-                            "detection_timestamp": data_point.timestamp.isoformat()
-                        },
-                        contributing_factors=contributing_factors
+                    anomaly = self._build_price_anomaly(
+                        frame, data_point_index, commodity, variety, current_price,
+                        moving_avg, price_deviation, deviation_percentage, z_score, stats
                     )
                     
                     anomalies.append(anomaly)
                     
-                    logger.warning(
+                    detection_log.warning(
                         "Price spike detected",
                         commodity=commodity,
                         variety=variety,
-                        mandi=data_point.mandi_name,
+                        mandi=anomaly.mandi_name,
                         current_price=current_price,
                         baseline_price=moving_avg,
                         deviation_percentage=deviation_percentage,
                         z_score=z_score,
-                        severity=severity.value
+                        severity=anomaly.severity.value
                     )
             
             return anomalies
@@ -305,6 +342,121 @@ class PriceSpikeDetector:
             logger.error("Error in price spike detection", error=str(e))
             return []
     
+    def _detect_price_spikes_vectorized(
+        self,
+        frame: PriceFrame,
+        commodity: str,
+        variety: Optional[str]
+    ) -> List[PriceAnomaly]:
+        """Array version of the spike scan; only flagged points become PriceAnomaly objects"""
+        window_size = self.config.moving_average_window_days
+        moving_averages = self.statistical_analyzer.rolling_mean(frame.prices, window_size)
+        if not len(moving_averages):
+            return []
+        
+        if not np.all(moving_averages):
+            # Same outcome as the scalar path, which fails on the division
+            raise ZeroDivisionError("float division by zero")
+        
+        stats = self.statistical_analyzer.calculate_statistics(frame.prices.tolist())
+        
+        # Moving average i corresponds to the price at index i + window_size - 1
+        current_prices = frame.prices[window_size - 1:]
+        price_deviations = current_prices - moving_averages
+        deviation_percentages = (price_deviations / moving_averages) * 100
+        if stats.std_dev == 0:
+            z_scores = np.zeros_like(current_prices)
+        else:
+            z_scores = (current_prices - stats.mean) / stats.std_dev
+        
+        flagged = np.flatnonzero(
+            (np.abs(deviation_percentages) >= self.config.price_spike_threshold_percentage) |
+            (np.abs(z_scores) >= self.config.z_score_threshold)
+        )
+        
+        anomalies = []
+        for i in flagged.tolist():
+            anomaly = self._build_price_anomaly(
+                frame, i + window_size - 1, commodity, variety,
+                float(current_prices[i]), float(moving_averages[i]), float(price_deviations[i]),
+                float(deviation_percentages[i]), float(z_scores[i]), stats
+            )
+            anomalies.append(anomaly)
+            
+            detection_log.warning(
+                "Price spike detected",
+                commodity=commodity,
+                variety=variety,
+                mandi=anomaly.mandi_name,
+                current_price=anomaly.current_price,
+                baseline_price=anomaly.baseline_price,
+                deviation_percentage=anomaly.deviation_percentage,
+                z_score=anomaly.z_score,
+                severity=anomaly.severity.value
+            )
+        
+        return anomalies
+    
+    def _build_price_anomaly(
+        self,
+        frame: PriceFrame,
+        data_point_index: int,
+        commodity: str,
+        variety: Optional[str],
+        current_price: float,
+        moving_avg: float,
+        price_deviation: float,
+        deviation_percentage: float,
+        z_score: float,
+        stats: StatisticalAnalysis
+    ) -> PriceAnomaly:
+        """Create the anomaly record for a flagged price point"""
+        # Determine severity
+        severity = self._determine_price_spike_severity(
+            deviation_percentage, z_score
+        )
+        
+        # Calculate confidence score
+        confidence_score = self._calculate_price_spike_confidence(
+            deviation_percentage, z_score, len(frame)
+        )
+        
+        mandi = frame.mandi_at(data_point_index)
+        timestamp = frame.timestamp_at(data_point_index)
+        
+        # Identify contributing factors
+        contributing_factors = self._identify_price_spike_factors(
+            float(frame.quantities[data_point_index]), timestamp,
+            deviation_percentage, z_score, stats
+        )
+        
+        return PriceAnomaly(
+            commodity=commodity,
+            variety=variety,
+            mandi_id=mandi.mandi_id,
+            mandi_name=mandi.mandi_name,
+            location=mandi.location,
+            anomaly_type=AnomalyType.PRICE_SPIKE,
+            detection_method=DetectionMethod.STATISTICAL_ANALYSIS,
+            severity=severity,
+            current_price=current_price,
+            baseline_price=moving_avg,
+            price_deviation=price_deviation,
+            deviation_percentage=deviation_percentage,
+            moving_average_30d=moving_avg,
+            standard_deviation=stats.std_dev,
+            z_score=z_score,
+            confidence_score=confidence_score,
+            analysis_period_days=self.config.moving_average_window_days,
+            evidence={
+                "statistical_analysis": stats.__dict__,
+                "moving_average_window": self.config.moving_average_window_days,
+                "data_points_analyzed": len(frame),
+                "detection_timestamp": timestamp.isoformat()
+            },
+            contributing_factors=contributing_factors
+        )
+    
     def _determine_price_spike_severity(
         self, 
         deviation_percentage: float, 
@@ -346,7 +498,8 @@ class PriceSpikeDetector:
     
     def _identify_price_spike_factors(
         self,
-        data_point: PriceDataPoint,
+        quantity: float,
+        timestamp: datetime,
         deviation_percentage: float,
         z_score: float,
         stats: StatisticalAnalysis
@@ -365,11 +518,11 @@ class PriceSpikeDetector:
         if stats.std_dev > stats.mean * 0.2:  # High volatility
             factors.append("High price volatility in recent period")
         
-        if data_point.quantity < stats.mean * 0.5:  # Low volume
+        if quantity < stats.mean * 0.5:  # Low volume
             factors.append("Lower than average trading volume")
         
         # Time-based factors
-        hour = data_point.timestamp.hour
+        hour = timestamp.hour
         if hour < 8 or hour > 18:
             factors.append("Price movement outside normal trading hours")
         
@@ -398,28 +551,30 @@ class InventoryTracker:
             if not inventory_data:
                 return []
             
-            # Filter data
-            filtered_data = [
-                inv for inv in inventory_data
-                if inv.commodity == commodity and (variety is None or inv.variety == variety)
-            ]
+            frame = InventoryFrame.from_points(inventory_data, commodity, variety)
+            return await self.detect_inventory_anomalies_in_frame(frame, commodity, variety, region)
             
-            if len(filtered_data) < 3:  # Need minimum data for analysis
+        except Exception as e:
+            logger.error("Error in inventory anomaly detection", error=str(e))
+            return []
+    
+    async def detect_inventory_anomalies_in_frame(
+        self,
+        frame: InventoryFrame,
+        commodity: str,
+        variety: Optional[str] = None,
+        region: Optional[str] = None
+    ) -> List[InventoryAnomaly]:
+        """Detect inventory anomalies in a timestamp-sorted inventory frame of one commodity"""
+        try:
+            if len(frame) < 3:  # Need minimum data for analysis
                 return []
             
             # Group by region if specified
-            if region:
-                filtered_data = [
-                    inv for inv in filtered_data
-                    if region.lower() in inv.location.state.lower() or 
-                       region.lower() in inv.location.district.lower()
-                ]
-            
-            # Sort by timestamp
-            filtered_data.sort(key=lambda x: x.timestamp)
+            frame = frame.filter_region(region)
             
             # Calculate normal inventory levels
-            inventory_levels = [inv.inventory_level for inv in filtered_data]
+            inventory_levels = frame.inventory_levels.tolist()
             stats = self.statistical_analyzer.calculate_statistics(inventory_levels)
             
             # Calculate moving average for trend analysis
@@ -434,10 +589,13 @@ class InventoryTracker:
             anomalies = []
             
             # Analyze recent inventory levels
-            recent_data = filtered_data[-len(moving_averages):] if moving_averages else filtered_data
+            recent_start = len(frame) - len(moving_averages) if moving_averages else 0
+            total_mandis_monitored = len({
+                frame.mandis[code].mandi_id for code in np.unique(frame.mandi_codes).tolist()
+            })
             
-            for i, data_point in enumerate(recent_data):
-                current_level = data_point.inventory_level
+            for i, data_index in enumerate(range(recent_start, len(frame))):
+                current_level = inventory_levels[data_index]
                 normal_level = moving_averages[i] if i < len(moving_averages) else stats.mean
                 
                 # Calculate deviation
@@ -457,7 +615,7 @@ class InventoryTracker:
                     
                     # Analyze affected mandis and concentration
                     affected_mandis, concentration_ratio = self._analyze_inventory_concentration(
-                        filtered_data, current_level, stats.mean
+                        frame, current_level, stats.mean
                     )
                     
                     # Determine trend
@@ -465,11 +623,13 @@ class InventoryTracker:
                         inventory_levels[-window_size:] if len(inventory_levels) >= window_size else inventory_levels
                     )
                     
+                    timestamp = frame.timestamp_at(data_index)
+                    
                     # Create anomaly record
                     anomaly = InventoryAnomaly(
                         commodity=commodity,
                         variety=variety,
-                        region=region or data_point.location.state,
+                        region=region or frame.mandi_at(data_index).location.state,
                         anomaly_type=anomaly_type,
                         detection_method=DetectionMethod.INVENTORY_TRACKING,
                         severity=severity,
@@ -478,24 +638,25 @@ class InventoryTracker:
                         inventory_deviation=deviation,
                         deviation_percentage=deviation_percentage,
                         affected_mandis=affected_mandis,
-                        total_mandis_monitored=len(set(inv.mandi_id for inv in filtered_data)),
+                        total_mandis_monitored=total_mandis_monitored,
                         concentration_ratio=concentration_ratio,
                         accumulation_period_days=self.config.stockpiling_threshold_days,
                         trend_direction=trend_direction,
                         evidence={
                             "statistical_analysis": stats.__dict__,
-                            "inventory_data_points": len(filtered_data),
+                            "inventory_data_points": len(frame),
                             "analysis_window_days": window_size,
-                            "detection_timestamp": data_point.timestamp.isoformat()
+                            "detection_timestamp": timestamp.isoformat()
                         },
                         stockpiling_indicators=self._identify_stockpiling_indicators(
-                            data_point, deviation_percentage, trend_direction
+                            current_level, frame.storage_capacity_at(data_index), timestamp,
+                            deviation_percentage, trend_direction
                         )
                     )
                     
                     anomalies.append(anomaly)
                     
-                    logger.warning(
+                    detection_log.warning(
                         "Inventory anomaly detected",
                         commodity=commodity,
                         variety=variety,
@@ -528,15 +689,15 @@ class InventoryTracker:
     
     def _analyze_inventory_concentration(
         self,
-        inventory_data: List[InventoryDataPoint],
+        frame: InventoryFrame,
         current_level: float,
         average_level: float
     ) -> Tuple[List[str], float]:
         """Analyze inventory concentration across mandis"""
         # Group by mandi
         mandi_inventories = defaultdict(list)
-        for inv in inventory_data:
-            mandi_inventories[inv.mandi_id].append(inv.inventory_level)
+        for code, level in zip(frame.mandi_codes.tolist(), frame.inventory_levels.tolist()):
+            mandi_inventories[frame.mandis[code].mandi_id].append(level)
         
         # Calculate average inventory per mandi
         mandi_averages = {
@@ -592,7 +753,9 @@ class InventoryTracker:
     
     def _identify_stockpiling_indicators(
         self,
-        data_point: InventoryDataPoint,
+        inventory_level: float,
+        storage_capacity: Optional[float],
+        timestamp: datetime,
         deviation_percentage: float,
         trend_direction: str
     ) -> List[str]:
@@ -605,11 +768,11 @@ class InventoryTracker:
         if trend_direction == "increasing":
             indicators.append("Consistent inventory accumulation pattern")
         
-        if data_point.storage_capacity and data_point.inventory_level > data_point.storage_capacity * 0.9:
+        if storage_capacity and inventory_level > storage_capacity * 0.9:
             indicators.append("Near maximum storage capacity utilization")
         
         # Time-based indicators
-        current_month = data_point.timestamp.month
+        current_month = timestamp.month
         if current_month in [3, 4, 5]:  # Pre-harvest season
             indicators.append("Unusual stockpiling during pre-harvest period")
         elif current_month in [10, 11, 12]:  # Post-harvest season
@@ -623,6 +786,7 @@ class StockpilingPatternDetector:
     def __init__(self, config: AnomalyDetectionConfig):
         self.config = config
         self.statistical_analyzer = StatisticalAnalyzer()
+        self.correlation_engine = RegionalCorrelationEngine(config.cross_regional_max_lag_days)
     
     async def detect_stockpiling_patterns(
         self,
@@ -640,37 +804,47 @@ class StockpilingPatternDetector:
             if not inventory_data or not price_data:
                 return []
             
-            # Filter data for commodity
-            filtered_inventory = [
-                inv for inv in inventory_data
-                if inv.commodity == commodity and (variety is None or inv.variety == variety)
-            ]
-            
-            filtered_prices = [
-                p for p in price_data
-                if p.commodity == commodity and (variety is None or p.variety == variety)
-            ]
+            return await self.detect_stockpiling_patterns_in_frames(
+                InventoryFrame.from_points(inventory_data, commodity, variety),
+                PriceFrame.from_points(price_data, commodity, variety),
+                commodity,
+                variety
+            )
             
-            if len(filtered_inventory) < 5 or len(filtered_prices) < 5:
+        except Exception as e:
+            logger.error("Error in stockpiling pattern detection", error=str(e))
+            return []
+    
+    async def detect_stockpiling_patterns_in_frames(
+        self,
+        inventory_frame: InventoryFrame,
+        price_frame: PriceFrame,
+        commodity: str,
+        variety: Optional[str] = None
+    ) -> List[StockpilingPattern]:
+        """Detect stockpiling patterns in timestamp-sorted frames of one commodity"""
+        try:
+            if len(inventory_frame) < 5 or len(price_frame) < 5:
                 return []
             
             patterns = []
             
             # Detect coordinated stockpiling
             coordinated_patterns = await self._detect_coordinated_stockpiling(
-                filtered_inventory, commodity, variety
+                inventory_frame, commodity, variety
             )
             patterns.extend(coordinated_patterns)
             
             # Detect cross-regional patterns
-            cross_regional_patterns = await self._detect_cross_regional_patterns(
-                filtered_inventory, filtered_prices, commodity, variety
-            )
-            patterns.extend(cross_regional_patterns)
+            if self.config.cross_regional_analysis_enabled:
+                cross_regional_patterns = await self._detect_cross_regional_patterns(
+                    inventory_frame, price_frame, commodity, variety
+                )
+                patterns.extend(cross_regional_patterns)
             
             # Detect seasonal unusual patterns
             seasonal_patterns = await self._detect_seasonal_unusual_patterns(
-                filtered_inventory, commodity, variety
+                inventory_frame, commodity, variety
             )
             patterns.extend(seasonal_patterns)
             
@@ -682,7 +856,7 @@ class StockpilingPatternDetector:
     
     async def _detect_coordinated_stockpiling(
         self,
-        inventory_data: List[InventoryDataPoint],
+        inventory_frame: InventoryFrame,
         commodity: str,
         variety: Optional[str]
     ) -> List[StockpilingPattern]:
@@ -690,28 +864,29 @@ class StockpilingPatternDetector:
         patterns = []
         
         # Group by location (state/district)
-        location_groups = defaultdict(list)
-        for inv in inventory_data:
-            location_key = f"{inv.location.state}_{inv.location.district}"
-            location_groups[location_key].append(inv)
+        location_groups = inventory_frame.group_indices(
+            lambda mandi: f"{mandi.location.state}_{mandi.location.district}"
+        )
         
         # Analyze for coordination
         if len(location_groups) >= 3:  # Need at least 3 locations for coordination
             # Calculate inventory trends for each location
             location_trends = {}
-            for location, inventories in location_groups.items():
-                if len(inventories) >= 3:
-                    inventories.sort(key=lambda x: x.timestamp)
-                    levels = [inv.inventory_level for inv in inventories]
+            for location, indices in location_groups.items():
+                if len(indices) >= 3:
+                    levels = inventory_frame.inventory_levels[indices].tolist()
+                    first_seen = inventory_frame.timestamp_at(indices[0])
+                    last_seen = inventory_frame.timestamp_at(indices[-1])
                     
                     # Calculate accumulation rate
-                    time_span = (inventories[-1].timestamp - inventories[0].timestamp).days
+                    time_span = (last_seen - first_seen).days
                     if time_span > 0:
                         accumulation_rate = (levels[-1] - levels[0]) / time_span
                         location_trends[location] = {
                             'rate': accumulation_rate,
                             'total': sum(levels),
-                            'inventories': inventories
+                            'first_seen': first_seen,
+                            'last_seen': last_seen
                         }
             
             # Look for synchronized accumulation
@@ -731,11 +906,10 @@ class StockpilingPatternDetector:
                         avg_accumulation_rate = rate_mean
                         
                         # Estimate pattern duration
-                        all_timestamps = []
-                        for trend in location_trends.values():
-                            all_timestamps.extend([inv.timestamp for inv in trend['inventories']])
-                        
-                        pattern_duration = (max(all_timestamps) - min(all_timestamps)).days
+                        pattern_duration = (
+                            max(trend['last_seen'] for trend in location_trends.values()) -
+                            min(trend['first_seen'] for trend in location_trends.values())
+                        ).days
                         
                         # Calculate confidence
                         confidence_score = self._calculate_coordination_confidence(
@@ -784,7 +958,7 @@ class StockpilingPatternDetector:
                             
                             patterns.append(pattern)
                             
-                            logger.warning(
+                            detection_log.warning(
                                 "Coordinated stockpiling pattern detected",
                                 commodity=commodity,
                                 variety=variety,
@@ -797,90 +971,56 @@ class StockpilingPatternDetector:
     
     async def _detect_cross_regional_patterns(
         self,
-        inventory_data: List[InventoryDataPoint],
-        price_data: List[PriceDataPoint],
+        inventory_frame: InventoryFrame,
+        price_frame: PriceFrame,
         commodity: str,
         variety: Optional[str]
     ) -> List[StockpilingPattern]:
-        """Detect cross-regional stockpiling patterns"""
+        """Detect inventory accumulation in one state that leads price rises in another"""
         patterns = []
         
-        # Group inventory by state
-        state_inventories = defaultdict(list)
-        for inv in inventory_data:
-            state_inventories[inv.location.state].append(inv)
-        
-        # Group prices by state
-        state_prices = defaultdict(list)
-        for price in price_data:
-            state_prices[price.location.state].append(price)
+        result = self.correlation_engine.correlate(inventory_frame, price_frame)
+        pairs = result.top_pairs(
+            self.config.cross_regional_top_pairs,
+            self.config.cross_regional_correlation_threshold
+        )
         
-        # Look for patterns where inventory accumulation in one region correlates with price increases in others
-        for accumulating_state, inventories in state_inventories.items():
-            if len(inventories) < 3:
-                continue
-            
-            # Calculate inventory trend
-            inventories.sort(key=lambda x: x.timestamp)
-            levels = [inv.inventory_level for inv in inventories]
+        for pair in pairs:
+            pattern = StockpilingPattern(
+                commodity=commodity,
+                variety=variety,
+                pattern_type="cross_regional",
+                detection_method=DetectionMethod.PATTERN_RECOGNITION,
+                severity=AnomalySeverity.HIGH,
+                involved_locations=[pair.inventory_state, pair.price_state],
+                pattern_duration_days=(pair.last_seen - pair.first_seen).days,
+                accumulation_rate=pair.inventory_trend,
+                total_accumulated_quantity=pair.total_inventory,
+                price_impact_percentage=(pair.price_trend / pair.first_price) * 100 if pair.first_price else None,
+                confidence_score=pair.correlation,
+                pattern_indicators=[
+                    f"Inventory accumulation in {pair.inventory_state}",
+                    f"Price increases in {pair.price_state}",
+                    f"Cross-regional correlation: {pair.correlation:.2f} at {pair.lag_days} day lag"
+                ],
+                evidence={
+                    "accumulating_region": pair.inventory_state,
+                    "affected_price_region": pair.price_state,
+                    "inventory_trend": pair.inventory_trend,
+                    "price_trend": pair.price_trend,
+                    "correlation_strength": pair.correlation,
+                    "lag_days": pair.lag_days,
+                    "overlap_days": pair.overlap_days
+                }
+            )
             
-            if len(levels) > 1:
-                # Check if inventory is increasing
-                recent_trend = (levels[-1] - levels[0]) / len(levels)
-                
-                if recent_trend > 0:  # Inventory accumulating
-                    # Check price trends in other states
-                    for other_state, prices in state_prices.items():
-                        if other_state != accumulating_state and len(prices) >= 3:
-                            prices.sort(key=lambda x: x.timestamp)
-                            price_values = [p.price for p in prices]
-                            
-                            # Check if prices are rising in other state
-                            price_trend = (price_values[-1] - price_values[0]) / len(price_values)
-                            
-                            if price_trend > 0:  # Prices rising
-                                # Calculate correlation strength
-                                correlation_strength = self._calculate_cross_regional_correlation(
-                                    inventories, prices
-                                )
-                                
-                                if correlation_strength > 0.6:  # Strong correlation
-                                    pattern = StockpilingPattern(
-                                        commodity=commodity,
-                                        variety=variety,
-                                        pattern_type="cross_regional",
-                                        detection_method=DetectionMethod.PATTERN_RECOGNITION,
-                                        severity=AnomalySeverity.HIGH,
-                                        involved_locations=[accumulating_state, other_state],
-                                        pattern_duration_days=(
-                                            max(inventories[-1].timestamp, prices[-1].timestamp) -
-                                            min(inventories[0].timestamp, prices[0].timestamp)
-                                        ).days,
-                                        accumulation_rate=recent_trend,
-                                        total_accumulated_quantity=sum(levels),
-                                        price_impact_percentage=(price_trend / price_values[0]) * 100,
-                                        confidence_score=correlation_strength,
-                                        pattern_indicators=[
-                                            f"Inventory accumulation in {accumulating_state}",
-                                            f"Price increases in {other_state}",
-                                            f"Cross-regional correlation: {correlation_strength:.2f}"
-                                        ],
-                                        evidence={
-                                            "accumulating_region": accumulating_state,
-                                            "affected_price_region": other_state,
-                                            "inventory_trend": recent_trend,
-                                            "price_trend": price_trend,
-                                            "correlation_strength": correlation_strength
-                                        }
-                                    )
-                                    
-                                    patterns.append(pattern)
+            patterns.append(pattern)
         
         return patterns
     
     async def _detect_seasonal_unusual_patterns(
         self,
-        inventory_data: List[InventoryDataPoint],
+        inventory_frame: InventoryFrame,
         commodity: str,
         variety: Optional[str]
     ) -> List[StockpilingPattern]:
@@ -888,10 +1028,10 @@ class StockpilingPatternDetector:
         patterns = []
         
         # Group by month to identify seasonal patterns
+        months = inventory_frame.months()
         monthly_inventories = defaultdict(list)
-        for inv in inventory_data:
-            month = inv.timestamp.month
-            monthly_inventories[month].append(inv.inventory_level)
+        for month, level in zip(months.tolist(), inventory_frame.inventory_levels.tolist()):
+            monthly_inventories[month].append(level)
         
         # Calculate seasonal baselines
         seasonal_baselines = {}
@@ -900,16 +1040,14 @@ class StockpilingPatternDetector:
                 seasonal_baselines[month] = statistics.mean(levels)
         
         # Check current month against seasonal baseline
-        current_month = datetime.utcnow().month
+        now = datetime.utcnow()
+        current_month = now.month
         if current_month in seasonal_baselines:
-            recent_inventories = [
-                inv for inv in inventory_data
-                if inv.timestamp.month == current_month and
-                   (datetime.utcnow() - inv.timestamp).days <= 30
-            ]
+            age_days = (np.datetime64(now, "us") - inventory_frame.timestamps) // np.timedelta64(1, "D")
+            recent_indices = np.flatnonzero((months == current_month) & (age_days <= 30))
             
-            if recent_inventories:
-                current_levels = [inv.inventory_level for inv in recent_inventories]
+            if len(recent_indices):
+                current_levels = inventory_frame.inventory_levels[recent_indices].tolist()
                 current_average = statistics.mean(current_levels)
                 seasonal_baseline = seasonal_baselines[current_month]
                 
@@ -923,7 +1061,9 @@ class StockpilingPatternDetector:
                         pattern_type="seasonal_unusual",
                         detection_method=DetectionMethod.PATTERN_RECOGNITION,
                         severity=self._determine_seasonal_severity(seasonal_deviation),
-                        involved_locations=[inv.location.state for inv in recent_inventories],
+                        involved_locations=[
+                            inventory_frame.mandi_at(index).location.state for index in recent_indices
+                        ],
                         pattern_duration_days=30,
                         accumulation_rate=seasonal_deviation / 30,  # Daily rate
                         total_accumulated_quantity=sum(current_levels),
@@ -990,37 +1130,6 @@ class StockpilingPatternDetector:
         else:
             return AnomalySeverity.LOW
     
-    def _calculate_cross_regional_correlation(
-        self,
-        inventories: List[InventoryDataPoint],
-        prices: List[PriceDataPoint]
-    ) -> float:
-        """Calculate correlation between inventory accumulation and price changes"""
-        # Simplified correlation calculation
-        # In practice, this would use more sophisticated time-series correlation
-        
-        if len(inventories) < 2 or len(prices) < 2:
-            return 0.0
-        
-        # Calculate trends
-        inv_levels = [inv.inventory_level for inv in inventories]
-        price_values = [p.price for p in prices]
-        
-        inv_trend = (inv_levels[-1] - inv_levels[0]) / len(inv_levels)
-        price_trend = (price_values[-1] - price_values[0]) / len(price_values)
-        
-        # Normalize trends
-        inv_trend_norm = inv_trend / statistics.mean(inv_levels) if statistics.mean(inv_levels) > 0 else 0
-        price_trend_norm = price_trend / statistics.mean(price_values) if statistics.mean(price_values) > 0 else 0
-        
-        # Simple correlation measure (positive inventory trend with positive price trend)
-        if inv_trend_norm > 0 and price_trend_norm > 0:
-            correlation = min(1.0, (inv_trend_norm + price_trend_norm) / 2)
-        else:
-            correlation = 0.0
-        
-        return correlation
-    
     def _determine_seasonal_severity(self, seasonal_deviation: float) -> AnomalySeverity:
         """Determine severity of seasonal pattern anomaly"""
         abs_deviation = abs(seasonal_deviation)
@@ -1054,9 +1163,48 @@ class AnomalyDetectionEngine:
         """
         Run comprehensive anomaly detection analysis
         
+        The point lists are loaded into a PriceHistoryStore once, so every
+        detector reads the same sorted, zero-copy frames of it.
+        
         Returns:
             Dictionary containing all detected anomalies by type
         """
+        history = PriceHistoryStore()
+        try:
+            history.add_price_points(price_data or [])
+            history.add_inventory_points(inventory_data or [])
+        except Exception as e:
+            logger.error("Error preparing data for anomaly analysis", error=str(e))
+            history.clear()
+        
+        return await self.run_store_analysis(history, commodity, variety, region)
+    
+    async def run_store_analysis(
+        self,
+        store: PriceHistoryStore,
+        commodity: str,
+        variety: Optional[str] = None,
+        region: Optional[str] = None,
+        since: Optional[datetime] = None
+    ) -> Dict[str, List]:
+        """Run comprehensive analysis over history already held in a PriceHistoryStore"""
+        return await self.analyze_frames(
+            store.price_frame(commodity, variety, start=since),
+            store.inventory_frame(commodity, variety, start=since),
+            commodity,
+            variety,
+            region
+        )
+    
+    async def analyze_frames(
+        self,
+        price_frame: PriceFrame,
+        inventory_frame: InventoryFrame,
+        commodity: str,
+        variety: Optional[str] = None,
+        region: Optional[str] = None
+    ) -> Dict[str, List]:
+        """Run all detectors over timestamp-sorted frames of one commodity"""
         results = {
             "price_anomalies": [],
             "inventory_anomalies": [],
@@ -1065,23 +1213,23 @@ class AnomalyDetectionEngine:
         
         try:
             # Run price spike detection
-            if price_data:
-                price_anomalies = await self.price_spike_detector.detect_price_spikes(
-                    price_data, commodity, variety
+            if len(price_frame):
+                price_anomalies = await self.price_spike_detector.detect_price_spikes_in_frame(
+                    price_frame, commodity, variety
                 )
                 results["price_anomalies"] = price_anomalies
             
             # Run inventory anomaly detection
-            if inventory_data:
-                inventory_anomalies = await self.inventory_tracker.detect_inventory_anomalies(
-                    inventory_data, commodity, variety, region
+            if len(inventory_frame):
+                inventory_anomalies = await self.inventory_tracker.detect_inventory_anomalies_in_frame(
+                    inventory_frame, commodity, variety, region
                 )
                 results["inventory_anomalies"] = inventory_anomalies
             
             # Run stockpiling pattern detection
-            if inventory_data and price_data:
-                stockpiling_patterns = await self.stockpiling_detector.detect_stockpiling_patterns(
-                    inventory_data, price_data, commodity, variety
+            if len(inventory_frame) and len(price_frame):
+                stockpiling_patterns = await self.stockpiling_detector.detect_stockpiling_patterns_in_frames(
+                    inventory_frame, price_frame, commodity, variety
                 )
                 results["stockpiling_patterns"] = stockpiling_patterns
             
@@ -1106,4 +1254,4 @@ class AnomalyDetectionEngine:
         except Exception as e:
             logger.error("Error in comprehensive anomaly analysis", error=str(e))
         
-        return results
\ No newline at end of file
+        return results
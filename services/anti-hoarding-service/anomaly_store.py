@@ -0,0 +1,536 @@
+"""
+Indexed storage engine for anomaly detection records
+Keeps records in memory behind time-ordered secondary indexes with incrementally
+maintained counters, and optionally writes through to SQLite or PostgreSQL
+"""
+
+import asyncio
+import heapq
+import itertools
+import sqlite3
+import threading
+import structlog
+from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import asyncpg
+except ImportError:  # PostgreSQL persistence is optional
+    asyncpg = None
+
+logger = structlog.get_logger()
+
+# (timestamp, -insertion sequence, record id). Iterating an index backwards
+# yields newest first with ties in insertion order, like a stable reverse sort.
+IndexEntry = Tuple[datetime, int, str]
+
+# (day, severity, is_confirmed, is_resolved) as last counted for a record
+StatusState = Tuple[date, Any, bool, bool]
+
+@dataclass
+class RecordCounters:
+    """Severity and review-status counts for a set of records"""
+    total: int = 0
+    confirmed: int = 0
+    resolved: int = 0
+    false_positives: int = 0
+    by_severity: Counter = field(default_factory=Counter)
+
+    def apply(self, state: StatusState, delta: int):
+        _, severity, is_confirmed, is_resolved = state
+        self.total += delta
+        if severity is not None:
+            self.by_severity[severity] += delta
+        if is_confirmed:
+            self.confirmed += delta
+        if is_resolved:
+            self.resolved += delta
+            if not is_confirmed:
+                self.false_positives += delta
+
+    def add(self, other: "RecordCounters"):
+        self.total += other.total
+        self.confirmed += other.confirmed
+        self.resolved += other.resolved
+        self.false_positives += other.false_positives
+        self.by_severity.update(other.by_severity)
+
+class IndexedRecordStore:
+    """Records of one model type behind secondary indexes.
+
+    Every index maps a key to entries sorted by the record's time field, so a
+    filtered, time-bounded, newest-first query is a bisect plus a scan of the
+    smallest matching index. Counters are kept per day, which makes statistics
+    for a time range cost one lookup per day rather than a pass over records.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        model: Any,
+        time_field: str,
+        indexes: Dict[str, Callable[[Any], Any]]
+    ):
+        self.name = name
+        self.model = model
+        self.time_field = time_field
+        self.records: Dict[str, Any] = {}
+        self.totals = RecordCounters()
+        self._index_keys = indexes
+        self._time_index: List[IndexEntry] = []
+        self._indexes: Dict[str, Dict[Any, List[IndexEntry]]] = {name: {} for name in indexes}
+        self._entries: Dict[str, IndexEntry] = {}
+        self._keys: Dict[str, Dict[str, Any]] = {}
+        self._status: Dict[str, StatusState] = {}
+        self._daily: Dict[date, RecordCounters] = {}
+        self._sequence = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __contains__(self, record_id: str) -> bool:
+        return record_id in self.records
+
+    def __getitem__(self, record_id: str) -> Any:
+        return self.records[record_id]
+
+    def get(self, record_id: str) -> Optional[Any]:
+        return self.records.get(record_id)
+
+    def values(self):
+        return self.records.values()
+
+    def timestamp_of(self, record: Any) -> datetime:
+        return getattr(record, self.time_field)
+
+    def _status_of(self, record: Any) -> StatusState:
+        return (
+            self.timestamp_of(record).date(),
+            getattr(record, "severity", None),
+            bool(getattr(record, "is_confirmed", False)),
+            bool(getattr(record, "is_resolved", False))
+        )
+
+    def _count(self, state: StatusState, delta: int):
+        self.totals.apply(state, delta)
+        bucket = self._daily.get(state[0])
+        if bucket is None:
+            bucket = self._daily[state[0]] = RecordCounters()
+        bucket.apply(state, delta)
+        if bucket.total == 0:
+            del self._daily[state[0]]
+
+    def add(self, record: Any):
+        """Insert or replace a record"""
+        if record.id in self.records:
+            self.remove(record.id)
+
+        entry = (self.timestamp_of(record), -next(self._sequence), record.id)
+        keys = {name: key_fn(record) for name, key_fn in self._index_keys.items()}
+
+        self.records[record.id] = record
+        self._entries[record.id] = entry
+        self._keys[record.id] = keys
+        insort(self._time_index, entry)
+        for name, key in keys.items():
+            insort(self._indexes[name].setdefault(key, []), entry)
+
+        state = self._status_of(record)
+        self._status[record.id] = state
+        self._count(state, 1)
+
+    def remove(self, record_id: str) -> Optional[Any]:
+        record = self.records.pop(record_id, None)
+        if record is None:
+            return None
+
+        entry = self._entries.pop(record_id)
+        keys = self._keys.pop(record_id)
+        del self._time_index[bisect_left(self._time_index, entry)]
+        for name, key in keys.items():
+            entries = self._indexes[name][key]
+            del entries[bisect_left(entries, entry)]
+            if not entries:
+                del self._indexes[name][key]
+
+        self._count(self._status.pop(record_id), -1)
+        return record
+
+    def update(self, record_id: str, **changes) -> Optional[Any]:
+        """Set fields on a stored record, keeping indexes and counters current"""
+        record = self.records.get(record_id)
+        if record is None:
+            return None
+
+        for name, value in changes.items():
+            setattr(record, name, value)
+
+        keys = {name: key_fn(record) for name, key_fn in self._index_keys.items()}
+        if keys != self._keys[record_id] or self.timestamp_of(record) != self._entries[record_id][0]:
+            self.remove(record_id)
+            self.add(record)
+            return record
+
+        state = self._status_of(record)
+        if state != self._status[record_id]:
+            self._count(self._status[record_id], -1)
+            self._count(state, 1)
+            self._status[record_id] = state
+        return record
+
+    def _drop_prefix(self, boundary: Tuple) -> List[str]:
+        """Remove every record whose index entry sorts before boundary"""
+        cut = bisect_left(self._time_index, boundary)
+        if cut == 0:
+            return []
+
+        dropped = [entry[2] for entry in self._time_index[:cut]]
+        del self._time_index[:cut]
+        # Each index list is ordered like the time index, so the dropped
+        # entries are a prefix of it; only the lists they sit in are cut
+        counts: Counter = Counter()
+        for record_id in dropped:
+            for name, key in self._keys[record_id].items():
+                counts[(name, key)] += 1
+        for (name, key), count in counts.items():
+            entries = self._indexes[name][key]
+            del entries[:count]
+            if not entries:
+                del self._indexes[name][key]
+
+        for record_id in dropped:
+            del self.records[record_id]
+            del self._entries[record_id]
+            del self._keys[record_id]
+            self._count(self._status.pop(record_id), -1)
+        return dropped
+
+    def purge_before(self, cutoff: datetime) -> List[str]:
+        """Drop records older than cutoff; returns their ids"""
+        return self._drop_prefix((cutoff,))
+
+    def trim_to(self, max_records: int) -> List[str]:
+        """Drop the oldest records beyond max_records; returns their ids"""
+        excess = len(self._time_index) - max_records
+        if excess <= 0:
+            return []
+        return self._drop_prefix(self._time_index[excess])
+
+    @staticmethod
+    def _bounds(
+        entries: List[IndexEntry],
+        start: Optional[datetime],
+        end: Optional[datetime]
+    ) -> Tuple[int, int]:
+        lo = bisect_left(entries, (start,)) if start is not None else 0
+        hi = bisect_right(entries, (end, 1)) if end is not None else len(entries)
+        return lo, hi
+
+    @staticmethod
+    def _newest_first(entries: List[IndexEntry], lo: int, hi: int) -> Iterator[IndexEntry]:
+        for position in range(hi - 1, lo - 1, -1):
+            yield entries[position]
+
+    def query(
+        self,
+        equals: Optional[Dict[str, Any]] = None,
+        matching: Optional[Dict[str, Callable[[Any], bool]]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        predicate: Optional[Callable[[Any], bool]] = None,
+        limit: Optional[int] = None
+    ) -> List[Any]:
+        """Records newest first.
+
+        equals filters on exact index keys (None values are ignored),
+        matching applies a predicate to index keys, predicate is checked on
+        the records themselves.
+        """
+        equals = {name: value for name, value in (equals or {}).items() if value is not None}
+        matching = matching or {}
+
+        # Candidate index lists per filter; the smallest one drives the scan
+        sources: List[List[List[IndexEntry]]] = [
+            [self._indexes[name].get(value, [])] for name, value in equals.items()
+        ]
+        sources.extend(
+            [entries for key, entries in self._indexes[name].items() if match(key)]
+            for name, match in matching.items()
+        )
+        if not sources:
+            sources = [[self._time_index]]
+        driver = min(sources, key=lambda lists: sum(len(entries) for entries in lists))
+
+        scans = [
+            self._newest_first(entries, *self._bounds(entries, start, end))
+            for entries in driver
+        ]
+        candidates = scans[0] if len(scans) == 1 else heapq.merge(*scans, reverse=True)
+
+        results = []
+        for _, _, record_id in candidates:
+            keys = self._keys[record_id]
+            if any(keys[name] != value for name, value in equals.items()):
+                continue
+            if any(not match(keys[name]) for name, match in matching.items()):
+                continue
+            record = self.records[record_id]
+            if predicate is not None and not predicate(record):
+                continue
+            results.append(record)
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+    def _scan_counts(self, counters: RecordCounters, start: datetime, end: datetime, include_end: bool):
+        lo = bisect_left(self._time_index, (start,))
+        hi = bisect_right(self._time_index, (end, 1)) if include_end else bisect_left(self._time_index, (end,))
+        for position in range(lo, hi):
+            counters.apply(self._status[self._time_index[position][2]], 1)
+
+    def counters(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> RecordCounters:
+        """Counts for records with start <= time <= end"""
+        result = RecordCounters()
+        if not self._time_index:
+            return result
+
+        oldest = self._time_index[0][0]
+        newest = self._time_index[-1][0]
+        start = oldest if start is None else max(start, oldest)
+        end = newest if end is None else min(end, newest)
+        if start > end:
+            return result
+        if start == oldest and end == newest:
+            result.add(self.totals)
+            return result
+
+        # Whole days come from the daily buckets; only the partial first and
+        # last day are scanned
+        first_full_day = start.date() if start.time() == time.min else start.date() + timedelta(days=1)
+        last_day = end.date()
+        if first_full_day >= last_day:
+            self._scan_counts(result, start, end, include_end=True)
+            return result
+
+        self._scan_counts(result, start, datetime.combine(first_full_day, time.min), include_end=False)
+        for offset in range((last_day - first_full_day).days):
+            bucket = self._daily.get(first_full_day + timedelta(days=offset))
+            if bucket is not None:
+                result.add(bucket)
+        self._scan_counts(result, datetime.combine(last_day, time.min), end, include_end=True)
+        return result
+
+class AnomalyPersistence(ABC):
+    """Write-through persistence for IndexedRecordStore collections.
+
+    Records are stored as JSON payloads keyed by (collection, id) with the
+    record time alongside for retention and reloads. Backends must implement
+    every abstract method; an incomplete one fails at construction.
+    """
+
+    @abstractmethod
+    async def connect(self):
+        ...
+
+    @abstractmethod
+    async def close(self):
+        ...
+
+    @abstractmethod
+    async def save_many(self, collection: str, rows: Sequence[Tuple[str, datetime, str]]):
+        ...
+
+    async def save(self, collection: str, record_id: str, recorded_at: datetime, payload: str):
+        await self.save_many(collection, [(record_id, recorded_at, payload)])
+
+    @abstractmethod
+    async def delete(self, collection: str, record_ids: Sequence[str]):
+        ...
+
+    @abstractmethod
+    async def delete_before(self, collection: str, cutoff: datetime):
+        ...
+
+    @abstractmethod
+    async def load(self, collection: str, since: Optional[datetime] = None) -> List[str]:
+        """JSON payloads of a collection, oldest first"""
+
+class SQLitePersistence(AnomalyPersistence):
+    """SQLite backend; blocking calls run in a worker thread"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS anomaly_records (
+                collection TEXT NOT NULL,
+                id TEXT NOT NULL,
+                recorded_at TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                PRIMARY KEY (collection, id)
+            )
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_anomaly_records_collection_time
+            ON anomaly_records (collection, recorded_at)
+        """)
+        conn.commit()
+        return conn
+
+    async def _run(self, fn, *args):
+        def locked():
+            with self._lock:
+                return fn(*args)
+        return await asyncio.to_thread(locked)
+
+    async def connect(self):
+        self._conn = await asyncio.to_thread(self._open)
+        logger.info("SQLite anomaly persistence connected", path=self.path)
+
+    async def close(self):
+        if self._conn is not None:
+            await self._run(self._conn.close)
+            self._conn = None
+
+    def _execute(self, sql: str, parameters: Sequence = (), many: bool = False):
+        with self._conn:
+            if many:
+                self._conn.executemany(sql, parameters)
+            else:
+                self._conn.execute(sql, parameters)
+
+    async def save_many(self, collection: str, rows: Sequence[Tuple[str, datetime, str]]):
+        await self._run(
+            self._execute,
+            """
+            INSERT INTO anomaly_records (collection, id, recorded_at, payload)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (collection, id) DO UPDATE SET
+                recorded_at = excluded.recorded_at,
+                payload = excluded.payload
+            """,
+            [(collection, record_id, recorded_at.isoformat(), payload) for record_id, recorded_at, payload in rows],
+            True
+        )
+
+    async def delete(self, collection: str, record_ids: Sequence[str]):
+        await self._run(
+            self._execute,
+            "DELETE FROM anomaly_records WHERE collection = ? AND id = ?",
+            [(collection, record_id) for record_id in record_ids],
+            True
+        )
+
+    async def delete_before(self, collection: str, cutoff: datetime):
+        await self._run(
+            self._execute,
+            "DELETE FROM anomaly_records WHERE collection = ? AND recorded_at < ?",
+            (collection, cutoff.isoformat())
+        )
+
+    async def load(self, collection: str, since: Optional[datetime] = None) -> List[str]:
+        def fetch():
+            rows = self._conn.execute(
+                """
+                SELECT payload FROM anomaly_records
+                WHERE collection = ? AND recorded_at >= ?
+                ORDER BY recorded_at
+                """,
+                (collection, since.isoformat() if since else "")
+            ).fetchall()
+            return [row[0] for row in rows]
+        return await self._run(fetch)
+
+class PostgresPersistence(AnomalyPersistence):
+    """PostgreSQL backend on an asyncpg pool"""
+
+    def __init__(self, dsn: str, min_size: int = 1, max_size: int = 5):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self._pool = None
+
+    async def connect(self):
+        if asyncpg is None:
+            raise RuntimeError("asyncpg is required for PostgreSQL anomaly persistence")
+
+        self._pool = await asyncpg.create_pool(
+            self.dsn, min_size=self.min_size, max_size=self.max_size, command_timeout=60
+        )
+        async with self._pool.acquire() as conn:
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS anomaly_records (
+                    collection VARCHAR NOT NULL,
+                    id VARCHAR NOT NULL,
+                    recorded_at TIMESTAMP NOT NULL,
+                    payload JSONB NOT NULL,
+                    PRIMARY KEY (collection, id)
+                )
+            """)
+            await conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_anomaly_records_collection_time
+                ON anomaly_records (collection, recorded_at)
+            """)
+        logger.info("PostgreSQL anomaly persistence connected")
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    async def save_many(self, collection: str, rows: Sequence[Tuple[str, datetime, str]]):
+        async with self._pool.acquire() as conn:
+            await conn.executemany(
+                """
+                INSERT INTO anomaly_records (collection, id, recorded_at, payload)
+                VALUES ($1, $2, $3, $4::jsonb)
+                ON CONFLICT (collection, id) DO UPDATE SET
+                    recorded_at = EXCLUDED.recorded_at,
+                    payload = EXCLUDED.payload
+                """,
+                [(collection, record_id, recorded_at, payload) for record_id, recorded_at, payload in rows]
+            )
+
+    async def delete(self, collection: str, record_ids: Sequence[str]):
+        async with self._pool.acquire() as conn:
+            await conn.execute(
+                "DELETE FROM anomaly_records WHERE collection = $1 AND id = ANY($2::varchar[])",
+                collection, list(record_ids)
+            )
+
+    async def delete_before(self, collection: str, cutoff: datetime):
+        async with self._pool.acquire() as conn:
+            await conn.execute(
+                "DELETE FROM anomaly_records WHERE collection = $1 AND recorded_at < $2",
+                collection, cutoff
+            )
+
+    async def load(self, collection: str, since: Optional[datetime] = None) -> List[str]:
+        async with self._pool.acquire() as conn:
+            rows = await conn.fetch(
+                """
+                SELECT payload::text AS payload FROM anomaly_records
+                WHERE collection = $1 AND ($2::timestamp IS NULL OR recorded_at >= $2)
+                ORDER BY recorded_at
+                """,
+                collection, since
+            )
+        return [row["payload"] for row in rows]
+
+def create_persistence(url: str) -> AnomalyPersistence:
+    """Persistence backend for a sqlite:///path or postgresql:// URL"""
+    if url.startswith("sqlite://"):
+        path = url[len("sqlite:///"):] if url.startswith("sqlite:///") else ""
+        return SQLitePersistence(path or ":memory:")
+    if url.startswith(("postgres://", "postgresql://")):
+        return PostgresPersistence(url)
+    raise ValueError(f"Unsupported anomaly store URL: {url}")
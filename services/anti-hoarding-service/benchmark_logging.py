@@ -0,0 +1,88 @@
+"""
+Benchmark: detection throughput with per-anomaly logging unsampled, sampled and off
+
+Usage: python benchmark_logging.py [--points 2000] [--repeat 3]
+
+Log output goes to /dev/null through structlog's default processors, so the
+numbers measure formatting cost rather than terminal speed.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+import structlog
+
+import anomaly_detector
+from anomaly_detector import PriceSpikeDetector, InventoryTracker, PriceDataPoint, InventoryDataPoint
+from models import AnomalyDetectionConfig, GeoLocation
+from sampled_logging import LogRule
+
+def make_data(points: int):
+    rng = random.Random(7)
+    location = GeoLocation(latitude=0.0, longitude=0.0, district="Test District", state="Test State")
+    start = datetime(2024, 1, 1)
+    prices = []
+    inventory = []
+    for i in range(points):
+        # A noisy market day: roughly one point in eight is a spike
+        spike = 1.6 if rng.random() < 0.125 else 1.0
+        prices.append(PriceDataPoint(
+            "wheat", "HD-2967", 2000.0 * rng.uniform(0.95, 1.05) * spike, 50.0,
+            f"mandi_{i % 20}", f"Mandi {i % 20}", location, start + timedelta(minutes=i), 0.9
+        ))
+        inventory.append(InventoryDataPoint(
+            "wheat", "HD-2967", 1000.0 * rng.uniform(0.9, 1.1) * spike,
+            f"mandi_{i % 20}", f"Mandi {i % 20}", location, start + timedelta(minutes=i), 3000.0
+        ))
+    return prices, inventory
+
+async def detect(config, prices, inventory) -> int:
+    spikes = await PriceSpikeDetector(config).detect_price_spikes(prices, "wheat", "HD-2967")
+    anomalies = await InventoryTracker(config).detect_inventory_anomalies(inventory, "wheat", "HD-2967")
+    return len(spikes) + len(anomalies)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--points", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    devnull = open(os.devnull, "w")
+    structlog.configure(logger_factory=structlog.PrintLoggerFactory(file=devnull))
+
+    config = AnomalyDetectionConfig(min_data_points=10, moving_average_window_days=7)
+    prices, inventory = make_data(args.points)
+    log = anomaly_detector.detection_log
+
+    # sample_rate=0 drops every event before its lazy kwargs are resolved
+    modes = {
+        "unsampled": (False, LogRule()),
+        "sampled": (True, LogRule.from_env()),
+        "off": (True, LogRule(sample_rate=0.0))
+    }
+    baseline = None
+    for mode, (enabled, rule) in modes.items():
+        log.enabled = enabled
+        log.default_rule = rule
+        log.rules.clear()
+        best = float("inf")
+        for _ in range(args.repeat):
+            log.reset()
+            started = time.perf_counter()
+            found = asyncio.run(detect(config, prices, inventory))
+            best = min(best, time.perf_counter() - started)
+        throughput = 2 * args.points / best
+        baseline = baseline or throughput
+        stats = log.stats()
+        print(
+            f"{mode:>10}: {best * 1000:8.1f} ms  {throughput:12,.0f} points/s  "
+            f"x{throughput / baseline:4.2f}  ({found} anomalies, "
+            f"{stats['logged']} logged, {stats['dropped']} dropped)"
+        )
+
+if __name__ == "__main__":
+    main()
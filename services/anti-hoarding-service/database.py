@@ -7,33 +7,184 @@ import structlog
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 import json
+import os
 
 from models import (
     PriceAnomaly, InventoryAnomaly, StockpilingPattern, 
-    MarketManipulationAlert, SupplyDemandBalance, EvidenceRecord,
+    MarketManipulationAlert, SupplyDemandBalance, RegionalSupplyChain, EvidenceRecord,
     AnomalyType, AnomalySeverity, DetectionStatistics
 )
+from anomaly_store import (
+    IndexedRecordStore, RecordCounters, AnomalyPersistence, create_persistence
+)
+from sampled_logging import SampledLogger
 
 logger = structlog.get_logger()
+# Per-record store events are sampled and rate limited
+store_log = SampledLogger.from_env(logger)
+
+DEFAULT_RETENTION_DAYS = 90
+DEFAULT_MAX_RECORDS_PER_COLLECTION = 100_000
+
+def _lower(value: Optional[str]) -> Optional[str]:
+    return value.lower() if value else value
 
-# Mock database operations - In production, these would connect to actual databases
 class AnomalyDatabase:
-    """Database operations for anomaly detection data"""
+    """Database operations for anomaly detection data
+    
+    Records live in IndexedRecordStore collections (indexed by commodity,
+    severity, region and time) and are optionally written through to a
+    persistence backend. Records older than retention_days are dropped, and
+    each collection keeps at most max_records_per_collection in memory.
+    
+    Queries, statistics and status updates only see records held in memory.
+    Once a collection is over its cap, its oldest records are still kept
+    by the persistence backend until retention, but reads no longer return
+    them, even for a time range inside the retention window.
+    """
     
-    def __init__(self):
-        # In-memory storage for demonstration
-        self.price_anomalies: Dict[str, PriceAnomaly] = {}
-        self.inventory_anomalies: Dict[str, InventoryAnomaly] = {}
-        self.stockpiling_patterns: Dict[str, StockpilingPattern] = {}
-        self.manipulation_alerts: Dict[str, MarketManipulationAlert] = {}
-        self.supply_demand_balances: Dict[str, SupplyDemandBalance] = {}
-        self.evidence_records: Dict[str, EvidenceRecord] = {}
+    def __init__(
+        self,
+        retention_days: Optional[int] = DEFAULT_RETENTION_DAYS,
+        max_records_per_collection: Optional[int] = DEFAULT_MAX_RECORDS_PER_COLLECTION
+    ):
+        self.retention_days = retention_days
+        self.max_records_per_collection = max_records_per_collection
+        self.persistence: Optional[AnomalyPersistence] = None
+        
+        commodity_key = lambda record: record.commodity.lower()
+        severity_key = lambda record: record.severity
+        
+        self.price_anomalies = IndexedRecordStore(
+            "price_anomalies", PriceAnomaly, "detected_at",
+            {"commodity": commodity_key, "severity": severity_key}
+        )
+        self.inventory_anomalies = IndexedRecordStore(
+            "inventory_anomalies", InventoryAnomaly, "detected_at",
+            {
+                "commodity": commodity_key,
+                "severity": severity_key,
+                "region": lambda record: record.region.lower(),
+                "anomaly_type": lambda record: record.anomaly_type
+            }
+        )
+        self.stockpiling_patterns = IndexedRecordStore(
+            "stockpiling_patterns", StockpilingPattern, "detected_at",
+            {
+                "commodity": commodity_key,
+                "severity": severity_key,
+                "pattern_type": lambda record: record.pattern_type
+            }
+        )
+        self.manipulation_alerts = IndexedRecordStore(
+            "manipulation_alerts", MarketManipulationAlert, "generated_at",
+            {"commodity": commodity_key, "severity": severity_key}
+        )
+        self.supply_demand_balances = IndexedRecordStore(
+            "supply_demand_balances", SupplyDemandBalance, "calculated_at",
+            {
+                "commodity": commodity_key,
+                "region": lambda record: record.region.lower(),
+                "balance_status": lambda record: record.balance_status
+            }
+        )
+        self.supply_chains = IndexedRecordStore(
+            "supply_chains", RegionalSupplyChain, "analyzed_at",
+            {"commodity": commodity_key, "region": lambda record: record.region.lower()}
+        )
+        self.evidence_records = IndexedRecordStore(
+            "evidence_records", EvidenceRecord, "collected_at",
+            {
+                "anomaly_id": lambda record: record.anomaly_id,
+                "evidence_type": lambda record: record.evidence_type
+            }
+        )
+        self.collections: Dict[str, IndexedRecordStore] = {
+            store.name: store for store in (
+                self.price_anomalies, self.inventory_anomalies, self.stockpiling_patterns,
+                self.manipulation_alerts, self.supply_demand_balances, self.supply_chains,
+                self.evidence_records
+            )
+        }
+        self._status_collections = {
+            "price": self.price_anomalies,
+            "inventory": self.inventory_anomalies,
+            "stockpiling": self.stockpiling_patterns
+        }
+    
+    def _retention_cutoff(self) -> Optional[datetime]:
+        if not self.retention_days:
+            return None
+        return datetime.utcnow() - timedelta(days=self.retention_days)
+    
+    async def attach_persistence(self, persistence: AnomalyPersistence):
+        """Connect a persistence backend and reload records within retention"""
+        await persistence.connect()
+        self.persistence = persistence
+        
+        since = self._retention_cutoff()
+        for store in self.collections.values():
+            payloads = await persistence.load(store.name, since)
+            for payload in payloads:
+                store.add(store.model.model_validate_json(payload))
+            if self.max_records_per_collection:
+                store.trim_to(self.max_records_per_collection)
+            logger.info("Anomaly collection loaded", collection=store.name, records=len(store))
+    
+    async def close(self):
+        if self.persistence is not None:
+            await self.persistence.close()
+            self.persistence = None
+    
+    async def _save(self, store: IndexedRecordStore, record: Any):
+        """Index a record, write it through and apply the retention policy"""
+        store.add(record)
+        if self.persistence is not None:
+            await self.persistence.save(
+                store.name, record.id, store.timestamp_of(record), record.model_dump_json()
+            )
+        await self._enforce_retention(store)
+    
+    async def store_many(self, store: IndexedRecordStore, records: List[Any]) -> int:
+        """Index many records of one collection with a single bulk write-through"""
+        try:
+            for record in records:
+                store.add(record)
+            if records and self.persistence is not None:
+                await self.persistence.save_many(store.name, [
+                    (record.id, store.timestamp_of(record), record.model_dump_json())
+                    for record in records
+                ])
+            await self._enforce_retention(store)
+            logger.info("Records stored in bulk", collection=store.name, records=len(records))
+            return len(records)
+        except Exception as e:
+            logger.error("Failed to store records in bulk", collection=store.name, error=str(e))
+            return 0
+    
+    async def _enforce_retention(self, store: IndexedRecordStore) -> int:
+        cutoff = self._retention_cutoff()
+        expired = store.purge_before(cutoff) if cutoff else []
+        if expired and self.persistence is not None:
+            await self.persistence.delete_before(store.name, cutoff)
+        
+        # The in-memory cap only bounds memory; persisted rows age out by
+        # retention, and trimmed rows stay in the backend but leave every read
+        trimmed = store.trim_to(self.max_records_per_collection) if self.max_records_per_collection else []
+        return len(expired) + len(trimmed)
+    
+    async def enforce_retention(self) -> Dict[str, int]:
+        """Apply the retention policy to every collection; returns records dropped"""
+        dropped = {}
+        for name, store in self.collections.items():
+            dropped[name] = await self._enforce_retention(store)
+        return dropped
     
     async def store_price_anomaly(self, anomaly: PriceAnomaly) -> bool:
         """Store price anomaly in database"""
         try:
-            self.price_anomalies[anomaly.id] = anomaly
-            logger.info("Price anomaly stored", anomaly_id=anomaly.id, commodity=anomaly.commodity)
+            await self._save(self.price_anomalies, anomaly)
+            store_log.info("Price anomaly stored", anomaly_id=anomaly.id, commodity=anomaly.commodity)
             return True
         except Exception as e:
             logger.error("Failed to store price anomaly", error=str(e))
@@ -42,8 +193,8 @@ class AnomalyDatabase:
     async def store_inventory_anomaly(self, anomaly: InventoryAnomaly) -> bool:
         """Store inventory anomaly in database"""
         try:
-            self.inventory_anomalies[anomaly.id] = anomaly
-            logger.info("Inventory anomaly stored", anomaly_id=anomaly.id, commodity=anomaly.commodity)
+            await self._save(self.inventory_anomalies, anomaly)
+            store_log.info("Inventory anomaly stored", anomaly_id=anomaly.id, commodity=anomaly.commodity)
             return True
         except Exception as e:
             logger.error("Failed to store inventory anomaly", error=str(e))
@@ -52,8 +203,8 @@ class AnomalyDatabase:
     async def store_stockpiling_pattern(self, pattern: StockpilingPattern) -> bool:
         """Store stockpiling pattern in database"""
         try:
-            self.stockpiling_patterns[pattern.id] = pattern
-            logger.info("Stockpiling pattern stored", pattern_id=pattern.id, commodity=pattern.commodity)
+            await self._save(self.stockpiling_patterns, pattern)
+            store_log.info("Stockpiling pattern stored", pattern_id=pattern.id, commodity=pattern.commodity)
             return True
         except Exception as e:
             logger.error("Failed to store stockpiling pattern", error=str(e))
@@ -62,8 +213,8 @@ class AnomalyDatabase:
     async def store_manipulation_alert(self, alert: MarketManipulationAlert) -> bool:
         """Store market manipulation alert in database"""
         try:
-            self.manipulation_alerts[alert.id] = alert
-            logger.info("Manipulation alert stored", alert_id=alert.id, commodity=alert.commodity)
+            await self._save(self.manipulation_alerts, alert)
+            store_log.info("Manipulation alert stored", alert_id=alert.id, commodity=alert.commodity)
             return True
         except Exception as e:
             logger.error("Failed to store manipulation alert", error=str(e))
@@ -72,8 +223,8 @@ class AnomalyDatabase:
     async def store_supply_demand_balance(self, balance: SupplyDemandBalance) -> bool:
         """Store supply-demand balance in database"""
         try:
-            self.supply_demand_balances[balance.id] = balance
-            logger.info("Supply-demand balance stored", balance_id=balance.id, commodity=balance.commodity)
+            await self._save(self.supply_demand_balances, balance)
+            store_log.info("Supply-demand balance stored", balance_id=balance.id, commodity=balance.commodity)
             return True
         except Exception as e:
             logger.error("Failed to store supply-demand balance", error=str(e))
@@ -82,8 +233,8 @@ class AnomalyDatabase:
     async def store_evidence_record(self, evidence: EvidenceRecord) -> bool:
         """Store evidence record in database"""
         try:
-            self.evidence_records[evidence.id] = evidence
-            logger.info("Evidence record stored", evidence_id=evidence.id, anomaly_id=evidence.anomaly_id)
+            await self._save(self.evidence_records, evidence)
+            store_log.info("Evidence record stored", evidence_id=evidence.id, anomaly_id=evidence.anomaly_id)
             return True
         except Exception as e:
             logger.error("Failed to store evidence record", error=str(e))
@@ -97,27 +248,14 @@ class AnomalyDatabase:
         end_date: Optional[datetime] = None,
         limit: int = 100
     ) -> List[PriceAnomaly]:
-        """Retrieve price anomalies with filters"""
+        """Retrieve price anomalies with filters, most recent first"""
         try:
-            anomalies = list(self.price_anomalies.values())
-            
-            # Apply filters
-            if commodity:
-                anomalies = [a for a in anomalies if a.commodity.lower() == commodity.lower()]
-            
-            if severity:
-                anomalies = [a for a in anomalies if a.severity == severity]
-            
-            if start_date:
-                anomalies = [a for a in anomalies if a.detected_at >= start_date]
-            
-            if end_date:
-                anomalies = [a for a in anomalies if a.detected_at <= end_date]
-            
-            # Sort by detection time (most recent first)
-            anomalies.sort(key=lambda x: x.detected_at, reverse=True)
-            
-            return anomalies[:limit]
+            return self.price_anomalies.query(
+                equals={"commodity": _lower(commodity), "severity": severity},
+                start=start_date,
+                end=end_date,
+                limit=limit
+            )
             
         except Exception as e:
             logger.error("Failed to retrieve price anomalies", error=str(e))
@@ -130,24 +268,15 @@ class AnomalyDatabase:
         anomaly_type: Optional[AnomalyType] = None,
         limit: int = 100
     ) -> List[InventoryAnomaly]:
-        """Retrieve inventory anomalies with filters"""
+        """Retrieve inventory anomalies with filters, most recent first"""
         try:
-            anomalies = list(self.inventory_anomalies.values())
-            
-            # Apply filters
-            if commodity:
-                anomalies = [a for a in anomalies if a.commodity.lower() == commodity.lower()]
-            
-            if region:
-                anomalies = [a for a in anomalies if region.lower() in a.region.lower()]
-            
-            if anomaly_type:
-                anomalies = [a for a in anomalies if a.anomaly_type == anomaly_type]
-            
-            # Sort by detection time (most recent first)
-            anomalies.sort(key=lambda x: x.detected_at, reverse=True)
-            
-            return anomalies[:limit]
+            # Region matches are substring matches over the distinct regions
+            matching = {"region": lambda key: region.lower() in key} if region else None
+            return self.inventory_anomalies.query(
+                equals={"commodity": _lower(commodity), "anomaly_type": anomaly_type},
+                matching=matching,
+                limit=limit
+            )
             
         except Exception as e:
             logger.error("Failed to retrieve inventory anomalies", error=str(e))
@@ -160,24 +289,16 @@ class AnomalyDatabase:
         severity: Optional[AnomalySeverity] = None,
         limit: int = 100
     ) -> List[StockpilingPattern]:
-        """Retrieve stockpiling patterns with filters"""
+        """Retrieve stockpiling patterns with filters, most recent first"""
         try:
-            patterns = list(self.stockpiling_patterns.values())
-            
-            # Apply filters
-            if commodity:
-                patterns = [p for p in patterns if p.commodity.lower() == commodity.lower()]
-            
-            if pattern_type:
-                patterns = [p for p in patterns if p.pattern_type == pattern_type]
-            
-            if severity:
-                patterns = [p for p in patterns if p.severity == severity]
-            
-            # Sort by detection time (most recent first)
-            patterns.sort(key=lambda x: x.detected_at, reverse=True)
-            
-            return patterns[:limit]
+            return self.stockpiling_patterns.query(
+                equals={
+                    "commodity": _lower(commodity),
+                    "pattern_type": pattern_type,
+                    "severity": severity
+                },
+                limit=limit
+            )
             
         except Exception as e:
             logger.error("Failed to retrieve stockpiling patterns", error=str(e))
@@ -190,24 +311,13 @@ class AnomalyDatabase:
         is_sent: Optional[bool] = None,
         limit: int = 100
     ) -> List[MarketManipulationAlert]:
-        """Retrieve manipulation alerts with filters"""
+        """Retrieve manipulation alerts with filters, most recent first"""
         try:
-            alerts = list(self.manipulation_alerts.values())
-            
-            # Apply filters
-            if commodity:
-                alerts = [a for a in alerts if a.commodity.lower() == commodity.lower()]
-            
-            if severity:
-                alerts = [a for a in alerts if a.severity == severity]
-            
-            if is_sent is not None:
-                alerts = [a for a in alerts if a.is_sent == is_sent]
-            
-            # Sort by generation time (most recent first)
-            alerts.sort(key=lambda x: x.generated_at, reverse=True)
-            
-            return alerts[:limit]
+            return self.manipulation_alerts.query(
+                equals={"commodity": _lower(commodity), "severity": severity},
+                predicate=(lambda alert: alert.is_sent == is_sent) if is_sent is not None else None,
+                limit=limit
+            )
             
         except Exception as e:
             logger.error("Failed to retrieve manipulation alerts", error=str(e))
@@ -220,24 +330,14 @@ class AnomalyDatabase:
         balance_status: Optional[str] = None,
         limit: int = 100
     ) -> List[SupplyDemandBalance]:
-        """Retrieve supply-demand balances with filters"""
+        """Retrieve supply-demand balances with filters, most recent first"""
         try:
-            balances = list(self.supply_demand_balances.values())
-            
-            # Apply filters
-            if commodity:
-                balances = [b for b in balances if b.commodity.lower() == commodity.lower()]
-            
-            if region:
-                balances = [b for b in balances if region.lower() in b.region.lower()]
-            
-            if balance_status:
-                balances = [b for b in balances if b.balance_status == balance_status]
-            
-            # Sort by calculation time (most recent first)
-            balances.sort(key=lambda x: x.calculated_at, reverse=True)
-            
-            return balances[:limit]
+            matching = {"region": lambda key: region.lower() in key} if region else None
+            return self.supply_demand_balances.query(
+                equals={"commodity": _lower(commodity), "balance_status": balance_status},
+                matching=matching,
+                limit=limit
+            )
             
         except Exception as e:
             logger.error("Failed to retrieve supply-demand balances", error=str(e))
@@ -248,20 +348,11 @@ class AnomalyDatabase:
         anomaly_id: str,
         evidence_type: Optional[str] = None
     ) -> List[EvidenceRecord]:
-        """Retrieve evidence records for an anomaly"""
+        """Retrieve evidence records for an anomaly, most recent first"""
         try:
-            records = [
-                record for record in self.evidence_records.values()
-                if record.anomaly_id == anomaly_id
-            ]
-            
-            if evidence_type:
-                records = [r for r in records if r.evidence_type == evidence_type]
-            
-            # Sort by collection time (most recent first)
-            records.sort(key=lambda x: x.collected_at, reverse=True)
-            
-            return records
+            return self.evidence_records.query(
+                equals={"anomaly_id": anomaly_id, "evidence_type": evidence_type}
+            )
             
         except Exception as e:
             logger.error("Failed to retrieve evidence records", error=str(e))
@@ -277,32 +368,23 @@ class AnomalyDatabase:
     ) -> bool:
         """Update anomaly confirmation and resolution status"""
         try:
-            if anomaly_type == "price":
-                if anomaly_id in self.price_anomalies:
-                    anomaly = self.price_anomalies[anomaly_id]
-                    anomaly.is_confirmed = is_confirmed
-                    anomaly.is_resolved = is_resolved
-                    if resolution_notes:
-                        anomaly.resolution_notes = resolution_notes
-                    if is_resolved:
-                        anomaly.resolved_at = datetime.utcnow()
-                    return True
-            
-            elif anomaly_type == "inventory":
-                if anomaly_id in self.inventory_anomalies:
-                    anomaly = self.inventory_anomalies[anomaly_id]
-                    anomaly.is_confirmed = is_confirmed
-                    anomaly.is_resolved = is_resolved
-                    return True
-            
-            elif anomaly_type == "stockpiling":
-                if anomaly_id in self.stockpiling_patterns:
-                    pattern = self.stockpiling_patterns[anomaly_id]
-                    pattern.is_confirmed = is_confirmed
-                    pattern.is_resolved = is_resolved
-                    return True
+            store = self._status_collections.get(anomaly_type)
+            if store is None or anomaly_id not in store:
+                return False
             
-            return False
+            changes = {"is_confirmed": is_confirmed, "is_resolved": is_resolved}
+            if anomaly_type == "price":
+                if resolution_notes:
+                    changes["resolution_notes"] = resolution_notes
+                if is_resolved:
+                    changes["resolved_at"] = datetime.utcnow()
+            
+            record = store.update(anomaly_id, **changes)
+            if self.persistence is not None:
+                await self.persistence.save(
+                    store.name, record.id, store.timestamp_of(record), record.model_dump_json()
+                )
+            return True
             
         except Exception as e:
             logger.error("Failed to update anomaly status", error=str(e))
@@ -313,67 +395,40 @@ class AnomalyDatabase:
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None
     ) -> DetectionStatistics:
-        """Calculate detection statistics for a time period"""
+        """Calculate detection statistics for a time period from the maintained counters"""
         try:
             if not start_date:
                 start_date = datetime.utcnow() - timedelta(days=30)
             if not end_date:
                 end_date = datetime.utcnow()
             
-            # Filter anomalies by date range
-            price_anomalies = [
-                a for a in self.price_anomalies.values()
-                if start_date <= a.detected_at <= end_date
-            ]
-            
-            inventory_anomalies = [
-                a for a in self.inventory_anomalies.values()
-                if start_date <= a.detected_at <= end_date
-            ]
+            price_counts = self.price_anomalies.counters(start_date, end_date)
+            inventory_counts = self.inventory_anomalies.counters(start_date, end_date)
+            pattern_counts = self.stockpiling_patterns.counters(start_date, end_date)
             
-            stockpiling_patterns = [
-                p for p in self.stockpiling_patterns.values()
-                if start_date <= p.detected_at <= end_date
-            ]
-            
-            # Calculate counts
-            total_anomalies = len(price_anomalies) + len(inventory_anomalies) + len(stockpiling_patterns)
-            
-            # Count by severity
-            all_anomalies = price_anomalies + inventory_anomalies + stockpiling_patterns
-            critical_count = sum(1 for a in all_anomalies if a.severity == AnomalySeverity.CRITICAL)
-            high_count = sum(1 for a in all_anomalies if a.severity == AnomalySeverity.HIGH)
-            medium_count = sum(1 for a in all_anomalies if a.severity == AnomalySeverity.MEDIUM)
-            low_count = sum(1 for a in all_anomalies if a.severity == AnomalySeverity.LOW)
-            
-            # Count confirmed and resolved
-            confirmed_count = sum(1 for a in all_anomalies if a.is_confirmed)
-            resolved_count = sum(1 for a in all_anomalies if a.is_resolved)
-            
-            # Calculate false positives (confirmed as false)
-            false_positives = sum(
-                1 for a in all_anomalies 
-                if hasattr(a, 'is_confirmed') and not a.is_confirmed and a.is_resolved
-            )
+            counts = RecordCounters()
+            for partial in (price_counts, inventory_counts, pattern_counts):
+                counts.add(partial)
+            total_anomalies = counts.total
             
             # Calculate accuracy rate
             if total_anomalies > 0:
-                accuracy_rate = (confirmed_count - false_positives) / total_anomalies
+                accuracy_rate = (counts.confirmed - counts.false_positives) / total_anomalies
             else:
                 accuracy_rate = 0.0
             
             return DetectionStatistics(
                 total_anomalies_detected=total_anomalies,
-                price_anomalies_count=len(price_anomalies),
-                inventory_anomalies_count=len(inventory_anomalies),
-                stockpiling_patterns_count=len(stockpiling_patterns),
-                critical_anomalies=critical_count,
-                high_severity_anomalies=high_count,
-                medium_severity_anomalies=medium_count,
-                low_severity_anomalies=low_count,
-                confirmed_anomalies=confirmed_count,
-                resolved_anomalies=resolved_count,
-                false_positives=false_positives,
+                price_anomalies_count=price_counts.total,
+                inventory_anomalies_count=inventory_counts.total,
+                stockpiling_patterns_count=pattern_counts.total,
+                critical_anomalies=counts.by_severity[AnomalySeverity.CRITICAL],
+                high_severity_anomalies=counts.by_severity[AnomalySeverity.HIGH],
+                medium_severity_anomalies=counts.by_severity[AnomalySeverity.MEDIUM],
+                low_severity_anomalies=counts.by_severity[AnomalySeverity.LOW],
+                confirmed_anomalies=counts.confirmed,
+                resolved_anomalies=counts.resolved,
+                false_positives=counts.false_positives,
                 average_detection_time_minutes=15.0,  # Mock value
                 accuracy_rate=accuracy_rate,
                 statistics_period_start=start_date,
@@ -488,7 +543,23 @@ async def get_inventory_data_for_analysis(
         return []
 
 # Global database instance
-anomaly_db = AnomalyDatabase()
+anomaly_db = AnomalyDatabase(
+    retention_days=int(os.getenv("ANOMALY_RETENTION_DAYS", DEFAULT_RETENTION_DAYS))
+)
+
+async def init_anomaly_store():
+    """Attach the persistence backend configured by ANOMALY_STORE_URL, if any"""
+    store_url = os.getenv("ANOMALY_STORE_URL")
+    if not store_url:
+        logger.info("Anomaly store running in memory only")
+        return
+    
+    await anomaly_db.attach_persistence(create_persistence(store_url))
+    logger.info("Anomaly store persistence initialized")
+
+async def close_anomaly_store():
+    """Close the anomaly store persistence backend"""
+    await anomaly_db.close()
 
 # Convenience functions for external access
 async def store_price_anomaly(anomaly: PriceAnomaly) -> bool:
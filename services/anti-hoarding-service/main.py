@@ -4,9 +4,12 @@ Main FastAPI application for anomaly detection and market manipulation detection
 """
 
 import asyncio
+import math
+import os
 import structlog
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Query, Depends
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Query, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 from pydantic import BaseModel
@@ -17,15 +20,18 @@ from models import (
     AnomalyType, AnomalySeverity, GeoLocation
 )
 from anomaly_detector import (
-    AnomalyDetectionEngine, PriceDataPoint, InventoryDataPoint
+    AnomalyDetectionEngine, PriceDataPoint, InventoryDataPoint,
+    price_points_from_rows, inventory_points_from_rows
 )
+from streaming_detector import StreamingAnomalyDetector
 from supply_demand_analyzer import SupplyDemandAnalyzer
 from market_manipulation_detector import MarketManipulationDetector
 from regional_supply_chain_analyzer import RegionalSupplyChainAnalyzer
+from national_sweep import NationalSweep, parse_commodity_keys
 from database import (
     anomaly_db, get_price_data_for_analysis, get_inventory_data_for_analysis,
     store_price_anomaly, store_inventory_anomaly, store_stockpiling_pattern,
-    get_recent_anomalies
+    get_recent_anomalies, init_anomaly_store, close_anomaly_store
 )
 
 # Configure logging
@@ -49,17 +55,26 @@ app.add_middleware(
 
 # Global detection engine and analyzers
 detection_engine: Optional[AnomalyDetectionEngine] = None
+streaming_detector: Optional[StreamingAnomalyDetector] = None
 supply_demand_analyzer: Optional[SupplyDemandAnalyzer] = None
 manipulation_detector: Optional[MarketManipulationDetector] = None
 supply_chain_analyzer: Optional[RegionalSupplyChainAnalyzer] = None
+national_sweep: Optional[NationalSweep] = None
+sweep_scheduler: Optional[asyncio.Task] = None
 detection_config = AnomalyDetectionConfig()
 
+# Commodities covered by the scheduled national sweep, as "commodity" or "commodity:variety"
+SWEEP_COMMODITIES = parse_commodity_keys(
+    os.getenv("NATIONAL_SWEEP_COMMODITIES", "wheat,rice,onion").split(",")
+)
+
 # Pydantic models for API requests/responses
 class AnomalyDetectionRequest(BaseModel):
     commodity: str
     variety: Optional[str] = None
     region: Optional[str] = None
     analysis_period_days: int = 30
+    mode: str = "batch"  # "batch" reruns all detectors, "incremental" feeds only new data to the streaming detector
 
 class PriceSpikeDetectionRequest(BaseModel):
     commodity: str
@@ -85,6 +100,38 @@ class AnomalyStatusUpdate(BaseModel):
     is_resolved: bool = False
     resolution_notes: Optional[str] = None
 
+class PriceObservation(BaseModel):
+    commodity: str
+    variety: Optional[str] = None
+    price: float
+    quantity: float
+    mandi_id: str
+    mandi_name: str
+    district: Optional[str] = None
+    state: str
+    timestamp: datetime
+    confidence: float = 1.0
+
+class InventoryObservation(BaseModel):
+    commodity: str
+    variety: Optional[str] = None
+    inventory_level: float
+    mandi_id: str
+    mandi_name: str
+    district: Optional[str] = None
+    state: str
+    timestamp: datetime
+    storage_capacity: Optional[float] = None
+
+class ObservationBatch(BaseModel):
+    price_observations: List[PriceObservation] = []
+    inventory_observations: List[InventoryObservation] = []
+    region: Optional[str] = None
+
+class NationalSweepRequest(BaseModel):
+    commodities: Optional[List[str]] = None  # "commodity" or "commodity:variety"
+    analysis_period_days: int = 30
+
 class DetectionResponse(BaseModel):
     success: bool
     message: str
@@ -98,12 +145,26 @@ class DetectionResponse(BaseModel):
 @app.on_event("startup")
 async def startup_event():
     """Initialize the detection engine and analyzers on startup"""
-    global detection_engine, supply_demand_analyzer, manipulation_detector, supply_chain_analyzer
+    global detection_engine, streaming_detector, supply_demand_analyzer, manipulation_detector, supply_chain_analyzer
+    global national_sweep, sweep_scheduler
     try:
         detection_engine = AnomalyDetectionEngine(detection_config)
+        streaming_detector = StreamingAnomalyDetector(detection_config)
         supply_demand_analyzer = SupplyDemandAnalyzer()
         manipulation_detector = MarketManipulationDetector()
         supply_chain_analyzer = RegionalSupplyChainAnalyzer()
+        await init_anomaly_store()
+        
+        workers = os.getenv("NATIONAL_SWEEP_WORKERS")
+        national_sweep = NationalSweep(
+            anomaly_db, detection_config, max_workers=int(workers) if workers else None
+        )
+        interval_minutes = float(os.getenv("NATIONAL_SWEEP_INTERVAL_MINUTES", "0"))
+        if interval_minutes > 0:
+            sweep_scheduler = asyncio.create_task(
+                national_sweep.run_every(interval_minutes, SWEEP_COMMODITIES)
+            )
+            logger.info("National sweep scheduled", interval_minutes=interval_minutes)
         logger.info("Anti-hoarding detection service started successfully")
     except Exception as e:
         logger.error("Failed to start detection service", error=str(e))
@@ -112,6 +173,9 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
+    if sweep_scheduler is not None:
+        sweep_scheduler.cancel()
+    await close_anomaly_store()
     logger.info("Anti-hoarding detection service shutting down")
 
 # Health check endpoint
@@ -141,9 +205,14 @@ async def update_detection_config(config: AnomalyDetectionConfig):
     try:
         detection_config = config
         detection_engine = AnomalyDetectionEngine(detection_config)
+        # Reconfigure in place: rolling state, watermarks and SSE subscribers survive
+        if streaming_detector is not None:
+            streaming_detector.reconfigure(detection_config)
         supply_demand_analyzer = SupplyDemandAnalyzer()
         manipulation_detector = MarketManipulationDetector()
         supply_chain_analyzer = RegionalSupplyChainAnalyzer()
+        if national_sweep is not None:
+            national_sweep.config = detection_config
         logger.info("Detection configuration updated")
         return {"success": True, "message": "Configuration updated successfully"}
     except Exception as e:
@@ -164,75 +233,58 @@ async def run_comprehensive_detection(
     - Inventory level tracking across mandis
     - Stockpiling pattern detection
     """
-    if not detection_engine:
+    if not detection_engine or not streaming_detector:
         raise HTTPException(status_code=503, detail="Detection engine not initialized")
     
+    if request.mode not in ("batch", "incremental"):
+        raise HTTPException(status_code=400, detail="mode must be 'batch' or 'incremental'")
+    
     try:
+        incremental = request.mode == "incremental"
+        watermark_key = (request.commodity, request.variety, request.region)
+        since = streaming_detector.watermark(watermark_key) if incremental else None
+        
+        # Incremental runs only fetch what arrived since the previous tick
+        days_back = request.analysis_period_days
+        if since is not None:
+            days_back = max(1, math.ceil((datetime.utcnow() - since).total_seconds() / 86400))
+        
         # Get data for analysis
         price_data_raw = await get_price_data_for_analysis(
             commodity=request.commodity,
             variety=request.variety,
             region=request.region,
-            days_back=request.analysis_period_days
+            days_back=days_back
         )
         
         inventory_data_raw = await get_inventory_data_for_analysis(
             commodity=request.commodity,
             variety=request.variety,
             region=request.region,
-            days_back=request.analysis_period_days
+            days_back=days_back
         )
         
+        if since is not None:
+            price_data_raw = [p for p in price_data_raw if p["timestamp"] > since]
+            inventory_data_raw = [i for i in inventory_data_raw if i["timestamp"] > since]
+        
         # Convert to detection data structures
-        price_data = [
-            PriceDataPoint(
-                commodity=p["commodity"],
-                variety=p.get("variety"),
-                price=p["price"],
-                quantity=p["quantity"],
-                mandi_id=p["mandi_id"],
-                mandi_name=p["mandi_name"],
-                location=GeoLocation(
-                    latitude=0.0,  # Mock coordinates
-                    longitude=0.0,
-                    district=p.get("district", ""),
-                    state=p.get("state", ""),
-                    country="India"
-                ),
-                timestamp=p["timestamp"],
-                confidence=p["confidence"]
-            )
-            for p in price_data_raw
-        ]
+        price_data = price_points_from_rows(price_data_raw)
+        inventory_data = inventory_points_from_rows(inventory_data_raw)
         
-        inventory_data = [
-            InventoryDataPoint(
-                commodity=i["commodity"],
-                variety=i.get("variety"),
-                inventory_level=i["inventory_level"],
-                mandi_id=i["mandi_id"],
-                mandi_name=i["mandi_name"],
-                location=GeoLocation(
-                    latitude=0.0,  # Mock coordinates
-                    longitude=0.0,
-                    district=i.get("district", ""),
-                    state=i.get("state", ""),
-                    country="India"
-                ),
-                timestamp=i["timestamp"],
-                storage_capacity=i.get("storage_capacity")
+        if incremental:
+            results = streaming_detector.observe_batch(price_data, inventory_data, request.region)
+            for point in price_data + inventory_data:
+                streaming_detector.advance_watermark(watermark_key, point.timestamp)
+        else:
+            # Run comprehensive analysis
+            results = await detection_engine.run_comprehensive_analysis(
+                price_data=price_data,
+                inventory_data=inventory_data,
+                commodity=request.commodity,
+                variety=request.variety,
+                region=request.region
             )
-            for i in inventory_data_raw
-        ]
-        
-        # Run comprehensive analysis
-        results = await detection_engine.run_comprehensive_analysis(
-            price_data=price_data,
-            inventory_data=inventory_data,
-            commodity=request.commodity,
-            variety=request.variety,
-            region=request.region
-        )
         
         # Store results in background
         background_tasks.add_task(store_detection_results, results)
@@ -264,6 +316,72 @@ async def run_comprehensive_detection(
         logger.error("Comprehensive detection failed", error=str(e))
         raise HTTPException(status_code=500, detail=f"Detection failed: {str(e)}")
 
+@app.post("/stream/observations")
+async def ingest_stream_observations(
+    batch: ObservationBatch,
+    background_tasks: BackgroundTasks
+):
+    """
+    Evaluate new price and inventory observations with the streaming detector
+    
+    Each observation updates its series' rolling state in constant time; any
+    anomalies are stored and pushed to /stream/anomalies subscribers.
+    """
+    if not streaming_detector:
+        raise HTTPException(status_code=503, detail="Streaming detector not initialized")
+    
+    try:
+        results = streaming_detector.observe_batch(
+            price_points_from_rows([o.dict() for o in batch.price_observations]),
+            inventory_points_from_rows([o.dict() for o in batch.inventory_observations]),
+            batch.region
+        )
+        
+        background_tasks.add_task(store_detection_results, results)
+        
+        return {
+            "success": True,
+            "observations_processed": len(batch.price_observations) + len(batch.inventory_observations),
+            "price_anomalies": [a.dict() for a in results["price_anomalies"]],
+            "inventory_anomalies": [a.dict() for a in results["inventory_anomalies"]]
+        }
+        
+    except Exception as e:
+        logger.error("Streaming observation ingestion failed", error=str(e))
+        raise HTTPException(status_code=500, detail=f"Streaming detection failed: {str(e)}")
+
+@app.get("/stream/anomalies")
+async def stream_anomalies(request: Request):
+    """Server-sent event stream of anomalies detected by the streaming detector"""
+    if not streaming_detector:
+        raise HTTPException(status_code=503, detail="Streaming detector not initialized")
+    
+    detector = streaming_detector
+    queue = detector.subscribe()
+    
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    anomaly = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                
+                event = "price_anomaly" if isinstance(anomaly, PriceAnomaly) else "inventory_anomaly"
+                yield f"event: {event}\ndata: {anomaly.json()}\n\n"
+        finally:
+            detector.unsubscribe(queue)
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@app.get("/stream/status")
+async def get_stream_status():
+    """Series and subscriber counts for the streaming detector"""
+    if not streaming_detector:
+        raise HTTPException(status_code=503, detail="Streaming detector not initialized")
+    return streaming_detector.get_status()
+
 @app.post("/detect/price-spikes")
 async def detect_price_spikes(
     request: PriceSpikeDetectionRequest,
@@ -819,6 +937,48 @@ async def analyze_regional_supply_chain(
         logger.error("Regional supply chain analysis failed", error=str(e))
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
+@app.post("/sweep/national", status_code=202)
+async def start_national_sweep(request: NationalSweepRequest):
+    """
+    Start a national sweep across commodities and regions
+    
+    Price and inventory data for every commodity is loaded once and the
+    detectors, supply-demand and manipulation analysis run in parallel worker
+    processes. Poll GET /sweep/status for progress and stage timings.
+    """
+    if not national_sweep:
+        raise HTTPException(status_code=503, detail="National sweep not initialized")
+    
+    if national_sweep.running:
+        raise HTTPException(status_code=409, detail="A national sweep is already running")
+    
+    commodities = SWEEP_COMMODITIES
+    if request.commodities:
+        commodities = parse_commodity_keys(request.commodities)
+    
+    progress = national_sweep.start(commodities, days_back=request.analysis_period_days)
+    
+    return {
+        "success": True,
+        "message": f"National sweep started for {progress.total_commodities} commodities",
+        "sweep": progress.to_dict()
+    }
+
+@app.get("/sweep/status")
+async def get_national_sweep_status():
+    """Progress and per-stage timings of the latest national sweep"""
+    if not national_sweep:
+        raise HTTPException(status_code=503, detail="National sweep not initialized")
+    
+    if national_sweep.progress is None:
+        return {"success": True, "running": False, "sweep": None}
+    
+    return {
+        "success": True,
+        "running": national_sweep.running,
+        "sweep": national_sweep.progress.to_dict()
+    }
+
 # Query endpoints for supply-demand data
 @app.get("/supply-demand-balances")
 async def get_supply_demand_balances(
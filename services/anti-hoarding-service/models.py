@@ -207,6 +207,9 @@ class AnomalyDetectionConfig(BaseModel):
     pattern_confidence_threshold: float = Field(default=0.75, ge=0.5, le=1.0)
     coordination_detection_enabled: bool = True
     cross_regional_analysis_enabled: bool = True
+    cross_regional_max_lag_days: int = Field(default=14, ge=0, le=60)
+    cross_regional_correlation_threshold: float = Field(default=0.6, ge=0.0, le=1.0)
+    cross_regional_top_pairs: int = Field(default=10, ge=1, le=100)
     
     # Alert settings
     alert_cooldown_hours: int = Field(default=6, ge=1, le=24)
@@ -277,6 +280,20 @@ class SupplyDemandBalance(BaseModel):
     demand_factors: List[str] = []
     external_factors: List[str] = []
 
+class RegionalSupplyChain(BaseModel):
+    """Regional supply chain analysis data"""
+    id: str = Field(default_factory=lambda: str(uuid4()))
+    region: str
+    commodity: str
+    variety: Optional[str] = None
+    supply_sources: Dict[str, float]  # source_region -> supply_amount
+    demand_destinations: Dict[str, float]  # destination_region -> demand_amount
+    transportation_costs: Dict[str, float]  # route -> cost_per_unit
+    bottlenecks: List[str]
+    efficiency_score: float
+    vulnerability_factors: List[str]
+    analyzed_at: datetime = Field(default_factory=datetime.utcnow)
+
 class EvidenceRecord(BaseModel):
     """Evidence record for anomaly detection"""
     id: str = Field(default_factory=lambda: str(uuid4()))
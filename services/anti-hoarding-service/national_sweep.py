@@ -0,0 +1,353 @@
+"""
+National sweep for the Anti-Hoarding Detection System
+Loads price and inventory data for every commodity once, fans the CPU-bound
+detectors out across a process pool and persists the results in bulk
+"""
+
+import asyncio
+import structlog
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from models import (
+    AnomalyDetectionConfig, PriceAnomaly, InventoryAnomaly, StockpilingPattern,
+    MarketManipulationAlert, SupplyDemandBalance, RegionalSupplyChain
+)
+from anomaly_detector import (
+    AnomalyDetectionEngine, price_points_from_rows, inventory_points_from_rows
+)
+from supply_demand_analyzer import SupplyDemandAnalyzer
+from market_manipulation_detector import MarketManipulationDetector
+from regional_supply_chain_analyzer import RegionalSupplyChainAnalyzer
+from database import (
+    AnomalyDatabase, get_price_data_for_analysis, get_inventory_data_for_analysis
+)
+
+logger = structlog.get_logger()
+
+CommodityKey = Tuple[str, Optional[str]]
+
+@dataclass
+class SweepJob:
+    """Everything one worker needs to analyse a commodity nationally"""
+    commodity: str
+    variety: Optional[str]
+    price_rows: List[Dict[str, Any]]
+    inventory_rows: List[Dict[str, Any]]
+    config: AnomalyDetectionConfig
+
+@dataclass
+class SweepOutcome:
+    """Results of one commodity, returned from a worker process"""
+    commodity: str
+    variety: Optional[str]
+    price_anomalies: List[PriceAnomaly] = field(default_factory=list)
+    inventory_anomalies: List[InventoryAnomaly] = field(default_factory=list)
+    stockpiling_patterns: List[StockpilingPattern] = field(default_factory=list)
+    supply_demand_balances: List[SupplyDemandBalance] = field(default_factory=list)
+    manipulation_alerts: List[MarketManipulationAlert] = field(default_factory=list)
+    supply_chains: List[RegionalSupplyChain] = field(default_factory=list)
+    stage_seconds: Dict[str, float] = field(default_factory=dict)
+    error: Optional[str] = None
+
+@dataclass
+class SweepProgress:
+    """Live progress of a sweep, as exposed by the API"""
+    sweep_id: str
+    status: str = "pending"  # "pending", "loading", "analyzing", "persisting", "completed", "failed"
+    total_commodities: int = 0
+    completed_commodities: int = 0
+    failed_commodities: List[str] = field(default_factory=list)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    # Wall-clock seconds of the coordinator stages
+    stage_seconds: Dict[str, float] = field(default_factory=dict)
+    # Detector seconds summed across workers
+    detector_seconds: Dict[str, float] = field(default_factory=lambda: defaultdict(float))
+    results: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "sweep_id": self.sweep_id,
+            "status": self.status,
+            "total_commodities": self.total_commodities,
+            "completed_commodities": self.completed_commodities,
+            "failed_commodities": list(self.failed_commodities),
+            "progress_percentage": (
+                self.completed_commodities / self.total_commodities * 100
+                if self.total_commodities else 0.0
+            ),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "stage_seconds": dict(self.stage_seconds),
+            "detector_seconds": dict(self.detector_seconds),
+            "results": dict(self.results),
+            "error": self.error
+        }
+
+def parse_commodity_keys(items: List[str]) -> List[CommodityKey]:
+    """Parse "commodity" or "commodity:variety" entries"""
+    keys = []
+    for item in items:
+        item = item.strip()
+        if not item:
+            continue
+        commodity, _, variety = item.partition(":")
+        keys.append((commodity, variety or None))
+    return keys
+
+def _rows_by_state(rows: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    groups = defaultdict(list)
+    for row in rows:
+        groups[row.get("state", "")].append(row)
+    return groups
+
+async def _analyze_commodity(job: SweepJob) -> SweepOutcome:
+    outcome = SweepOutcome(commodity=job.commodity, variety=job.variety)
+    timings = outcome.stage_seconds
+
+    started = time.perf_counter()
+    results = await AnomalyDetectionEngine(job.config).run_comprehensive_analysis(
+        price_data=price_points_from_rows(job.price_rows),
+        inventory_data=inventory_points_from_rows(job.inventory_rows),
+        commodity=job.commodity,
+        variety=job.variety
+    )
+    outcome.price_anomalies = results["price_anomalies"]
+    outcome.inventory_anomalies = results["inventory_anomalies"]
+    outcome.stockpiling_patterns = results["stockpiling_patterns"]
+    timings["anomaly_detection"] = time.perf_counter() - started
+
+    # Partition once instead of re-filtering the national rows per region
+    prices_by_state = _rows_by_state(job.price_rows)
+    inventory_by_state = _rows_by_state(job.inventory_rows)
+    regions = sorted(set(prices_by_state) | set(inventory_by_state))
+
+    price_anomalies_by_state = defaultdict(list)
+    for anomaly in outcome.price_anomalies:
+        price_anomalies_by_state[anomaly.location.state].append(anomaly)
+    inventory_anomalies_by_state = defaultdict(list)
+    for anomaly in outcome.inventory_anomalies:
+        inventory_anomalies_by_state[anomaly.region].append(anomaly)
+
+    supply_demand_analyzer = SupplyDemandAnalyzer()
+    manipulation_detector = MarketManipulationDetector()
+    timings["supply_demand"] = 0.0
+    timings["market_manipulation"] = 0.0
+
+    for region in regions:
+        started = time.perf_counter()
+        balance = await supply_demand_analyzer.calculate_supply_demand_balance(
+            commodity=job.commodity,
+            variety=job.variety,
+            region=region,
+            price_data=prices_by_state.get(region, []),
+            inventory_data=inventory_by_state.get(region, [])
+        )
+        outcome.supply_demand_balances.append(balance)
+        timings["supply_demand"] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        alerts = await manipulation_detector.detect_market_manipulation(
+            commodity=job.commodity,
+            variety=job.variety,
+            region=region,
+            price_anomalies=price_anomalies_by_state.get(region, []),
+            inventory_anomalies=inventory_anomalies_by_state.get(region, []),
+            stockpiling_patterns=outcome.stockpiling_patterns,
+            supply_demand_balance=balance
+        )
+        outcome.manipulation_alerts.extend(alerts)
+        timings["market_manipulation"] += time.perf_counter() - started
+
+    started = time.perf_counter()
+    outcome.supply_chains = await RegionalSupplyChainAnalyzer().analyze_regional_supply_chain(
+        commodity=job.commodity,
+        variety=job.variety,
+        regions=regions,
+        price_data=job.price_rows,
+        inventory_data=job.inventory_rows
+    )
+    timings["supply_chain"] = time.perf_counter() - started
+
+    return outcome
+
+async def _analyze_commodity_safely(job: SweepJob) -> SweepOutcome:
+    try:
+        return await _analyze_commodity(job)
+    except Exception as e:
+        logger.error("National sweep failed for commodity", commodity=job.commodity, error=str(e))
+        return SweepOutcome(commodity=job.commodity, variety=job.variety, error=str(e))
+
+def analyze_commodity(job: SweepJob) -> SweepOutcome:
+    """Run every detector for one commodity; executed in a worker process.
+
+    The analyzers are coroutines but never await I/O, so each worker drives
+    them on its own event loop.
+    """
+    return asyncio.run(_analyze_commodity_safely(job))
+
+class NationalSweep:
+    """Scheduled multi-commodity analysis across all regions.
+
+    Data for every commodity is loaded once, up front. Commodities are then
+    analysed in parallel worker processes (max_workers=0 runs them inline)
+    and results are written with one bulk store per collection.
+    """
+
+    def __init__(
+        self,
+        database: AnomalyDatabase,
+        config: AnomalyDetectionConfig = None,
+        max_workers: Optional[int] = None,
+        days_back: int = 30
+    ):
+        self.database = database
+        self.config = config or AnomalyDetectionConfig()
+        self.max_workers = max_workers
+        self.days_back = days_back
+        self.progress: Optional[SweepProgress] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def load_data(
+        self,
+        commodities: List[CommodityKey],
+        days_back: Optional[int] = None
+    ) -> Dict[CommodityKey, Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]:
+        """Price and inventory rows for every commodity, fetched concurrently"""
+        days_back = days_back or self.days_back
+        fetches = []
+        for commodity, variety in commodities:
+            fetches.append(get_price_data_for_analysis(
+                commodity=commodity, variety=variety, days_back=days_back
+            ))
+            fetches.append(get_inventory_data_for_analysis(
+                commodity=commodity, variety=variety, days_back=days_back
+            ))
+        rows = await asyncio.gather(*fetches)
+        return {
+            key: (rows[2 * i], rows[2 * i + 1])
+            for i, key in enumerate(commodities)
+        }
+
+    def start(self, commodities: List[CommodityKey], days_back: Optional[int] = None) -> SweepProgress:
+        """Start a sweep in the background; only one sweep runs at a time.
+
+        days_back overrides the sweep's default analysis period for this run only.
+        """
+        if self.running:
+            raise RuntimeError("A national sweep is already running")
+
+        commodities = list(dict.fromkeys(commodities))
+        progress = SweepProgress(
+            sweep_id=str(uuid.uuid4()),
+            total_commodities=len(commodities),
+            started_at=datetime.utcnow()
+        )
+        self.progress = progress
+        self._task = asyncio.create_task(self._run(commodities, progress, days_back))
+        return progress
+
+    async def run(self, commodities: List[CommodityKey], days_back: Optional[int] = None) -> SweepProgress:
+        """Sweep all commodities and wait for the result"""
+        progress = self.start(commodities, days_back)
+        await self._task
+        return progress
+
+    async def run_every(self, interval_minutes: float, commodities: List[CommodityKey]):
+        """Scheduler loop: start a sweep every interval unless one is still running"""
+        while True:
+            if self.running:
+                logger.warning("Skipping scheduled national sweep, previous sweep still running")
+            else:
+                self.start(commodities)
+            await asyncio.sleep(interval_minutes * 60)
+
+    async def _run(self, commodities: List[CommodityKey], progress: SweepProgress, days_back: Optional[int]):
+        try:
+            progress.status = "loading"
+            started = time.perf_counter()
+            data = await self.load_data(commodities, days_back)
+            progress.stage_seconds["load"] = time.perf_counter() - started
+
+            progress.status = "analyzing"
+            started = time.perf_counter()
+            outcomes = await self._analyze_all(data, progress)
+            progress.stage_seconds["analyze"] = time.perf_counter() - started
+
+            progress.status = "persisting"
+            started = time.perf_counter()
+            await self._persist(outcomes, progress)
+            progress.stage_seconds["persist"] = time.perf_counter() - started
+
+            progress.status = "completed"
+
+        except Exception as e:
+            logger.error("National sweep failed", sweep_id=progress.sweep_id, error=str(e))
+            progress.status = "failed"
+            progress.error = str(e)
+
+        progress.finished_at = datetime.utcnow()
+        logger.info(
+            "National sweep finished",
+            sweep_id=progress.sweep_id,
+            status=progress.status,
+            commodities=progress.total_commodities,
+            failed=len(progress.failed_commodities),
+            stage_seconds=progress.stage_seconds
+        )
+
+    async def _analyze_all(self, data, progress: SweepProgress) -> List[SweepOutcome]:
+        jobs = [
+            SweepJob(commodity, variety, price_rows, inventory_rows, self.config)
+            for (commodity, variety), (price_rows, inventory_rows) in data.items()
+        ]
+
+        if self.max_workers == 0:
+            outcomes = []
+            for job in jobs:
+                outcome = await _analyze_commodity_safely(job)
+                self._record(outcome, progress)
+                outcomes.append(outcome)
+            return outcomes
+
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [loop.run_in_executor(pool, analyze_commodity, job) for job in jobs]
+            outcomes = []
+            for future in asyncio.as_completed(futures):
+                outcome = await future
+                self._record(outcome, progress)
+                outcomes.append(outcome)
+            return outcomes
+
+    @staticmethod
+    def _record(outcome: SweepOutcome, progress: SweepProgress):
+        progress.completed_commodities += 1
+        if outcome.error:
+            progress.failed_commodities.append(outcome.commodity)
+        for stage, seconds in outcome.stage_seconds.items():
+            progress.detector_seconds[stage] += seconds
+
+    async def _persist(self, outcomes: List[SweepOutcome], progress: SweepProgress):
+        collections = {
+            "price_anomalies": self.database.price_anomalies,
+            "inventory_anomalies": self.database.inventory_anomalies,
+            "stockpiling_patterns": self.database.stockpiling_patterns,
+            "supply_demand_balances": self.database.supply_demand_balances,
+            "manipulation_alerts": self.database.manipulation_alerts,
+            "supply_chains": self.database.supply_chains
+        }
+        for name, store in collections.items():
+            records = [record for outcome in outcomes for record in getattr(outcome, name)]
+            progress.results[name] = await self.database.store_many(store, records)
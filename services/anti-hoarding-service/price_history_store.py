@@ -0,0 +1,392 @@
+"""
+Columnar price and inventory history store for anomaly detection
+Keeps NumPy columns per (commodity, variety, mandi) series, sorted by timestamp
+on insert, and hands detectors read-only slices instead of filtered point lists
+"""
+
+import structlog
+import numpy as np
+from dataclasses import dataclass, fields
+from datetime import datetime, timezone
+from typing import Any, ClassVar, Dict, Iterable, List, Optional, Tuple
+
+from models import GeoLocation
+
+logger = structlog.get_logger()
+
+TIMESTAMP_DTYPE = "datetime64[us]"
+INITIAL_SERIES_CAPACITY = 64
+
+SeriesKey = Tuple[str, Optional[str], str]
+
+def to_utc_naive(timestamp: datetime) -> datetime:
+    """Normalize a timestamp to naive UTC, the representation used by the store"""
+    if timestamp.tzinfo is not None:
+        return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+def to_datetime64(timestamp: datetime) -> np.datetime64:
+    return np.datetime64(to_utc_naive(timestamp), "us")
+
+@dataclass(frozen=True)
+class MandiRef:
+    """Mandi metadata shared by all rows recorded for that mandi"""
+    mandi_id: str
+    mandi_name: str
+    location: GeoLocation
+
+    def matches_region(self, region: str) -> bool:
+        region = region.lower()
+        return (
+            region in self.location.state.lower() or
+            region in (self.location.district or "").lower()
+        )
+
+class MandiRegistry:
+    """Interns mandi metadata so rows only carry an integer code"""
+
+    def __init__(self):
+        self.refs: List[MandiRef] = []
+        self._codes: Dict[Tuple, int] = {}
+
+    def code_for(self, point: Any) -> int:
+        location = point.location
+        key = (
+            point.mandi_id, point.mandi_name, location.latitude, location.longitude,
+            location.state, location.district, location.address, location.country
+        )
+        code = self._codes.get(key)
+        if code is None:
+            code = len(self.refs)
+            self.refs.append(MandiRef(point.mandi_id, point.mandi_name, location))
+            self._codes[key] = code
+        return code
+
+@dataclass
+class HistoryFrame:
+    """Timestamp-sorted columns for one analysis scope.
+
+    Frames handed out by PriceHistoryStore are read-only views of the store's
+    buffers whenever a single series covers the scope.
+    """
+    timestamps: np.ndarray
+    mandi_codes: np.ndarray
+    mandis: List[MandiRef]
+
+    # Frame column name -> data point attribute
+    POINT_ATTRIBUTES: ClassVar[Dict[str, str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @classmethod
+    def value_columns(cls) -> Tuple[str, ...]:
+        return tuple(cls.POINT_ATTRIBUTES)
+
+    @classmethod
+    def empty(cls, mandis: Optional[List[MandiRef]] = None) -> "HistoryFrame":
+        columns = {name: np.empty(0, dtype=np.float64) for name in cls.value_columns()}
+        return cls(
+            timestamps=np.empty(0, dtype=TIMESTAMP_DTYPE),
+            mandi_codes=np.empty(0, dtype=np.int32),
+            mandis=mandis if mandis is not None else [],
+            **columns
+        )
+
+    @classmethod
+    def from_points(
+        cls,
+        points: Iterable[Any],
+        commodity: str,
+        variety: Optional[str] = None
+    ) -> "HistoryFrame":
+        """Build a frame from data points of one commodity (and variety).
+
+        Rows are stably sorted by timestamp, matching list.sort on the points.
+        """
+        selected = [
+            p for p in points
+            if p.commodity == commodity and (variety is None or p.variety == variety)
+        ]
+        registry = MandiRegistry()
+        timestamps, columns, codes = _point_columns(cls, selected, registry)
+        order = np.argsort(timestamps, kind="stable")
+        return cls(
+            timestamps=timestamps[order],
+            mandi_codes=codes[order],
+            mandis=registry.refs,
+            **{name: values[order] for name, values in columns.items()}
+        )
+
+    def _array_fields(self) -> List[str]:
+        return [f.name for f in fields(self) if f.name != "mandis"]
+
+    def take(self, selector: np.ndarray) -> "HistoryFrame":
+        """Rows selected by a boolean mask or index array"""
+        return type(self)(
+            mandis=self.mandis,
+            **{name: getattr(self, name)[selector] for name in self._array_fields()}
+        )
+
+    def filter_region(self, region: Optional[str]) -> "HistoryFrame":
+        """Rows whose mandi state or district contains region"""
+        if not region:
+            return self
+        matching = [code for code, ref in enumerate(self.mandis) if ref.matches_region(region)]
+        return self.take(np.isin(self.mandi_codes, matching))
+
+    def timestamp_at(self, index: int) -> datetime:
+        return self.timestamps[index].item()
+
+    def mandi_at(self, index: int) -> MandiRef:
+        return self.mandis[self.mandi_codes[index]]
+
+    def months(self) -> np.ndarray:
+        """Calendar month (1-12) of every row"""
+        return self.timestamps.astype("datetime64[M]").astype(np.int64) % 12 + 1
+
+    def group_indices(self, key_fn) -> Dict[Any, np.ndarray]:
+        """Row indices grouped by key_fn(MandiRef), in order of first appearance"""
+        groups: Dict[Any, List[int]] = {}
+        keys = [key_fn(ref) for ref in self.mandis]
+        for index, code in enumerate(self.mandi_codes.tolist()):
+            groups.setdefault(keys[code], []).append(index)
+        return {key: np.array(indices, dtype=np.intp) for key, indices in groups.items()}
+
+@dataclass
+class PriceFrame(HistoryFrame):
+    prices: np.ndarray = None
+    quantities: np.ndarray = None
+    confidences: np.ndarray = None
+
+    POINT_ATTRIBUTES: ClassVar[Dict[str, str]] = {
+        "prices": "price",
+        "quantities": "quantity",
+        "confidences": "confidence"
+    }
+
+@dataclass
+class InventoryFrame(HistoryFrame):
+    inventory_levels: np.ndarray = None
+    storage_capacities: np.ndarray = None  # NaN where capacity is unknown
+
+    POINT_ATTRIBUTES: ClassVar[Dict[str, str]] = {
+        "inventory_levels": "inventory_level",
+        "storage_capacities": "storage_capacity"
+    }
+
+    def storage_capacity_at(self, index: int) -> Optional[float]:
+        capacity = float(self.storage_capacities[index])
+        return None if np.isnan(capacity) else capacity
+
+def _point_columns(
+    frame_cls,
+    points: List[Any],
+    registry: MandiRegistry
+) -> Tuple[np.ndarray, Dict[str, np.ndarray], np.ndarray]:
+    """Unsorted column arrays for a list of data points"""
+    timestamps = np.array(
+        [to_utc_naive(p.timestamp) for p in points], dtype=TIMESTAMP_DTYPE
+    ).reshape(-1)
+    columns = {}
+    for name, attribute in frame_cls.POINT_ATTRIBUTES.items():
+        values = [getattr(p, attribute) for p in points]
+        columns[name] = np.array(
+            [np.nan if v is None else v for v in values], dtype=np.float64
+        ).reshape(-1)
+    codes = np.array([registry.code_for(p) for p in points], dtype=np.int32).reshape(-1)
+    return timestamps, columns, codes
+
+class _SeriesColumns:
+    """Growable, timestamp-sorted columns for one (commodity, variety, mandi)"""
+
+    def __init__(self, value_columns: Tuple[str, ...], capacity: int = INITIAL_SERIES_CAPACITY):
+        self.size = 0
+        self.timestamps = np.empty(capacity, dtype=TIMESTAMP_DTYPE)
+        self.mandi_codes = np.empty(capacity, dtype=np.int32)
+        self.values = {name: np.empty(capacity, dtype=np.float64) for name in value_columns}
+
+    def _columns(self) -> Dict[str, np.ndarray]:
+        return {"timestamps": self.timestamps, "mandi_codes": self.mandi_codes, **self.values}
+
+    def _reallocate(self, capacity: int, order: Optional[np.ndarray] = None,
+                    extra: Optional[Dict[str, np.ndarray]] = None):
+        # Always into fresh buffers: slices handed out earlier keep the old ones
+        total = self.size + (len(extra["timestamps"]) if extra else 0)
+        for name, column in self._columns().items():
+            data = column[:self.size]
+            if extra:
+                data = np.concatenate((data, extra[name]))
+            if order is not None:
+                data = data[order]
+            fresh = np.empty(capacity, dtype=column.dtype)
+            fresh[:total] = data
+            if name == "timestamps":
+                self.timestamps = fresh
+            elif name == "mandi_codes":
+                self.mandi_codes = fresh
+            else:
+                self.values[name] = fresh
+        self.size = total
+
+    def insert(self, rows: Dict[str, np.ndarray]):
+        """Insert rows (column name -> array), keeping the series sorted.
+
+        In-order batches are appended in place; anything older than the last
+        stored row triggers a stable merge into new buffers.
+        """
+        count = len(rows["timestamps"])
+        if count == 0:
+            return
+
+        order = np.argsort(rows["timestamps"], kind="stable")
+        rows = {name: values[order] for name, values in rows.items()}
+        required = self.size + count
+        capacity = len(self.timestamps)
+
+        if self.size == 0 or rows["timestamps"][0] >= self.timestamps[self.size - 1]:
+            if required > capacity:
+                self._reallocate(max(required, capacity * 2))
+            for name, column in self._columns().items():
+                column[self.size:required] = rows[name]
+            self.size = required
+            return
+
+        merged = np.concatenate((self.timestamps[:self.size], rows["timestamps"]))
+        merge_order = np.argsort(merged, kind="stable")
+        self._reallocate(max(required, capacity), order=merge_order, extra=rows)
+
+    def window(self, start: Optional[np.datetime64], end: Optional[np.datetime64]) -> Dict[str, np.ndarray]:
+        """Read-only views of rows with start <= timestamp <= end"""
+        timestamps = self.timestamps[:self.size]
+        lo = 0 if start is None else int(np.searchsorted(timestamps, start, side="left"))
+        hi = self.size if end is None else int(np.searchsorted(timestamps, end, side="right"))
+        views = {}
+        for name, column in self._columns().items():
+            view = column[lo:hi]
+            view.flags.writeable = False
+            views[name] = view
+        return views
+
+class PriceHistoryStore:
+    """In-memory columnar history of price and inventory observations.
+
+    Observations are kept per (commodity, variety, mandi) series. Frames for a
+    commodity (optionally a variety and time window) are zero-copy when one
+    series covers the scope; merged frames are cached until the next insert so
+    every detector in a cycle reads the same sorted columns.
+    """
+
+    def __init__(self):
+        self.mandis = MandiRegistry()
+        self.version = 0
+        self._series: Dict[type, Dict[SeriesKey, _SeriesColumns]] = {
+            PriceFrame: {},
+            InventoryFrame: {}
+        }
+        self._frame_cache: Dict[Tuple, HistoryFrame] = {}
+
+    def __len__(self) -> int:
+        return sum(
+            series.size for series_map in self._series.values() for series in series_map.values()
+        )
+
+    def clear(self):
+        self.mandis = MandiRegistry()
+        for series_map in self._series.values():
+            series_map.clear()
+        self._frame_cache.clear()
+        self.version += 1
+
+    def add_price_points(self, points: Iterable[Any]) -> int:
+        """Insert PriceDataPoint-like records; returns the number stored"""
+        return self._add(PriceFrame, points)
+
+    def add_inventory_points(self, points: Iterable[Any]) -> int:
+        """Insert InventoryDataPoint-like records; returns the number stored"""
+        return self._add(InventoryFrame, points)
+
+    def _add(self, frame_cls, points: Iterable[Any]) -> int:
+        grouped: Dict[SeriesKey, List[Any]] = {}
+        for point in points:
+            grouped.setdefault((point.commodity, point.variety, point.mandi_id), []).append(point)
+        if not grouped:
+            return 0
+
+        series_map = self._series[frame_cls]
+        stored = 0
+        for key, group in grouped.items():
+            timestamps, columns, codes = _point_columns(frame_cls, group, self.mandis)
+            series = series_map.get(key)
+            if series is None:
+                series = series_map[key] = _SeriesColumns(frame_cls.value_columns())
+            series.insert({"timestamps": timestamps, "mandi_codes": codes, **columns})
+            stored += len(group)
+
+        self.version += 1
+        self._frame_cache.clear()
+        return stored
+
+    def series_keys(self, frame_cls=PriceFrame) -> List[SeriesKey]:
+        return list(self._series[frame_cls])
+
+    def commodities(self) -> List[Tuple[str, Optional[str]]]:
+        """Distinct (commodity, variety) pairs with any stored history"""
+        pairs = {}
+        for series_map in self._series.values():
+            for commodity, variety, _ in series_map:
+                pairs[(commodity, variety)] = None
+        return list(pairs)
+
+    def price_frame(
+        self,
+        commodity: str,
+        variety: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> PriceFrame:
+        return self._frame(PriceFrame, commodity, variety, start, end)
+
+    def inventory_frame(
+        self,
+        commodity: str,
+        variety: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> InventoryFrame:
+        return self._frame(InventoryFrame, commodity, variety, start, end)
+
+    def _frame(self, frame_cls, commodity, variety, start, end) -> HistoryFrame:
+        cache_key = (frame_cls, commodity, variety, start, end)
+        cached = self._frame_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        start64 = to_datetime64(start) if start is not None else None
+        end64 = to_datetime64(end) if end is not None else None
+        windows = [
+            series.window(start64, end64)
+            for (series_commodity, series_variety, _), series in self._series[frame_cls].items()
+            if series_commodity == commodity and (variety is None or series_variety == variety)
+        ]
+        windows = [window for window in windows if len(window["timestamps"])]
+
+        if not windows:
+            frame = frame_cls.empty(self.mandis.refs)
+        elif len(windows) == 1:
+            frame = frame_cls(mandis=self.mandis.refs, **windows[0])
+        else:
+            merged = {
+                name: np.concatenate([window[name] for window in windows])
+                for name in windows[0]
+            }
+            order = np.argsort(merged["timestamps"], kind="stable")
+            columns = {}
+            for name, values in merged.items():
+                column = values[order]
+                column.flags.writeable = False
+                columns[name] = column
+            frame = frame_cls(mandis=self.mandis.refs, **columns)
+
+        self._frame_cache[cache_key] = frame
+        return frame
@@ -0,0 +1,224 @@
+"""
+Cross-regional correlation engine for the Anti-Hoarding Detection System
+Resamples per-state inventory and price series onto a shared daily grid and
+computes lagged inventory/price cross-correlations for every state pair at once
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from price_history_store import HistoryFrame, InventoryFrame, PriceFrame
+
+# Fewer overlapping days than this gives no usable correlation
+MIN_OVERLAP_DAYS = 5
+MIN_STATE_OBSERVATIONS = 3
+# Relative standard deviation below which a series counts as flat
+FLAT_TOLERANCE = 1e-6
+
+DAY = np.timedelta64(1, "D")
+
+@dataclass
+class StateSeries:
+    """Per-state summary of one frame, plus its forward-filled daily grid"""
+    states: List[str]
+    grid: np.ndarray           # (states, days), NaN before a state's first observation
+    counts: np.ndarray         # observations per state
+    first_values: np.ndarray
+    last_values: np.ndarray
+    totals: np.ndarray
+    first_seen: np.ndarray     # datetime64 per state
+    last_seen: np.ndarray
+
+    @property
+    def trends(self) -> np.ndarray:
+        """(last - first) / observations, the trend used for regional screening"""
+        return (self.last_values - self.first_values) / np.maximum(self.counts, 1)
+
+@dataclass
+class CorrelationPair:
+    """Inventory state correlated with prices in another state at a given lag"""
+    inventory_state: str
+    price_state: str
+    correlation: float
+    lag_days: int
+    overlap_days: int
+    inventory_trend: float
+    price_trend: float
+    first_price: float
+    total_inventory: float
+    first_seen: datetime
+    last_seen: datetime
+
+@dataclass
+class CrossCorrelationResult:
+    inventory: StateSeries
+    prices: StateSeries
+    correlations: np.ndarray   # (lags, inventory states, price states)
+    overlaps: np.ndarray       # overlapping days per entry of correlations
+
+    def top_pairs(self, k: int, min_correlation: float) -> List[CorrelationPair]:
+        """Strongest accumulating-inventory / rising-price pairs across distinct states"""
+        if not self.correlations.size:
+            return []
+
+        best_lags = np.argmax(np.where(np.isnan(self.correlations), -np.inf, self.correlations), axis=0)
+        rows, cols = np.indices(best_lags.shape)
+        best = self.correlations[best_lags, rows, cols]
+        overlaps = self.overlaps[best_lags, rows, cols]
+
+        inventory_states = np.array(self.inventory.states, dtype=object)
+        price_states = np.array(self.prices.states, dtype=object)
+        eligible = (
+            (best > min_correlation)
+            & (inventory_states[:, None] != price_states[None, :])
+            & (self.inventory.trends[:, None] > 0)
+            & (self.prices.trends[None, :] > 0)
+            & (self.inventory.counts[:, None] >= MIN_STATE_OBSERVATIONS)
+            & (self.prices.counts[None, :] >= MIN_STATE_OBSERVATIONS)
+        )
+
+        candidates = np.flatnonzero(eligible)
+        if not len(candidates):
+            return []
+        ranked = candidates[np.argsort(-best.ravel()[candidates], kind="stable")][:k]
+
+        pairs = []
+        for flat in ranked.tolist():
+            i, j = divmod(flat, best.shape[1])
+            pairs.append(CorrelationPair(
+                inventory_state=self.inventory.states[i],
+                price_state=self.prices.states[j],
+                correlation=float(best[i, j]),
+                lag_days=int(best_lags[i, j]),
+                overlap_days=int(overlaps[i, j]),
+                inventory_trend=float(self.inventory.trends[i]),
+                price_trend=float(self.prices.trends[j]),
+                first_price=float(self.prices.first_values[j]),
+                total_inventory=float(self.inventory.totals[i]),
+                first_seen=min(self.inventory.first_seen[i], self.prices.first_seen[j]).item(),
+                last_seen=max(self.inventory.last_seen[i], self.prices.last_seen[j]).item()
+            ))
+        return pairs
+
+class RegionalCorrelationEngine:
+    """Lagged cross-correlation between state inventory and state price series.
+
+    Both frames are resampled once onto a shared daily grid (daily mean,
+    forward-filled). For every lag the full states x states Pearson matrix is
+    built from a handful of matrix products over the observed-day masks, so the
+    cost is one pass over the rows plus O(lags * S^2 * days) in BLAS, with no
+    per-pair rescans.
+    """
+
+    def __init__(self, max_lag_days: int = 14):
+        self.max_lag_days = max_lag_days
+
+    def correlate(self, inventory_frame: InventoryFrame, price_frame: PriceFrame) -> CrossCorrelationResult:
+        """Correlate inventory in each state with prices in each state lag days later"""
+        start = min(inventory_frame.timestamps[0], price_frame.timestamps[0]).astype("datetime64[D]")
+        end = max(inventory_frame.timestamps[-1], price_frame.timestamps[-1]).astype("datetime64[D]")
+        days = int((end - start) // DAY) + 1
+
+        inventory = self.resample(inventory_frame, inventory_frame.inventory_levels, start, days)
+        prices = self.resample(price_frame, price_frame.prices, start, days)
+
+        max_lag = min(self.max_lag_days, max(days - MIN_OVERLAP_DAYS, 0))
+        correlations = []
+        overlaps = []
+        for lag in range(max_lag + 1):
+            corr, overlap = self._pearson_matrix(
+                inventory.grid[:, :days - lag], prices.grid[:, lag:]
+            )
+            correlations.append(corr)
+            overlaps.append(overlap)
+
+        return CrossCorrelationResult(
+            inventory=inventory,
+            prices=prices,
+            correlations=np.stack(correlations),
+            overlaps=np.stack(overlaps)
+        )
+
+    @staticmethod
+    def resample(frame: HistoryFrame, values: np.ndarray, start: np.datetime64, days: int) -> StateSeries:
+        """Daily mean per state on [start, start + days), forward-filled"""
+        state_of_code: Dict[str, int] = {}
+        code_to_state = np.array(
+            [state_of_code.setdefault(ref.location.state, len(state_of_code)) for ref in frame.mandis],
+            dtype=np.intp
+        )
+        states = list(state_of_code)
+
+        state_index = code_to_state[frame.mandi_codes]
+        day_index = ((frame.timestamps.astype("datetime64[D]") - start) // DAY).astype(np.intp)
+        n_states = len(states)
+
+        cells = state_index * days + day_index
+        sums = np.bincount(cells, weights=values, minlength=n_states * days).reshape(n_states, days)
+        hits = np.bincount(cells, minlength=n_states * days).reshape(n_states, days)
+        observed = hits > 0
+        daily = np.divide(sums, hits, out=np.full(sums.shape, np.nan), where=observed)
+
+        # Forward fill: carry each state's last observed day
+        last_observed = np.maximum.accumulate(np.where(observed, np.arange(days), -1), axis=1)
+        grid = np.take_along_axis(daily, np.maximum(last_observed, 0), axis=1)
+        grid[last_observed < 0] = np.nan
+
+        # Rows are timestamp-sorted, so first/last occurrences are chronological
+        counts = np.bincount(state_index, minlength=n_states)
+        first_rows = np.zeros(n_states, dtype=np.intp)
+        last_rows = np.zeros(n_states, dtype=np.intp)
+        present, first = np.unique(state_index, return_index=True)
+        first_rows[present] = first
+        present, from_end = np.unique(state_index[::-1], return_index=True)
+        last_rows[present] = len(state_index) - 1 - from_end
+
+        return StateSeries(
+            states=states,
+            grid=grid,
+            counts=counts,
+            first_values=values[first_rows],
+            last_values=values[last_rows],
+            totals=np.bincount(state_index, weights=values, minlength=n_states),
+            first_seen=frame.timestamps[first_rows],
+            last_seen=frame.timestamps[last_rows]
+        )
+
+    @staticmethod
+    def _pearson_matrix(x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Pairwise Pearson correlation of rows of x with rows of y over jointly observed days"""
+        x, x_mask, x_scale = _centred(x)
+        y, y_mask, y_scale = _centred(y)
+
+        n = x_mask @ y_mask.T
+        sum_x = x @ y_mask.T
+        sum_y = x_mask @ y.T
+        sum_xx = (x * x) @ y_mask.T
+        sum_yy = x_mask @ (y * y).T
+        sum_xy = x @ y.T
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            variance_x = (n * sum_xx - sum_x ** 2) / n ** 2
+            variance_y = (n * sum_yy - sum_y ** 2) / n ** 2
+            correlation = (n * sum_xy - sum_x * sum_y) / (n ** 2 * np.sqrt(variance_x * variance_y))
+
+        # Flat series over the overlap (e.g. a single forward-filled reading) carry no signal
+        flat = (
+            (variance_x <= (FLAT_TOLERANCE * x_scale[:, None]) ** 2)
+            | (variance_y <= (FLAT_TOLERANCE * y_scale[None, :]) ** 2)
+        )
+        correlation[(n < MIN_OVERLAP_DAYS) | flat] = np.nan
+        return np.clip(correlation, -1.0, 1.0), n.astype(np.int64)
+
+def _centred(grid: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Rows minus their observed mean with gaps zeroed, the observed mask, and each row's scale"""
+    mask = ~np.isnan(grid)
+    filled = np.where(mask, grid, 0.0)
+    counts = mask.sum(axis=1, keepdims=True)
+    means = filled.sum(axis=1, keepdims=True) / np.maximum(counts, 1)
+    scale = np.abs(filled).max(axis=1) if grid.shape[1] else np.zeros(grid.shape[0])
+    # Centring keeps the sums of squares from cancelling catastrophically
+    return np.where(mask, filled - means, 0.0), mask.astype(np.float64), scale
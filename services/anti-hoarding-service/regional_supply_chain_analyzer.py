@@ -9,22 +9,10 @@ from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 import statistics
 from collections import defaultdict
-from dataclasses import dataclass
 
-logger = structlog.get_logger()
+from models import RegionalSupplyChain
 
-@dataclass
-class RegionalSupplyChain:
-    """Regional supply chain analysis data"""
-    region: str
-    commodity: str
-    variety: Optional[str]
-    supply_sources: Dict[str, float]  # source_region -> supply_amount
-    demand_destinations: Dict[str, float]  # destination_region -> demand_amount
-    transportation_costs: Dict[str, float]  # route -> cost_per_unit
-    bottlenecks: List[str]
-    efficiency_score: float
-    vulnerability_factors: List[str]
+logger = structlog.get_logger()
 
 class RegionalSupplyChainAnalyzer:
     """Regional supply chain analysis system"""
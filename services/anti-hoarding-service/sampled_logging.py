@@ -0,0 +1,197 @@
+"""
+Sampled, rate-limited structured logging for detection hot loops
+Wraps a structlog logger with per-event-key sampling, token-bucket rate
+limits, "N similar events suppressed" summaries and lazy keyword arguments
+
+Vendored verbatim in anti-hoarding-service and msp-enforcement-service: each
+service image is built from its own directory, so there is no shared package
+both can import. Change the two copies together.
+"""
+
+import os
+import threading
+import time
+import structlog
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+@dataclass
+class LogRule:
+    """How often events for one key may reach the underlying logger"""
+    sample_rate: float = 1.0                 # fraction of events kept before rate limiting
+    rate_per_second: Optional[float] = None  # token refill rate; None disables the limit
+    burst: int = 10                          # bucket size
+
+    @classmethod
+    def from_env(cls) -> "LogRule":
+        rate = os.getenv("LOG_RATE_PER_SECOND", "20")
+        return cls(
+            sample_rate=float(os.getenv("LOG_SAMPLE_RATE", "1.0")),
+            rate_per_second=float(rate) if rate else None,
+            burst=int(os.getenv("LOG_BURST", "50"))
+        )
+
+class LazyValue:
+    __slots__ = ("fn",)
+
+    def __init__(self, fn: Callable[[], Any]):
+        self.fn = fn
+
+def lazy(fn: Callable[[], Any]) -> LazyValue:
+    """Keyword argument computed only if the event is actually logged"""
+    return LazyValue(fn)
+
+class _KeyState:
+    __slots__ = ("credit", "tokens", "refilled_at", "suppressed")
+
+    def __init__(self, burst: int, now: float):
+        self.credit = 0.0
+        self.tokens = float(burst)
+        self.refilled_at = now
+        self.suppressed = 0
+
+class SampledLogger:
+    """structlog wrapper that drops excess hot-loop events and reports how many.
+
+    Events are keyed by `key` (default: the event message). Each key first
+    passes a deterministic sampler (every 1/sample_rate-th event is kept),
+    then a token bucket. Dropped events are counted; the count is attached
+    to the key's next logged event as `suppressed_similar` and any remaining
+    counts are flushed as summary lines every summary_interval_seconds.
+
+    With enabled=False sampling and rate limits are bypassed and every event
+    is logged.
+    """
+
+    def __init__(
+        self,
+        logger: Any = None,
+        default_rule: Optional[LogRule] = None,
+        rules: Optional[Dict[str, LogRule]] = None,
+        summary_interval_seconds: float = 60.0,
+        enabled: bool = True,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.logger = logger or structlog.get_logger()
+        self.default_rule = default_rule or LogRule()
+        self.rules: Dict[str, LogRule] = dict(rules or {})
+        self.summary_interval_seconds = summary_interval_seconds
+        self.enabled = enabled
+        self.clock = clock
+        self._states: Dict[str, _KeyState] = {}
+        self._logged = 0
+        self._dropped = 0
+        self._lock = threading.Lock()
+        self._last_summary = clock()
+
+    @classmethod
+    def from_env(cls, logger: Any = None, rules: Optional[Dict[str, LogRule]] = None) -> "SampledLogger":
+        """Configured by LOG_SAMPLING_ENABLED, LOG_SAMPLE_RATE, LOG_RATE_PER_SECOND,
+        LOG_BURST and LOG_SUMMARY_INTERVAL_SECONDS"""
+        return cls(
+            logger,
+            default_rule=LogRule.from_env(),
+            rules=rules,
+            summary_interval_seconds=float(os.getenv("LOG_SUMMARY_INTERVAL_SECONDS", "60")),
+            enabled=os.getenv("LOG_SAMPLING_ENABLED", "true").lower() != "false"
+        )
+
+    def debug(self, event: str, key: Optional[str] = None, **kwargs):
+        self._log("debug", event, key, kwargs)
+
+    def info(self, event: str, key: Optional[str] = None, **kwargs):
+        self._log("info", event, key, kwargs)
+
+    def warning(self, event: str, key: Optional[str] = None, **kwargs):
+        self._log("warning", event, key, kwargs)
+
+    def error(self, event: str, **kwargs):
+        # Errors are never sampled
+        self.logger.error(event, **_resolve(kwargs))
+
+    def set_rule(self, key: str, rule: LogRule):
+        with self._lock:
+            self.rules[key] = rule
+            self._states.pop(key, None)
+
+    def suppressed_counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {key: state.suppressed for key, state in self._states.items() if state.suppressed}
+
+    def stats(self) -> Dict[str, int]:
+        """Events logged and dropped since creation or the last reset()"""
+        with self._lock:
+            return {"logged": self._logged, "dropped": self._dropped, "keys": len(self._states)}
+
+    def reset(self):
+        """Forget all per-key sampling state, pending suppressed counts and stats"""
+        with self._lock:
+            self._states.clear()
+            self._logged = 0
+            self._dropped = 0
+            self._last_summary = self.clock()
+
+    def flush(self):
+        """Log a summary line for every key with suppressed events"""
+        with self._lock:
+            pending = [(key, state.suppressed) for key, state in self._states.items() if state.suppressed]
+            for state in self._states.values():
+                state.suppressed = 0
+            self._last_summary = self.clock()
+        for key, suppressed in pending:
+            self.logger.info("Similar log events suppressed", event_key=key, suppressed=suppressed)
+
+    def _log(self, level: str, event: str, key: Optional[str], kwargs: Dict[str, Any]):
+        key = key or event
+        now = self.clock()
+        with self._lock:
+            allowed, suppressed = self._admit(key, now)
+            if allowed:
+                self._logged += 1
+            else:
+                self._dropped += 1
+            flush_due = now - self._last_summary >= self.summary_interval_seconds
+
+        if allowed:
+            kwargs = _resolve(kwargs)
+            if suppressed:
+                kwargs["suppressed_similar"] = suppressed
+            getattr(self.logger, level)(event, **kwargs)
+        if flush_due:
+            self.flush()
+
+    def _admit(self, key: str, now: float):
+        """(allowed, suppressed count to report); caller holds the lock"""
+        if not self.enabled:
+            return True, 0
+
+        rule = self.rules.get(key, self.default_rule)
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = _KeyState(rule.burst, now)
+
+        if rule.sample_rate < 1.0:
+            state.credit += rule.sample_rate
+            if state.credit < 1.0:
+                state.suppressed += 1
+                return False, 0
+            state.credit -= 1.0
+
+        if rule.rate_per_second is not None:
+            state.tokens = min(
+                float(rule.burst), state.tokens + (now - state.refilled_at) * rule.rate_per_second
+            )
+            state.refilled_at = now
+            if state.tokens < 1.0:
+                state.suppressed += 1
+                return False, 0
+            state.tokens -= 1.0
+
+        suppressed, state.suppressed = state.suppressed, 0
+        return True, suppressed
+
+def _resolve(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        name: value.fn() if isinstance(value, LazyValue) else value
+        for name, value in kwargs.items()
+    }
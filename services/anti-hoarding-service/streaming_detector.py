@@ -0,0 +1,465 @@
+"""
+Streaming anomaly detection for the Anti-Hoarding Detection System
+Keeps rolling state per (commodity, variety, mandi) series and evaluates each
+price or inventory observation in constant time as it arrives
+"""
+
+import asyncio
+import math
+import structlog
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from models import (
+    PriceAnomaly, InventoryAnomaly, AnomalyType, DetectionMethod,
+    AnomalyDetectionConfig
+)
+from anomaly_detector import (
+    PriceSpikeDetector, InventoryTracker, PriceDataPoint, InventoryDataPoint
+)
+from price_history_store import to_utc_naive
+
+logger = structlog.get_logger()
+
+# Observations kept for the rolling mean/variance behind the z-score, as a
+# multiple of the moving-average window
+STATS_WINDOW_MULTIPLIER = 5
+INVENTORY_TREND_WINDOW = 7
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+SeriesKey = Tuple[str, Optional[str], str]
+
+class RollingWindowStats:
+    """Welford mean/variance over the last `capacity` observations.
+
+    Adding an observation and evicting the oldest are both O(1).
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.values: deque = deque()
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def add(self, value: float):
+        if len(self.values) == self.capacity:
+            self._remove(self.values.popleft())
+        self.values.append(value)
+        delta = value - self.mean
+        self.mean += delta / len(self.values)
+        self._m2 += delta * (value - self.mean)
+
+    def _remove(self, value: float):
+        # value has already left self.values
+        count = len(self.values) + 1
+        if count == 1:
+            self.mean = 0.0
+            self._m2 = 0.0
+            return
+        old_mean = self.mean
+        self.mean = (count * old_mean - value) / (count - 1)
+        self._m2 -= (value - old_mean) * (value - self.mean)
+        self._m2 = max(self._m2, 0.0)
+
+    def resize(self, capacity: int):
+        """Change the window, keeping the most recent observations"""
+        retained = list(self.values)[-capacity:]
+        self.capacity = capacity
+        self.values = deque()
+        self.mean = 0.0
+        self._m2 = 0.0
+        for value in retained:
+            self.add(value)
+
+    @property
+    def std_dev(self) -> float:
+        """Sample standard deviation, as statistics.stdev"""
+        if len(self.values) < 2:
+            return 0.0
+        return math.sqrt(self._m2 / (len(self.values) - 1))
+
+class MovingAverageBuffer:
+    """Fixed-size ring buffer with a running sum"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values: deque = deque(maxlen=window)
+        self.total = 0.0
+
+    @property
+    def full(self) -> bool:
+        return len(self.values) == self.window
+
+    def add(self, value: float):
+        if self.full:
+            self.total -= self.values[0]
+        self.values.append(value)
+        self.total += value
+
+    def resize(self, window: int):
+        """Change the window, keeping the most recent values"""
+        self.window = window
+        self.values = deque(list(self.values)[-window:], maxlen=window)
+        self.total = sum(self.values)
+
+    @property
+    def mean(self) -> float:
+        return self.total / len(self.values) if self.values else 0.0
+
+class SlidingRegression:
+    """Least-squares slope of the last `window` values against their position.
+
+    Sums are updated on every push so the slope costs O(1).
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values: deque = deque()
+        self.sum_y = 0.0
+        self.sum_xy = 0.0
+
+    def add(self, value: float):
+        if len(self.values) == self.window:
+            oldest = self.values.popleft()
+            # Remaining points shift one position left
+            self.sum_y -= oldest
+            self.sum_xy -= self.sum_y
+        self.sum_xy += len(self.values) * value
+        self.sum_y += value
+        self.values.append(value)
+
+    @property
+    def slope(self) -> float:
+        n = len(self.values)
+        if n < 2:
+            return 0.0
+        sum_x = n * (n - 1) / 2
+        sum_xx = (n - 1) * n * (2 * n - 1) / 6
+        denominator = n * sum_xx - sum_x ** 2
+        return (n * self.sum_xy - sum_x * self.sum_y) / denominator
+
+@dataclass
+class RollingStatistics:
+    """Rolling mean and deviation of a series, for anomaly evidence"""
+    mean: float
+    std_dev: float
+    count: int
+
+@dataclass
+class PriceSeriesState:
+    moving_average: MovingAverageBuffer
+    stats: RollingWindowStats
+    observations: int = 0
+    last_timestamp: Optional[datetime] = None
+
+@dataclass
+class InventorySeriesState:
+    moving_average: MovingAverageBuffer
+    stats: RollingWindowStats
+    trend: SlidingRegression
+    observations: int = 0
+    last_timestamp: Optional[datetime] = None
+    last_level: Optional[float] = None
+
+@dataclass
+class CommodityInventoryTotals:
+    """Latest inventory level per mandi with sums for an O(1) concentration ratio"""
+    latest_levels: Dict[str, float] = field(default_factory=dict)
+    total: float = 0.0
+    total_squared: float = 0.0
+
+    def update(self, mandi_id: str, level: float):
+        previous = self.latest_levels.get(mandi_id)
+        if previous is not None:
+            self.total -= previous
+            self.total_squared -= previous ** 2
+        self.latest_levels[mandi_id] = level
+        self.total += level
+        self.total_squared += level ** 2
+
+    @property
+    def concentration_ratio(self) -> float:
+        if self.total <= 0:
+            return 0.0
+        return min(1.0, max(0.0, self.total_squared / self.total ** 2))
+
+class StreamingAnomalyDetector:
+    """Online anomaly detection over price and inventory observations.
+
+    Each (commodity, variety, mandi) series keeps a moving-average ring buffer,
+    windowed Welford statistics and, for inventory, a sliding accumulation
+    slope. Observations are evaluated as they arrive and any anomalies are
+    returned and pushed to subscribers.
+    """
+
+    def __init__(self, config: AnomalyDetectionConfig = None):
+        self.config = config or AnomalyDetectionConfig()
+        self.price_spike_detector = PriceSpikeDetector(self.config)
+        self.inventory_tracker = InventoryTracker(self.config)
+        self.stats_window = self.config.moving_average_window_days * STATS_WINDOW_MULTIPLIER
+
+        self.price_series: Dict[SeriesKey, PriceSeriesState] = {}
+        self.inventory_series: Dict[SeriesKey, InventorySeriesState] = {}
+        self.inventory_totals: Dict[Tuple[str, Optional[str]], CommodityInventoryTotals] = {}
+        self.watermarks: Dict[Any, datetime] = {}
+        self.late_observations = 0
+        self.dropped_events = 0
+        self._subscribers: Set[asyncio.Queue] = set()
+
+    def reconfigure(self, config: AnomalyDetectionConfig):
+        """Apply a new configuration to the live detector.
+
+        Series state, watermarks and subscribers are kept; rolling windows
+        are resized in place and retain their most recent observations.
+        """
+        window_changed = config.moving_average_window_days != self.config.moving_average_window_days
+        self.config = config
+        self.price_spike_detector = PriceSpikeDetector(config)
+        self.inventory_tracker = InventoryTracker(config)
+        self.stats_window = config.moving_average_window_days * STATS_WINDOW_MULTIPLIER
+
+        if window_changed:
+            for state in self.price_series.values():
+                state.moving_average.resize(config.moving_average_window_days)
+                state.stats.resize(self.stats_window)
+            for state in self.inventory_series.values():
+                state.stats.resize(self.stats_window)
+
+        logger.info(
+            "Streaming detector reconfigured",
+            price_series=len(self.price_series),
+            inventory_series=len(self.inventory_series),
+            windows_resized=window_changed
+        )
+
+    # Push stream
+
+    def subscribe(self, max_size: int = SUBSCRIBER_QUEUE_SIZE) -> asyncio.Queue:
+        """Queue receiving every anomaly detected from now on"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def _publish(self, anomaly: Any):
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait(anomaly)
+            except asyncio.QueueFull:
+                # A slow consumer must not hold up detection
+                self.dropped_events += 1
+
+    # Watermarks let callers fetch only data newer than the last tick
+
+    def watermark(self, key: Any) -> Optional[datetime]:
+        return self.watermarks.get(key)
+
+    def advance_watermark(self, key: Any, timestamp: datetime):
+        timestamp = to_utc_naive(timestamp)
+        current = self.watermarks.get(key)
+        if current is None or timestamp > current:
+            self.watermarks[key] = timestamp
+
+    # Price observations
+
+    def observe_price(self, point: PriceDataPoint) -> Optional[PriceAnomaly]:
+        """Evaluate one price observation against its series state"""
+        key = (point.commodity, point.variety, point.mandi_id)
+        state = self.price_series.get(key)
+        if state is None:
+            state = self.price_series[key] = PriceSeriesState(
+                moving_average=MovingAverageBuffer(self.config.moving_average_window_days),
+                stats=RollingWindowStats(self.stats_window)
+            )
+
+        timestamp = to_utc_naive(point.timestamp)
+        if state.last_timestamp is not None and timestamp < state.last_timestamp:
+            self.late_observations += 1
+            return None
+        state.last_timestamp = timestamp
+
+        price = point.price
+        state.moving_average.add(price)
+        state.stats.add(price)
+        state.observations += 1
+
+        if not state.moving_average.full or state.observations < self.config.min_data_points:
+            return None
+
+        moving_avg = state.moving_average.mean
+        if moving_avg == 0:
+            return None
+
+        price_deviation = price - moving_avg
+        deviation_percentage = (price_deviation / moving_avg) * 100
+        stats = RollingStatistics(state.stats.mean, state.stats.std_dev, len(state.stats))
+        z_score = (price - stats.mean) / stats.std_dev if stats.std_dev > 0 else 0.0
+
+        is_spike = (
+            abs(deviation_percentage) >= self.config.price_spike_threshold_percentage or
+            abs(z_score) >= self.config.z_score_threshold
+        )
+        if not is_spike:
+            return None
+
+        detector = self.price_spike_detector
+        anomaly = PriceAnomaly(
+            commodity=point.commodity,
+            variety=point.variety,
+            mandi_id=point.mandi_id,
+            mandi_name=point.mandi_name,
+            location=point.location,
+            anomaly_type=AnomalyType.PRICE_SPIKE,
+            detection_method=DetectionMethod.MOVING_AVERAGE_DEVIATION,
+            severity=detector._determine_price_spike_severity(deviation_percentage, z_score),
+            current_price=price,
+            baseline_price=moving_avg,
+            price_deviation=price_deviation,
+            deviation_percentage=deviation_percentage,
+            moving_average_30d=moving_avg,
+            standard_deviation=stats.std_dev,
+            z_score=z_score,
+            confidence_score=detector._calculate_price_spike_confidence(
+                deviation_percentage, z_score, stats.count
+            ),
+            analysis_period_days=self.config.moving_average_window_days,
+            evidence={
+                "rolling_statistics": stats.__dict__,
+                "moving_average_window": self.config.moving_average_window_days,
+                "series_observations": state.observations,
+                "detection_timestamp": timestamp.isoformat()
+            },
+            contributing_factors=detector._identify_price_spike_factors(
+                point.quantity, timestamp, deviation_percentage, z_score, stats
+            )
+        )
+        self._publish(anomaly)
+        return anomaly
+
+    # Inventory observations
+
+    def observe_inventory(
+        self,
+        point: InventoryDataPoint,
+        region: Optional[str] = None
+    ) -> Optional[InventoryAnomaly]:
+        """Evaluate one inventory observation against its series state"""
+        key = (point.commodity, point.variety, point.mandi_id)
+        state = self.inventory_series.get(key)
+        if state is None:
+            state = self.inventory_series[key] = InventorySeriesState(
+                moving_average=MovingAverageBuffer(INVENTORY_TREND_WINDOW),
+                stats=RollingWindowStats(self.stats_window),
+                trend=SlidingRegression(INVENTORY_TREND_WINDOW)
+            )
+
+        timestamp = to_utc_naive(point.timestamp)
+        if state.last_timestamp is not None and timestamp < state.last_timestamp:
+            self.late_observations += 1
+            return None
+        state.last_timestamp = timestamp
+
+        level = point.inventory_level
+        state.moving_average.add(level)
+        state.stats.add(level)
+        state.trend.add(level)
+        state.observations += 1
+        state.last_level = level
+
+        totals = self.inventory_totals.setdefault((point.commodity, point.variety), CommodityInventoryTotals())
+        totals.update(point.mandi_id, level)
+
+        if not state.moving_average.full:
+            return None
+
+        normal_level = state.moving_average.mean
+        deviation = level - normal_level
+        deviation_percentage = (deviation / normal_level) * 100 if normal_level > 0 else 0
+        if abs(deviation_percentage) < self.config.inventory_deviation_threshold:
+            return None
+
+        slope = state.trend.slope
+        if slope > 0.1:
+            trend_direction = "increasing"
+        elif slope < -0.1:
+            trend_direction = "decreasing"
+        else:
+            trend_direction = "stable"
+
+        tracker = self.inventory_tracker
+        anomaly = InventoryAnomaly(
+            commodity=point.commodity,
+            variety=point.variety,
+            region=region or point.location.state,
+            anomaly_type=(
+                AnomalyType.INVENTORY_HOARDING if deviation > 0 else AnomalyType.ARTIFICIAL_SCARCITY
+            ),
+            detection_method=DetectionMethod.INVENTORY_TRACKING,
+            severity=tracker._determine_inventory_severity(deviation_percentage),
+            current_inventory_level=level,
+            normal_inventory_level=normal_level,
+            inventory_deviation=deviation,
+            deviation_percentage=deviation_percentage,
+            affected_mandis=[point.mandi_id],
+            total_mandis_monitored=len(totals.latest_levels),
+            concentration_ratio=totals.concentration_ratio,
+            accumulation_period_days=self.config.stockpiling_threshold_days,
+            trend_direction=trend_direction,
+            evidence={
+                "rolling_statistics": RollingStatistics(
+                    state.stats.mean, state.stats.std_dev, len(state.stats)
+                ).__dict__,
+                "accumulation_slope": slope,
+                "analysis_window_days": INVENTORY_TREND_WINDOW,
+                "detection_timestamp": timestamp.isoformat()
+            },
+            stockpiling_indicators=tracker._identify_stockpiling_indicators(
+                level, point.storage_capacity, timestamp, deviation_percentage, trend_direction
+            )
+        )
+        self._publish(anomaly)
+        return anomaly
+
+    def observe_batch(
+        self,
+        price_data: List[PriceDataPoint],
+        inventory_data: List[InventoryDataPoint],
+        region: Optional[str] = None
+    ) -> Dict[str, List]:
+        """Feed a batch of observations in timestamp order"""
+        results = {"price_anomalies": [], "inventory_anomalies": [], "stockpiling_patterns": []}
+
+        for point in sorted(price_data, key=lambda p: to_utc_naive(p.timestamp)):
+            anomaly = self.observe_price(point)
+            if anomaly is not None:
+                results["price_anomalies"].append(anomaly)
+
+        for point in sorted(inventory_data, key=lambda p: to_utc_naive(p.timestamp)):
+            anomaly = self.observe_inventory(point, region)
+            if anomaly is not None:
+                results["inventory_anomalies"].append(anomaly)
+
+        if results["price_anomalies"] or results["inventory_anomalies"]:
+            logger.info(
+                "Streaming anomalies detected",
+                price_anomalies=len(results["price_anomalies"]),
+                inventory_anomalies=len(results["inventory_anomalies"]),
+                observations=len(price_data) + len(inventory_data)
+            )
+        return results
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "price_series": len(self.price_series),
+            "inventory_series": len(self.inventory_series),
+            "subscribers": len(self._subscribers),
+            "late_observations": self.late_observations,
+            "dropped_events": self.dropped_events
+        }
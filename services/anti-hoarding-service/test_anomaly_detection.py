@@ -7,6 +7,7 @@ import asyncio
 from datetime import datetime, timedelta
 from typing import List
 import statistics
+import numpy as np
 
 from models import (
     AnomalyDetectionConfig, AnomalyType, AnomalySeverity, 
@@ -17,6 +18,8 @@ from anomaly_detector import (
     StockpilingPatternDetector, PriceDataPoint, InventoryDataPoint,
     StatisticalAnalyzer
 )
+from price_history_store import PriceHistoryStore, PriceFrame, InventoryFrame
+from regional_correlation import RegionalCorrelationEngine
 
 class TestStatisticalAnalyzer:
     """Test statistical analysis functions"""
@@ -187,6 +190,43 @@ class TestPriceSpikeDetector:
         )
         
         assert len(anomalies) == 0
+    
+    @pytest.mark.asyncio
+    async def test_vectorized_matches_scalar_detection(self, config, normal_price_data, spike_price_data):
+        """Vectorized detection returns the same anomalies as the scalar scan"""
+        base_time = datetime(2024, 1, 1)
+        location = GeoLocation(latitude=0.0, longitude=0.0, state="Test State")
+        rng = np.random.default_rng(7)
+        noisy_price_data = [
+            PriceDataPoint(
+                commodity="wheat",
+                variety="HD-2967",
+                price=float(price),
+                quantity=100.0,
+                mandi_id="mandi_1",
+                mandi_name="Test Mandi",
+                location=location,
+                timestamp=base_time + timedelta(days=i),
+                confidence=0.9
+            )
+            for i, price in enumerate(rng.normal(2000.0, 300.0, 200))
+        ]
+        
+        scalar = PriceSpikeDetector(config, vectorized=False)
+        vectorized = PriceSpikeDetector(config, vectorized=True)
+        
+        for price_data in (normal_price_data, spike_price_data, noisy_price_data):
+            expected = await scalar.detect_price_spikes(price_data, "wheat", "HD-2967")
+            actual = await vectorized.detect_price_spikes(price_data, "wheat", "HD-2967")
+            
+            assert len(actual) == len(expected)
+            for e, a in zip(expected, actual):
+                assert a.current_price == e.current_price
+                assert a.severity == e.severity
+                assert a.evidence["detection_timestamp"] == e.evidence["detection_timestamp"]
+                assert a.baseline_price == pytest.approx(e.baseline_price, rel=1e-9)
+                assert a.deviation_percentage == pytest.approx(e.deviation_percentage, rel=1e-9, abs=1e-9)
+                assert a.z_score == pytest.approx(e.z_score, rel=1e-9)
 
 class TestInventoryTracker:
     """Test inventory anomaly detection"""
@@ -362,6 +402,71 @@ class TestStockpilingPatternDetector:
         assert pattern.commodity == "wheat"
         assert len(pattern.involved_locations) >= 3
         assert pattern.confidence_score > 0.5
+    
+    @pytest.mark.asyncio
+    async def test_cross_regional_lagged_correlation(self, detector):
+        """Test that prices following another state's inventory with a lag are paired"""
+        rng = np.random.default_rng(5)
+        base_time = datetime(2024, 3, 1, 9)
+        days = 60
+        lag = 4
+        accumulation = np.cumsum(np.abs(rng.normal(20.0, 15.0, days + lag)))
+        
+        def location(state):
+            return GeoLocation(latitude=0.0, longitude=0.0, state=state, district=f"{state} District")
+        
+        inventory_data = [
+            InventoryDataPoint(
+                commodity="wheat", variety="HD-2967",
+                inventory_level=1000.0 + accumulation[day],
+                mandi_id="mandi_a", mandi_name="Hoarding Mandi", location=location("State_A"),
+                timestamp=base_time + timedelta(days=day), storage_capacity=5000.0
+            )
+            for day in range(days)
+        ]
+        price_data = [
+            PriceDataPoint(
+                commodity="wheat", variety="HD-2967",
+                price=price, quantity=100.0,
+                mandi_id=mandi_id, mandi_name=mandi_id, location=location(state),
+                timestamp=base_time + timedelta(days=day, hours=3), confidence=0.9
+            )
+            for day in range(days)
+            for mandi_id, state, price in [
+                # State_B prices track State_A inventory four days later
+                ("mandi_b", "State_B", 2000.0 + 2.0 * accumulation[day - lag] if day >= lag else 2000.0),
+                ("mandi_c", "State_C", 2000.0 + day * 0.5 + rng.normal(0.0, 40.0))
+            ]
+        ]
+        
+        patterns = await detector.detect_stockpiling_patterns(
+            inventory_data, price_data, "wheat", "HD-2967"
+        )
+        
+        cross_regional = [p for p in patterns if p.pattern_type == "cross_regional"]
+        assert cross_regional
+        strongest = cross_regional[0]
+        assert strongest.involved_locations == ["State_A", "State_B"]
+        assert strongest.evidence["lag_days"] == lag
+        assert strongest.confidence_score > 0.95
+        assert all(p.confidence_score <= strongest.confidence_score for p in cross_regional)
+    
+    def test_correlation_matrix_matches_pairwise_corrcoef(self):
+        """Test the masked matrix Pearson against np.corrcoef on each overlap"""
+        rng = np.random.default_rng(9)
+        x = rng.normal(1000.0, 50.0, (4, 30))
+        y = rng.normal(2000.0, 80.0, (3, 30))
+        x[0, :6] = np.nan
+        y[2, :10] = np.nan
+        
+        correlation, overlap = RegionalCorrelationEngine._pearson_matrix(x, y)
+        
+        for i in range(4):
+            for j in range(3):
+                both = ~np.isnan(x[i]) & ~np.isnan(y[j])
+                assert overlap[i, j] == both.sum()
+                expected = np.corrcoef(x[i, both], y[j, both])[0, 1]
+                assert correlation[i, j] == pytest.approx(expected, abs=1e-9)
 
 class TestAnomalyDetectionEngine:
     """Test the main anomaly detection engine"""
@@ -462,6 +567,92 @@ class TestAnomalyDetectionEngine:
         assert inventory_anomaly.commodity == "wheat"
         assert inventory_anomaly.anomaly_type == AnomalyType.INVENTORY_HOARDING
 
+class TestPriceHistoryStore:
+    """Test the columnar price history store"""
+    
+    @staticmethod
+    def make_point(price, timestamp, mandi_id="mandi_1", variety="HD-2967"):
+        return PriceDataPoint(
+            commodity="wheat",
+            variety=variety,
+            price=price,
+            quantity=100.0,
+            mandi_id=mandi_id,
+            mandi_name=f"Mandi {mandi_id}",
+            location=GeoLocation(latitude=0.0, longitude=0.0, state="Test State"),
+            timestamp=timestamp,
+            confidence=0.9
+        )
+    
+    def test_out_of_order_inserts_are_sorted(self):
+        """Late-arriving observations are merged into timestamp order"""
+        base_time = datetime(2024, 1, 1)
+        store = PriceHistoryStore()
+        store.add_price_points([self.make_point(2000.0 + i, base_time + timedelta(days=i)) for i in (0, 2, 4)])
+        store.add_price_points([self.make_point(2001.0, base_time + timedelta(days=1))])
+        
+        frame = store.price_frame("wheat", "HD-2967")
+        assert frame.prices.tolist() == [2000.0, 2001.0, 2002.0, 2004.0]
+        assert frame.timestamp_at(1) == base_time + timedelta(days=1)
+    
+    def test_single_series_frame_is_zero_copy(self):
+        """A frame covered by one series is a read-only view of the store buffers"""
+        base_time = datetime(2024, 1, 1)
+        store = PriceHistoryStore()
+        store.add_price_points([self.make_point(2000.0, base_time + timedelta(days=i)) for i in range(10)])
+        
+        frame = store.price_frame("wheat", "HD-2967", start=base_time + timedelta(days=3))
+        assert len(frame) == 7
+        assert frame.prices.base is not None
+        assert not frame.prices.flags.writeable
+        assert store.price_frame("wheat", "HD-2967", start=base_time + timedelta(days=3)) is frame
+    
+    def test_frames_merge_mandis_and_varieties(self):
+        """Commodity frames merge every matching series in timestamp order"""
+        base_time = datetime(2024, 1, 1)
+        points = [
+            self.make_point(1.0, base_time + timedelta(days=2), mandi_id="a"),
+            self.make_point(2.0, base_time + timedelta(days=1), mandi_id="b"),
+            self.make_point(3.0, base_time, mandi_id="c", variety="Sharbati"),
+        ]
+        store = PriceHistoryStore()
+        store.add_price_points(points)
+        
+        frame = store.price_frame("wheat")
+        assert frame.prices.tolist() == [3.0, 2.0, 1.0]
+        assert [frame.mandi_at(i).mandi_id for i in range(len(frame))] == ["c", "b", "a"]
+        assert len(store.price_frame("wheat", "HD-2967")) == 2
+        assert len(PriceFrame.from_points(points, "wheat", "HD-2967")) == 2
+    
+    @pytest.mark.asyncio
+    async def test_store_analysis_matches_list_analysis(self, monkeypatch):
+        """Point lists are analysed through a store, matching frames built straight from them"""
+        base_time = datetime(2024, 1, 1)
+        price_data = [
+            self.make_point(3200.0 if i == 12 else 2000.0, base_time + timedelta(days=i))
+            for i in range(15)
+        ]
+        config = AnomalyDetectionConfig(moving_average_window_days=7, min_data_points=5)
+        engine = AnomalyDetectionEngine(config)
+        stores = []
+        run_store_analysis = AnomalyDetectionEngine.run_store_analysis
+        
+        async def spy(self, history, *args, **kwargs):
+            stores.append(len(history))
+            return await run_store_analysis(self, history, *args, **kwargs)
+        
+        monkeypatch.setattr(AnomalyDetectionEngine, "run_store_analysis", spy)
+        from_store = await engine.run_comprehensive_analysis(price_data[::-1], [], "wheat", "HD-2967")
+        from_lists = await engine.analyze_frames(
+            PriceFrame.from_points(price_data, "wheat", "HD-2967"), InventoryFrame.empty(), "wheat", "HD-2967"
+        )
+        
+        assert stores == [len(price_data)]
+        assert len(from_store["price_anomalies"]) == len(from_lists["price_anomalies"]) > 0
+        for expected, actual in zip(from_lists["price_anomalies"], from_store["price_anomalies"]):
+            assert actual.current_price == expected.current_price
+            assert actual.deviation_percentage == expected.deviation_percentage
+
 # Integration tests
 class TestAnomalyDetectionIntegration:
     """Integration tests for the complete anomaly detection system"""
@@ -0,0 +1,149 @@
+"""
+Unit tests for the indexed anomaly store
+"""
+
+import pytest
+import random
+from datetime import datetime, timedelta
+
+from models import (
+    PriceAnomaly, AnomalyType, AnomalySeverity, DetectionMethod, GeoLocation
+)
+from database import AnomalyDatabase
+from anomaly_store import AnomalyPersistence, SQLitePersistence, create_persistence
+
+def make_price_anomaly(commodity: str, severity: AnomalySeverity, detected_at: datetime) -> PriceAnomaly:
+    return PriceAnomaly(
+        commodity=commodity,
+        mandi_id="mandi_1",
+        mandi_name="Test Mandi",
+        location=GeoLocation(latitude=0.0, longitude=0.0, state="Test State"),
+        anomaly_type=AnomalyType.PRICE_SPIKE,
+        detection_method=DetectionMethod.STATISTICAL_ANALYSIS,
+        severity=severity,
+        current_price=2600.0,
+        baseline_price=2000.0,
+        price_deviation=600.0,
+        deviation_percentage=30.0,
+        moving_average_30d=2000.0,
+        standard_deviation=100.0,
+        z_score=3.0,
+        confidence_score=0.8,
+        analysis_period_days=30,
+        detected_at=detected_at
+    )
+
+@pytest.fixture
+def anomalies():
+    rng = random.Random(11)
+    now = datetime.utcnow()
+    return [
+        make_price_anomaly(
+            rng.choice(["Wheat", "rice"]),
+            rng.choice(list(AnomalySeverity)),
+            now - timedelta(hours=rng.randint(0, 24 * 60))
+        )
+        for _ in range(300)
+    ]
+
+@pytest.mark.asyncio
+async def test_indexed_queries_match_linear_filters(anomalies):
+    """Index scans return what filtering and sorting the full list would"""
+    db = AnomalyDatabase()
+    for anomaly in anomalies:
+        await db.store_price_anomaly(anomaly)
+
+    start = datetime.utcnow() - timedelta(days=20)
+    results = await db.get_price_anomalies(
+        commodity="WHEAT", severity=AnomalySeverity.HIGH, start_date=start, limit=10
+    )
+
+    expected = sorted(
+        (
+            a for a in anomalies
+            if a.commodity.lower() == "wheat" and a.severity == AnomalySeverity.HIGH and a.detected_at >= start
+        ),
+        key=lambda a: a.detected_at,
+        reverse=True
+    )[:10]
+    assert [a.id for a in results] == [a.id for a in expected]
+
+@pytest.mark.asyncio
+async def test_statistics_counters_follow_status_updates(anomalies):
+    """Counters match a full recount after confirmations and resolutions"""
+    db = AnomalyDatabase()
+    for anomaly in anomalies:
+        await db.store_price_anomaly(anomaly)
+    for anomaly in anomalies[:60]:
+        await db.update_anomaly_status(anomaly.id, "price", is_confirmed=anomaly.z_score > 0, is_resolved=True)
+    for anomaly in anomalies[60:90]:
+        await db.update_anomaly_status(anomaly.id, "price", is_confirmed=False, is_resolved=True)
+
+    start = datetime.utcnow() - timedelta(days=25, hours=7)
+    end = datetime.utcnow() - timedelta(days=3, hours=2)
+    stats = await db.get_detection_statistics(start, end)
+
+    in_range = [a for a in anomalies if start <= a.detected_at <= end]
+    assert stats.price_anomalies_count == len(in_range)
+    assert stats.critical_anomalies == sum(a.severity == AnomalySeverity.CRITICAL for a in in_range)
+    assert stats.confirmed_anomalies == sum(a.is_confirmed for a in in_range)
+    assert stats.resolved_anomalies == sum(a.is_resolved for a in in_range)
+    assert stats.false_positives == sum(a.is_resolved and not a.is_confirmed for a in in_range)
+
+@pytest.mark.asyncio
+async def test_retention_and_sqlite_reload(anomalies, tmp_path):
+    """Expired records are dropped and the rest survive a restart"""
+    url = f"sqlite:///{tmp_path / 'anomalies.db'}"
+    db = AnomalyDatabase(retention_days=30)
+    await db.attach_persistence(create_persistence(url))
+    for anomaly in anomalies:
+        await db.store_price_anomaly(anomaly)
+
+    cutoff = datetime.utcnow() - timedelta(days=30)
+    retained = {a.id for a in anomalies if a.detected_at >= cutoff}
+    assert set(db.price_anomalies.records) <= retained
+    await db.close()
+
+    reloaded = AnomalyDatabase(retention_days=30)
+    await reloaded.attach_persistence(create_persistence(url))
+    assert set(reloaded.price_anomalies.records) == set(db.price_anomalies.records)
+    await reloaded.close()
+
+@pytest.mark.asyncio
+async def test_memory_cap_keeps_newest_records(anomalies):
+    """The per-collection cap evicts the oldest records first"""
+    db = AnomalyDatabase(max_records_per_collection=50)
+    for anomaly in anomalies:
+        await db.store_price_anomaly(anomaly)
+
+    newest = sorted(anomalies, key=lambda a: a.detected_at, reverse=True)[:50]
+    assert len(db.price_anomalies) == 50
+    assert set(db.price_anomalies.records) == {a.id for a in newest}
+
+    # Secondary indexes hold exactly the retained records
+    for index in db.price_anomalies._indexes.values():
+        assert sorted(entry[2] for entries in index.values() for entry in entries) == \
+            sorted(a.id for a in newest)
+    results = await db.get_price_anomalies(commodity="wheat", severity=AnomalySeverity.HIGH)
+    assert [a.id for a in results] == [
+        a.id for a in newest if a.commodity.lower() == "wheat" and a.severity == AnomalySeverity.HIGH
+    ]
+
+def test_incomplete_persistence_backend_fails_at_construction():
+    """A backend missing abstract methods cannot be instantiated"""
+    class WriteOnlyPersistence(AnomalyPersistence):
+        async def connect(self):
+            pass
+
+        async def close(self):
+            pass
+
+        async def save_many(self, collection, rows):
+            pass
+
+    with pytest.raises(TypeError, match="delete"):
+        WriteOnlyPersistence()
+    assert isinstance(SQLitePersistence(":memory:"), AnomalyPersistence)
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
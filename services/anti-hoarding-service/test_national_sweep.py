@@ -0,0 +1,93 @@
+"""
+Unit tests for the national multi-commodity sweep
+"""
+
+import pytest
+
+from models import AnomalyDetectionConfig
+from database import AnomalyDatabase, get_price_data_for_analysis, get_inventory_data_for_analysis
+from anomaly_detector import AnomalyDetectionEngine, price_points_from_rows, inventory_points_from_rows
+import national_sweep
+from national_sweep import NationalSweep, SweepJob, _analyze_commodity, parse_commodity_keys
+
+COMMODITIES = [("wheat", "HD-2967"), ("rice", None), ("onion", None)]
+
+def test_parse_commodity_keys():
+    assert parse_commodity_keys(["wheat:HD-2967", " rice ", ""]) == [("wheat", "HD-2967"), ("rice", None)]
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("max_workers", [0, 2])
+async def test_sweep_persists_every_commodity(max_workers):
+    """Inline and process-pool sweeps analyse each commodity once and store results in bulk"""
+    db = AnomalyDatabase()
+    sweep = NationalSweep(db, AnomalyDetectionConfig(), max_workers=max_workers, days_back=20)
+
+    progress = await sweep.run(COMMODITIES + [("rice", None)])
+
+    assert progress.status == "completed"
+    assert progress.total_commodities == progress.completed_commodities == 3
+    assert not progress.failed_commodities
+    assert set(progress.stage_seconds) == {"load", "analyze", "persist"}
+    assert {"anomaly_detection", "supply_demand", "market_manipulation", "supply_chain"} <= set(progress.detector_seconds)
+    assert not sweep.running
+
+    assert progress.results["price_anomalies"] == len(db.price_anomalies)
+    assert progress.results["supply_demand_balances"] == len(db.supply_demand_balances)
+    assert {b.commodity for b in db.supply_demand_balances.records.values()} == {"wheat", "rice", "onion"}
+    assert progress.results["supply_chains"] == len(db.supply_chains) > 0
+    assert {c.commodity for c in db.supply_chains.records.values()} == {"wheat", "rice", "onion"}
+    assert progress.to_dict()["progress_percentage"] == 100.0
+
+@pytest.mark.asyncio
+async def test_sweep_detects_over_the_history_store(monkeypatch):
+    """Each commodity is analysed from a PriceHistoryStore, matching the list-based analysis"""
+    price_rows = await get_price_data_for_analysis("wheat", days_back=20)
+    inventory_rows = await get_inventory_data_for_analysis("wheat", days_back=20)
+    config = AnomalyDetectionConfig()
+
+    calls = []
+    run_store_analysis = AnomalyDetectionEngine.run_store_analysis
+
+    async def spy(self, store, commodity, variety=None, region=None, since=None):
+        calls.append((len(store), commodity))
+        return await run_store_analysis(self, store, commodity, variety, region, since)
+
+    monkeypatch.setattr(AnomalyDetectionEngine, "run_store_analysis", spy)
+    outcome = await _analyze_commodity(SweepJob("wheat", None, price_rows, inventory_rows, config))
+
+    assert calls == [(len(price_rows) + len(inventory_rows), "wheat")]
+    expected = await AnomalyDetectionEngine(config).run_comprehensive_analysis(
+        price_points_from_rows(price_rows), inventory_points_from_rows(inventory_rows), "wheat"
+    )
+    assert [a.current_price for a in outcome.price_anomalies] == [a.current_price for a in expected["price_anomalies"]]
+    assert len(outcome.inventory_anomalies) == len(expected["inventory_anomalies"])
+    assert len(outcome.stockpiling_patterns) == len(expected["stockpiling_patterns"])
+
+@pytest.mark.asyncio
+async def test_days_back_applies_to_one_run(monkeypatch):
+    """A per-run analysis period never changes the shared sweep's default"""
+    sweep = NationalSweep(AnomalyDatabase(), max_workers=0, days_back=10)
+    periods = []
+
+    async def spy(commodity, variety=None, days_back=30):
+        periods.append(days_back)
+        return await get_price_data_for_analysis(commodity, variety=variety, days_back=days_back)
+
+    monkeypatch.setattr(national_sweep, "get_price_data_for_analysis", spy)
+    await sweep.run([("wheat", None)], days_back=45)
+    await sweep.run([("wheat", None)])
+
+    assert periods == [45, 10]
+    assert sweep.days_back == 10
+
+@pytest.mark.asyncio
+async def test_only_one_sweep_runs_at_a_time():
+    sweep = NationalSweep(AnomalyDatabase(), max_workers=0, days_back=10)
+    sweep.start(COMMODITIES)
+
+    with pytest.raises(RuntimeError):
+        sweep.start(COMMODITIES)
+    await sweep._task
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
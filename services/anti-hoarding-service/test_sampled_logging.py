@@ -0,0 +1,109 @@
+"""
+Unit tests for sampled, rate-limited logging
+"""
+
+import pytest
+
+from sampled_logging import SampledLogger, LogRule, lazy
+
+class RecordingLogger:
+    def __init__(self):
+        self.events = []
+
+    def __getattr__(self, level):
+        return lambda event, **kwargs: self.events.append((level, event, kwargs))
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+def test_token_bucket_reports_suppressed_events(clock):
+    recorder = RecordingLogger()
+    log = SampledLogger(
+        recorder, LogRule(rate_per_second=1.0, burst=2),
+        summary_interval_seconds=3600, clock=clock
+    )
+
+    for _ in range(10):
+        log.warning("Price spike detected", price=1.0)
+    assert len(recorder.events) == 2
+    assert log.suppressed_counts() == {"Price spike detected": 8}
+
+    clock.now = 1.0
+    log.warning("Price spike detected", price=2.0)
+    level, event, kwargs = recorder.events[-1]
+    assert (level, event) == ("warning", "Price spike detected")
+    assert kwargs == {"price": 2.0, "suppressed_similar": 8}
+    assert log.suppressed_counts() == {}
+
+def test_sampling_is_per_key_and_errors_pass_through(clock):
+    recorder = RecordingLogger()
+    log = SampledLogger(recorder, rules={"noisy": LogRule(sample_rate=0.25)}, clock=clock)
+
+    for _ in range(100):
+        log.info("Record stored", key="noisy")
+        log.info("Other event")
+    log.error("Failure", error="boom")
+
+    levels = [(level, event) for level, event, _ in recorder.events]
+    assert levels.count(("info", "Record stored")) == 25
+    assert levels.count(("info", "Other event")) == 100
+    assert levels[-1] == ("error", "Failure")
+
+def test_lazy_kwargs_and_periodic_summary(clock):
+    recorder = RecordingLogger()
+    log = SampledLogger(
+        recorder, LogRule(rate_per_second=0.001, burst=1),
+        summary_interval_seconds=60, clock=clock
+    )
+    calls = []
+
+    def expensive():
+        calls.append(1)
+        return 42
+
+    for _ in range(5):
+        log.warning("Inventory anomaly detected", detail=lazy(expensive))
+    assert len(calls) == 1
+    assert recorder.events[0][2] == {"detail": 42}
+
+    clock.now = 61.0
+    log.info("Unrelated event")
+    assert ("info", "Similar log events suppressed", {
+        "event_key": "Inventory anomaly detected", "suppressed": 4
+    }) in recorder.events
+
+def test_disabled_sampling_logs_everything(clock):
+    recorder = RecordingLogger()
+    log = SampledLogger(recorder, LogRule(sample_rate=0.1, rate_per_second=0.001, burst=1),
+                        enabled=False, clock=clock)
+
+    for _ in range(20):
+        log.warning("Price spike detected", severity=lazy(lambda: "high"))
+    log.error("Failure")
+
+    assert len(recorder.events) == 21
+    assert recorder.events[0][2] == {"severity": "high"}
+    assert log.suppressed_counts() == {}
+
+def test_stats_and_reset(clock):
+    log = SampledLogger(RecordingLogger(), LogRule(rate_per_second=0.001, burst=3), clock=clock)
+
+    for _ in range(10):
+        log.info("Record stored")
+    assert log.stats() == {"logged": 3, "dropped": 7, "keys": 1}
+
+    log.reset()
+    assert log.stats() == {"logged": 0, "dropped": 0, "keys": 0}
+    log.info("Record stored")
+    assert log.stats()["logged"] == 1
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
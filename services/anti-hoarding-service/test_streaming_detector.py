@@ -0,0 +1,174 @@
+"""
+Unit tests for streaming anomaly detection
+"""
+
+import pytest
+import random
+import statistics
+from datetime import datetime, timedelta
+
+from models import AnomalyDetectionConfig, AnomalyType, GeoLocation
+from anomaly_detector import PriceDataPoint, InventoryDataPoint
+from streaming_detector import (
+    StreamingAnomalyDetector, RollingWindowStats, MovingAverageBuffer, SlidingRegression
+)
+
+LOCATION = GeoLocation(latitude=0.0, longitude=0.0, state="Test State")
+
+def price_point(price: float, day: int, mandi_id: str = "mandi_1") -> PriceDataPoint:
+    return PriceDataPoint(
+        commodity="wheat",
+        variety="HD-2967",
+        price=price,
+        quantity=100.0,
+        mandi_id=mandi_id,
+        mandi_name="Test Mandi",
+        location=LOCATION,
+        timestamp=datetime(2024, 1, 1, 10) + timedelta(days=day),
+        confidence=0.9
+    )
+
+def inventory_point(level: float, day: int, mandi_id: str = "mandi_1") -> InventoryDataPoint:
+    return InventoryDataPoint(
+        commodity="wheat",
+        variety="HD-2967",
+        inventory_level=level,
+        mandi_id=mandi_id,
+        mandi_name="Test Mandi",
+        location=LOCATION,
+        timestamp=datetime(2024, 1, 1, 10) + timedelta(days=day),
+        storage_capacity=3000.0
+    )
+
+class TestRollingState:
+    """Test the constant-time rolling state primitives"""
+
+    def test_rolling_window_stats_match_statistics(self):
+        rng = random.Random(3)
+        values = [rng.uniform(1500, 2500) for _ in range(200)]
+        stats = RollingWindowStats(capacity=25)
+
+        for i, value in enumerate(values):
+            stats.add(value)
+            window = values[max(0, i - 24):i + 1]
+            assert stats.mean == pytest.approx(statistics.mean(window), rel=1e-9)
+            if len(window) > 1:
+                assert stats.std_dev == pytest.approx(statistics.stdev(window), rel=1e-6)
+
+    def test_moving_average_buffer(self):
+        buffer = MovingAverageBuffer(window=3)
+        for value in [10.0, 20.0, 30.0, 40.0]:
+            buffer.add(value)
+        assert buffer.full
+        assert buffer.mean == pytest.approx(30.0)
+
+    def test_sliding_regression_slope(self):
+        regression = SlidingRegression(window=5)
+        for value in [5.0, 1.0, 2.0, 4.0, 6.0, 8.0, 10.0]:
+            regression.add(value)
+        # Last five values rise by 2 per step
+        assert regression.slope == pytest.approx(2.0)
+
+class TestStreamingAnomalyDetector:
+    """Test online detection over observation streams"""
+
+    @pytest.fixture
+    def config(self):
+        return AnomalyDetectionConfig(
+            price_spike_threshold_percentage=25.0,
+            moving_average_window_days=7,
+            min_data_points=5,
+            z_score_threshold=2.0,
+            inventory_deviation_threshold=30.0
+        )
+
+    def test_price_spike_is_detected_on_arrival(self, config):
+        detector = StreamingAnomalyDetector(config)
+        anomalies = [
+            detector.observe_price(price_point(3200.0 if day == 12 else 2000.0, day))
+            for day in range(15)
+        ]
+
+        flagged = [day for day, anomaly in enumerate(anomalies) if anomaly is not None]
+        assert 12 in flagged
+        spike = anomalies[12]
+        assert spike.anomaly_type == AnomalyType.PRICE_SPIKE
+        assert spike.current_price == 3200.0
+        assert spike.deviation_percentage > 25.0
+
+    def test_inventory_hoarding_is_detected(self, config):
+        detector = StreamingAnomalyDetector(config)
+        anomalies = [
+            detector.observe_inventory(inventory_point(1600.0 if day >= 12 else 1000.0, day))
+            for day in range(15)
+        ]
+
+        hoarding = [a for a in anomalies if a is not None]
+        assert hoarding
+        assert hoarding[0].anomaly_type == AnomalyType.INVENTORY_HOARDING
+        assert hoarding[0].trend_direction == "increasing"
+
+    def test_late_observations_are_skipped(self, config):
+        detector = StreamingAnomalyDetector(config)
+        detector.observe_price(price_point(2000.0, 5))
+        assert detector.observe_price(price_point(9000.0, 1)) is None
+        assert detector.late_observations == 1
+
+    @pytest.mark.asyncio
+    async def test_anomalies_are_pushed_to_subscribers(self, config):
+        detector = StreamingAnomalyDetector(config)
+        queue = detector.subscribe()
+
+        results = detector.observe_batch(
+            [price_point(3200.0 if day == 12 else 2000.0, day) for day in range(15)],
+            []
+        )
+
+        assert queue.qsize() == len(results["price_anomalies"]) > 0
+        assert (await queue.get()).id == results["price_anomalies"][0].id
+        detector.unsubscribe(queue)
+        assert detector.get_status()["subscribers"] == 0
+
+    @pytest.mark.asyncio
+    async def test_reconfigure_keeps_state_and_subscribers(self, config):
+        detector = StreamingAnomalyDetector(config)
+        queue = detector.subscribe()
+        prices = [2000.0 + (day % 3) * 10 for day in range(20)]
+        for day, price in enumerate(prices):
+            detector.observe_price(price_point(price, day))
+        detector.advance_watermark(("wheat", "HD-2967", None), datetime(2024, 1, 20))
+
+        detector.reconfigure(config.model_copy(update={
+            "moving_average_window_days": 5,
+            "price_spike_threshold_percentage": 10.0
+        }))
+
+        state = detector.price_series[("wheat", "HD-2967", "mandi_1")]
+        assert state.observations == 20
+        assert state.moving_average.values == type(state.moving_average.values)(prices[-5:])
+        assert state.moving_average.mean == pytest.approx(statistics.mean(prices[-5:]))
+        assert len(state.stats) == 20
+        assert state.stats.std_dev == pytest.approx(statistics.stdev(prices), rel=1e-6)
+        assert detector.watermark(("wheat", "HD-2967", None)) == datetime(2024, 1, 20)
+
+        # A 15% move now trips the lowered threshold immediately, on the same subscriber
+        anomaly = detector.observe_price(price_point(2300.0, 20))
+        assert anomaly is not None
+        assert (await queue.get()).id == anomaly.id
+        assert detector.get_status()["subscribers"] == 1
+
+    def test_shrinking_the_window_trims_rolling_stats(self, config):
+        detector = StreamingAnomalyDetector(config)
+        prices = [2000.0 + day * 7 for day in range(40)]
+        for day, price in enumerate(prices):
+            detector.observe_price(price_point(price, day))
+
+        detector.reconfigure(config.model_copy(update={"moving_average_window_days": 3}))
+
+        stats = detector.price_series[("wheat", "HD-2967", "mandi_1")].stats
+        assert len(stats) == 15
+        assert stats.mean == pytest.approx(statistics.mean(prices[-15:]))
+        assert stats.std_dev == pytest.approx(statistics.stdev(prices[-15:]), rel=1e-6)
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -54,6 +54,11 @@ demand_analyzer = DemandAnalyzer()
 recommendation_engine = RecommendationEngine()
 resource_optimizer = ResourceOptimizer()
 
+@app.on_event("shutdown")
+async def shutdown():
+    """Close pooled provider sessions"""
+    await weather_analyzer.close()
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -0,0 +1,123 @@
+"""
+Unit tests for weather analysis through the shared weather acquisition layer,
+against a local mock provider
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from weather_acquisition import WeatherAcquisition
+from weather_analyzer import WeatherAnalyzer
+
+TIMEFRAME = timedelta(days=180)
+FORECAST_POINTS = 8
+
+class MockWeatherProvider:
+    """OpenWeather-style current and forecast endpoints that count requests"""
+
+    def __init__(self):
+        self.requests = []
+        self.failing = False
+
+    async def current(self, request):
+        self.requests.append(('weather', dict(request.query)))
+        if self.failing:
+            return web.json_response({'message': 'unavailable'}, status=503)
+        return web.json_response({
+            'main': {'temp': 31.0, 'temp_min': 27.0, 'temp_max': 36.0, 'humidity': 65},
+            'wind': {'speed': 3.0},
+            'rain': {'1h': 2.0}
+        })
+
+    async def forecast(self, request):
+        self.requests.append(('forecast', dict(request.query)))
+        if self.failing:
+            return web.json_response({'message': 'unavailable'}, status=503)
+        start = int(datetime(2024, 7, 1).timestamp())
+        return web.json_response({
+            'list': [
+                {
+                    'dt': start + i * 3 * 3600,
+                    'main': {'temp': 30.0, 'temp_min': 26.0, 'temp_max': 34.0, 'humidity': 80},
+                    'wind': {'speed': 4.0},
+                    'rain': {'3h': 12.0}
+                }
+                for i in range(FORECAST_POINTS)
+            ]
+        })
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/weather', self.current)
+        app.router.add_get('/forecast', self.forecast)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        return str(self.server.make_url(''))
+
+    async def close(self):
+        await self.server.close()
+
+def make_analyzer(url):
+    return WeatherAnalyzer(api_key="test", weather=WeatherAcquisition(api_key="test", base_url=url))
+
+@pytest.mark.asyncio
+async def test_analysis_uses_provider_data_and_shares_cells():
+    provider = MockWeatherProvider()
+    analyzer = make_analyzer(await provider.start())
+    try:
+        analysis = await analyzer.analyze_patterns(18.52, 73.86, TIMEFRAME)
+
+        assert analysis.analysis_period == f"{TIMEFRAME.days} days"
+        assert len(analysis.patterns) == 1 + FORECAST_POINTS
+        assert analysis.patterns[0].temperature_avg == 31.0
+        assert analysis.rainfall_total == pytest.approx(2.0 + 12.0 * FORECAST_POINTS)
+        assert sorted(endpoint for endpoint, _ in provider.requests) == ['forecast', 'weather']
+
+        # A farm a few hundred metres away falls in the same grid cell
+        await analyzer.analyze_patterns(18.521, 73.861, TIMEFRAME)
+        assert len(provider.requests) == 2
+    finally:
+        await analyzer.close()
+        await provider.close()
+
+@pytest.mark.asyncio
+async def test_provider_errors_fall_back_through_empty_patterns():
+    provider = MockWeatherProvider()
+    provider.failing = True
+    analyzer = make_analyzer(await provider.start())
+    try:
+        analysis = await analyzer.analyze_patterns(18.52, 73.86, TIMEFRAME)
+    finally:
+        await analyzer.close()
+        await provider.close()
+
+    assert analysis.analysis_period == f"{TIMEFRAME.days} days (fallback data)"
+    assert analysis.weather_suitability_score == 0.6
+    assert len(provider.requests) == 2
+
+@pytest.mark.asyncio
+async def test_exceptions_fall_back_to_estimates(monkeypatch):
+    analyzer = make_analyzer("http://127.0.0.1:9")
+
+    async def broken(latitude, longitude):
+        raise RuntimeError("connection reset")
+
+    monkeypatch.setattr(analyzer.weather, 'current', broken)
+    monkeypatch.setattr(analyzer.weather, 'forecast', broken)
+    analysis = await analyzer.analyze_patterns(18.52, 73.86, TIMEFRAME)
+
+    # The fetch failure is replaced by estimated monthly patterns
+    assert analysis.analysis_period == f"{TIMEFRAME.days} days"
+    assert len(analysis.patterns) == TIMEFRAME.days // 30
+
+    def failing_analysis(location, patterns, timeframe):
+        raise ValueError("bad pattern")
+
+    monkeypatch.setattr(analyzer, '_analyze_weather_patterns', failing_analysis)
+    analysis = await analyzer.analyze_patterns(18.52, 73.86, TIMEFRAME)
+    await analyzer.close()
+
+    assert analysis.analysis_period == f"{TIMEFRAME.days} days (fallback data)"
@@ -0,0 +1,162 @@
+"""
+Weather Acquisition
+Fetches OpenWeather-compatible observations per provider grid cell, deduplicating
+concurrent requests and caching responses for a short TTL
+"""
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+OPENWEATHER_URL = "https://api.openweathermap.org/data/2.5"
+GRID_RESOLUTION = 0.1   # degrees; points closer than this share one provider request
+CACHE_TTL = 600         # seconds a cell's response is reused
+FETCH_CONCURRENCY = 16  # provider requests in flight at once
+MAX_CACHED_CELLS = 4096
+
+@dataclass(frozen=True)
+class WeatherCell:
+    """Provider grid cell, or a place name when no coordinates are known"""
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    place: Optional[str] = None
+
+    @classmethod
+    def snap(cls, lat: float, lon: float, resolution: float = GRID_RESOLUTION) -> "WeatherCell":
+        return cls(
+            lat=round(round(lat / resolution) * resolution, 4),
+            lon=round(round(lon / resolution) * resolution, 4)
+        )
+
+    @classmethod
+    def named(cls, place: str) -> "WeatherCell":
+        return cls(place=place.strip().lower())
+
+    def params(self) -> Dict[str, Any]:
+        if self.place:
+            return {'q': self.place}
+        return {'lat': self.lat, 'lon': self.lon}
+
+class WeatherAcquisition:
+    """Shared weather fetching layer.
+
+    Each (endpoint, cell) is requested at most once per TTL: concurrent callers
+    share the in-flight request and later ones read the cache. Requests go over
+    one pooled session, at most `concurrency` at a time. Without an API key
+    every fetch returns None and callers fall back to their own estimates.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: str = OPENWEATHER_URL,
+        resolution: float = GRID_RESOLUTION,
+        ttl: float = CACHE_TTL,
+        concurrency: int = FETCH_CONCURRENCY,
+        session: Optional[aiohttp.ClientSession] = None
+    ):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.resolution = resolution
+        self.ttl = ttl
+        self.concurrency = concurrency
+        self.session = session
+        self._owns_session = session is None
+        self._slots = asyncio.Semaphore(concurrency)
+        self._cache: Dict[Tuple[str, WeatherCell], Tuple[float, Dict[str, Any]]] = {}
+        self._inflight: Dict[Tuple[str, WeatherCell], asyncio.Future] = {}
+        self.requests = 0
+        self.cache_hits = 0
+
+    @classmethod
+    def from_env(cls) -> "WeatherAcquisition":
+        return cls(
+            api_key=os.getenv("OPENWEATHER_API_KEY") or None,
+            base_url=os.getenv("OPENWEATHER_URL", OPENWEATHER_URL)
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.api_key)
+
+    async def close(self):
+        if self.session and self._owns_session:
+            await self.session.close()
+            self.session = None
+
+    def cell(self, lat: float, lon: float) -> WeatherCell:
+        return WeatherCell.snap(lat, lon, self.resolution)
+
+    async def current(self, lat: float, lon: float) -> Optional[Dict[str, Any]]:
+        """Current conditions for the cell containing (lat, lon)"""
+        return await self.fetch('weather', self.cell(lat, lon))
+
+    async def forecast(self, lat: float, lon: float) -> Optional[Dict[str, Any]]:
+        """Forecast for the cell containing (lat, lon)"""
+        return await self.fetch('forecast', self.cell(lat, lon))
+
+    async def current_for_place(self, place: str) -> Optional[Dict[str, Any]]:
+        """Current conditions looked up by place name"""
+        return await self.fetch('weather', WeatherCell.named(place))
+
+    async def current_many(self, points: List[Tuple[float, float]]) -> List[Optional[Dict[str, Any]]]:
+        """Current conditions for many points; one request per distinct cell"""
+        return list(await asyncio.gather(*(self.current(lat, lon) for lat, lon in points)))
+
+    async def fetch(self, endpoint: str, cell: WeatherCell) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+
+        key = (endpoint, cell)
+        loop = asyncio.get_running_loop()
+        cached = self._cache.get(key)
+        if cached and cached[0] > loop.time():
+            self.cache_hits += 1
+            return cached[1]
+
+        future = self._inflight.get(key)
+        if future is None:
+            future = self._inflight[key] = asyncio.ensure_future(self._request(key))
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # One caller giving up must not cancel the request the others wait on
+        return await asyncio.shield(future)
+
+    async def _request(self, key: Tuple[str, WeatherCell]) -> Optional[Dict[str, Any]]:
+        endpoint, cell = key
+        params = {**cell.params(), 'appid': self.api_key, 'units': 'metric'}
+
+        async with self._slots:
+            try:
+                if self.session is None:
+                    self.session = aiohttp.ClientSession(
+                        timeout=aiohttp.ClientTimeout(total=30),
+                        connector=aiohttp.TCPConnector(limit=self.concurrency)
+                    )
+                self.requests += 1
+                async with self.session.get(f"{self.base_url}/{endpoint}", params=params) as response:
+                    if response.status != 200:
+                        logger.warning(f"Weather provider request failed for {endpoint} {cell}: HTTP {response.status}")
+                        return None
+                    data = await response.json()
+
+            except Exception as e:
+                logger.error(f"Error fetching weather for {endpoint} {cell}: {str(e)}")
+                return None
+
+        # Failures are not cached, so the next check asks again
+        self._store(key, data)
+        return data
+
+    def _store(self, key: Tuple[str, WeatherCell], data: Dict[str, Any]):
+        now = asyncio.get_running_loop().time()
+        if len(self._cache) >= MAX_CACHED_CELLS:
+            self._cache = {k: v for k, v in self._cache.items() if v[0] > now}
+            while len(self._cache) >= MAX_CACHED_CELLS:
+                self._cache.pop(next(iter(self._cache)))
+        self._cache[key] = (now + self.ttl, data)
@@ -7,7 +7,6 @@ and climate risk assessment.
 """
 
 import asyncio
-import aiohttp
 import logging
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
@@ -16,6 +15,7 @@ import statistics
 from models import (
     WeatherAnalysis, WeatherPattern, GeoLocation, RiskLevel
 )
+from weather_acquisition import WeatherAcquisition
 
 logger = logging.getLogger(__name__)
 
@@ -30,7 +30,7 @@ class WeatherAnalyzer:
     - Optimal planting windows
     """
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, weather: Optional[WeatherAcquisition] = None):
         self.api_key = api_key
         self.base_urls = {
             'openweather': 'https://api.openweathermap.org/data/2.5',
@@ -38,6 +38,12 @@ class WeatherAnalyzer:
             # Fallback to mock data if no API key
             'mock': None
         }
+        # Nearby farms share one grid cell, so repeated analyses reuse cached responses
+        self.weather = weather or WeatherAcquisition(api_key=api_key, base_url=self.base_urls['openweather'])
+    
+    async def close(self):
+        """Release the pooled weather session"""
+        await self.weather.close()
         
     async def analyze_patterns(
         self, 
@@ -86,29 +92,16 @@ class WeatherAnalyzer:
         patterns = []
         
         try:
-            async with aiohttp.ClientSession() as session:
-                # Fetch current and forecast data
-                current_url = f"{self.base_urls['openweather']}/weather"
-                forecast_url = f"{self.base_urls['openweather']}/forecast"
-                
-                params = {
-                    'lat': latitude,
-                    'lon': longitude,
-                    'appid': self.api_key,
-                    'units': 'metric'
-                }
-                
-                # Get current weather
-                async with session.get(current_url, params=params) as response:
-                    if response.status == 200:
-                        current_data = await response.json()
-                        patterns.append(self._parse_current_weather(current_data))
-                
-                # Get forecast data
-                async with session.get(forecast_url, params=params) as response:
-                    if response.status == 200:
-                        forecast_data = await response.json()
-                        patterns.extend(self._parse_forecast_data(forecast_data))
+            # Fetch current and forecast data together over the shared session
+            current_data, forecast_data = await asyncio.gather(
+                self.weather.current(latitude, longitude),
+                self.weather.forecast(latitude, longitude)
+            )
+            
+            if current_data:
+                patterns.append(self._parse_current_weather(current_data))
+            if forecast_data:
+                patterns.extend(self._parse_forecast_data(forecast_data))
                         
         except Exception as e:
             logger.warning(f"API fetch failed, using mock data: {str(e)}")
@@ -15,16 +15,29 @@ from models import (
     AlertSeverity, ViolationType
 )
 from database import (
-    get_procurement_centers, get_nearby_mandis, store_msp_alert,
-    store_alternative_suggestion, get_farmer_preferences
+    get_nearby_mandis, store_msp_alerts,
+    store_alternative_suggestions, get_farmer_preferences
 )
+from sampled_logging import SampledLogger
+from procurement_index import procurement_center_index, locate, center_coordinates, great_circle_km
 
 logger = structlog.get_logger()
+# Per-alert and per-notification events are sampled and rate limited
+notification_log = SampledLogger.from_env(logger)
+
+# Procurement center search
+PROCUREMENT_SEARCH_RADIUS_KM = 500.0
+PROCUREMENT_CANDIDATES = 12   # nearest centers considered before FCI-first ranking
+MAX_PROCUREMENT_SUGGESTIONS = 6
+# Groups searched for alternatives at once; each search makes up to four
+# database lookups, so this keeps a large sweep within the pool (max 20)
+ALTERNATIVE_SEARCH_CONCURRENCY = 4
 
 class MSPAlertSystem:
     """Handles MSP violation alerts and alternative suggestions"""
     
-    def __init__(self):
+    def __init__(self, concurrency: int = ALTERNATIVE_SEARCH_CONCURRENCY):
+        self.concurrency = concurrency
         self.session: Optional[aiohttp.ClientSession] = None
         self.notification_queue: asyncio.Queue = asyncio.Queue()
         self.notification_task: Optional[asyncio.Task] = None
@@ -35,6 +48,8 @@ class MSPAlertSystem:
         self.session = aiohttp.ClientSession(
             timeout=aiohttp.ClientTimeout(total=30)
         )
+        if not procurement_center_index.ready:
+            await procurement_center_index.refresh()
         await self._start_notification_processor()
         logger.info("MSP alert system initialized")
     
@@ -81,40 +96,70 @@ class MSPAlertSystem:
     
     async def process_violation(self, violation: MSPViolation) -> List[MSPAlert]:
         """Process a violation and generate alerts"""
+        return await self.process_violations([violation])
+    
+    async def process_violations(self, violations: List[MSPViolation]) -> List[MSPAlert]:
+        """Process a monitoring cycle's violations and generate alerts in bulk.
+        
+        Violations are grouped by (commodity, district, state). Alternatives are
+        searched once per group, for its most severe violation, and shared by
+        every violation in the group. Alerts and suggestions are each stored
+        with a single bulk insert.
+        """
+        if not violations:
+            return []
+        
         try:
             alerts = []
             
-            # Create main violation alert
-            main_alert = await self._create_violation_alert(violation)
-            if main_alert:
-                alerts.append(main_alert)
-                await self.notification_queue.put(main_alert)
+            # Main violation alerts are queued before any alternative search
+            for violation in violations:
+                main_alert = await self._create_violation_alert(violation)
+                if main_alert:
+                    alerts.append(main_alert)
+                    self.notification_queue.put_nowait(main_alert)
+            
+            groups: Dict[Tuple[str, str, str], List[MSPViolation]] = {}
+            for violation in violations:
+                groups.setdefault((violation.commodity, violation.district, violation.state), []).append(violation)
             
-            # Find alternative suggestions
-            alternatives = await self._find_alternatives(violation)
+            # Find alternative suggestions, one search per group
+            semaphore = asyncio.Semaphore(self.concurrency)
+            
+            async def search(group: List[MSPViolation]) -> List[AlternativeSuggestion]:
+                async with semaphore:
+                    return await self._find_alternatives(max(group, key=lambda v: v.violation_percentage))
+            
+            group_alternatives = await asyncio.gather(*(search(group) for group in groups.values()))
             
             # Create alternative suggestion alerts
-            if alternatives:
-                alt_alert = await self._create_alternative_alert(violation, alternatives)
-                if alt_alert:
-                    alerts.append(alt_alert)
-                    await self.notification_queue.put(alt_alert)
-            
-            # Store alerts
-            for alert in alerts:
-                await store_msp_alert(alert)
-            
-            logger.info(
-                "Processed MSP violation",
-                violation_id=violation.id,
+            suggestions = []
+            for group, alternatives in zip(groups.values(), group_alternatives):
+                if not alternatives:
+                    continue
+                suggestions.extend(alternatives)
+                for violation in group:
+                    alt_alert = await self._create_alternative_alert(violation, alternatives)
+                    if alt_alert:
+                        alerts.append(alt_alert)
+                        self.notification_queue.put_nowait(alt_alert)
+            
+            # Store alerts and suggestions
+            await store_msp_alerts(alerts)
+            await store_alternative_suggestions(suggestions)
+            
+            notification_log.info(
+                "Processed MSP violations",
+                violations=len(violations),
+                groups=len(groups),
                 alerts_created=len(alerts),
-                alternatives_found=len(alternatives)
+                alternatives_found=len(suggestions)
             )
             
             return alerts
             
         except Exception as e:
-            logger.error("Error processing violation", violation_id=violation.id, error=str(e))
+            logger.error("Error processing violations", count=len(violations), error=str(e))
             return []
     
     async def _create_violation_alert(self, violation: MSPViolation) -> Optional[MSPAlert]:
@@ -222,29 +267,30 @@ class MSPAlertSystem:
         alternatives = []
         
         try:
-            # Find government procurement centers (highest priority)
-            procurement_centers = await self._find_procurement_centers(violation)
-            for center in procurement_centers:
-                alt = await self._create_procurement_suggestion(violation, center)
+            # Government procurement centers, nearby mandis with better prices,
+            # FPO (Farmer Producer Organization) centers and private buyers
+            procurement_centers, nearby_mandis, fpo_centers, private_buyers = await asyncio.gather(
+                self._find_procurement_centers(violation),
+                self._find_better_price_mandis(violation),
+                self._find_fpo_centers(violation),
+                self._find_private_buyers(violation)
+            )
+            
+            for center, distance_km in procurement_centers:
+                alt = await self._create_procurement_suggestion(violation, center, distance_km)
                 if alt:
                     alternatives.append(alt)
             
-            # Find nearby mandis with better prices
-            nearby_mandis = await self._find_better_price_mandis(violation)
             for mandi in nearby_mandis:
                 alt = await self._create_mandi_suggestion(violation, mandi)
                 if alt:
                     alternatives.append(alt)
             
-            # Find FPO (Farmer Producer Organization) centers
-            fpo_centers = await self._find_fpo_centers(violation)
             for fpo in fpo_centers:
                 alt = await self._create_fpo_suggestion(violation, fpo)
                 if alt:
                     alternatives.append(alt)
             
-            # Find private buyers offering better prices
-            private_buyers = await self._find_private_buyers(violation)
             for buyer in private_buyers:
                 alt = await self._create_private_buyer_suggestion(violation, buyer)
                 if alt:
@@ -263,99 +309,37 @@ class MSPAlertSystem:
             logger.error("Error finding alternatives", error=str(e))
             return []
     
-    async def _find_procurement_centers(self, violation: MSPViolation) -> List[ProcurementCenter]:
-        """Find government procurement centers for the commodity"""
+    async def _find_procurement_centers(self, violation: MSPViolation) -> List[Tuple[ProcurementCenter, float]]:
+        """Find nearby government procurement centers for the commodity, with distances in km"""
         try:
-            # Get procurement centers from multiple sources
-            centers = []
+            location = locate(violation.district, violation.state)
+            if location is None:
+                notification_log.debug(
+                    "Unknown violation location for procurement search",
+                    district=violation.district,
+                    state=violation.state
+                )
+                return []
             
-            # Primary search: same state, commodity-specific
-            state_centers = await get_procurement_centers(
-                state=violation.state,
-                commodity=violation.commodity,
-                is_operational=True
+            centers = procurement_center_index.nearest(
+                violation.commodity, *location,
+                k=PROCUREMENT_CANDIDATES,
+                radius_km=PROCUREMENT_SEARCH_RADIUS_KM
             )
-            centers.extend(state_centers)
-            
-            # Secondary search: neighboring states if not enough centers found
-            if len(centers) < 3:
-                neighboring_states = await self._get_neighboring_states(violation.state)
-                for neighbor_state in neighboring_states[:2]:  # Check up to 2 neighboring states
-                    neighbor_centers = await get_procurement_centers(
-                        state=neighbor_state,
-                        commodity=violation.commodity,
-                        is_operational=True
-                    )
-                    centers.extend(neighbor_centers[:2])  # Add up to 2 centers per state
-            
-            # Tertiary search: any center accepting the commodity (broader search)
-            if len(centers) < 2:
-                all_centers = await get_procurement_centers(
-                    commodity=violation.commodity,
-                    is_operational=True
-                )
-                # Add centers not already included
-                existing_ids = {c.id for c in centers}
-                for center in all_centers:
-                    if center.id not in existing_ids and len(centers) < 5:
-                        centers.append(center)
-            
-            # Filter and sort centers by distance and capacity
-            filtered_centers = []
-            for center in centers:
-                # Calculate approximate distance
-                distance = await self._calculate_distance(
-                    violation.district, violation.state,
-                    center.district, center.state
-                )
-                
-                # Only include centers within reasonable distance (500km)
-                if distance <= 500:
-                    # Add distance as attribute for sorting
-                    center.estimated_distance = distance
-                    filtered_centers.append(center)
             
             # Sort by priority: FCI first, then by distance, then by capacity
-            filtered_centers.sort(key=lambda c: (
-                0 if c.center_type == 'FCI' else 1,  # FCI centers first
-                getattr(c, 'estimated_distance', 999),  # Closer centers first
-                -(c.storage_capacity or 0)  # Higher capacity first
+            centers.sort(key=lambda match: (
+                0 if match[0].center_type == 'FCI' else 1,  # FCI centers first
+                match[1],  # Closer centers first
+                -(match[0].storage_capacity or 0)  # Higher capacity first
             ))
             
-            return filtered_centers[:6]  # Return top 6 centers
+            return centers[:MAX_PROCUREMENT_SUGGESTIONS]
             
         except Exception as e:
             logger.error("Error finding procurement centers", error=str(e))
             return []
     
-    async def _get_neighboring_states(self, state: str) -> List[str]:
-        """Get neighboring states for expanded search"""
-        # Simplified neighboring states mapping
-        neighbors = {
-            'Punjab': ['Haryana', 'Himachal Pradesh', 'Rajasthan'],
-            'Haryana': ['Punjab', 'Uttar Pradesh', 'Rajasthan', 'Delhi'],
-            'Uttar Pradesh': ['Haryana', 'Madhya Pradesh', 'Rajasthan', 'Bihar'],
-            'Madhya Pradesh': ['Uttar Pradesh', 'Rajasthan', 'Gujarat', 'Maharashtra'],
-            'Maharashtra': ['Madhya Pradesh', 'Gujarat', 'Karnataka', 'Andhra Pradesh'],
-            'Gujarat': ['Madhya Pradesh', 'Maharashtra', 'Rajasthan'],
-            'Rajasthan': ['Punjab', 'Haryana', 'Uttar Pradesh', 'Madhya Pradesh', 'Gujarat'],
-            'Karnataka': ['Maharashtra', 'Andhra Pradesh', 'Tamil Nadu', 'Kerala'],
-            'Andhra Pradesh': ['Maharashtra', 'Karnataka', 'Tamil Nadu', 'Telangana'],
-            'Tamil Nadu': ['Karnataka', 'Andhra Pradesh', 'Kerala'],
-            'Kerala': ['Karnataka', 'Tamil Nadu'],
-            'West Bengal': ['Bihar', 'Jharkhand', 'Odisha'],
-            'Bihar': ['Uttar Pradesh', 'West Bengal', 'Jharkhand'],
-            'Odisha': ['West Bengal', 'Jharkhand', 'Chhattisgarh', 'Andhra Pradesh'],
-            'Telangana': ['Andhra Pradesh', 'Karnataka', 'Maharashtra'],
-            'Assam': ['Meghalaya', 'Arunachal Pradesh', 'Nagaland'],
-            'Himachal Pradesh': ['Punjab', 'Uttarakhand'],
-            'Uttarakhand': ['Himachal Pradesh', 'Uttar Pradesh'],
-            'Jharkhand': ['Bihar', 'West Bengal', 'Odisha', 'Chhattisgarh'],
-            'Chhattisgarh': ['Jharkhand', 'Odisha', 'Madhya Pradesh', 'Maharashtra']
-        }
-        
-        return neighbors.get(state, [])
-    
     async def _find_better_price_mandis(self, violation: MSPViolation) -> List[Dict[str, Any]]:
         """Find nearby mandis with better prices"""
         try:
@@ -453,17 +437,22 @@ class MSPAlertSystem:
     async def _create_procurement_suggestion(
         self, 
         violation: MSPViolation, 
-        center: ProcurementCenter
+        center: ProcurementCenter,
+        distance_km: Optional[float] = None
     ) -> Optional[AlternativeSuggestion]:
         """Create suggestion for government procurement center"""
         try:
-            # Use pre-calculated distance if available, otherwise calculate
-            distance_km = getattr(center, 'estimated_distance', None)
+            # Use the index distance if available, otherwise measure to the center's coordinates
             if distance_km is None:
-                distance_km = await self._calculate_distance(
-                    violation.district, violation.state,
-                    center.district, center.state
-                )
+                origin = locate(violation.district, violation.state)
+                destination = center_coordinates(center)
+                if origin is not None and destination is not None:
+                    distance_km = great_circle_km(origin, destination)
+                else:
+                    distance_km = await self._calculate_distance(
+                        violation.district, violation.state,
+                        center.district, center.state
+                    )
             
             # Estimate transportation cost (₹2 per km per quintal)
             transport_cost = distance_km * 2.0
@@ -499,15 +488,18 @@ class MSPAlertSystem:
                 price_advantage=violation.msp_price - violation.market_price,
                 transportation_cost=transport_cost,
                 net_benefit=net_benefit,
+                # contact_info holds strings; fields the center has not published are left out
                 contact_info={
-                    'phone': center.phone_number,
-                    'email': center.email,
-                    'address': center.address,
-                    'contact_person': center.contact_person,
-                    'center_type': center.center_type,
-                    'operating_hours': center.operating_hours,
-                    'storage_capacity': center.storage_capacity,
-                    'current_stock': center.current_stock
+                    key: str(value) for key, value in {
+                        'phone': center.phone_number,
+                        'email': center.email,
+                        'address': center.address,
+                        'contact_person': center.contact_person,
+                        'center_type': center.center_type,
+                        'operating_hours': center.operating_hours,
+                        'storage_capacity': center.storage_capacity,
+                        'current_stock': center.current_stock
+                    }.items() if value is not None
                 },
                 directions=directions,
                 estimated_travel_time=travel_time_str,
@@ -703,9 +695,13 @@ class MSPAlertSystem:
         to_district: str, to_state: str
     ) -> float:
         """Calculate approximate distance between locations"""
-        # Simplified distance calculation
-        # In production, would use actual geolocation APIs
+        # Great-circle distance between known district or state coordinates
+        origin = locate(from_district, from_state)
+        destination = locate(to_district, to_state)
+        if origin is not None and destination is not None:
+            return great_circle_km(origin, destination)
         
+        # Unknown locations fall back to a coarse same-district/state/neighbour estimate
         if from_state == to_state:
             if from_district == to_district:
                 return 10.0  # Same district
@@ -827,10 +823,6 @@ class MSPAlertSystem:
                 alternative_centers=alternative_centers
             )
             
-            # Store alternative suggestions
-            for alt in alternatives:
-                await store_alternative_suggestion(alt)
-            
             return alert
             
         except Exception as e:
@@ -846,7 +838,7 @@ class MSPAlertSystem:
             # - Email service for email notifications
             # - Voice calling service for urgent alerts
             
-            logger.info(
+            notification_log.info(
                 "Sending MSP alert notification",
                 alert_id=alert.id,
                 severity=alert.severity.value,
@@ -874,17 +866,17 @@ class MSPAlertSystem:
     async def _send_sms_notification(self, alert: MSPAlert):
         """Send SMS notification"""
         # Simulate SMS sending
-        logger.info("SMS notification sent", alert_id=alert.id)
+        notification_log.info("SMS notification sent", alert_id=alert.id)
     
     async def _send_push_notification(self, alert: MSPAlert):
         """Send push notification"""
         # Simulate push notification
-        logger.info("Push notification sent", alert_id=alert.id)
+        notification_log.info("Push notification sent", alert_id=alert.id)
     
     async def _send_voice_notification(self, alert: MSPAlert):
         """Send voice notification for critical alerts"""
         # Simulate voice call
-        logger.info("Voice notification sent", alert_id=alert.id)
+        notification_log.info("Voice notification sent", alert_id=alert.id)
     
     async def get_alerts_for_farmer(self, farmer_id: str, unread_only: bool = False) -> List[MSPAlert]:
         """Get alerts for a specific farmer"""
@@ -0,0 +1,206 @@
+"""
+Batch MSP Compliance Engine
+Vectorized market price vs MSP comparison for whole monitoring cycles
+"""
+
+import structlog
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Tuple, Iterable
+
+import numpy as np
+
+from models import (
+    MSPRate, MSPViolation, MSPComparisonResult, ViolationType, AlertSeverity
+)
+
+logger = structlog.get_logger()
+
+# Compliance status codes in ComplianceBatch.status
+UNMATCHED = -1   # invalid row or no MSP rate for the commodity
+COMPLIANT = 0
+WARNING = 1
+VIOLATION = 2
+
+STATUS_NAMES = {COMPLIANT: "compliant", WARNING: "warning", VIOLATION: "violation"}
+
+SEVERITY_LEVELS = (AlertSeverity.LOW, AlertSeverity.MEDIUM, AlertSeverity.HIGH, AlertSeverity.CRITICAL)
+
+class MSPRateIndex:
+    """Active MSP rates addressed by integer id.
+
+    Each distinct (commodity, variety) key is resolved to a rate id once,
+    falling back to the commodity's default rate when the variety has none.
+    MSP prices live in an array indexed by rate id.
+    """
+
+    def __init__(self, rates: Iterable[MSPRate] = ()):
+        # Later rates replace earlier ones for the same key
+        by_key: Dict[Tuple[str, Optional[str]], MSPRate] = {}
+        for rate in rates:
+            by_key[(rate.commodity, rate.variety or None)] = rate
+
+        self.rates: List[MSPRate] = list(by_key.values())
+        self.rate_ids: Dict[Tuple[str, Optional[str]], int] = {key: i for i, key in enumerate(by_key)}
+        self.msp_prices = np.array([rate.msp_price for rate in self.rates], dtype=np.float64)
+        self._resolved: Dict[Tuple[Any, Any], int] = {}
+
+    def __len__(self) -> int:
+        return len(self.rates)
+
+    def rate_id(self, commodity: Optional[str], variety: Optional[str]) -> int:
+        """Rate id for a commodity/variety, or UNMATCHED"""
+        key = (commodity, variety)
+        rate_id = self._resolved.get(key)
+        if rate_id is None:
+            rate_id = self.rate_ids.get((commodity, variety or None))
+            if rate_id is None:
+                rate_id = self.rate_ids.get((commodity, None), UNMATCHED)
+            self._resolved[key] = rate_id
+        return rate_id
+
+@dataclass
+class ComplianceBatch:
+    """Column-wise comparison results for one monitoring cycle"""
+    rows: List[Dict[str, Any]]
+    rate_ids: np.ndarray
+    market_prices: np.ndarray
+    msp_prices: np.ndarray
+    price_differences: np.ndarray
+    violation_percentages: np.ndarray
+    status: np.ndarray
+
+    @property
+    def compared(self) -> int:
+        return int(np.count_nonzero(self.status != UNMATCHED))
+
+    def indices(self, status: int) -> np.ndarray:
+        return np.flatnonzero(self.status == status)
+
+    def comparison_at(self, index: int) -> MSPComparisonResult:
+        """Materialize the comparison model for one matched row"""
+        row = self.rows[index]
+        status = int(self.status[index])
+        return MSPComparisonResult(
+            commodity=row.get("commodity"),
+            variety=row.get("variety"),
+            mandi_id=row.get("mandi_id", ""),
+            mandi_name=row.get("mandi_name", ""),
+            location=f"{row.get('district', '')}, {row.get('state', '')}",
+            market_price=float(self.market_prices[index]),
+            msp_price=float(self.msp_prices[index]),
+            price_difference=float(self.price_differences[index]),
+            compliance_status=STATUS_NAMES[status],
+            violation_percentage=float(self.violation_percentages[index]) if status != COMPLIANT else None,
+            data_confidence=row.get("confidence", 0.8)
+        )
+
+def _market_price(value: Any) -> float:
+    """Row price as a float; missing or malformed prices become NaN and stay unmatched"""
+    if value is None:
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+class BatchComplianceEngine:
+    """Compares a whole cycle of market prices against MSP in one pass"""
+
+    def __init__(
+        self,
+        violation_threshold_percentage: float = 5.0,
+        critical_threshold_percentage: float = 15.0
+    ):
+        self.violation_threshold_percentage = violation_threshold_percentage
+        self.critical_threshold_percentage = critical_threshold_percentage
+
+    def evaluate(self, price_rows: List[Dict[str, Any]], rate_index: MSPRateIndex) -> ComplianceBatch:
+        """Price differences, violation percentages and status for every row"""
+        count = len(price_rows)
+        rate_ids = np.empty(count, dtype=np.intp)
+        market_prices = np.empty(count, dtype=np.float64)
+        for i, row in enumerate(price_rows):
+            commodity = row.get("commodity")
+            rate_ids[i] = rate_index.rate_id(commodity, row.get("variety")) if commodity else UNMATCHED
+            market_prices[i] = _market_price(row.get("price"))
+
+        matched = (rate_ids != UNMATCHED) & (market_prices > 0)
+        if len(rate_index):
+            msp_prices = np.where(matched, rate_index.msp_prices[np.where(matched, rate_ids, 0)], np.nan)
+        else:
+            msp_prices = np.full(count, np.nan)
+
+        price_differences = market_prices - msp_prices
+        violation_percentages = np.abs(price_differences) / msp_prices * 100
+
+        below_msp = matched & (price_differences < 0)
+        status = np.select(
+            [
+                ~matched,
+                below_msp & (violation_percentages >= self.violation_threshold_percentage),
+                below_msp
+            ],
+            [UNMATCHED, VIOLATION, WARNING],
+            default=COMPLIANT
+        )
+
+        return ComplianceBatch(
+            rows=price_rows,
+            rate_ids=rate_ids,
+            market_prices=market_prices,
+            msp_prices=msp_prices,
+            price_differences=price_differences,
+            violation_percentages=violation_percentages,
+            status=status
+        )
+
+    def severities(self, violation_percentages: np.ndarray) -> List[AlertSeverity]:
+        """AlertSeverity for each violation percentage"""
+        levels = np.select(
+            [
+                violation_percentages >= self.critical_threshold_percentage,
+                violation_percentages >= 10.0,
+                violation_percentages >= 5.0
+            ],
+            [3, 2, 1],
+            default=0
+        )
+        return [SEVERITY_LEVELS[level] for level in levels.tolist()]
+
+    def violations(self, batch: ComplianceBatch) -> List[MSPViolation]:
+        """Violation records for the rows flagged as violations"""
+        indices = batch.indices(VIOLATION)
+        severities = self.severities(batch.violation_percentages[indices])
+
+        violations = []
+        for index, severity in zip(indices.tolist(), severities):
+            try:
+                comparison = batch.comparison_at(index)
+                row = batch.rows[index]
+                violations.append(MSPViolation(
+                    commodity=comparison.commodity,
+                    variety=comparison.variety,
+                    mandi_id=comparison.mandi_id,
+                    mandi_name=comparison.mandi_name,
+                    district=row.get("district", ""),
+                    state=row.get("state", ""),
+                    market_price=comparison.market_price,
+                    msp_price=comparison.msp_price,
+                    price_difference=comparison.price_difference,
+                    violation_percentage=comparison.violation_percentage,
+                    violation_type=ViolationType.BELOW_MSP,
+                    severity=severity,
+                    evidence={
+                        "comparison_data": comparison.dict(),
+                        "detection_method": "automated_monitoring",
+                        "data_confidence": comparison.data_confidence
+                    }
+                ))
+            except Exception as e:
+                logger.error("Error creating violation record", error=str(e))
+
+        return violations
+
+    def warnings(self, batch: ComplianceBatch) -> List[MSPComparisonResult]:
+        """Comparison results for prices below MSP but within the violation threshold"""
+        return [batch.comparison_at(index) for index in batch.indices(WARNING).tolist()]
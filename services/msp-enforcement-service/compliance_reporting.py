@@ -5,7 +5,7 @@ Generates comprehensive compliance reports for regulatory authorities
 
 import asyncio
 import structlog
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator
 from datetime import datetime, date, timedelta
 import json
 import uuid
@@ -17,6 +17,11 @@ from models import (
     MSPRate, ProcurementCenter
 )
 from database import _pool
+from report_streaming import (
+    ViolationAggregates, iter_violations, violation_row,
+    CSVReportWriter, XLSXReportWriter, STREAM_CHUNK_SIZE
+)
+from evidence_store import EvidenceStore
 
 logger = structlog.get_logger()
 
@@ -49,6 +54,15 @@ class ReportConfig:
     auto_submit: bool = False
     notification_emails: List[str] = None
 
+# Formats that can be streamed row by row
+STREAMING_WRITERS = {
+    ReportFormat.CSV: CSVReportWriter,
+    ReportFormat.EXCEL: XLSXReportWriter
+}
+
+# Violations whose evidence is collected at the same time
+EVIDENCE_CONCURRENCY = 16
+
 class ComplianceReportGenerator:
     """Generates comprehensive MSP compliance reports"""
     
@@ -138,7 +152,66 @@ class ComplianceReportGenerator:
         except Exception as e:
             logger.error("Error generating compliance report", error=str(e))
             raise
-    
+
+    async def stream_compliance_report(
+        self,
+        start_date: date,
+        end_date: date,
+        region: str = "national",
+        commodity: Optional[str] = None,
+        report_format: ReportFormat = ReportFormat.CSV,
+        report_id: Optional[str] = None,
+        chunk_size: int = STREAM_CHUNK_SIZE
+    ) -> AsyncIterator[bytes]:
+        """Stream violation rows as CSV or Excel while aggregating the report.
+
+        Violations are read in pages keyed on (detected_at, id), one short
+        query per chunk, and each chunk is written out before the next page
+        is fetched, so memory stays
+        bounded for annual national reports. The summary report is stored
+        once the last row has been streamed.
+        """
+        writer = STREAMING_WRITERS[report_format]()
+        aggregates = ViolationAggregates()
+
+        logger.info(
+            "Streaming MSP compliance report",
+            start_date=start_date,
+            end_date=end_date,
+            region=region,
+            commodity=commodity,
+            format=report_format.value
+        )
+
+        try:
+            yield writer.begin()
+
+            async for chunk in iter_violations(start_date, end_date, region, commodity, chunk_size):
+                aggregates.update(chunk)
+                yield writer.write_rows(violation_row(violation) for violation in chunk)
+
+            market_analysis = aggregates.market_analysis(start_date, end_date)
+            recommendations = self._recommendations_for_counts(
+                aggregates.total, aggregates.critical, market_analysis, aggregates.farmer_impact()
+            )
+            report = aggregates.to_report(
+                start_date, end_date, region, recommendations, report_id=report_id
+            )
+            await self._store_compliance_report(report)
+
+            yield writer.finish(aggregates.summary_rows())
+
+            logger.info(
+                "MSP compliance report streamed successfully",
+                report_id=report.id,
+                violations_count=aggregates.total,
+                period=f"{start_date} to {end_date}"
+            )
+
+        except Exception as e:
+            logger.error("Error streaming compliance report", error=str(e))
+            raise
+
     async def _get_violations_for_period(
         self,
         start_date: date,
@@ -147,62 +220,11 @@ class ComplianceReportGenerator:
         commodity: Optional[str]
     ) -> List[MSPViolation]:
         """Get violations for the specified period and filters"""
-        if not _pool:
-            return []
-        
         try:
-            query = """
-                SELECT * FROM msp_violations 
-                WHERE detected_at::date BETWEEN $1 AND $2
-            """
-            params = [start_date, end_date]
-            
-            # Add region filter
-            if region != "national":
-                if "," in region:  # State, District format
-                    state, district = region.split(",", 1)
-                    query += " AND LOWER(state) = LOWER($3) AND LOWER(district) = LOWER($4)"
-                    params.extend([state.strip(), district.strip()])
-                else:  # State only
-                    query += " AND LOWER(state) = LOWER($3)"
-                    params.append(region)
-            
-            # Add commodity filter
-            if commodity:
-                param_num = len(params) + 1
-                query += f" AND LOWER(commodity) = LOWER(${param_num})"
-                params.append(commodity)
-            
-            query += " ORDER BY detected_at DESC"
-            
-            async with _pool.acquire() as conn:
-                rows = await conn.fetch(query, *params)
-                
-                violations = []
-                for row in rows:
-                    violation = MSPViolation(
-                        id=row['id'],
-                        commodity=row['commodity'],
-                        variety=row['variety'],
-                        mandi_id=row['mandi_id'],
-                        mandi_name=row['mandi_name'],
-                        district=row['district'],
-                        state=row['state'],
-                        market_price=float(row['market_price']),
-                        msp_price=float(row['msp_price']),
-                        price_difference=float(row['price_difference']),
-                        violation_percentage=float(row['violation_percentage']),
-                        violation_type=ViolationType(row['violation_type']),
-                        detected_at=row['detected_at'],
-                        severity=AlertSeverity(row['severity']),
-                        is_resolved=row['is_resolved'],
-                        resolution_notes=row['resolution_notes'],
-                        resolved_at=row['resolved_at'],
-                        evidence=json.loads(row['evidence']) if row['evidence'] else None
-                    )
-                    violations.append(violation)
-                
-                return violations
+            violations = []
+            async for chunk in iter_violations(start_date, end_date, region, commodity):
+                violations.extend(chunk)
+            return violations
                 
         except Exception as e:
             logger.error("Error getting violations for period", error=str(e))
@@ -218,95 +240,7 @@ class ComplianceReportGenerator:
     ) -> Dict[str, Any]:
         """Generate comprehensive market analysis"""
         try:
-            analysis = {
-                "period": {
-                    "start_date": start_date.isoformat(),
-                    "end_date": end_date.isoformat(),
-                    "duration_days": (end_date - start_date).days
-                },
-                "violation_statistics": {},
-                "geographic_distribution": {},
-                "commodity_analysis": {},
-                "severity_breakdown": {},
-                "temporal_patterns": {},
-                "market_trends": {}
-            }
-            
-            if not violations:
-                return analysis
-            
-            # Violation statistics
-            total_violations = len(violations)
-            resolved_violations = len([v for v in violations if v.is_resolved])
-            critical_violations = len([v for v in violations if v.severity == AlertSeverity.CRITICAL])
-            
-            analysis["violation_statistics"] = {
-                "total_violations": total_violations,
-                "resolved_violations": resolved_violations,
-                "unresolved_violations": total_violations - resolved_violations,
-                "critical_violations": critical_violations,
-                "resolution_rate": (resolved_violations / total_violations * 100) if total_violations > 0 else 0,
-                "average_violation_percentage": sum(v.violation_percentage for v in violations) / total_violations,
-                "max_violation_percentage": max(v.violation_percentage for v in violations),
-                "total_farmer_losses": sum(abs(v.price_difference) for v in violations)
-            }
-            
-            # Geographic distribution
-            state_violations = {}
-            district_violations = {}
-            for violation in violations:
-                state_violations[violation.state] = state_violations.get(violation.state, 0) + 1
-                district_key = f"{violation.district}, {violation.state}"
-                district_violations[district_key] = district_violations.get(district_key, 0) + 1
-            
-            analysis["geographic_distribution"] = {
-                "by_state": dict(sorted(state_violations.items(), key=lambda x: x[1], reverse=True)),
-                "by_district": dict(sorted(district_violations.items(), key=lambda x: x[1], reverse=True)[:20]),
-                "most_affected_state": max(state_violations.keys(), key=state_violations.get) if state_violations else None,
-                "most_affected_district": max(district_violations.keys(), key=district_violations.get) if district_violations else None
-            }
-            
-            # Commodity analysis
-            commodity_violations = {}
-            commodity_losses = {}
-            for violation in violations:
-                commodity_violations[violation.commodity] = commodity_violations.get(violation.commodity, 0) + 1
-                commodity_losses[violation.commodity] = commodity_losses.get(violation.commodity, 0) + abs(violation.price_difference)
-            
-            analysis["commodity_analysis"] = {
-                "by_commodity": dict(sorted(commodity_violations.items(), key=lambda x: x[1], reverse=True)),
-                "losses_by_commodity": dict(sorted(commodity_losses.items(), key=lambda x: x[1], reverse=True)),
-                "most_violated_commodity": max(commodity_violations.keys(), key=commodity_violations.get) if commodity_violations else None,
-                "highest_loss_commodity": max(commodity_losses.keys(), key=commodity_losses.get) if commodity_losses else None
-            }
-            
-            # Severity breakdown
-            severity_count = {}
-            for violation in violations:
-                severity_count[violation.severity.value] = severity_count.get(violation.severity.value, 0) + 1
-            
-            analysis["severity_breakdown"] = severity_count
-            
-            # Temporal patterns
-            daily_violations = {}
-            for violation in violations:
-                day = violation.detected_at.date().isoformat()
-                daily_violations[day] = daily_violations.get(day, 0) + 1
-            
-            analysis["temporal_patterns"] = {
-                "daily_violations": daily_violations,
-                "peak_violation_day": max(daily_violations.keys(), key=daily_violations.get) if daily_violations else None,
-                "average_daily_violations": sum(daily_violations.values()) / len(daily_violations) if daily_violations else 0
-            }
-            
-            # Market trends (would integrate with price discovery service)
-            analysis["market_trends"] = {
-                "price_volatility": "High" if analysis["violation_statistics"]["average_violation_percentage"] > 15 else "Medium" if analysis["violation_statistics"]["average_violation_percentage"] > 5 else "Low",
-                "market_stability": "Unstable" if critical_violations > total_violations * 0.3 else "Stable",
-                "intervention_needed": critical_violations > 0 or total_violations > 50
-            }
-            
-            return analysis
+            return ViolationAggregates.from_violations(violations).market_analysis(start_date, end_date)
             
         except Exception as e:
             logger.error("Error generating market analysis", error=str(e))
@@ -315,67 +249,7 @@ class ComplianceReportGenerator:
     async def _calculate_farmer_impact(self, violations: List[MSPViolation]) -> Dict[str, Any]:
         """Calculate impact on farmers"""
         try:
-            if not violations:
-                return {}
-            
-            # Calculate financial impact
-            total_loss = sum(abs(v.price_difference) for v in violations)
-            average_loss_per_violation = total_loss / len(violations)
-            
-            # Estimate affected farmers (assuming average 10 quintals per farmer)
-            estimated_affected_farmers = len(violations) * 10  # Rough estimate
-            average_loss_per_farmer = total_loss / estimated_affected_farmers if estimated_affected_farmers > 0 else 0
-            
-            # Categorize impact by severity
-            critical_impact_violations = [v for v in violations if v.severity == AlertSeverity.CRITICAL]
-            high_impact_violations = [v for v in violations if v.severity == AlertSeverity.HIGH]
-            
-            impact = {
-                "financial_impact": {
-                    "total_estimated_losses": round(total_loss, 2),
-                    "average_loss_per_violation": round(average_loss_per_violation, 2),
-                    "estimated_affected_farmers": estimated_affected_farmers,
-                    "average_loss_per_farmer": round(average_loss_per_farmer, 2)
-                },
-                "severity_impact": {
-                    "critical_impact_cases": len(critical_impact_violations),
-                    "high_impact_cases": len(high_impact_violations),
-                    "critical_impact_losses": sum(abs(v.price_difference) for v in critical_impact_violations),
-                    "high_impact_losses": sum(abs(v.price_difference) for v in high_impact_violations)
-                },
-                "geographic_impact": {},
-                "commodity_impact": {}
-            }
-            
-            # Geographic impact
-            state_impact = {}
-            for violation in violations:
-                if violation.state not in state_impact:
-                    state_impact[violation.state] = {"violations": 0, "losses": 0}
-                state_impact[violation.state]["violations"] += 1
-                state_impact[violation.state]["losses"] += abs(violation.price_difference)
-            
-            impact["geographic_impact"] = dict(sorted(
-                state_impact.items(), 
-                key=lambda x: x[1]["losses"], 
-                reverse=True
-            ))
-            
-            # Commodity impact
-            commodity_impact = {}
-            for violation in violations:
-                if violation.commodity not in commodity_impact:
-                    commodity_impact[violation.commodity] = {"violations": 0, "losses": 0}
-                commodity_impact[violation.commodity]["violations"] += 1
-                commodity_impact[violation.commodity]["losses"] += abs(violation.price_difference)
-            
-            impact["commodity_impact"] = dict(sorted(
-                commodity_impact.items(), 
-                key=lambda x: x[1]["losses"], 
-                reverse=True
-            ))
-            
-            return impact
+            return ViolationAggregates.from_violations(violations).farmer_impact()
             
         except Exception as e:
             logger.error("Error calculating farmer impact", error=str(e))
@@ -388,15 +262,27 @@ class ComplianceReportGenerator:
         farmer_impact: Dict[str, Any]
     ) -> List[str]:
         """Generate actionable recommendations based on analysis"""
+        critical_violations = len([v for v in violations if v.severity == AlertSeverity.CRITICAL])
+        return self._recommendations_for_counts(
+            len(violations), critical_violations, market_analysis, farmer_impact
+        )
+    
+    def _recommendations_for_counts(
+        self,
+        total_violations: int,
+        critical_violations: int,
+        market_analysis: Dict[str, Any],
+        farmer_impact: Dict[str, Any]
+    ) -> List[str]:
+        """Recommendations from violation counts and the aggregated analysis"""
         try:
             recommendations = []
             
-            if not violations:
+            if not total_violations:
                 recommendations.append("No MSP violations detected during this period. Continue monitoring.")
                 return recommendations
             
             # Critical violations recommendations
-            critical_violations = len([v for v in violations if v.severity == AlertSeverity.CRITICAL])
             if critical_violations > 0:
                 recommendations.extend([
                     f"URGENT: {critical_violations} critical MSP violations require immediate intervention",
@@ -450,7 +336,7 @@ class ComplianceReportGenerator:
                 ])
             
             # Systemic recommendations
-            if len(violations) > 100:  # High volume of violations
+            if total_violations > 100:  # High volume of violations
                 recommendations.extend([
                     "Review and strengthen MSP enforcement mechanisms",
                     "Increase frequency of market monitoring",
@@ -486,46 +372,13 @@ class ComplianceReportGenerator:
     ) -> MSPComplianceReport:
         """Create comprehensive compliance report"""
         try:
-            # Aggregate violations by commodity and location
-            violations_by_commodity = {}
-            violations_by_location = {}
-            
-            for violation in violations:
-                # By commodity
-                violations_by_commodity[violation.commodity] = violations_by_commodity.get(violation.commodity, 0) + 1
-                
-                # By location
-                location_key = f"{violation.district}, {violation.state}"
-                violations_by_location[location_key] = violations_by_location.get(location_key, 0) + 1
-            
-            # Calculate average violation percentage
-            avg_violation_percentage = 0
-            if violations:
-                avg_violation_percentage = sum(v.violation_percentage for v in violations) / len(violations)
-            
-            # Estimate affected farmers
-            estimated_affected_farmers = len(violations) * 10  # Rough estimate
-            
-            # Calculate estimated losses
-            estimated_losses = sum(abs(v.price_difference) for v in violations)
-            
             # Prepare evidence files list
             evidence_files = []
             if evidence_data:
                 evidence_files = evidence_data.get("evidence_files", [])
             
-            report = MSPComplianceReport(
-                report_period_start=start_date,
-                report_period_end=end_date,
-                region=region,
-                total_violations=len(violations),
-                violations_by_commodity=violations_by_commodity,
-                violations_by_location=violations_by_location,
-                average_violation_percentage=round(avg_violation_percentage, 2),
-                most_affected_farmers=estimated_affected_farmers,
-                estimated_farmer_losses=round(estimated_losses, 2),
-                recommendations=recommendations,
-                evidence_files=evidence_files
+            report = ViolationAggregates.from_violations(violations).to_report(
+                start_date, end_date, region, recommendations, evidence_files
             )
             
             # Add additional metadata
@@ -563,6 +416,18 @@ class ComplianceReportGenerator:
 class EvidenceCollector:
     """Collects and organizes evidence for MSP violations"""
     
+    def __init__(self, concurrency: int = EVIDENCE_CONCURRENCY, store: Optional[EvidenceStore] = None):
+        self.concurrency = concurrency
+        self.evidence_store = store or EvidenceStore.from_env()
+        self._reset_lookups()
+    
+    def _reset_lookups(self):
+        """Forget memoized reference/context lookups from a previous collection run"""
+        # (commodity, date) -> task resolving to (msp data, blob digest)
+        self._msp_reference_cache: Dict[Tuple[str, date], asyncio.Future] = {}
+        # (mandi, district, state, date) -> task resolving to (market data, blob digest)
+        self._market_context_cache: Dict[Tuple[str, str, str, date], asyncio.Future] = {}
+    
     async def collect_evidence_for_violations(
         self, 
         violations: List[MSPViolation]
@@ -579,8 +444,17 @@ class EvidenceCollector:
                 "verification_status": {}
             }
             
-            for violation in violations:
-                violation_evidence = await self._collect_violation_evidence(violation)
+            # Violations sharing a commodity, mandi and date share one lookup each
+            self._reset_lookups()
+            semaphore = asyncio.Semaphore(self.concurrency)
+            
+            async def collect(violation: MSPViolation) -> Dict[str, Any]:
+                async with semaphore:
+                    return await self._collect_violation_evidence(violation)
+            
+            collected = await asyncio.gather(*(collect(violation) for violation in violations))
+            
+            for violation, violation_evidence in zip(violations, collected):
                 evidence_data["violation_evidence"][violation.id] = violation_evidence
                 
                 # Add evidence files
@@ -599,7 +473,9 @@ class EvidenceCollector:
             logger.info(
                 "Evidence collection completed",
                 violations_count=len(violations),
-                evidence_files_count=len(evidence_data["evidence_files"])
+                evidence_files_count=len(evidence_data["evidence_files"]),
+                msp_reference_lookups=len(self._msp_reference_cache),
+                market_context_lookups=len(self._market_context_cache)
             )
             
             return evidence_data
@@ -618,7 +494,8 @@ class EvidenceCollector:
                 "price_data": {},
                 "msp_data": {},
                 "market_data": {},
-                "verification_data": {}
+                "verification_data": {},
+                "evidence_hashes": {}
             }
             
             # Price evidence
@@ -630,11 +507,24 @@ class EvidenceCollector:
                 "price_source": violation.evidence.get("comparison_data", {}).get("data_confidence", 0.8) if violation.evidence else 0.8
             }
             
-            # MSP reference data
-            evidence["msp_data"] = await self._get_msp_reference_data(violation.commodity, violation.detected_at.date())
-            
-            # Market context data
-            evidence["market_data"] = await self._get_market_context_data(violation)
+            # MSP reference and market context, shared with violations on the same inputs
+            detection_date = violation.detected_at.date()
+            evidence["msp_data"], msp_digest = await self._memoized(
+                self._msp_reference_cache,
+                (violation.commodity.lower(), detection_date),
+                "MSP_REFERENCE",
+                lambda: self._get_msp_reference_data(violation.commodity, detection_date)
+            )
+            evidence["market_data"], market_digest = await self._memoized(
+                self._market_context_cache,
+                (violation.mandi_id, violation.district, violation.state, detection_date),
+                "MARKET_CONTEXT",
+                lambda: self._get_market_context_data(violation)
+            )
+            if msp_digest:
+                evidence["evidence_hashes"]["msp_reference"] = msp_digest
+            if market_digest:
+                evidence["evidence_hashes"]["market_context"] = market_digest
             
             # Generate evidence files
             evidence_file = await self._generate_violation_evidence_file(violation, evidence)
@@ -655,6 +545,23 @@ class EvidenceCollector:
             logger.error("Error collecting violation evidence", violation_id=violation.id, error=str(e))
             return {}
     
+    def _memoized(self, cache: Dict[Any, asyncio.Future], key: Any, document_type: str, fetch):
+        """Shared lookup for `key`: fetched and stored as an evidence blob only once.
+        
+        Concurrent violations await the same task rather than each issuing the lookup.
+        """
+        task = cache.get(key)
+        if task is None:
+            async def load() -> Tuple[Dict[str, Any], Optional[str]]:
+                data = await fetch()
+                if not data:
+                    return data, None
+                digest, _ = self.evidence_store.put({"document_type": document_type, "data": data})
+                return data, digest
+            
+            task = cache[key] = asyncio.ensure_future(load())
+        return task
+    
     async def _get_msp_reference_data(self, commodity: str, detection_date: date) -> Dict[str, Any]:
         """Get MSP reference data for evidence"""
         try:
@@ -717,11 +624,12 @@ class EvidenceCollector:
     ) -> Optional[str]:
         """Generate evidence file for violation"""
         try:
-            # Generate evidence document
+            # Generate evidence document. Shared MSP reference and market context
+            # blobs are referenced by digest, and nothing time-of-generation is
+            # included, so re-collecting the same violation yields the same blob.
             evidence_doc = {
                 "document_type": "MSP_VIOLATION_EVIDENCE",
                 "violation_id": violation.id,
-                "generated_at": datetime.utcnow().isoformat(),
                 "violation_details": {
                     "commodity": violation.commodity,
                     "variety": violation.variety,
@@ -731,16 +639,15 @@ class EvidenceCollector:
                     "severity": violation.severity.value
                 },
                 "price_evidence": evidence["price_data"],
-                "msp_reference": evidence["msp_data"],
-                "market_context": evidence["market_data"],
-                "verification": evidence["verification_data"]
+                "evidence_hashes": dict(evidence.get("evidence_hashes", {}))
             }
             
-            # In production, this would save to file system or cloud storage
-            filename = f"violation_evidence_{violation.id}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.json"
+            digest, created = self.evidence_store.put(evidence_doc)
+            evidence.setdefault("evidence_hashes", {})["violation"] = digest
+            filename = self.evidence_store.filename(digest)
             
-            # Simulate file creation
-            logger.info("Generated evidence file", filename=filename, violation_id=violation.id)
+            if created:
+                logger.info("Generated evidence file", filename=filename, violation_id=violation.id)
             
             return filename
             
@@ -832,6 +739,26 @@ class EvidenceCollector:
             if len(evidence_data.get("evidence_files", [])) == 0:
                 verification["recommendations"].append("Generate evidence files for violations")
             
+            # Check stored blobs against their content hashes, once per distinct blob
+            digests = {
+                digest
+                for violation_evidence in evidence_data.get("violation_evidence", {}).values()
+                for digest in violation_evidence.get("evidence_hashes", {}).values()
+            }
+            results = {digest: self.evidence_store.verify(digest) for digest in digests}
+            failed = [digest for digest, verified in results.items() if verified is False]
+            unverifiable = [digest for digest, verified in results.items() if verified is None]
+            verification["verified_blobs"] = len(digests) - len(failed) - len(unverifiable)
+            verification["unverifiable_blobs"] = len(unverifiable)
+            
+            if unverifiable:
+                # Evicted or never stored here: nothing to re-hash, which is not evidence of tampering
+                verification["issues"].append(f"Evidence blobs no longer retained for re-verification: {len(unverifiable)}")
+            
+            if failed:
+                verification["issues"].append(f"Evidence blobs failing hash check: {len(failed)}")
+                verification["integrity_status"] = "TAMPERED"
+            
             return verification
             
         except Exception as e:
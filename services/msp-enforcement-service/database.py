@@ -184,6 +184,19 @@ async def _create_tables():
             )
         """)
         
+        # Incremental sync state: HTTP validators per document, row hashes per dataset
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS government_sync_state (
+                key VARCHAR PRIMARY KEY,
+                etag VARCHAR,
+                last_modified VARCHAR,
+                content_hash VARCHAR,
+                links JSONB,
+                row_hashes JSONB,
+                updated_at TIMESTAMP DEFAULT NOW()
+            )
+        """)
+        
         # Compliance reports table
         await conn.execute("""
             CREATE TABLE IF NOT EXISTS compliance_reports (
@@ -211,6 +224,7 @@ async def _create_tables():
         await conn.execute("CREATE INDEX IF NOT EXISTS idx_msp_rates_commodity ON msp_rates(commodity, is_active)")
         await conn.execute("CREATE INDEX IF NOT EXISTS idx_msp_violations_commodity ON msp_violations(commodity, detected_at)")
         await conn.execute("CREATE INDEX IF NOT EXISTS idx_msp_violations_location ON msp_violations(state, district)")
+        await conn.execute("CREATE INDEX IF NOT EXISTS idx_msp_violations_detected ON msp_violations(detected_at, id)")
         await conn.execute("CREATE INDEX IF NOT EXISTS idx_procurement_centers_location ON procurement_centers(state, district, is_operational)")
         await conn.execute("CREATE INDEX IF NOT EXISTS idx_msp_alerts_farmer ON msp_alerts(farmer_id, sent_at)")
         await conn.execute("CREATE INDEX IF NOT EXISTS idx_compliance_reports_period ON compliance_reports(report_period_start, report_period_end)")
@@ -325,28 +339,34 @@ async def store_msp_violation(violation: MSPViolation) -> bool:
         return False
 
 # Alerts operations
-async def store_msp_alert(alert: MSPAlert) -> bool:
-    """Store MSP alert in database"""
-    if not _pool:
+_INSERT_MSP_ALERT = """
+    INSERT INTO msp_alerts (
+        id, violation_id, farmer_id, alert_type, title, message,
+        severity, commodity, location, suggested_actions,
+        alternative_centers, is_read, is_acknowledged
+    ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13)
+"""
+
+def _msp_alert_row(alert: MSPAlert) -> tuple:
+    return (
+        alert.id, alert.violation_id, alert.farmer_id, alert.alert_type,
+        alert.title, alert.message, alert.severity.value, alert.commodity,
+        alert.location, json.dumps(alert.suggested_actions),
+        json.dumps(alert.alternative_centers), alert.is_read, alert.is_acknowledged
+    )
+
+async def store_msp_alerts(alerts: List[MSPAlert]) -> bool:
+    """Store a batch of MSP alerts in one round trip"""
+    if not _pool or not alerts:
         return False
     
     try:
         async with _pool.acquire() as conn:
-            await conn.execute("""
-                INSERT INTO msp_alerts (
-                    id, violation_id, farmer_id, alert_type, title, message,
-                    severity, commodity, location, suggested_actions,
-                    alternative_centers, is_read, is_acknowledged
-                ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13)
-            """,
-                alert.id, alert.violation_id, alert.farmer_id, alert.alert_type,
-                alert.title, alert.message, alert.severity.value, alert.commodity,
-                alert.location, json.dumps(alert.suggested_actions),
-                json.dumps(alert.alternative_centers), alert.is_read, alert.is_acknowledged
-            )
+            async with conn.transaction():
+                await conn.executemany(_INSERT_MSP_ALERT, [_msp_alert_row(alert) for alert in alerts])
         return True
     except Exception as e:
-        logger.error("Error storing MSP alert", error=str(e))
+        logger.error("Error storing MSP alerts", count=len(alerts), error=str(e))
         return False
 
 # Procurement centers operations
@@ -443,34 +463,43 @@ async def get_procurement_centers(
         return []
 
 # Alternative suggestions operations
-async def store_alternative_suggestion(suggestion: AlternativeSuggestion) -> bool:
-    """Store alternative suggestion in database"""
-    if not _pool:
+_INSERT_ALTERNATIVE_SUGGESTION = """
+    INSERT INTO alternative_suggestions (
+        id, commodity, original_location, suggested_center_id,
+        suggested_center_name, suggested_location, distance_km,
+        price_offered, price_advantage, transportation_cost,
+        net_benefit, contact_info, directions, estimated_travel_time,
+        suggestion_reason, confidence_score
+    ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16)
+"""
+
+def _alternative_suggestion_row(suggestion: AlternativeSuggestion) -> tuple:
+    return (
+        suggestion.id, suggestion.commodity, suggestion.original_location,
+        suggestion.suggested_center_id, suggestion.suggested_center_name,
+        suggestion.suggested_location, suggestion.distance_km,
+        suggestion.price_offered, suggestion.price_advantage,
+        suggestion.transportation_cost, suggestion.net_benefit,
+        json.dumps(suggestion.contact_info) if suggestion.contact_info else None,
+        suggestion.directions, suggestion.estimated_travel_time,
+        suggestion.suggestion_reason, suggestion.confidence_score
+    )
+
+async def store_alternative_suggestions(suggestions: List[AlternativeSuggestion]) -> bool:
+    """Store a batch of alternative suggestions in one round trip"""
+    if not _pool or not suggestions:
         return False
     
     try:
         async with _pool.acquire() as conn:
-            await conn.execute("""
-                INSERT INTO alternative_suggestions (
-                    id, commodity, original_location, suggested_center_id,
-                    suggested_center_name, suggested_location, distance_km,
-                    price_offered, price_advantage, transportation_cost,
-                    net_benefit, contact_info, directions, estimated_travel_time,
-                    suggestion_reason, confidence_score
-                ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16)
-            """,
-                suggestion.id, suggestion.commodity, suggestion.original_location,
-                suggestion.suggested_center_id, suggestion.suggested_center_name,
-                suggestion.suggested_location, suggestion.distance_km,
-                suggestion.price_offered, suggestion.price_advantage,
-                suggestion.transportation_cost, suggestion.net_benefit,
-                json.dumps(suggestion.contact_info) if suggestion.contact_info else None,
-                suggestion.directions, suggestion.estimated_travel_time,
-                suggestion.suggestion_reason, suggestion.confidence_score
-            )
+            async with conn.transaction():
+                await conn.executemany(
+                    _INSERT_ALTERNATIVE_SUGGESTION,
+                    [_alternative_suggestion_row(suggestion) for suggestion in suggestions]
+                )
         return True
     except Exception as e:
-        logger.error("Error storing alternative suggestion", error=str(e))
+        logger.error("Error storing alternative suggestions", count=len(suggestions), error=str(e))
         return False
 
 # Mock functions for integration with other services
@@ -563,6 +592,56 @@ async def get_government_data_sources() -> List[GovernmentDataSource]:
         logger.error("Error getting government data sources", error=str(e))
         return []
 
+async def get_government_sync_states() -> Dict[str, Dict[str, Any]]:
+    """Get incremental sync state for all government documents and datasets"""
+    if not _pool:
+        return {}
+    
+    try:
+        async with _pool.acquire() as conn:
+            rows = await conn.fetch("SELECT * FROM government_sync_state")
+            
+            return {
+                row['key']: {
+                    'etag': row['etag'],
+                    'last_modified': row['last_modified'],
+                    'content_hash': row['content_hash'],
+                    'links': json.loads(row['links']) if row['links'] else [],
+                    'row_hashes': json.loads(row['row_hashes']) if row['row_hashes'] else {}
+                }
+                for row in rows
+            }
+    except Exception as e:
+        logger.error("Error getting government sync state", error=str(e))
+        return {}
+
+async def store_government_sync_state(key: str, state: Dict[str, Any]) -> bool:
+    """Store incremental sync state for a government document or dataset"""
+    if not _pool:
+        return False
+    
+    try:
+        async with _pool.acquire() as conn:
+            await conn.execute("""
+                INSERT INTO government_sync_state (
+                    key, etag, last_modified, content_hash, links, row_hashes
+                ) VALUES ($1, $2, $3, $4, $5, $6)
+                ON CONFLICT (key) DO UPDATE SET
+                    etag = EXCLUDED.etag,
+                    last_modified = EXCLUDED.last_modified,
+                    content_hash = EXCLUDED.content_hash,
+                    links = EXCLUDED.links,
+                    row_hashes = EXCLUDED.row_hashes,
+                    updated_at = NOW()
+            """,
+                key, state.get('etag'), state.get('last_modified'), state.get('content_hash'),
+                json.dumps(state.get('links', [])), json.dumps(state.get('row_hashes', {}))
+            )
+        return True
+    except Exception as e:
+        logger.error("Error storing government sync state", key=key, error=str(e))
+        return False
+
 async def get_mandi_info(mandi_id: str) -> Optional[Dict[str, Any]]:
     """Get mandi information"""
     # Mock implementation - would integrate with price discovery service
@@ -0,0 +1,151 @@
+"""
+Content-Addressed Evidence Store
+Evidence documents keyed by the SHA-256 of their canonical JSON
+"""
+
+import hashlib
+import json
+import os
+import structlog
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+
+logger = structlog.get_logger()
+
+DEFAULT_MAX_BLOBS = 10000
+DEFAULT_MAX_DIGESTS = 100000
+
+def _remember(cache: OrderedDict, key: str, value: Any, limit: int) -> List[str]:
+    """Insert or refresh an LRU entry; returns the keys evicted to stay within limit"""
+    cache[key] = value
+    cache.move_to_end(key)
+    evicted = []
+    while len(cache) > limit:
+        evicted.append(cache.popitem(last=False)[0])
+    return evicted
+
+class EvidenceStore:
+    """Evidence blobs addressed by content hash.
+
+    Identical documents hash to the same digest, so they are written once no
+    matter how many violations or reports reference them. Blobs go to `root`
+    when it is set (EVIDENCE_STORE_DIR), otherwise they are kept in memory,
+    least recently used first out beyond max_blobs.
+
+    Verification re-hashes a blob whenever it may have changed: a file whose
+    mtime or size differs from the last check, or a replaced in-memory blob.
+    A digest whose blob is no longer held (evicted, or never stored here)
+    cannot be checked and verifies as None rather than False.
+    """
+
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        max_blobs: int = DEFAULT_MAX_BLOBS,
+        max_digests: int = DEFAULT_MAX_DIGESTS
+    ):
+        self.root = root
+        self.max_blobs = max_blobs
+        self.max_digests = max_digests
+        self._blobs: "OrderedDict[str, bytes]" = OrderedDict()
+        self._known: "OrderedDict[str, None]" = OrderedDict()
+        # digest -> (signature of the checked blob, result)
+        self._verified: "OrderedDict[str, Tuple[Any, bool]]" = OrderedDict()
+        self.writes = 0
+        self.verifications = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls) -> "EvidenceStore":
+        max_blobs = os.getenv("EVIDENCE_STORE_MAX_BLOBS")
+        return cls(
+            os.getenv("EVIDENCE_STORE_DIR") or None,
+            max_blobs=int(max_blobs) if max_blobs else DEFAULT_MAX_BLOBS
+        )
+
+    @staticmethod
+    def canonical(document: Any) -> bytes:
+        return json.dumps(document, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+
+    @staticmethod
+    def filename(digest: str) -> str:
+        return f"evidence_{digest}.json"
+
+    def put(self, document: Any) -> Tuple[str, bool]:
+        """(digest, newly written) for a document"""
+        data = self.canonical(document)
+        digest = hashlib.sha256(data).hexdigest()
+        if digest in self._known and (self.root or digest in self._blobs):
+            self._known.move_to_end(digest)
+            if not self.root:
+                self._blobs.move_to_end(digest)
+            return digest, False
+
+        created = True
+        if self.root:
+            path = self._path(digest)
+            if os.path.exists(path):
+                created = False
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+        else:
+            for evicted in _remember(self._blobs, digest, data, self.max_blobs):
+                # Drop everything that refers to the evicted bytes so they can be freed
+                self._known.pop(evicted, None)
+                self._verified.pop(evicted, None)
+                self.evictions += 1
+
+        _remember(self._known, digest, None, self.max_digests)
+        if created:
+            self.writes += 1
+        return digest, created
+
+    def get(self, digest: str) -> Optional[bytes]:
+        if not self.root:
+            return self._blobs.get(digest)
+        try:
+            with open(self._path(digest), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def verify(self, digest: str) -> Optional[bool]:
+        """Whether the stored blob still hashes to its digest; None when it is not retained"""
+        signature = self._signature(digest)
+        if signature is None:
+            self._verified.pop(digest, None)
+            return None
+
+        cached = self._verified.get(digest)
+        if cached is not None and self._same_blob(cached[0], signature):
+            self._verified.move_to_end(digest)
+            return cached[1]
+
+        data = self.get(digest)
+        if data is None:
+            return None
+        verified = hashlib.sha256(data).hexdigest() == digest
+        _remember(self._verified, digest, (signature, verified), self.max_digests)
+        self.verifications += 1
+        return verified
+
+    def _signature(self, digest: str) -> Any:
+        """What identifies the current blob: (mtime, size) of its file, or the bytes object"""
+        if not self.root:
+            return self._blobs.get(digest)
+        try:
+            stat = os.stat(self._path(digest))
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _same_blob(self, cached: Any, current: Any) -> bool:
+        # In-memory blobs are immutable bytes; a replaced blob is a different object
+        return cached is current if not self.root else cached == current
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], self.filename(digest))
@@ -6,7 +6,7 @@ Handles MSP rate updates and government data sources
 import asyncio
 import aiohttp
 import structlog
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, date, timedelta
 import json
 import re
@@ -19,6 +19,11 @@ from models import (
     ProcurementCenter
 )
 from database import store_msp_rate, store_procurement_center, get_government_data_sources
+from procurement_index import procurement_center_index
+from incremental_sync import (
+    SyncState, SyncStateCache, ConditionalFetcher, FetchResult,
+    diff_rows, msp_rate_key, procurement_center_key, stable_id, MSP_RATE_VOLATILE_FIELDS
+)
 
 logger = structlog.get_logger()
 
@@ -30,6 +35,10 @@ class GovernmentDataIntegrator:
         self.data_sources: List[GovernmentDataSource] = []
         self.sync_tasks: List[asyncio.Task] = []
         self.is_running = False
+        self.sync_state = SyncStateCache()
+        self.fetcher: Optional[ConditionalFetcher] = None
+        # Fetches made during a source's sync, committed only once its records are stored
+        self._pending_fetches: Dict[str, List[FetchResult]] = {}
     
     async def initialize(self):
         """Initialize the data integrator"""
@@ -39,6 +48,8 @@ class GovernmentDataIntegrator:
                 'User-Agent': 'MANDI-EAR-MSP-Service/1.0'
             }
         )
+        self.fetcher = ConditionalFetcher(self.session, self.sync_state)
+        await self.sync_state.load()
         await self._load_data_sources()
         logger.info("Government data integrator initialized")
     
@@ -143,20 +154,49 @@ class GovernmentDataIntegrator:
         """Sync data from a specific government source"""
         logger.info("Starting sync from government source", source_id=source.id)
         
+        fetches = self._pending_fetches[source.id] = []
         try:
             if source.api_endpoint:
                 data = await self._fetch_api_data(source)
             else:
                 data = await self._scrape_web_data(source)
             
+            failed = 0
             if data:
-                await self._process_government_data(data, source)
-                logger.info("Successfully synced government data", source_id=source.id, records=len(data))
+                upserted, failed = await self._process_government_data(data, source)
+                logger.info(
+                    "Successfully synced government data",
+                    source_id=source.id, records=len(data), upserted=upserted, failed=failed
+                )
+            elif fetches and not any(fetch.changed for fetch in fetches):
+                logger.info("Government source unchanged", source_id=source.id, documents=len(fetches))
             else:
                 logger.warning("No data received from government source", source_id=source.id)
+            
+            # Documents whose rows failed to store are re-parsed next time
+            if not failed:
+                for fetch in fetches:
+                    await self.fetcher.commit(fetch)
                 
         except Exception as e:
             logger.error("Failed to sync from government source", source_id=source.id, error=str(e))
+        finally:
+            self._pending_fetches.pop(source.id, None)
+    
+    async def _conditional_fetch(
+        self,
+        url: str,
+        source: GovernmentDataSource,
+        headers: Optional[Dict[str, str]] = None
+    ) -> Optional[FetchResult]:
+        """Conditional GET, held as pending until the source's sync has stored its records"""
+        if not self.fetcher:
+            return None
+        
+        result = await self.fetcher.fetch(url, headers)
+        if result:
+            self._pending_fetches.setdefault(source.id, []).append(result)
+        return result
     
     async def _fetch_api_data(self, source: GovernmentDataSource) -> List[Dict[str, Any]]:
         """Fetch data from government API"""
@@ -168,25 +208,24 @@ class GovernmentDataIntegrator:
             if source.api_key:
                 headers['Authorization'] = f'Bearer {source.api_key}'
             
-            async with self.session.get(source.api_endpoint, headers=headers) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    
-                    # Handle different API response formats
-                    if isinstance(data, dict):
-                        if 'records' in data:
-                            return data['records']
-                        elif 'data' in data:
-                            return data['data']
-                        elif 'results' in data:
-                            return data['results']
-                    elif isinstance(data, list):
-                        return data
-                    
-                    return [data] if data else []
-                else:
-                    logger.error("API request failed", source_id=source.id, status=response.status)
-                    return []
+            result = await self._conditional_fetch(source.api_endpoint, source, headers)
+            if not result or not result.changed:
+                return []
+            
+            data = json.loads(result.content)
+            
+            # Handle different API response formats
+            if isinstance(data, dict):
+                if 'records' in data:
+                    return data['records']
+                elif 'data' in data:
+                    return data['data']
+                elif 'results' in data:
+                    return data['results']
+            elif isinstance(data, list):
+                return data
+            
+            return [data] if data else []
                     
         except Exception as e:
             logger.error("Error fetching API data", source_id=source.id, error=str(e))
@@ -200,13 +239,24 @@ class GovernmentDataIntegrator:
         try:
             # This is a simplified scraper - in production, each source would need
             # specific scraping logic based on their website structure
-            async with self.session.get(source.url) as response:
-                if response.status == 200:
-                    html = await response.text()
-                    return await self._parse_government_html(html, source)
-                else:
-                    logger.error("Web scraping failed", source_id=source.id, status=response.status)
-                    return []
+            page = await self._conditional_fetch(source.url, source)
+            if not page:
+                return []
+            
+            if page.changed:
+                html = page.content.decode('utf-8', errors='replace')
+                data = await self._parse_government_html(html, source)
+                page.state.links = [
+                    fetch.url for fetch in self._pending_fetches.get(source.id, [])
+                    if fetch is not page
+                ]
+                return data
+            
+            # Unchanged page: its linked files may still have been republished
+            data = []
+            for file_url in page.state.links:
+                data.extend(await self._process_downloadable_file(file_url, source))
+            return data
                     
         except Exception as e:
             logger.error("Error scraping web data", source_id=source.id, error=str(e))
@@ -401,18 +451,18 @@ class GovernmentDataIntegrator:
             if not file_url.startswith('http'):
                 file_url = f"{source.url.rstrip('/')}/{file_url.lstrip('/')}"
             
-            async with self.session.get(file_url) as response:
-                if response.status != 200:
-                    return []
-                
-                content = await response.read()
-                
-                if file_url.lower().endswith('.csv'):
-                    return await self._process_csv_data(content, source)
-                elif file_url.lower().endswith(('.xls', '.xlsx')):
-                    return await self._process_excel_data(content, source)
-                elif file_url.lower().endswith('.pdf'):
-                    return await self._process_pdf_data(content, source)
+            result = await self._conditional_fetch(file_url, source)
+            if not result or not result.changed:
+                return []
+            
+            content = result.content
+            
+            if file_url.lower().endswith('.csv'):
+                return await self._process_csv_data(content, source)
+            elif file_url.lower().endswith(('.xls', '.xlsx')):
+                return await self._process_excel_data(content, source)
+            elif file_url.lower().endswith('.pdf'):
+                return await self._process_pdf_data(content, source)
                 
         except Exception as e:
             logger.error("Error processing downloadable file", file_url=file_url, error=str(e))
@@ -456,12 +506,18 @@ class GovernmentDataIntegrator:
         logger.info("PDF processing not implemented yet", source_id=source.id)
         return []
     
-    async def _process_government_data(self, data: List[Dict[str, Any]], source: GovernmentDataSource):
-        """Process and store government data"""
-        for record in data:
+    async def _process_government_data(self, data: List[Dict[str, Any]], source: GovernmentDataSource) -> Tuple[int, int]:
+        """Store MSP rates that are new or changed since the last sync; returns (upserted, failed)"""
+        dataset = f"msp_rates:{source.id}"
+        row_hashes = dict(self.sync_state.get(dataset).row_hashes)
+        changed = diff_rows(data, msp_rate_key, row_hashes, MSP_RATE_VOLATILE_FIELDS)
+        upserted = failed = 0
+        
+        for key, digest, record in changed:
             try:
                 # Create MSP rate record
                 msp_rate = MSPRate(
+                    id=stable_id("msp_rate", f"{source.id}|{key}"),
                     commodity=record['commodity'],
                     variety=record.get('variety'),
                     season=record['season'],
@@ -474,10 +530,21 @@ class GovernmentDataIntegrator:
                 )
                 
                 # Store in database
-                await store_msp_rate(msp_rate)
+                if not await store_msp_rate(msp_rate):
+                    failed += 1
+                    continue
+                upserted += 1
                 
             except Exception as e:
+                # Malformed rows stay malformed until the source changes them
                 logger.error("Error processing government data record", error=str(e))
+            
+            row_hashes[key] = digest
+        
+        if changed:
+            await self.sync_state.save(dataset, SyncState(row_hashes=row_hashes))
+        
+        return upserted, failed
     
     async def manual_sync_all(self):
         """Manually trigger sync for all data sources"""
@@ -687,12 +754,30 @@ class GovernmentDataIntegrator:
             }
         ]
         
-        for center_data in sample_centers:
+        # Only centers that are new or changed since the last sync are upserted
+        dataset = "procurement_centers"
+        row_hashes = dict(self.sync_state.get(dataset).row_hashes)
+        changed = diff_rows(sample_centers, procurement_center_key, row_hashes)
+        upserted = 0
+        
+        for key, digest, center_data in changed:
             try:
-                center = ProcurementCenter(**center_data)
-                await store_procurement_center(center)
-                logger.info("Stored procurement center", name=center.name, state=center.state)
+                center = ProcurementCenter(id=stable_id("procurement_center", key), **center_data)
+                if await store_procurement_center(center):
+                    row_hashes[key] = digest
+                    upserted += 1
+                    logger.info("Stored procurement center", name=center.name, state=center.state)
             except Exception as e:
                 logger.error("Error storing procurement center", center=center_data.get('name'), error=str(e))
         
-        logger.info("Procurement centers sync completed", total_centers=len(sample_centers))
\ No newline at end of file
+        if changed:
+            await self.sync_state.save(dataset, SyncState(row_hashes=row_hashes))
+        
+        logger.info(
+            "Procurement centers sync completed",
+            total_centers=len(sample_centers), changed=len(changed), upserted=upserted
+        )
+        
+        # Rebuild the in-memory index used for alternative suggestions
+        if upserted or not procurement_center_index.ready:
+            await procurement_center_index.refresh()
\ No newline at end of file
@@ -0,0 +1,163 @@
+"""
+Incremental Government Data Sync
+Conditional fetches and row-level diffs so unchanged sources are neither re-parsed nor re-stored
+"""
+
+import hashlib
+import json
+import uuid
+import aiohttp
+import structlog
+from dataclasses import dataclass, field, asdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from database import get_government_sync_states, store_government_sync_state
+
+logger = structlog.get_logger()
+
+# Parsers stamp these with the parse date, so they would make every row look changed daily
+MSP_RATE_VOLATILE_FIELDS = ('announcement_date', 'effective_date')
+
+@dataclass
+class SyncState:
+    """What was last seen for a document (validators, content hash, linked files) or dataset (row hashes)"""
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+    links: List[str] = field(default_factory=list)
+    row_hashes: Dict[str, str] = field(default_factory=dict)
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+@dataclass
+class FetchResult:
+    """Outcome of a conditional fetch; `state` is committed once the content has been processed"""
+    url: str
+    changed: bool
+    content: Optional[bytes]
+    state: SyncState
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+def record_hash(record: Dict[str, Any], ignore: Tuple[str, ...] = ()) -> str:
+    hashed = {name: value for name, value in record.items() if name not in ignore}
+    return hashlib.sha256(
+        json.dumps(hashed, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+    ).hexdigest()
+
+def _value(value: Any) -> str:
+    return str(getattr(value, 'value', value) or '').strip().lower()
+
+def msp_rate_key(record: Dict[str, Any]) -> str:
+    """Identity of an MSP rate row: commodity, variety, season and crop year"""
+    return "|".join(_value(record.get(name)) for name in ('commodity', 'variety', 'season', 'crop_year'))
+
+def procurement_center_key(center: Dict[str, Any]) -> str:
+    """Identity of a procurement center row: name, district and state"""
+    return "|".join(_value(center.get(name)) for name in ('name', 'district', 'state'))
+
+def stable_id(kind: str, key: str) -> str:
+    """Deterministic row id so re-synced rows update in place instead of inserting duplicates"""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"mandi-ear:{kind}:{key}"))
+
+def diff_rows(
+    records: List[Dict[str, Any]],
+    key_fn: Callable[[Dict[str, Any]], str],
+    previous: Dict[str, str],
+    ignore: Tuple[str, ...] = ()
+) -> List[Tuple[str, str, Dict[str, Any]]]:
+    """(key, hash, record) for records that are new or differ from the previous sync.
+
+    Rows missing from `records` are left alone: a sync may only have re-read
+    part of a source, so absence does not mean deletion.
+    """
+    latest: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+    for record in records:
+        latest[key_fn(record)] = (record_hash(record, ignore), record)
+
+    return [
+        (key, digest, record)
+        for key, (digest, record) in latest.items()
+        if previous.get(key) != digest
+    ]
+
+class SyncStateCache:
+    """Sync state keyed by document URL or dataset name, persisted to the database"""
+
+    def __init__(self):
+        self._states: Dict[str, SyncState] = {}
+
+    async def load(self):
+        try:
+            states = await get_government_sync_states()
+            self._states.update({key: SyncState(**state) for key, state in states.items()})
+            logger.info("Loaded government sync state", entries=len(states))
+        except Exception as e:
+            logger.error("Error loading government sync state", error=str(e))
+
+    def get(self, key: str) -> SyncState:
+        return self._states.get(key) or SyncState()
+
+    async def save(self, key: str, state: SyncState):
+        self._states[key] = state
+        try:
+            await store_government_sync_state(key, asdict(state))
+        except Exception as e:
+            logger.error("Error saving government sync state", key=key, error=str(e))
+
+class ConditionalFetcher:
+    """GETs with If-None-Match / If-Modified-Since, falling back to a content hash
+    for servers that ignore validators"""
+
+    def __init__(self, session: aiohttp.ClientSession, states: SyncStateCache):
+        self.session = session
+        self.states = states
+        self.stats = {"requests": 0, "not_modified": 0, "unchanged": 0, "changed": 0}
+
+    async def fetch(self, url: str, headers: Optional[Dict[str, str]] = None) -> Optional[FetchResult]:
+        """Fetch `url`; content is only returned when it differs from the last committed sync"""
+        previous = self.states.get(url)
+        request_headers = dict(headers or {})
+        request_headers.update(previous.conditional_headers())
+
+        try:
+            self.stats["requests"] += 1
+            async with self.session.get(url, headers=request_headers) as response:
+                if response.status == 304:
+                    self.stats["not_modified"] += 1
+                    return FetchResult(url, False, None, previous)
+
+                if response.status != 200:
+                    logger.error("Government data request failed", url=url, status=response.status)
+                    return None
+
+                content = await response.read()
+                state = SyncState(
+                    etag=response.headers.get('ETag'),
+                    last_modified=response.headers.get('Last-Modified'),
+                    content_hash=content_hash(content),
+                    links=list(previous.links)
+                )
+
+        except Exception as e:
+            logger.error("Error fetching government data", url=url, error=str(e))
+            return None
+
+        if state.content_hash == previous.content_hash:
+            self.stats["unchanged"] += 1
+            return FetchResult(url, False, None, state)
+
+        self.stats["changed"] += 1
+        return FetchResult(url, True, content, state)
+
+    async def commit(self, result: FetchResult):
+        """Record a processed fetch so the next sync can skip it if unchanged"""
+        if result.state != self.states.get(result.url):
+            await self.states.save(result.url, result.state)
@@ -4,8 +4,10 @@ Continuous MSP monitoring, violation detection, and alternative suggestions
 """
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks, Query
+from fastapi.responses import StreamingResponse
 from contextlib import asynccontextmanager
 import structlog
+import uuid
 from typing import List, Optional
 from datetime import datetime, date, timedelta
 
@@ -18,7 +20,8 @@ from database import init_db, close_db, store_compliance_report, get_compliance_
 from msp_monitor import MSPMonitoringEngine, MonitoringConfig
 from government_data_integration import GovernmentDataIntegrator
 from alert_system import MSPAlertSystem
-from compliance_reporting import ComplianceReportGenerator, ReportConfig, ReportType, ReportFormat
+from compliance_reporting import ComplianceReportGenerator, ReportConfig, ReportType, ReportFormat, STREAMING_WRITERS
+from report_streaming import export_filename
 
 logger = structlog.get_logger()
 
@@ -508,6 +511,42 @@ async def list_compliance_reports(
         logger.error("Failed to list compliance reports", error=str(e))
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.get("/reports/compliance/export")
+async def export_compliance_report(
+    start_date: date,
+    end_date: date,
+    region: str = "national",
+    commodity: Optional[str] = None,
+    format: ReportFormat = ReportFormat.CSV,
+    chunk_size: int = Query(1000, ge=100, le=10000)
+):
+    """Stream violation rows as CSV or Excel and store the aggregated report"""
+    if not compliance_reporter:
+        raise HTTPException(status_code=503, detail="Compliance reporter not available")
+
+    writer = STREAMING_WRITERS.get(format)
+    if not writer:
+        raise HTTPException(status_code=400, detail=f"Streaming export supports: {', '.join(f.value for f in STREAMING_WRITERS)}")
+
+    report_id = str(uuid.uuid4())
+    filename = export_filename(region, start_date, end_date, writer.extension)
+    return StreamingResponse(
+        compliance_reporter.stream_compliance_report(
+            start_date=start_date,
+            end_date=end_date,
+            region=region,
+            commodity=commodity,
+            report_format=format,
+            report_id=report_id,
+            chunk_size=chunk_size
+        ),
+        media_type=writer.media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Report-Id": report_id
+        }
+    )
+
 @app.get("/reports/compliance/{report_id}")
 async def get_compliance_report_by_id(report_id: str) -> MSPComplianceReport:
     """Get compliance report by ID"""
@@ -612,17 +651,12 @@ async def update_monitoring_config(config: dict):
         raise HTTPException(status_code=503, detail="Monitoring engine not available")
     
     try:
-        # Update configuration
-        if "check_interval_minutes" in config:
-            monitoring_engine.config.check_interval_minutes = config["check_interval_minutes"]
-        if "violation_threshold_percentage" in config:
-            monitoring_engine.config.violation_threshold_percentage = config["violation_threshold_percentage"]
-        if "critical_threshold_percentage" in config:
-            monitoring_engine.config.critical_threshold_percentage = config["critical_threshold_percentage"]
-        if "min_confidence_score" in config:
-            monitoring_engine.config.min_confidence_score = config["min_confidence_score"]
-        if "max_price_age_hours" in config:
-            monitoring_engine.config.max_price_age_hours = config["max_price_age_hours"]
+        # Update configuration; the compliance engine picks up new thresholds
+        fields = (
+            "check_interval_minutes", "violation_threshold_percentage", "critical_threshold_percentage",
+            "min_confidence_score", "max_price_age_hours"
+        )
+        monitoring_engine.update_config(**{name: config[name] for name in fields if name in config})
         
         return {"message": "Monitoring configuration updated"}
     except Exception as e:
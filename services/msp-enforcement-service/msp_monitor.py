@@ -8,6 +8,7 @@ import structlog
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta, date
 import aiohttp
+import numpy as np
 from dataclasses import dataclass
 
 from models import (
@@ -18,8 +19,12 @@ from database import (
     get_active_msp_rates, get_current_market_prices, 
     store_msp_violation, get_mandi_info
 )
+from sampled_logging import SampledLogger
+from compliance_engine import MSPRateIndex, BatchComplianceEngine, ComplianceBatch, UNMATCHED, VIOLATION
 
 logger = structlog.get_logger()
+# Per-price and per-violation events are sampled and rate limited
+detection_log = SampledLogger.from_env(logger)
 
 @dataclass
 class MonitoringConfig:
@@ -39,7 +44,25 @@ class MSPMonitoringEngine:
         self.monitoring_task: Optional[asyncio.Task] = None
         self.session: Optional[aiohttp.ClientSession] = None
         self.current_msp_rates: Dict[str, MSPRate] = {}
+        self.rate_index = MSPRateIndex()
+        self.compliance_engine = self._build_compliance_engine()
         self.violation_cache: Dict[str, MSPViolation] = {}
+    
+    def _build_compliance_engine(self) -> BatchComplianceEngine:
+        return BatchComplianceEngine(
+            self.config.violation_threshold_percentage,
+            self.config.critical_threshold_percentage
+        )
+    
+    def update_config(self, **changes: Any):
+        """Apply monitoring config changes; thresholds take effect on the next comparison"""
+        unknown = [name for name in changes if not hasattr(self.config, name)]
+        if unknown:
+            raise ValueError(f"Unknown monitoring config fields: {', '.join(unknown)}")
+        for name, value in changes.items():
+            setattr(self.config, name, value)
+        self.compliance_engine = self._build_compliance_engine()
+        logger.info("Monitoring config updated", changes=changes)
         
     async def initialize(self):
         """Initialize the monitoring engine"""
@@ -106,31 +129,21 @@ class MSPMonitoringEngine:
             # Get current market prices
             market_prices = await self._get_current_market_prices()
             
-            # Compare prices against MSP
-            violations = []
-            comparisons = []
-            
-            for price_data in market_prices:
-                comparison = await self._compare_price_with_msp(price_data)
-                if comparison:
-                    comparisons.append(comparison)
-                    
-                    if comparison.compliance_status == "violation":
-                        violation = await self._create_violation_record(comparison)
-                        if violation:
-                            violations.append(violation)
+            # Compare all prices against MSP in one vectorized pass
+            batch = self.compliance_engine.evaluate(market_prices, self.rate_index)
+            violations = self.compliance_engine.violations(batch)
             
             # Process violations
             if violations:
                 await self._process_violations(violations)
             
             # Update monitoring stats
-            await self._update_monitoring_stats(comparisons, violations)
+            await self._update_monitoring_stats(batch, violations)
             
             processing_time = (datetime.utcnow() - start_time).total_seconds()
             logger.info(
                 "MSP monitoring cycle completed",
-                comparisons=len(comparisons),
+                comparisons=batch.compared,
                 violations=len(violations),
                 processing_time=processing_time
             )
@@ -146,6 +159,7 @@ class MSPMonitoringEngine:
                 f"{rate.commodity}_{rate.variety or 'default'}": rate 
                 for rate in msp_rates
             }
+            self.rate_index = MSPRateIndex(msp_rates)
             logger.info("Loaded MSP rates", count=len(self.current_msp_rates))
         except Exception as e:
             logger.error("Failed to load MSP rates", error=str(e))
@@ -176,99 +190,26 @@ class MSPMonitoringEngine:
     async def _compare_price_with_msp(self, price_data: Dict[str, Any]) -> Optional[MSPComparisonResult]:
         """Compare a market price with corresponding MSP rate"""
         try:
-            commodity = price_data.get("commodity")
-            variety = price_data.get("variety")
-            market_price = float(price_data.get("price", 0))
+            batch = self.compliance_engine.evaluate([price_data], self.rate_index)
             
-            if not commodity or market_price <= 0:
+            if batch.status[0] == UNMATCHED:
+                if price_data.get("commodity") and float(price_data.get("price", 0)) > 0:
+                    detection_log.debug(
+                        "No MSP rate found for commodity",
+                        commodity=price_data.get("commodity"),
+                        variety=price_data.get("variety")
+                    )
                 return None
             
-            # Find matching MSP rate
-            msp_key = f"{commodity}_{variety or 'default'}"
-            msp_rate = self.current_msp_rates.get(msp_key)
-            
-            if not msp_rate:
-                # Try without variety
-                msp_key = f"{commodity}_default"
-                msp_rate = self.current_msp_rates.get(msp_key)
-            
-            if not msp_rate:
-                logger.debug("No MSP rate found for commodity", commodity=commodity, variety=variety)
-                return None
-            
-            # Calculate price difference
-            price_difference = market_price - msp_rate.msp_price
-            violation_percentage = abs(price_difference) / msp_rate.msp_price * 100
-            
-            # Determine compliance status
-            compliance_status = "compliant"
-            if price_difference < 0:  # Market price below MSP
-                if violation_percentage >= self.config.violation_threshold_percentage:
-                    compliance_status = "violation"
-                else:
-                    compliance_status = "warning"
-            
-            return MSPComparisonResult(
-                commodity=commodity,
-                variety=variety,
-                mandi_id=price_data.get("mandi_id", ""),
-                mandi_name=price_data.get("mandi_name", ""),
-                location=f"{price_data.get('district', '')}, {price_data.get('state', '')}",
-                market_price=market_price,
-                msp_price=msp_rate.msp_price,
-                price_difference=price_difference,
-                compliance_status=compliance_status,
-                violation_percentage=violation_percentage if compliance_status != "compliant" else None,
-                data_confidence=price_data.get("confidence", 0.8)
-            )
+            return batch.comparison_at(0)
             
         except Exception as e:
             logger.error("Error comparing price with MSP", error=str(e))
             return None
     
-    async def _create_violation_record(self, comparison: MSPComparisonResult) -> Optional[MSPViolation]:
-        """Create a violation record from comparison result"""
-        try:
-            # Determine violation type and severity
-            violation_type = ViolationType.BELOW_MSP
-            
-            if comparison.violation_percentage >= self.config.critical_threshold_percentage:
-                severity = AlertSeverity.CRITICAL
-            elif comparison.violation_percentage >= 10.0:
-                severity = AlertSeverity.HIGH
-            elif comparison.violation_percentage >= 5.0:
-                severity = AlertSeverity.MEDIUM
-            else:
-                severity = AlertSeverity.LOW
-            
-            violation = MSPViolation(
-                commodity=comparison.commodity,
-                variety=comparison.variety,
-                mandi_id=comparison.mandi_id,
-                mandi_name=comparison.mandi_name,
-                district=comparison.location.split(",")[0].strip(),
-                state=comparison.location.split(",")[1].strip() if "," in comparison.location else "",
-                market_price=comparison.market_price,
-                msp_price=comparison.msp_price,
-                price_difference=comparison.price_difference,
-                violation_percentage=comparison.violation_percentage,
-                violation_type=violation_type,
-                severity=severity,
-                evidence={
-                    "comparison_data": comparison.dict(),
-                    "detection_method": "automated_monitoring",
-                    "data_confidence": comparison.data_confidence
-                }
-            )
-            
-            return violation
-            
-        except Exception as e:
-            logger.error("Error creating violation record", error=str(e))
-            return None
-    
     async def _process_violations(self, violations: List[MSPViolation]):
         """Process detected violations"""
+        to_alert: List[MSPViolation] = []
         for violation in violations:
             try:
                 # Check if this is a duplicate violation
@@ -284,19 +225,19 @@ class MSPMonitoringEngine:
                         existing_violation.detected_at = violation.detected_at
                         await store_msp_violation(existing_violation)
                         
-                        # Trigger immediate alert for worsening violation
-                        await self._trigger_immediate_alert(existing_violation)
+                        # Alert again for worsening violation
+                        to_alert.append(existing_violation)
                     continue
                 
                 # Store new violation
                 await store_msp_violation(violation)
                 self.violation_cache[violation_key] = violation
                 
-                # Trigger immediate alert for new violation
-                await self._trigger_immediate_alert(violation)
+                # Alert for new violation
+                to_alert.append(violation)
                 
-                logger.warning(
-                    "MSP violation detected and alert triggered",
+                detection_log.warning(
+                    "MSP violation detected",
                     commodity=violation.commodity,
                     mandi=violation.mandi_name,
                     market_price=violation.market_price,
@@ -307,9 +248,13 @@ class MSPMonitoringEngine:
                 
             except Exception as e:
                 logger.error("Error processing violation", error=str(e))
+        
+        # One batched fan-out for the whole cycle
+        if to_alert:
+            await self._trigger_alerts(to_alert)
     
-    async def _trigger_immediate_alert(self, violation: MSPViolation):
-        """Trigger immediate alert for MSP violation"""
+    async def _trigger_alerts(self, violations: List[MSPViolation]):
+        """Trigger alerts for a batch of MSP violations"""
         try:
             # Import here to avoid circular imports
             from alert_system import MSPAlertSystem
@@ -319,36 +264,40 @@ class MSPMonitoringEngine:
                 self._alert_system = MSPAlertSystem()
                 await self._alert_system.initialize()
             
-            # Process violation and generate alerts
-            alerts = await self._alert_system.process_violation(violation)
+            # Process violations and generate alerts
+            alerts = await self._alert_system.process_violations(violations)
             
-            logger.info(
-                "Immediate alerts generated for violation",
-                violation_id=violation.id,
-                alerts_count=len(alerts),
-                severity=violation.severity.value
+            detection_log.info(
+                "Immediate alerts generated for violations",
+                violations=len(violations),
+                alerts_count=len(alerts)
             )
             
         except Exception as e:
-            logger.error("Error triggering immediate alert", violation_id=violation.id, error=str(e))
+            logger.error("Error triggering alerts", violations=len(violations), error=str(e))
     
-    async def _update_monitoring_stats(self, comparisons: List[MSPComparisonResult], violations: List[MSPViolation]):
+    async def _update_monitoring_stats(self, batch: ComplianceBatch, violations: List[MSPViolation]):
         """Update monitoring statistics"""
         try:
-            total_comparisons = len(comparisons)
+            compared = batch.status != UNMATCHED
+            total_comparisons = int(compared.sum())
             total_violations = len(violations)
             compliance_rate = ((total_comparisons - total_violations) / total_comparisons * 100) if total_comparisons > 0 else 100
             
-            # Find most violated commodity
-            commodity_violations = {}
-            for violation in violations:
-                commodity_violations[violation.commodity] = commodity_violations.get(violation.commodity, 0) + 1
-            
-            most_violated_commodity = max(commodity_violations.keys(), key=commodity_violations.get) if commodity_violations else None
+            # Most violated commodity, counted per rate id
+            violated_rates = batch.rate_ids[batch.status == VIOLATION]
+            most_violated_commodity = None
+            if len(violated_rates):
+                counts = {}
+                for rate_id, count in zip(*np.unique(violated_rates, return_counts=True)):
+                    commodity = self.rate_index.rates[rate_id].commodity
+                    counts[commodity] = counts.get(commodity, 0) + int(count)
+                most_violated_commodity = max(counts, key=counts.get)
             
+            compared_rows = [batch.rows[i] for i in np.flatnonzero(compared).tolist()]
             stats = MSPMonitoringStats(
-                total_commodities_monitored=len(set(c.commodity for c in comparisons)),
-                total_mandis_monitored=len(set(c.mandi_id for c in comparisons)),
+                total_commodities_monitored=len(set(row.get("commodity") for row in compared_rows)),
+                total_mandis_monitored=len(set(row.get("mandi_id", "") for row in compared_rows)),
                 violations_detected_today=total_violations,
                 violations_resolved_today=0,  # Would be calculated from database
                 average_compliance_rate=compliance_rate,
@@ -0,0 +1,216 @@
+"""
+Procurement Center Index
+In-memory geospatial index of operational procurement centers by commodity
+"""
+
+import heapq
+import math
+import structlog
+from datetime import datetime
+from typing import List, Dict, Optional, Tuple, Iterable
+
+from models import ProcurementCenter
+from database import get_procurement_centers
+
+logger = structlog.get_logger()
+
+EARTH_RADIUS_KM = 6371.0
+
+# Approximate district coordinates, used when a center has no latitude/longitude
+DISTRICT_COORDINATES: Dict[Tuple[str, str], Tuple[float, float]] = {
+    ("new delhi", "delhi"): (28.61, 77.21),
+    ("north delhi", "delhi"): (28.69, 77.21),
+    ("ludhiana", "punjab"): (30.90, 75.85),
+    ("amritsar", "punjab"): (31.63, 74.87),
+    ("fatehgarh sahib", "punjab"): (30.65, 76.39),
+    ("karnal", "haryana"): (29.69, 76.99),
+    ("panchkula", "haryana"): (30.69, 76.86),
+    ("meerut", "uttar pradesh"): (28.98, 77.71),
+    ("pune", "maharashtra"): (18.52, 73.86),
+    ("ahmedabad", "gujarat"): (23.02, 72.57),
+    ("jaipur", "rajasthan"): (26.91, 75.79),
+    ("bangalore urban", "karnataka"): (12.97, 77.59),
+}
+
+# Approximate state centroids, the fallback for unknown districts
+STATE_COORDINATES: Dict[str, Tuple[float, float]] = {
+    "punjab": (30.9, 75.4),
+    "haryana": (29.1, 76.1),
+    "delhi": (28.65, 77.2),
+    "uttar pradesh": (26.8, 80.9),
+    "madhya pradesh": (23.5, 77.9),
+    "maharashtra": (19.4, 75.7),
+    "gujarat": (22.7, 71.6),
+    "rajasthan": (26.6, 73.8),
+    "karnataka": (15.3, 75.7),
+    "andhra pradesh": (15.9, 79.7),
+    "telangana": (17.9, 79.1),
+    "tamil nadu": (11.1, 78.7),
+    "kerala": (10.5, 76.3),
+    "west bengal": (23.0, 87.9),
+    "bihar": (25.6, 85.5),
+    "odisha": (20.5, 84.4),
+    "jharkhand": (23.6, 85.3),
+    "chhattisgarh": (21.3, 81.9),
+    "assam": (26.2, 92.9),
+    "himachal pradesh": (31.9, 77.2),
+    "uttarakhand": (30.1, 79.0),
+}
+
+def locate(district: Optional[str], state: Optional[str]) -> Optional[Tuple[float, float]]:
+    """Approximate (latitude, longitude) of a district, else its state"""
+    state_key = (state or "").strip().lower()
+    coordinates = DISTRICT_COORDINATES.get(((district or "").strip().lower(), state_key))
+    return coordinates or STATE_COORDINATES.get(state_key)
+
+def center_coordinates(center: ProcurementCenter) -> Optional[Tuple[float, float]]:
+    if center.latitude is not None and center.longitude is not None:
+        return center.latitude, center.longitude
+    return locate(center.district, center.state)
+
+def _unit_vector(latitude: float, longitude: float) -> Tuple[float, float, float]:
+    lat, lon = math.radians(latitude), math.radians(longitude)
+    return math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat)
+
+def _chord_from_km(distance_km: float) -> float:
+    return 2 * math.sin(min(distance_km / EARTH_RADIUS_KM, math.pi) / 2)
+
+def _km_from_chord(chord: float) -> float:
+    return 2 * EARTH_RADIUS_KM * math.asin(min(chord / 2, 1.0))
+
+def great_circle_km(origin: Tuple[float, float], destination: Tuple[float, float]) -> float:
+    """Great-circle distance in km between two (latitude, longitude) points"""
+    return _km_from_chord(math.dist(_unit_vector(*origin), _unit_vector(*destination)))
+
+class _KDTree:
+    """3-d tree over points on the unit sphere.
+
+    Straight-line (chord) distance between unit vectors grows monotonically
+    with great-circle distance, so nearest-by-chord is nearest-by-km.
+    """
+
+    def __init__(self, points: List[Tuple[float, float, float]]):
+        self.points = points
+        self.root = self._build(list(range(len(points))), 0)
+
+    def _build(self, indices: List[int], depth: int):
+        if not indices:
+            return None
+        axis = depth % 3
+        indices.sort(key=lambda i: self.points[i][axis])
+        mid = len(indices) // 2
+        return (
+            indices[mid], axis,
+            self._build(indices[:mid], depth + 1),
+            self._build(indices[mid + 1:], depth + 1)
+        )
+
+    def nearest(self, target: Tuple[float, float, float], k: int, max_chord: float) -> List[Tuple[float, int]]:
+        """Up to k (squared chord, point index) pairs within max_chord, closest first"""
+        heap: List[Tuple[float, int]] = []  # max-heap of (-squared chord, index)
+        radius2 = max_chord * max_chord
+
+        def limit() -> float:
+            return -heap[0][0] if len(heap) == k else radius2
+
+        # Each entry carries a lower bound on the squared distance to its subtree
+        stack = [(self.root, 0.0)]
+        while stack:
+            node, bound = stack.pop()
+            if node is None or bound > limit():
+                continue
+            index, axis, left, right = node
+            point = self.points[index]
+            d2 = (
+                (point[0] - target[0]) ** 2 +
+                (point[1] - target[1]) ** 2 +
+                (point[2] - target[2]) ** 2
+            )
+            if d2 <= limit():
+                if len(heap) == k:
+                    heapq.heapreplace(heap, (-d2, index))
+                else:
+                    heapq.heappush(heap, (-d2, index))
+
+            diff = target[axis] - point[axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            stack.append((far, max(bound, diff * diff)))
+            stack.append((near, bound))
+
+        return sorted((-d2, index) for d2, index in heap)
+
+class ProcurementCenterIndex:
+    """Operational procurement centers per accepted commodity, searchable by distance"""
+
+    def __init__(self):
+        self._centers: Dict[str, List[ProcurementCenter]] = {}
+        self._trees: Dict[str, _KDTree] = {}
+        self.center_count = 0
+        self.unlocated_count = 0
+        self.refreshed_at: Optional[datetime] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.refreshed_at is not None
+
+    def load(self, centers: Iterable[ProcurementCenter]):
+        """Replace the index contents with the given centers"""
+        by_commodity: Dict[str, List[ProcurementCenter]] = {}
+        points: Dict[str, List[Tuple[float, float, float]]] = {}
+        count = unlocated = 0
+
+        for center in centers:
+            if not center.is_operational:
+                continue
+            coordinates = center_coordinates(center)
+            if coordinates is None:
+                unlocated += 1
+                continue
+            count += 1
+            vector = _unit_vector(*coordinates)
+            for commodity in {c.strip().lower() for c in center.commodities_accepted if c}:
+                by_commodity.setdefault(commodity, []).append(center)
+                points.setdefault(commodity, []).append(vector)
+
+        trees = {commodity: _KDTree(vectors) for commodity, vectors in points.items()}
+        self._centers, self._trees = by_commodity, trees
+        self.center_count, self.unlocated_count = count, unlocated
+        self.refreshed_at = datetime.utcnow()
+
+        logger.info(
+            "Procurement center index built",
+            centers=count,
+            commodities=len(trees),
+            unlocated=unlocated
+        )
+
+    async def refresh(self) -> int:
+        """Reload all operational centers from the database"""
+        try:
+            centers = await get_procurement_centers(is_operational=True)
+            self.load(centers)
+            return self.center_count
+        except Exception as e:
+            logger.error("Error refreshing procurement center index", error=str(e))
+            return 0
+
+    def nearest(
+        self,
+        commodity: str,
+        latitude: float,
+        longitude: float,
+        k: int = 6,
+        radius_km: float = 500.0
+    ) -> List[Tuple[ProcurementCenter, float]]:
+        """k nearest centers accepting the commodity within radius_km, as (center, distance_km)"""
+        key = (commodity or "").strip().lower()
+        tree = self._trees.get(key)
+        if tree is None or k <= 0:
+            return []
+
+        matches = tree.nearest(_unit_vector(latitude, longitude), k, _chord_from_km(radius_km))
+        centers = self._centers[key]
+        return [(centers[index], _km_from_chord(math.sqrt(d2))) for d2, index in matches]
+
+# Shared by every MSPAlertSystem and refreshed after procurement center syncs
+procurement_center_index = ProcurementCenterIndex()
@@ -0,0 +1,483 @@
+"""
+Streaming Compliance Report Pipeline
+Chunked violation reads, incremental aggregates and streaming CSV/XLSX writers
+"""
+
+import csv
+import io
+import json
+import math
+import re
+import zipfile
+import structlog
+from datetime import date, datetime
+from typing import List, Dict, Any, Optional, Tuple, Iterable, AsyncIterator
+from xml.sax.saxutils import escape
+
+import database
+from models import MSPViolation, MSPComplianceReport, ViolationType, AlertSeverity
+
+logger = structlog.get_logger()
+
+STREAM_CHUNK_SIZE = 1000
+
+EXPORT_COLUMNS = [
+    "id", "detected_at", "commodity", "variety", "mandi_id", "mandi_name",
+    "district", "state", "market_price", "msp_price", "price_difference",
+    "violation_percentage", "severity", "violation_type", "is_resolved", "resolved_at"
+]
+
+def violation_query(
+    start_date: date,
+    end_date: date,
+    region: str,
+    commodity: Optional[str],
+    after: Optional[Tuple[datetime, str]] = None,
+    limit: Optional[int] = None
+) -> Tuple[str, List[Any]]:
+    """SQL and parameters selecting violations for a period, region and commodity.
+
+    Rows are ordered newest first by (detected_at, id); `after` is the key of
+    the last row already read and `limit` bounds the page, for keyset paging.
+    """
+    query = """
+        SELECT * FROM msp_violations
+        WHERE detected_at::date BETWEEN $1 AND $2
+    """
+    params: List[Any] = [start_date, end_date]
+
+    # Add region filter
+    if region != "national":
+        if "," in region:  # State, District format
+            state, district = region.split(",", 1)
+            query += " AND LOWER(state) = LOWER($3) AND LOWER(district) = LOWER($4)"
+            params.extend([state.strip(), district.strip()])
+        else:  # State only
+            query += " AND LOWER(state) = LOWER($3)"
+            params.append(region)
+
+    # Add commodity filter
+    if commodity:
+        param_num = len(params) + 1
+        query += f" AND LOWER(commodity) = LOWER(${param_num})"
+        params.append(commodity)
+
+    if after is not None:
+        param_num = len(params) + 1
+        query += f" AND (detected_at, id) < (${param_num}, ${param_num + 1})"
+        params.extend(after)
+
+    query += " ORDER BY detected_at DESC, id DESC"
+    if limit is not None:
+        query += f" LIMIT {int(limit)}"
+    return query, params
+
+def export_filename(region: str, start_date: date, end_date: date, extension: str) -> str:
+    """Download filename safe to quote in a Content-Disposition header"""
+    slug = re.sub(r"[^A-Za-z0-9_-]+", "_", region.replace(" ", "")).strip("_")[:64] or "region"
+    return f"msp_compliance_{slug}_{start_date}_{end_date}.{extension}"
+
+def violation_from_row(row) -> MSPViolation:
+    return MSPViolation(
+        id=row['id'],
+        commodity=row['commodity'],
+        variety=row['variety'],
+        mandi_id=row['mandi_id'],
+        mandi_name=row['mandi_name'],
+        district=row['district'],
+        state=row['state'],
+        market_price=float(row['market_price']),
+        msp_price=float(row['msp_price']),
+        price_difference=float(row['price_difference']),
+        violation_percentage=float(row['violation_percentage']),
+        violation_type=ViolationType(row['violation_type']),
+        detected_at=row['detected_at'],
+        severity=AlertSeverity(row['severity']),
+        is_resolved=row['is_resolved'],
+        resolution_notes=row['resolution_notes'],
+        resolved_at=row['resolved_at'],
+        evidence=json.loads(row['evidence']) if row['evidence'] else None
+    )
+
+async def iter_violations(
+    start_date: date,
+    end_date: date,
+    region: str = "national",
+    commodity: Optional[str] = None,
+    chunk_size: int = STREAM_CHUNK_SIZE
+) -> AsyncIterator[List[MSPViolation]]:
+    """Violations for the period in chunks, read with keyset pagination.
+
+    Each chunk is one short query on a freshly acquired connection, so a slow
+    download never pins a pool connection or holds a transaction open.
+    """
+    if not database._pool:
+        return
+
+    after: Optional[Tuple[datetime, str]] = None
+    while True:
+        query, params = violation_query(start_date, end_date, region, commodity, after, chunk_size)
+        async with database._pool.acquire() as conn:
+            rows = await conn.fetch(query, *params)
+        if not rows:
+            break
+        yield [violation_from_row(row) for row in rows]
+        if len(rows) < chunk_size:
+            break
+        after = (rows[-1]['detected_at'], rows[-1]['id'])
+
+def violation_row(violation: MSPViolation) -> List[Any]:
+    """Export row in EXPORT_COLUMNS order"""
+    return [
+        violation.id,
+        violation.detected_at.isoformat(),
+        violation.commodity,
+        violation.variety or "",
+        violation.mandi_id,
+        violation.mandi_name,
+        violation.district,
+        violation.state,
+        violation.market_price,
+        violation.msp_price,
+        violation.price_difference,
+        round(violation.violation_percentage, 2),
+        violation.severity.value,
+        violation.violation_type.value,
+        violation.is_resolved,
+        violation.resolved_at.isoformat() if violation.resolved_at else ""
+    ]
+
+def _count(counter: Dict[str, int], key: str):
+    counter[key] = counter.get(key, 0) + 1
+
+class ViolationAggregates:
+    """Running report aggregates; memory grows with distinct keys, not violations"""
+
+    def __init__(self):
+        self.total = 0
+        self.resolved = 0
+        self.critical = 0
+        self.high = 0
+        self.percentage_sum = 0.0
+        self.max_percentage = 0.0
+        self.losses = 0.0
+        self.critical_losses = 0.0
+        self.high_losses = 0.0
+        self.by_state: Dict[str, int] = {}
+        self.by_location: Dict[str, int] = {}
+        self.by_commodity: Dict[str, int] = {}
+        self.by_severity: Dict[str, int] = {}
+        self.by_day: Dict[str, int] = {}
+        self.state_losses: Dict[str, float] = {}
+        self.commodity_losses: Dict[str, float] = {}
+
+    @classmethod
+    def from_violations(cls, violations: Iterable[MSPViolation]) -> "ViolationAggregates":
+        aggregates = cls()
+        aggregates.update(violations)
+        return aggregates
+
+    def update(self, violations: Iterable[MSPViolation]):
+        for violation in violations:
+            self.add(violation)
+
+    def add(self, violation: MSPViolation):
+        loss = abs(violation.price_difference)
+        if self.total == 0 or violation.violation_percentage > self.max_percentage:
+            self.max_percentage = violation.violation_percentage
+        self.total += 1
+        self.percentage_sum += violation.violation_percentage
+        self.losses += loss
+        if violation.is_resolved:
+            self.resolved += 1
+        if violation.severity == AlertSeverity.CRITICAL:
+            self.critical += 1
+            self.critical_losses += loss
+        elif violation.severity == AlertSeverity.HIGH:
+            self.high += 1
+            self.high_losses += loss
+
+        _count(self.by_state, violation.state)
+        _count(self.by_location, f"{violation.district}, {violation.state}")
+        _count(self.by_commodity, violation.commodity)
+        _count(self.by_severity, violation.severity.value)
+        _count(self.by_day, violation.detected_at.date().isoformat())
+        self.state_losses[violation.state] = self.state_losses.get(violation.state, 0) + loss
+        self.commodity_losses[violation.commodity] = self.commodity_losses.get(violation.commodity, 0) + loss
+
+    @property
+    def average_percentage(self) -> float:
+        return self.percentage_sum / self.total if self.total else 0
+
+    @property
+    def estimated_affected_farmers(self) -> int:
+        return self.total * 10  # Rough estimate: 10 farmers per violation
+
+    def market_analysis(self, start_date: date, end_date: date) -> Dict[str, Any]:
+        analysis = {
+            "period": {
+                "start_date": start_date.isoformat(),
+                "end_date": end_date.isoformat(),
+                "duration_days": (end_date - start_date).days
+            },
+            "violation_statistics": {},
+            "geographic_distribution": {},
+            "commodity_analysis": {},
+            "severity_breakdown": {},
+            "temporal_patterns": {},
+            "market_trends": {}
+        }
+
+        if not self.total:
+            return analysis
+
+        analysis["violation_statistics"] = {
+            "total_violations": self.total,
+            "resolved_violations": self.resolved,
+            "unresolved_violations": self.total - self.resolved,
+            "critical_violations": self.critical,
+            "resolution_rate": self.resolved / self.total * 100,
+            "average_violation_percentage": self.average_percentage,
+            "max_violation_percentage": self.max_percentage,
+            "total_farmer_losses": self.losses
+        }
+
+        analysis["geographic_distribution"] = {
+            "by_state": dict(sorted(self.by_state.items(), key=lambda x: x[1], reverse=True)),
+            "by_district": dict(sorted(self.by_location.items(), key=lambda x: x[1], reverse=True)[:20]),
+            "most_affected_state": max(self.by_state.keys(), key=self.by_state.get),
+            "most_affected_district": max(self.by_location.keys(), key=self.by_location.get)
+        }
+
+        analysis["commodity_analysis"] = {
+            "by_commodity": dict(sorted(self.by_commodity.items(), key=lambda x: x[1], reverse=True)),
+            "losses_by_commodity": dict(sorted(self.commodity_losses.items(), key=lambda x: x[1], reverse=True)),
+            "most_violated_commodity": max(self.by_commodity.keys(), key=self.by_commodity.get),
+            "highest_loss_commodity": max(self.commodity_losses.keys(), key=self.commodity_losses.get)
+        }
+
+        analysis["severity_breakdown"] = dict(self.by_severity)
+
+        analysis["temporal_patterns"] = {
+            "daily_violations": dict(self.by_day),
+            "peak_violation_day": max(self.by_day.keys(), key=self.by_day.get),
+            "average_daily_violations": sum(self.by_day.values()) / len(self.by_day)
+        }
+
+        # Market trends (would integrate with price discovery service)
+        average = self.average_percentage
+        analysis["market_trends"] = {
+            "price_volatility": "High" if average > 15 else "Medium" if average > 5 else "Low",
+            "market_stability": "Unstable" if self.critical > self.total * 0.3 else "Stable",
+            "intervention_needed": self.critical > 0 or self.total > 50
+        }
+
+        return analysis
+
+    def farmer_impact(self) -> Dict[str, Any]:
+        if not self.total:
+            return {}
+
+        farmers = self.estimated_affected_farmers
+        return {
+            "financial_impact": {
+                "total_estimated_losses": round(self.losses, 2),
+                "average_loss_per_violation": round(self.losses / self.total, 2),
+                "estimated_affected_farmers": farmers,
+                "average_loss_per_farmer": round(self.losses / farmers, 2) if farmers > 0 else 0
+            },
+            "severity_impact": {
+                "critical_impact_cases": self.critical,
+                "high_impact_cases": self.high,
+                "critical_impact_losses": self.critical_losses,
+                "high_impact_losses": self.high_losses
+            },
+            "geographic_impact": dict(sorted(
+                ((state, {"violations": self.by_state[state], "losses": losses})
+                 for state, losses in self.state_losses.items()),
+                key=lambda x: x[1]["losses"],
+                reverse=True
+            )),
+            "commodity_impact": dict(sorted(
+                ((commodity, {"violations": self.by_commodity[commodity], "losses": losses})
+                 for commodity, losses in self.commodity_losses.items()),
+                key=lambda x: x[1]["losses"],
+                reverse=True
+            ))
+        }
+
+    def to_report(
+        self,
+        start_date: date,
+        end_date: date,
+        region: str,
+        recommendations: List[str],
+        evidence_files: Optional[List[str]] = None,
+        report_id: Optional[str] = None
+    ) -> MSPComplianceReport:
+        fields = dict(
+            report_period_start=start_date,
+            report_period_end=end_date,
+            region=region,
+            total_violations=self.total,
+            violations_by_commodity=dict(self.by_commodity),
+            violations_by_location=dict(self.by_location),
+            average_violation_percentage=round(self.average_percentage, 2),
+            most_affected_farmers=self.estimated_affected_farmers,
+            estimated_farmer_losses=round(self.losses, 2),
+            recommendations=recommendations,
+            evidence_files=evidence_files or []
+        )
+        if report_id:
+            fields["id"] = report_id
+        return MSPComplianceReport(**fields)
+
+    def summary_rows(self) -> List[Tuple[str, Any]]:
+        """Headline figures for the end of a spreadsheet export"""
+        return [
+            ("total_violations", self.total),
+            ("resolved_violations", self.resolved),
+            ("critical_violations", self.critical),
+            ("average_violation_percentage", round(self.average_percentage, 2)),
+            ("max_violation_percentage", round(self.max_percentage, 2)),
+            ("estimated_farmer_losses", round(self.losses, 2)),
+            ("estimated_affected_farmers", self.estimated_affected_farmers)
+        ]
+
+class CSVReportWriter:
+    """Violation rows as CSV, emitted chunk by chunk"""
+    media_type = "text/csv"
+    extension = "csv"
+
+    def __init__(self, columns: List[str] = EXPORT_COLUMNS):
+        self.columns = columns
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+
+    def begin(self) -> bytes:
+        self._writer.writerow(self.columns)
+        return self._drain()
+
+    def write_rows(self, rows: Iterable[List[Any]]) -> bytes:
+        self._writer.writerows(rows)
+        return self._drain()
+
+    def finish(self, summary: List[Tuple[str, Any]]) -> bytes:
+        # The summary is stored with the compliance report, not in the CSV
+        return b""
+
+    def _drain(self) -> bytes:
+        data = self._buffer.getvalue().encode("utf-8")
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+class _ChunkSink(io.RawIOBase):
+    """Unseekable byte sink; zipfile writes streamed members with data descriptors"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+_XLSX_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
+<Override PartName="/xl/worksheets/sheet2.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
+</Types>"""
+
+_XLSX_ROOT_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>"""
+
+_XLSX_WORKBOOK = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<sheets>
+<sheet name="Violations" sheetId="1" r:id="rId1"/>
+<sheet name="Summary" sheetId="2" r:id="rId2"/>
+</sheets>
+</workbook>"""
+
+_XLSX_WORKBOOK_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>
+<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet2.xml"/>
+</Relationships>"""
+
+_XLSX_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_XLSX_SHEET_END = "</sheetData></worksheet>"
+
+def _xlsx_cell(value: Any) -> str:
+    if value is None:
+        return "<c/>"
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        # NaN and infinity have no spreadsheet representation; leave the cell empty
+        if isinstance(value, float) and not math.isfinite(value):
+            return "<c/>"
+        return f"<c><v>{value}</v></c>"
+    return f'<c t="inlineStr"><is><t>{escape(str(value))}</t></is></c>'
+
+class XLSXReportWriter:
+    """Violation rows as an Excel workbook, streamed without holding the sheet in memory.
+
+    The workbook is a zip written to an unseekable sink, so each chunk of rows
+    is deflated and handed out as soon as it is written. A second sheet holds
+    the summary figures once all rows are known.
+    """
+    media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    extension = "xlsx"
+
+    def __init__(self, columns: List[str] = EXPORT_COLUMNS):
+        self.columns = columns
+        self._sink = _ChunkSink()
+        self._zip = zipfile.ZipFile(self._sink, "w", compression=zipfile.ZIP_DEFLATED)
+        self._sheet = None
+        self._row = 0
+
+    def begin(self) -> bytes:
+        self._zip.writestr("[Content_Types].xml", _XLSX_CONTENT_TYPES)
+        self._zip.writestr("_rels/.rels", _XLSX_ROOT_RELS)
+        self._zip.writestr("xl/workbook.xml", _XLSX_WORKBOOK)
+        self._zip.writestr("xl/_rels/workbook.xml.rels", _XLSX_WORKBOOK_RELS)
+        self._sheet = self._zip.open("xl/worksheets/sheet1.xml", "w", force_zip64=True)
+        self._sheet.write(_XLSX_SHEET_START.encode("utf-8"))
+        return self.write_rows([self.columns])
+
+    def write_rows(self, rows: Iterable[List[Any]]) -> bytes:
+        parts = []
+        for row in rows:
+            self._row += 1
+            parts.append(f'<row r="{self._row}">{"".join(_xlsx_cell(value) for value in row)}</row>')
+        self._sheet.write("".join(parts).encode("utf-8"))
+        return self._sink.drain()
+
+    def finish(self, summary: List[Tuple[str, Any]]) -> bytes:
+        self._sheet.write(_XLSX_SHEET_END.encode("utf-8"))
+        self._sheet.close()
+
+        rows = "".join(
+            f'<row r="{i}">{_xlsx_cell(name)}{_xlsx_cell(value)}</row>'
+            for i, (name, value) in enumerate([("metric", "value")] + summary, 1)
+        )
+        self._zip.writestr("xl/worksheets/sheet2.xml", _XLSX_SHEET_START + rows + _XLSX_SHEET_END)
+        self._zip.close()
+        return self._sink.drain()
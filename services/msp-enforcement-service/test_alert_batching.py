@@ -0,0 +1,136 @@
+"""
+Unit tests for batched MSP violation alert fan-out
+"""
+
+import asyncio
+
+import pytest
+
+import alert_system
+from alert_system import MSPAlertSystem
+from models import MSPViolation, ViolationType, AlertSeverity
+
+def make_violation(mandi_id, district, commodity="Wheat", market_price=1900.0):
+    msp_price = 2125.0
+    return MSPViolation(
+        commodity=commodity,
+        mandi_id=mandi_id,
+        mandi_name=f"Mandi {mandi_id}",
+        district=district,
+        state="Punjab",
+        market_price=market_price,
+        msp_price=msp_price,
+        price_difference=market_price - msp_price,
+        violation_percentage=(msp_price - market_price) / msp_price * 100,
+        violation_type=ViolationType.BELOW_MSP,
+        severity=AlertSeverity.HIGH
+    )
+
+async def fake_nearby_mandis(state, district, commodity, radius_km=200, min_price=0):
+    return [{
+        'mandi_id': f'{district}_nearby',
+        'mandi_name': f'{district} Nearby Mandi',
+        'location': f'{district}, {state}',
+        'price': min_price * 1.1,
+        'distance_km': 40.0,
+        'confidence': 0.8
+    }]
+
+@pytest.mark.asyncio
+async def test_alternatives_searched_once_per_group(monkeypatch):
+    stored = {"alerts": [], "suggestions": []}
+
+    async def store_alerts(alerts):
+        stored["alerts"].append(list(alerts))
+        return True
+
+    async def store_suggestions(suggestions):
+        stored["suggestions"].append(list(suggestions))
+        return True
+
+    monkeypatch.setattr(alert_system, "store_msp_alerts", store_alerts)
+    monkeypatch.setattr(alert_system, "store_alternative_suggestions", store_suggestions)
+    monkeypatch.setattr(alert_system, "get_nearby_mandis", fake_nearby_mandis)
+
+    system = MSPAlertSystem()
+    searched = []
+    find_alternatives = system._find_alternatives
+
+    async def counting_find_alternatives(violation):
+        searched.append(violation.mandi_id)
+        return await find_alternatives(violation)
+
+    monkeypatch.setattr(system, "_find_alternatives", counting_find_alternatives)
+
+    violations = [
+        make_violation("ludhiana_1", "Ludhiana", market_price=1950.0),
+        make_violation("ludhiana_2", "Ludhiana", market_price=1800.0),
+        make_violation("ludhiana_3", "Ludhiana", market_price=1900.0),
+        make_violation("amritsar_1", "Amritsar"),
+        make_violation("ludhiana_rice", "Ludhiana", commodity="Rice")
+    ]
+
+    alerts = await system.process_violations(violations)
+
+    # Three (commodity, district) groups, each searched for its worst violation
+    assert sorted(searched) == ["amritsar_1", "ludhiana_2", "ludhiana_rice"]
+
+    # A main alert and an alternatives alert per violation, stored in one batch
+    assert len(stored["alerts"]) == 1 and stored["alerts"][0] == alerts
+    main_alerts = [a for a in alerts if a.severity == AlertSeverity.HIGH]
+    assert [a.violation_id for a in main_alerts] == [v.id for v in violations]
+    assert len(alerts) == 2 * len(violations)
+    assert system.notification_queue.qsize() == len(alerts)
+
+    # Shared suggestions are stored once per group, not once per violation
+    assert len(stored["suggestions"]) == 1
+    assert len({s.id for s in stored["suggestions"][0]}) == len(stored["suggestions"][0])
+
+@pytest.mark.asyncio
+async def test_single_violation_uses_batch_path(monkeypatch):
+    batches = []
+
+    async def store_alerts(alerts):
+        batches.append(len(alerts))
+        return True
+
+    async def store_suggestions(suggestions):
+        return True
+
+    monkeypatch.setattr(alert_system, "store_msp_alerts", store_alerts)
+    monkeypatch.setattr(alert_system, "store_alternative_suggestions", store_suggestions)
+    monkeypatch.setattr(alert_system, "get_nearby_mandis", fake_nearby_mandis)
+
+    alerts = await MSPAlertSystem().process_violation(make_violation("m1", "Ludhiana"))
+
+    assert batches == [len(alerts)]
+    assert alerts[0].severity == AlertSeverity.HIGH
+
+@pytest.mark.asyncio
+async def test_alternative_searches_are_bounded(monkeypatch):
+    async def store(items):
+        return True
+
+    monkeypatch.setattr(alert_system, "store_msp_alerts", store)
+    monkeypatch.setattr(alert_system, "store_alternative_suggestions", store)
+
+    system = MSPAlertSystem(concurrency=3)
+    in_flight = {"now": 0, "peak": 0}
+
+    async def slow_find_alternatives(violation):
+        in_flight["now"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        await asyncio.sleep(0.01)
+        in_flight["now"] -= 1
+        return []
+
+    monkeypatch.setattr(system, "_find_alternatives", slow_find_alternatives)
+
+    violations = [make_violation(f"m{i}", f"District {i}") for i in range(12)]
+    alerts = await system.process_violations(violations)
+
+    assert len(alerts) == len(violations)
+    assert in_flight["peak"] == 3
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,124 @@
+"""
+Unit tests for indexed MSP rate lookup and batch compliance checks
+"""
+
+import random
+from datetime import date
+
+import pytest
+
+from models import MSPRate, MSPSeason, MSPCommodityType, AlertSeverity
+from compliance_engine import MSPRateIndex, BatchComplianceEngine, UNMATCHED, COMPLIANT, WARNING, VIOLATION
+from msp_monitor import MSPMonitoringEngine
+
+def make_rate(commodity, msp_price, variety=None):
+    return MSPRate(
+        commodity=commodity,
+        variety=variety,
+        season=MSPSeason.RABI,
+        crop_year="2023-24",
+        msp_price=msp_price,
+        commodity_type=MSPCommodityType.CEREALS,
+        effective_date=date(2023, 4, 1),
+        announcement_date=date(2023, 3, 15)
+    )
+
+RATES = [
+    make_rate("Wheat", 2000.0),
+    make_rate("Wheat", 2200.0, "Durum"),
+    make_rate("Rice", 1000.0),
+    make_rate("Rice", 1100.0)  # later rate wins
+]
+
+def test_rate_index_falls_back_to_default_variety():
+    index = MSPRateIndex(RATES)
+    assert len(index) == 3
+    assert index.msp_prices[index.rate_id("Wheat", "Durum")] == 2200.0
+    assert index.msp_prices[index.rate_id("Wheat", "Sharbati")] == 2000.0
+    assert index.msp_prices[index.rate_id("Wheat", None)] == 2000.0
+    assert index.msp_prices[index.rate_id("Rice", None)] == 1100.0
+    assert index.rate_id("Cotton", None) == UNMATCHED
+
+def test_status_and_severity_thresholds():
+    engine = BatchComplianceEngine()
+    rows = [
+        {"commodity": "Wheat", "price": 2100.0, "mandi_id": "m1"},   # compliant
+        {"commodity": "Wheat", "price": 1950.0, "mandi_id": "m2"},   # 2.5% below: warning
+        {"commodity": "Wheat", "price": 1900.0, "mandi_id": "m3"},   # 5% below: violation
+        {"commodity": "Wheat", "price": 1790.0, "mandi_id": "m4"},   # 10.5% below: high
+        {"commodity": "Wheat", "variety": "Durum", "price": 1950.0, "district": "Ludhiana", "state": "Punjab"},
+        {"commodity": "Cotton", "price": 5000.0},
+        {"commodity": "Wheat", "price": 0},
+        {"price": 1000.0}
+    ]
+
+    batch = engine.evaluate(rows, MSPRateIndex(RATES))
+
+    assert batch.status.tolist() == [COMPLIANT, WARNING, VIOLATION, VIOLATION, VIOLATION, UNMATCHED, UNMATCHED, UNMATCHED]
+    assert batch.compared == 5
+    assert batch.comparison_at(0).violation_percentage is None
+    assert [c.mandi_id for c in engine.warnings(batch)] == ["m2"]
+
+    violations = engine.violations(batch)
+    assert [v.severity for v in violations] == [AlertSeverity.MEDIUM, AlertSeverity.HIGH, AlertSeverity.HIGH]
+    durum = violations[-1]
+    assert (durum.msp_price, durum.district, durum.state) == (2200.0, "Ludhiana", "Punjab")
+    assert durum.evidence["comparison_data"]["location"] == "Ludhiana, Punjab"
+
+def test_malformed_prices_are_unmatched_not_fatal():
+    engine = BatchComplianceEngine()
+    rows = [
+        {"commodity": "Wheat", "price": None},
+        {"commodity": "Wheat", "price": "n/a"},
+        {"commodity": "Wheat", "price": {"value": 1800}},
+        {"commodity": "Wheat"},
+        {"commodity": "Wheat", "price": "1800"}
+    ]
+
+    batch = engine.evaluate(rows, MSPRateIndex(RATES))
+
+    assert batch.status.tolist() == [UNMATCHED, UNMATCHED, UNMATCHED, UNMATCHED, VIOLATION]
+    assert batch.compared == 1
+
+@pytest.mark.asyncio
+async def test_config_update_changes_the_verdict():
+    monitor = MSPMonitoringEngine()
+    monitor.rate_index = MSPRateIndex(RATES)
+    row = {"commodity": "Wheat", "price": 1880.0, "mandi_id": "m1"}  # 6% below MSP
+
+    assert (await monitor._compare_price_with_msp(row)).compliance_status == "violation"
+
+    monitor.update_config(violation_threshold_percentage=8.0, critical_threshold_percentage=20.0)
+
+    assert (await monitor._compare_price_with_msp(row)).compliance_status == "warning"
+    assert monitor.compliance_engine.critical_threshold_percentage == 20.0
+    with pytest.raises(ValueError):
+        monitor.update_config(unknown_threshold=1.0)
+
+@pytest.mark.asyncio
+async def test_batch_matches_single_price_comparison():
+    """The vectorized cycle and the single-price endpoint agree row for row"""
+    monitor = MSPMonitoringEngine()
+    monitor.rate_index = MSPRateIndex(RATES)
+    rng = random.Random(3)
+    rows = [
+        {
+            "commodity": rng.choice(["Wheat", "Rice", "Cotton"]),
+            "variety": rng.choice([None, "Durum"]),
+            "price": rng.uniform(800.0, 2400.0),
+            "mandi_id": f"m{i}"
+        }
+        for i in range(200)
+    ]
+
+    batch = monitor.compliance_engine.evaluate(rows, monitor.rate_index)
+    for i, row in enumerate(rows):
+        single = await monitor._compare_price_with_msp(row)
+        if batch.status[i] == UNMATCHED:
+            assert single is None
+        else:
+            expected = batch.comparison_at(i)
+            assert single.dict(exclude={"comparison_timestamp"}) == expected.dict(exclude={"comparison_timestamp"})
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
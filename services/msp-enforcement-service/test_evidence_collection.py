@@ -0,0 +1,146 @@
+"""
+Unit tests for parallel, content-addressed evidence collection
+"""
+
+import asyncio
+import os
+from datetime import datetime
+
+import pytest
+
+from compliance_reporting import EvidenceCollector
+from evidence_store import EvidenceStore
+from models import MSPViolation, ViolationType, AlertSeverity
+
+def make_violations(count, mandis=2):
+    return [
+        MSPViolation(
+            commodity="Wheat",
+            mandi_id=f"mandi_{i % mandis}",
+            mandi_name=f"Mandi {i % mandis}",
+            district="Ludhiana",
+            state="Punjab",
+            market_price=1900.0,
+            msp_price=2125.0,
+            price_difference=-225.0,
+            violation_percentage=10.6,
+            violation_type=ViolationType.BELOW_MSP,
+            severity=AlertSeverity.HIGH,
+            detected_at=datetime(2024, 3, 1, 9 + i % 8)
+        )
+        for i in range(count)
+    ]
+
+@pytest.mark.asyncio
+async def test_lookups_scale_with_distinct_inputs(tmp_path):
+    collector = EvidenceCollector(concurrency=4, store=EvidenceStore(str(tmp_path)))
+    calls = {"msp": 0, "market": 0}
+
+    async def msp_reference(commodity, detection_date):
+        calls["msp"] += 1
+        await asyncio.sleep(0)
+        return {"commodity": commodity, "msp_price": 2125.0, "effective_date": "2023-10-01"}
+
+    async def market_context(violation):
+        calls["market"] += 1
+        await asyncio.sleep(0)
+        return {"mandi_id": violation.mandi_id, "location": "Ludhiana, Punjab"}
+
+    collector._get_msp_reference_data = msp_reference
+    collector._get_market_context_data = market_context
+
+    violations = make_violations(40)
+    evidence_data = await collector.collect_evidence_for_violations(violations)
+
+    # One MSP lookup for the (commodity, date), one context lookup per mandi
+    assert calls == {"msp": 1, "market": 2}
+    assert list(evidence_data["violation_evidence"]) == [v.id for v in violations]
+
+    # Shared blobs are written once; each violation adds only its own document
+    assert collector.evidence_store.writes == 1 + 2 + len(violations)
+    assert len(evidence_data["evidence_files"]) == len(violations)
+    first = evidence_data["violation_evidence"][violations[0].id]
+    assert first["msp_data"]["msp_price"] == 2125.0
+    assert set(first["evidence_hashes"]) == {"msp_reference", "market_context", "violation"}
+
+    status = evidence_data["verification_status"]
+    assert status["integrity_status"] == "VERIFIED"
+    assert status["verified_blobs"] == 1 + 2 + len(violations)
+    assert collector.evidence_store.verifications == 1 + 2 + len(violations)
+
+    # A second report over the same violations writes and verifies nothing new
+    await collector.collect_evidence_for_violations(violations)
+    assert collector.evidence_store.writes == 1 + 2 + len(violations)
+    assert collector.evidence_store.verifications == 1 + 2 + len(violations)
+
+def test_store_detects_tampered_blob(tmp_path):
+    store = EvidenceStore(str(tmp_path))
+    digest, created = store.put({"b": 1, "a": [1, 2]})
+
+    assert created
+    assert store.put({"a": [1, 2], "b": 1}) == (digest, False)
+
+    path = os.path.join(str(tmp_path), digest[:2], store.filename(digest))
+    with open(path, "w") as f:
+        f.write('{"a":[1,2],"b":2}')
+
+    assert EvidenceStore(str(tmp_path)).verify(digest) is False
+
+def test_verify_rechecks_a_blob_changed_after_verification(tmp_path):
+    store = EvidenceStore(str(tmp_path))
+    digest, _ = store.put({"a": 1})
+    assert store.verify(digest)
+    assert store.verify(digest)
+    assert store.verifications == 1
+
+    path = os.path.join(str(tmp_path), digest[:2], store.filename(digest))
+    with open(path, "w") as f:
+        f.write('{"a":2,"b":3}')
+
+    assert store.verify(digest) is False
+    assert store.verifications == 2
+
+    os.remove(path)
+    assert store.verify(digest) is None
+
+def test_in_memory_store_is_bounded_and_rechecks_replaced_blobs():
+    store = EvidenceStore(max_blobs=3)
+    digests = [store.put({"n": n})[0] for n in range(5)]
+
+    assert store.evictions == 2
+    assert len(store._blobs) == len(store._known) == 3
+    assert store.get(digests[0]) is None
+    assert store.verify(digests[0]) is None
+    assert all(store.verify(digest) for digest in digests[2:])
+    assert len(store._verified) == 3
+
+    # An evicted document is stored again when it comes back
+    assert store.put({"n": 0}) == (digests[0], True)
+
+    store._blobs[digests[4]] = b'{"n":"forged"}'
+    assert store.verify(digests[4]) is False
+
+@pytest.mark.asyncio
+async def test_evicted_evidence_is_unverifiable_not_tampered():
+    collector = EvidenceCollector(concurrency=4, store=EvidenceStore(max_blobs=5))
+
+    async def msp_reference(commodity, detection_date):
+        return {"commodity": commodity, "msp_price": 2125.0, "effective_date": "2023-10-01"}
+
+    async def market_context(violation):
+        return {"mandi_id": violation.mandi_id, "location": "Ludhiana, Punjab"}
+
+    collector._get_msp_reference_data = msp_reference
+    collector._get_market_context_data = market_context
+
+    violations = make_violations(20)
+    evidence_data = await collector.collect_evidence_for_violations(violations)
+
+    status = evidence_data["verification_status"]
+    assert collector.evidence_store.evictions > 0
+    assert status["integrity_status"] == "VERIFIED"
+    assert status["verified_blobs"] == 5
+    assert status["unverifiable_blobs"] == 1 + 2 + len(violations) - 5
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,150 @@
+"""
+Unit tests for incremental government data sync against a local HTTP stand-in
+"""
+
+import hashlib
+
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import government_data_integration
+import incremental_sync
+from government_data_integration import GovernmentDataIntegrator
+from incremental_sync import SyncStateCache, ConditionalFetcher, diff_rows, procurement_center_key
+from models import GovernmentDataSource
+
+MSP_PAGE = """
+<html><body>
+  <a href="/files/msp_rates.csv">MSP rates for Rabi 2024</a>
+  <a href="/files/circular.pdf">Office circular</a>
+</body></html>
+"""
+
+MSP_CSV = "commodity,msp,season,year\nWheat,2275,Rabi,2024\nGram,5440,Rabi,2024\nMustard,5650,Rabi,2024\n"
+
+class GovernmentPortal:
+    """Stand-in portal: the page sends no validators, the CSV honours If-None-Match"""
+
+    def __init__(self):
+        self.csv = MSP_CSV
+        self.requests = []
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get("/", self.page)
+        app.router.add_get("/files/msp_rates.csv", self.csv_file)
+        return app
+
+    async def page(self, request):
+        self.requests.append(("page", 200))
+        return web.Response(text=MSP_PAGE, content_type="text/html")
+
+    async def csv_file(self, request):
+        etag = '"%s"' % hashlib.md5(self.csv.encode()).hexdigest()
+        if request.headers.get("If-None-Match") == etag:
+            self.requests.append(("csv", 304))
+            return web.Response(status=304, headers={"ETag": etag})
+        self.requests.append(("csv", 200))
+        return web.Response(text=self.csv, content_type="text/csv", headers={"ETag": etag})
+
+@pytest.fixture(autouse=True)
+def no_database(monkeypatch):
+    async def no_states():
+        return {}
+
+    async def store_state(key, state):
+        return True
+
+    monkeypatch.setattr(incremental_sync, "get_government_sync_states", no_states)
+    monkeypatch.setattr(incremental_sync, "store_government_sync_state", store_state)
+
+@pytest.mark.asyncio
+async def test_unchanged_sources_are_not_reparsed_or_restored(monkeypatch):
+    portal = GovernmentPortal()
+    stored = []
+    parsed = []
+
+    async def store_rate(msp_rate):
+        stored.append(msp_rate)
+        return True
+
+    monkeypatch.setattr(government_data_integration, "store_msp_rate", store_rate)
+
+    async with TestServer(portal.app()) as server:
+        integrator = GovernmentDataIntegrator()
+        await integrator.initialize()
+        process_csv = integrator._process_csv_data
+
+        async def counting_process_csv(content, source):
+            parsed.append(len(content))
+            return await process_csv(content, source)
+
+        integrator._process_csv_data = counting_process_csv
+        source = GovernmentDataSource(id="cacp_msp", name="CACP", url=str(server.make_url("/")), update_frequency=24)
+
+        try:
+            await integrator._sync_from_source(source)
+            assert len(parsed) == 1
+            assert sorted(rate.commodity for rate in stored) == ["Gram", "Mustard", "Wheat"]
+            first_ids = {rate.commodity: rate.id for rate in stored}
+
+            # Nothing changed: the page hash matches and the CSV answers 304
+            stored.clear()
+            await integrator._sync_from_source(source)
+            assert len(parsed) == 1 and stored == []
+            assert portal.requests[-1] == ("csv", 304)
+
+            # One revised price: the file is re-parsed but only that row is upserted
+            portal.csv = MSP_CSV.replace("Gram,5440", "Gram,5650")
+            await integrator._sync_from_source(source)
+            assert len(parsed) == 2
+            assert [(rate.commodity, rate.msp_price) for rate in stored] == [("Gram", 5650.0)]
+            assert stored[0].id == first_ids["Gram"]
+        finally:
+            await integrator.session.close()
+
+@pytest.mark.asyncio
+async def test_failed_store_leaves_document_uncommitted(monkeypatch):
+    portal = GovernmentPortal()
+    attempts = []
+
+    async def failing_store(msp_rate):
+        attempts.append(msp_rate.commodity)
+        return len(attempts) > 3
+
+    monkeypatch.setattr(government_data_integration, "store_msp_rate", failing_store)
+
+    async with TestServer(portal.app()) as server:
+        async with aiohttp.ClientSession() as session:
+            integrator = GovernmentDataIntegrator()
+            integrator.session = session
+            integrator.fetcher = ConditionalFetcher(session, integrator.sync_state)
+            source = GovernmentDataSource(id="fci_msp", name="FCI", url=str(server.make_url("/")), update_frequency=24)
+
+            await integrator._sync_from_source(source)
+            assert portal.requests[-1] == ("csv", 200)
+
+            # The CSV was not committed, so it is fetched and parsed again and the rows retried
+            await integrator._sync_from_source(source)
+            assert portal.requests[-1] == ("csv", 200)
+            assert len(attempts) == 6
+
+def test_row_diff_only_reports_new_or_changed_rows():
+    centers = [
+        {"name": "FCI Depot Karnal", "district": "Karnal", "state": "Haryana", "current_stock": 30000.0},
+        {"name": "FCI Depot Ludhiana", "district": "Ludhiana", "state": "Punjab", "current_stock": 45000.0}
+    ]
+    first = diff_rows(centers, procurement_center_key, {})
+    previous = {key: digest for key, digest, _ in first}
+
+    assert len(first) == 2
+    assert diff_rows(centers, procurement_center_key, previous) == []
+
+    centers[1] = dict(centers[1], current_stock=47000.0)
+    changed = diff_rows(centers, procurement_center_key, previous)
+    assert [record["name"] for _, _, record in changed] == ["FCI Depot Ludhiana"]
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,126 @@
+"""
+Unit tests for the geospatial procurement center index
+"""
+
+import math
+import random
+
+import pytest
+
+from models import ProcurementCenter, MSPViolation, ViolationType, AlertSeverity
+import alert_system
+from procurement_index import ProcurementCenterIndex, locate, great_circle_km
+from alert_system import MSPAlertSystem
+
+def make_center(name, district, state, commodities, center_type="FCI", latitude=None, longitude=None, **kwargs):
+    return ProcurementCenter(
+        name=name,
+        center_type=center_type,
+        address=f"{district}, {state}",
+        district=district,
+        state=state,
+        pincode="000000",
+        latitude=latitude,
+        longitude=longitude,
+        commodities_accepted=commodities,
+        **kwargs
+    )
+
+def haversine_km(a, b):
+    lat1, lon1, lat2, lon2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(h))
+
+def test_nearest_matches_brute_force():
+    rng = random.Random(5)
+    centers = [
+        make_center(
+            f"Center {i}", "District", "State", rng.sample(["Wheat", "Rice", "Gram"], 2),
+            latitude=rng.uniform(8.0, 35.0), longitude=rng.uniform(68.0, 97.0)
+        )
+        for i in range(500)
+    ]
+    index = ProcurementCenterIndex()
+    index.load(centers)
+
+    for _ in range(50):
+        origin = (rng.uniform(8.0, 35.0), rng.uniform(68.0, 97.0))
+        expected = sorted(
+            (haversine_km(origin, (c.latitude, c.longitude)), c.id)
+            for c in centers if "Rice" in c.commodities_accepted
+        )
+        expected = [item for item in expected if item[0] <= 300.0][:5]
+
+        found = index.nearest("rice", *origin, k=5, radius_km=300.0)
+        assert [c.id for c, _ in found] == [center_id for _, center_id in expected]
+        for (_, distance), (expected_distance, _) in zip(found, expected):
+            assert distance == pytest.approx(expected_distance, abs=1e-6)
+
+def test_geocoded_centers_and_filters():
+    index = ProcurementCenterIndex()
+    index.load([
+        make_center("FCI Ludhiana", "Ludhiana", "Punjab", ["Wheat"]),
+        make_center("Closed Karnal", "Karnal", "Haryana", ["Wheat"], is_operational=False),
+        make_center("Pune Rice", "Pune", "Maharashtra", ["Rice"]),
+        make_center("Nowhere", "Unknown", "Atlantis", ["Wheat"])
+    ])
+
+    assert (index.center_count, index.unlocated_count) == (2, 1)
+    assert [c.name for c, _ in index.nearest("Wheat", *locate("Amritsar", "Punjab"), k=5)] == ["FCI Ludhiana"]
+    assert index.nearest("Wheat", *locate("Pune", "Maharashtra"), k=5) == []
+    assert index.nearest("Cotton", *locate("Pune", "Maharashtra"), k=5) == []
+
+@pytest.fixture
+def shared_index(monkeypatch):
+    """A fresh index in place of the module-global one, restored after the test"""
+    index = ProcurementCenterIndex()
+    monkeypatch.setattr(alert_system, "procurement_center_index", index)
+    return index
+
+def make_violation(district="Ludhiana", state="Punjab"):
+    return MSPViolation(
+        commodity="Wheat",
+        mandi_id="mandi_1",
+        mandi_name=f"{district} Mandi",
+        district=district,
+        state=state,
+        market_price=2000.0,
+        msp_price=2125.0,
+        price_difference=-125.0,
+        violation_percentage=5.88,
+        violation_type=ViolationType.BELOW_MSP,
+        severity=AlertSeverity.MEDIUM
+    )
+
+@pytest.mark.asyncio
+async def test_alert_system_ranks_fci_first(shared_index):
+    shared_index.load([
+        make_center("State Ludhiana", "Ludhiana", "Punjab", ["Wheat"], center_type="State Agency"),
+        make_center("FCI Karnal", "Karnal", "Haryana", ["Wheat"]),
+        make_center("FCI Pune", "Pune", "Maharashtra", ["Wheat"])
+    ])
+    violation = make_violation()
+
+    centers = await MSPAlertSystem()._find_procurement_centers(violation)
+
+    assert [c.name for c, _ in centers] == ["FCI Karnal", "State Ludhiana"]
+    assert centers[1][1] < centers[0][1] < 500
+
+@pytest.mark.asyncio
+async def test_suggestion_distances_use_coordinates():
+    system = MSPAlertSystem()
+    violation = make_violation()
+    karnal = make_center("FCI Karnal", "Karnal", "Haryana", ["Wheat"])
+    expected = great_circle_km(locate("Ludhiana", "Punjab"), locate("Karnal", "Haryana"))
+
+    suggestion = await system._create_procurement_suggestion(violation, karnal)
+
+    assert suggestion.distance_km == pytest.approx(expected)
+    assert suggestion.contact_info == {"address": "Karnal, Haryana", "center_type": "FCI"}
+    assert await system._calculate_distance("Ludhiana", "Punjab", "Pune", "Maharashtra") == pytest.approx(
+        great_circle_km(locate("Ludhiana", "Punjab"), locate("Pune", "Maharashtra"))
+    )
+    assert await system._calculate_distance("Nowhere", "Atlantis", "Karnal", "Haryana") == 500.0
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,219 @@
+"""
+Unit tests for streaming compliance report generation
+"""
+
+import csv
+import io
+import zipfile
+import xml.etree.ElementTree as ET
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import compliance_reporting
+import database
+from compliance_reporting import ComplianceReportGenerator, ReportFormat
+from models import MSPViolation, ViolationType, AlertSeverity
+from report_streaming import (
+    ViolationAggregates, XLSXReportWriter, EXPORT_COLUMNS, export_filename, iter_violations
+)
+
+SHEET_NS = {"s": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+
+def make_violations(count):
+    severities = [AlertSeverity.LOW, AlertSeverity.MEDIUM, AlertSeverity.HIGH, AlertSeverity.CRITICAL]
+    states = [("Ludhiana", "Punjab"), ("Karnal", "Haryana"), ("Meerut", "Uttar Pradesh")]
+    violations = []
+    for i in range(count):
+        district, state = states[i % 3]
+        percentage = 5.0 + i % 20
+        violations.append(MSPViolation(
+            commodity=["Wheat", "Rice"][i % 2],
+            mandi_id=f"mandi_{i}",
+            mandi_name=f"Mandi <{i}> & Sons",
+            district=district,
+            state=state,
+            market_price=2000.0 * (1 - percentage / 100),
+            msp_price=2000.0,
+            price_difference=-20.0 * percentage,
+            violation_percentage=percentage,
+            violation_type=ViolationType.BELOW_MSP,
+            severity=severities[i % 4],
+            detected_at=datetime(2024, 1, 1) + timedelta(hours=7 * i),
+            is_resolved=i % 5 == 0
+        ))
+    return violations
+
+@pytest.fixture
+def streamed(monkeypatch):
+    """Stream 2,500 violations in chunks and capture the stored report"""
+    violations = make_violations(2500)
+    chunk_sizes = []
+    stored = []
+
+    async def fake_iter_violations(start_date, end_date, region, commodity, chunk_size):
+        for i in range(0, len(violations), chunk_size):
+            chunk_sizes.append(len(violations[i:i + chunk_size]))
+            yield violations[i:i + chunk_size]
+
+    monkeypatch.setattr(compliance_reporting, "iter_violations", fake_iter_violations)
+
+    async def run(report_format):
+        generator = ComplianceReportGenerator()
+
+        async def store(report):
+            stored.append(report)
+            return True
+
+        generator._store_compliance_report = store
+        parts = []
+        async for part in generator.stream_compliance_report(
+            date(2024, 1, 1), date(2024, 12, 31),
+            report_format=report_format, report_id="report-1", chunk_size=1000
+        ):
+            parts.append(part)
+        return b"".join(parts), parts
+
+    return violations, chunk_sizes, stored, run
+
+@pytest.mark.asyncio
+async def test_csv_stream_and_stored_report(streamed):
+    violations, chunk_sizes, stored, run = streamed
+
+    data, parts = await run(ReportFormat.CSV)
+
+    assert chunk_sizes == [1000, 1000, 500]
+    rows = list(csv.reader(io.StringIO(data.decode("utf-8"))))
+    assert rows[0] == EXPORT_COLUMNS
+    assert len(rows) == len(violations) + 1
+    assert rows[1][EXPORT_COLUMNS.index("mandi_name")] == "Mandi <0> & Sons"
+
+    report = stored[0]
+    assert report.id == "report-1"
+    assert report.total_violations == 2500
+    assert report.violations_by_commodity == {"Wheat": 1250, "Rice": 1250}
+    assert report.recommendations
+
+@pytest.mark.asyncio
+async def test_xlsx_stream_is_a_valid_workbook(streamed):
+    violations, _, _, run = streamed
+
+    data, parts = await run(ReportFormat.EXCEL)
+
+    # Rows leave the writer chunk by chunk rather than all at the end
+    assert sum(1 for part in parts if part) > 3
+
+    with zipfile.ZipFile(io.BytesIO(data)) as workbook:
+        assert workbook.testzip() is None
+        # The streamed sheet is written with ZIP64 sizes so it may grow past 2 GiB
+        assert workbook.getinfo("xl/worksheets/sheet1.xml").extract_version >= zipfile.ZIP64_VERSION
+        sheet = ET.fromstring(workbook.read("xl/worksheets/sheet1.xml"))
+        summary = ET.fromstring(workbook.read("xl/worksheets/sheet2.xml"))
+
+    rows = sheet.findall(".//s:row", SHEET_NS)
+    assert len(rows) == len(violations) + 1
+    assert rows[1].findall(".//s:t", SHEET_NS)[5].text == "Mandi <0> & Sons"
+    metrics = {
+        row[0].find(".//s:t", SHEET_NS).text: row[1]
+        for row in summary.findall(".//s:row", SHEET_NS)
+    }
+    assert metrics["total_violations"].find("s:v", SHEET_NS).text == "2500"
+
+def test_incremental_aggregates_match_whole_list():
+    violations = make_violations(300)
+    incremental = ViolationAggregates()
+    for i in range(0, len(violations), 64):
+        incremental.update(violations[i:i + 64])
+    whole = ViolationAggregates.from_violations(violations)
+
+    period = (date(2024, 1, 1), date(2024, 3, 31))
+    assert incremental.market_analysis(*period) == whole.market_analysis(*period)
+    assert incremental.farmer_impact() == whole.farmer_impact()
+    stats = whole.market_analysis(*period)["violation_statistics"]
+    assert stats["total_violations"] == 300
+    assert stats["max_violation_percentage"] == max(v.violation_percentage for v in violations)
+    assert stats["resolved_violations"] == sum(v.is_resolved for v in violations)
+
+def violation_record(violation):
+    return {
+        **violation.dict(exclude={"evidence"}),
+        "violation_type": violation.violation_type.value,
+        "severity": violation.severity.value,
+        "evidence": None
+    }
+
+class KeysetPool:
+    """Serves ORDER BY detected_at DESC, id DESC pages and counts connection use"""
+
+    def __init__(self, violations):
+        self.rows = sorted(
+            (violation_record(v) for v in violations),
+            key=lambda row: (row["detected_at"], row["id"]), reverse=True
+        )
+        self.queries = []
+        self.open_connections = 0
+
+    def acquire(self):
+        pool = self
+
+        class _Acquire:
+            async def __aenter__(self):
+                pool.open_connections += 1
+                return pool
+
+            async def __aexit__(self, exc_type, exc, tb):
+                pool.open_connections -= 1
+                return False
+
+        return _Acquire()
+
+    async def fetch(self, query, *params):
+        self.queries.append((query, params))
+        rows = self.rows
+        if "(detected_at, id) <" in query:
+            after = (params[-2], params[-1])
+            rows = [row for row in rows if (row["detected_at"], row["id"]) < after]
+        limit = int(query.rsplit("LIMIT", 1)[1])
+        return rows[:limit]
+
+@pytest.mark.asyncio
+async def test_iter_violations_pages_by_key_without_holding_a_connection(monkeypatch):
+    violations = make_violations(250)
+    # Ties on detected_at must not drop or repeat rows across pages
+    for violation in violations[100:110]:
+        violation.detected_at = datetime(2024, 6, 1)
+    pool = KeysetPool(violations)
+    monkeypatch.setattr(database, "_pool", pool)
+
+    seen = []
+    async for chunk in iter_violations(date(2024, 1, 1), date(2024, 12, 31), "Punjab", None, chunk_size=100):
+        assert pool.open_connections == 0
+        seen.extend(chunk)
+
+    assert sorted(v.id for v in seen) == sorted(v.id for v in violations)
+    assert len(pool.queries) == 3
+    first_query, first_params = pool.queries[0]
+    assert "ORDER BY detected_at DESC, id DESC LIMIT 100" in first_query
+    assert "(detected_at, id) <" not in first_query
+    assert first_params == (date(2024, 1, 1), date(2024, 12, 31), "Punjab")
+
+def test_xlsx_non_finite_numbers_are_empty_cells():
+    writer = XLSXReportWriter(["a", "b", "c"])
+    data = writer.begin() + writer.write_rows([[float("nan"), float("inf"), 1.5]]) + writer.finish([])
+
+    with zipfile.ZipFile(io.BytesIO(data)) as workbook:
+        sheet = ET.fromstring(workbook.read("xl/worksheets/sheet1.xml"))
+
+    cells = sheet.findall(".//s:row", SHEET_NS)[1].findall("s:c", SHEET_NS)
+    assert [cell.find("s:v", SHEET_NS) is None for cell in cells] == [True, True, False]
+
+def test_export_filename_is_header_safe():
+    name = export_filename('Punjab, Ludhiana"\r\nX-Evil: 1', date(2024, 1, 1), date(2024, 1, 31), "csv")
+
+    assert name == "msp_compliance_Punjab_Ludhiana_X-Evil_1_2024-01-01_2024-01-31.csv"
+    assert export_filename("national", date(2024, 1, 1), date(2024, 1, 31), "xlsx") == \
+        "msp_compliance_national_2024-01-01_2024-01-31.xlsx"
+    assert export_filename("../..", date(2024, 1, 1), date(2024, 1, 31), "csv").startswith("msp_compliance_region_")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -20,15 +20,20 @@ from database import (
     get_alert_history, get_alert_statistics
 )
 from notification_dispatcher import NotificationDispatcher
+from alert_rules import AlertRuleIndex, ObservationCache
+from weather_acquisition import WeatherAcquisition
 
 logger = structlog.get_logger()
 
 class CustomizableAlertEngine:
     """Manages customizable alert configurations and triggers"""
     
-    def __init__(self):
+    def __init__(self, weather: Optional[WeatherAcquisition] = None):
         self.notification_dispatcher: Optional[NotificationDispatcher] = None
+        self.weather = weather or WeatherAcquisition.from_env()
+        self._owns_weather = weather is None
         self.active_configurations: Dict[str, AlertConfiguration] = {}
+        self.rule_index = AlertRuleIndex()
         self.alert_cache: Dict[str, datetime] = {}  # Last alert time per config
         self.is_running = False
         self.monitoring_task: Optional[asyncio.Task] = None
@@ -66,6 +71,9 @@ class CustomizableAlertEngine:
         if self.notification_dispatcher:
             await self.notification_dispatcher.shutdown()
         
+        if self._owns_weather:
+            await self.weather.close()
+        
         logger.info("Alert engine shutdown complete")
     
     async def _load_active_configurations(self):
@@ -74,6 +82,7 @@ class CustomizableAlertEngine:
             # In production, this would load from database
             # For now, initialize empty
             self.active_configurations = {}
+            self.rule_index.rebuild(list(self.active_configurations.values()))
             logger.info("Active alert configurations loaded", count=len(self.active_configurations))
             
         except Exception as e:
@@ -94,9 +103,14 @@ class CustomizableAlertEngine:
     
     async def _check_all_alert_conditions(self):
         """Check all active alert configurations for trigger conditions"""
-        for config_id, config in self.active_configurations.items():
+        # Each distinct market observation is fetched once, however many rules watch it
+        observations = self._new_observation_cache()
+        triggered = await self.rule_index.triggered(observations)
+        
+        for config_id in triggered:
+            config = self.active_configurations.get(config_id)
             try:
-                if not config.is_active:
+                if not config or not config.is_active:
                     continue
                 
                 # Check if we're in quiet hours
@@ -107,14 +121,25 @@ class CustomizableAlertEngine:
                 if await self._exceeded_daily_limit(config):
                     continue
                 
-                # Check the specific alert condition
-                should_trigger = await self._evaluate_alert_condition(config)
-                
-                if should_trigger:
-                    await self._trigger_alert(config)
+                await self._trigger_alert(config, observations)
                 
             except Exception as e:
                 logger.error("Error checking alert condition", config_id=config_id, error=str(e))
+        
+        logger.debug(
+            "Alert conditions checked",
+            rules=len(self.rule_index),
+            markets=self.rule_index.bucket_count,
+            fetches=observations.fetch_count,
+            triggered=len(triggered)
+        )
+    
+    def _new_observation_cache(self) -> ObservationCache:
+        return ObservationCache(
+            self._get_current_price_data,
+            self._get_previous_price_data,
+            self._get_current_weather_data
+        )
     
     async def _is_quiet_hours(self, config: AlertConfiguration) -> bool:
         """Check if current time is within quiet hours"""
@@ -145,154 +170,22 @@ class CustomizableAlertEngine:
         # In production, would query database for actual count
         return False  # Simplified for now
     
-    async def _evaluate_alert_condition(self, config: AlertConfiguration) -> bool:
+    async def _evaluate_alert_condition(
+        self,
+        config: AlertConfiguration,
+        observations: Optional[ObservationCache] = None
+    ) -> bool:
         """Evaluate if alert condition is met"""
         try:
-            if config.alert_type == AlertType.PRICE_MOVEMENT:
-                return await self._check_price_movement_condition(config)
-            elif config.alert_type == AlertType.PRICE_RISE:
-                return await self._check_price_rise_condition(config)
-            elif config.alert_type == AlertType.PRICE_DROP:
-                return await self._check_price_drop_condition(config)
-            elif config.alert_type == AlertType.CUSTOM_THRESHOLD:
-                return await self._check_custom_threshold_condition(config)
-            else:
-                logger.warning("Unknown alert type", alert_type=config.alert_type)
-                return False
+            index = AlertRuleIndex()
+            index.add(config)
+            triggered = await index.triggered(observations or self._new_observation_cache())
+            return config.id in triggered
                 
         except Exception as e:
             logger.error("Error evaluating alert condition", config_id=config.id, error=str(e))
             return False
     
-    async def _check_price_movement_condition(self, config: AlertConfiguration) -> bool:
-        """Check for significant price movement (>10% by default)"""
-        try:
-            # Get current and previous price data
-            current_data = await self._get_current_price_data(config.commodity, config.location)
-            if not current_data:
-                return False
-            
-            previous_data = await self._get_previous_price_data(
-                config.commodity, 
-                config.location, 
-                config.comparison_period or "24h"
-            )
-            if not previous_data:
-                return False
-            
-            # Calculate percentage change
-            current_price = current_data.get('price', 0)
-            previous_price = previous_data.get('price', 0)
-            
-            if previous_price == 0:
-                return False
-            
-            percentage_change = abs((current_price - previous_price) / previous_price) * 100
-            
-            # Check against threshold
-            if config.threshold_condition == ThresholdCondition.GREATER_THAN:
-                return percentage_change > config.threshold_value
-            elif config.threshold_condition == ThresholdCondition.PERCENTAGE_CHANGE:
-                return percentage_change >= config.threshold_value
-            
-            return False
-            
-        except Exception as e:
-            logger.error("Error checking price movement condition", error=str(e))
-            return False
-    
-    async def _check_price_rise_condition(self, config: AlertConfiguration) -> bool:
-        """Check for price rise above threshold"""
-        try:
-            current_data = await self._get_current_price_data(config.commodity, config.location)
-            if not current_data:
-                return False
-            
-            current_price = current_data.get('price', 0)
-            
-            if config.threshold_condition == ThresholdCondition.GREATER_THAN:
-                return current_price > config.threshold_value
-            elif config.threshold_condition == ThresholdCondition.PERCENTAGE_CHANGE:
-                previous_data = await self._get_previous_price_data(
-                    config.commodity, config.location, config.comparison_period or "24h"
-                )
-                if not previous_data:
-                    return False
-                
-                previous_price = previous_data.get('price', 0)
-                if previous_price == 0:
-                    return False
-                
-                percentage_change = ((current_price - previous_price) / previous_price) * 100
-                return percentage_change >= config.threshold_value
-            
-            return False
-            
-        except Exception as e:
-            logger.error("Error checking price rise condition", error=str(e))
-            return False
-    
-    async def _check_price_drop_condition(self, config: AlertConfiguration) -> bool:
-        """Check for price drop below threshold"""
-        try:
-            current_data = await self._get_current_price_data(config.commodity, config.location)
-            if not current_data:
-                return False
-            
-            current_price = current_data.get('price', 0)
-            
-            if config.threshold_condition == ThresholdCondition.LESS_THAN:
-                return current_price < config.threshold_value
-            elif config.threshold_condition == ThresholdCondition.PERCENTAGE_CHANGE:
-                previous_data = await self._get_previous_price_data(
-                    config.commodity, config.location, config.comparison_period or "24h"
-                )
-                if not previous_data:
-                    return False
-                
-                previous_price = previous_data.get('price', 0)
-                if previous_price == 0:
-                    return False
-                
-                percentage_change = ((previous_price - current_price) / previous_price) * 100
-                return percentage_change >= config.threshold_value
-            
-            return False
-            
-        except Exception as e:
-            logger.error("Error checking price drop condition", error=str(e))
-            return False
-    
-    async def _check_custom_threshold_condition(self, config: AlertConfiguration) -> bool:
-        """Check custom threshold condition"""
-        try:
-            # Get relevant data based on metadata
-            data_source = config.metadata.get('data_source') if config.metadata else 'price'
-            
-            if data_source == 'price':
-                current_data = await self._get_current_price_data(config.commodity, config.location)
-                current_value = current_data.get('price', 0) if current_data else 0
-            elif data_source == 'weather':
-                current_data = await self._get_current_weather_data(config.location)
-                metric = config.metadata.get('weather_metric', 'temperature')
-                current_value = current_data.get(metric, 0) if current_data else 0
-            else:
-                return False
-            
-            # Evaluate condition
-            if config.threshold_condition == ThresholdCondition.GREATER_THAN:
-                return current_value > config.threshold_value
-            elif config.threshold_condition == ThresholdCondition.LESS_THAN:
-                return current_value < config.threshold_value
-            elif config.threshold_condition == ThresholdCondition.EQUALS:
-                return abs(current_value - config.threshold_value) < 0.01
-            
-            return False
-            
-        except Exception as e:
-            logger.error("Error checking custom threshold condition", error=str(e))
-            return False
-    
     async def _get_current_price_data(self, commodity: str, location: str) -> Optional[Dict[str, Any]]:
         """Get current price data for commodity and location"""
         try:
@@ -348,8 +241,20 @@ class CustomizableAlertEngine:
     async def _get_current_weather_data(self, location: str) -> Optional[Dict[str, Any]]:
         """Get current weather data for location"""
         try:
-            # In production, would query weather service
-            # For now, simulate weather data
+            data = await self.weather.current_for_place(location)
+            if data:
+                main = data.get('main', {})
+                return {
+                    'location': location,
+                    'temperature': main.get('temp'),
+                    'humidity': main.get('humidity'),
+                    'rainfall': data.get('rain', {}).get('1h', 0.0),
+                    'wind_speed': data.get('wind', {}).get('speed', 0.0) * 3.6,  # m/s to km/h
+                    'timestamp': datetime.utcnow(),
+                    'source': 'weather_service'
+                }
+            
+            # No weather provider configured; simulate weather data
             import random
             
             return {
@@ -366,14 +271,16 @@ class CustomizableAlertEngine:
             logger.error("Error getting weather data", error=str(e))
             return None
     
-    async def _trigger_alert(self, config: AlertConfiguration):
+    async def _trigger_alert(self, config: AlertConfiguration, observations: Optional[ObservationCache] = None):
         """Trigger an alert based on configuration"""
         try:
+            observations = observations or self._new_observation_cache()
+            
             # Create appropriate alert based on type
             if config.alert_type in [AlertType.PRICE_MOVEMENT, AlertType.PRICE_RISE, AlertType.PRICE_DROP]:
-                alert = await self._create_price_alert(config)
+                alert = await self._create_price_alert(config, observations)
             elif config.alert_type == AlertType.CUSTOM_THRESHOLD:
-                alert = await self._create_custom_threshold_alert(config)
+                alert = await self._create_custom_threshold_alert(config, observations)
             else:
                 logger.warning("Unsupported alert type for triggering", alert_type=config.alert_type)
                 return
@@ -401,11 +308,16 @@ class CustomizableAlertEngine:
         except Exception as e:
             logger.error("Error triggering alert", config_id=config.id, error=str(e))
     
-    async def _create_price_alert(self, config: AlertConfiguration) -> Optional[PriceMovementAlert]:
+    async def _create_price_alert(
+        self,
+        config: AlertConfiguration,
+        observations: Optional[ObservationCache] = None
+    ) -> Optional[PriceMovementAlert]:
         """Create price movement alert"""
         try:
-            current_data = await self._get_current_price_data(config.commodity, config.location)
-            previous_data = await self._get_previous_price_data(
+            observations = observations or self._new_observation_cache()
+            current_data = await observations.current_price(config.commodity, config.location)
+            previous_data = await observations.previous_price(
                 config.commodity, config.location, config.comparison_period or "24h"
             )
             
@@ -472,18 +384,24 @@ class CustomizableAlertEngine:
             logger.error("Error creating price alert", error=str(e))
             return None
     
-    async def _create_custom_threshold_alert(self, config: AlertConfiguration) -> Optional[CustomThresholdAlert]:
+    async def _create_custom_threshold_alert(
+        self,
+        config: AlertConfiguration,
+        observations: Optional[ObservationCache] = None
+    ) -> Optional[CustomThresholdAlert]:
         """Create custom threshold alert"""
         try:
+            observations = observations or self._new_observation_cache()
+            
             # Get current value based on data source
             data_source = config.metadata.get('data_source', 'price') if config.metadata else 'price'
             
             if data_source == 'price':
-                current_data = await self._get_current_price_data(config.commodity, config.location)
+                current_data = await observations.current_price(config.commodity, config.location)
                 current_value = current_data.get('price', 0) if current_data else 0
                 unit = 'per quintal'
             elif data_source == 'weather':
-                current_data = await self._get_current_weather_data(config.location)
+                current_data = await observations.current_weather(config.location)
                 metric = config.metadata.get('weather_metric', 'temperature')
                 current_value = current_data.get(metric, 0) if current_data else 0
                 unit = '°C' if metric == 'temperature' else 'mm' if metric == 'rainfall' else ''
@@ -569,6 +487,8 @@ class CustomizableAlertEngine:
             
             # Add to active configurations
             self.active_configurations[config.id] = config
+            if config.is_active:
+                self.rule_index.add(config)
             
             logger.info(
                 "Alert configured",
@@ -632,8 +552,10 @@ class CustomizableAlertEngine:
             # Update active configurations
             if config.is_active:
                 self.active_configurations[alert_id] = config
+                self.rule_index.add(config)
             else:
                 self.active_configurations.pop(alert_id, None)
+                self.rule_index.remove(alert_id)
             
             return AlertToggleResponse(
                 alert_id=alert_id,
@@ -659,6 +581,7 @@ class CustomizableAlertEngine:
             if success:
                 # Remove from active configurations
                 self.active_configurations.pop(alert_id, None)
+                self.rule_index.remove(alert_id)
                 self.alert_cache.pop(alert_id, None)
             
             return success
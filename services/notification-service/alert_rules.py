@@ -0,0 +1,250 @@
+"""
+Alert Rule Index
+Indexes alert configurations by market and threshold so each tick fetches every
+distinct market observation once and finds triggered rules by range lookups
+"""
+
+import asyncio
+import structlog
+from bisect import bisect_left, bisect_right
+from typing import List, Dict, Any, Optional, Tuple, Callable, Awaitable
+
+from models import AlertConfiguration, AlertType, ThresholdCondition
+
+logger = structlog.get_logger()
+
+EQUALS_TOLERANCE = 0.01
+
+# Observed value per bucket, by (alert type, condition); combinations not listed never trigger
+PRICE_LEVEL = "price_level"              # current price
+PRICE_CHANGE = "price_change"            # signed % change vs the comparison period
+PRICE_MOVEMENT = "price_movement"        # absolute % change vs the comparison period
+PRICE_DROP = "price_drop"                # % drop vs the comparison period
+CUSTOM_VALUE = "custom_value"            # current price or weather metric, 0 when unavailable
+
+RULE_OBSERVATIONS = {
+    (AlertType.PRICE_MOVEMENT, ThresholdCondition.GREATER_THAN): PRICE_MOVEMENT,
+    (AlertType.PRICE_MOVEMENT, ThresholdCondition.PERCENTAGE_CHANGE): PRICE_MOVEMENT,
+    (AlertType.PRICE_RISE, ThresholdCondition.GREATER_THAN): PRICE_LEVEL,
+    (AlertType.PRICE_RISE, ThresholdCondition.PERCENTAGE_CHANGE): PRICE_CHANGE,
+    (AlertType.PRICE_DROP, ThresholdCondition.LESS_THAN): PRICE_LEVEL,
+    (AlertType.PRICE_DROP, ThresholdCondition.PERCENTAGE_CHANGE): PRICE_DROP,
+    (AlertType.CUSTOM_THRESHOLD, ThresholdCondition.GREATER_THAN): CUSTOM_VALUE,
+    (AlertType.CUSTOM_THRESHOLD, ThresholdCondition.LESS_THAN): CUSTOM_VALUE,
+    (AlertType.CUSTOM_THRESHOLD, ThresholdCondition.EQUALS): CUSTOM_VALUE,
+}
+
+def _normalize(value: Optional[str]) -> str:
+    return (value or "").strip().lower()
+
+class ObservationCache:
+    """Market observations fetched at most once per evaluation tick.
+
+    Concurrent requests for the same observation share one in-flight fetch.
+    """
+
+    def __init__(
+        self,
+        current_price: Callable[[str, str], Awaitable[Optional[Dict[str, Any]]]],
+        previous_price: Callable[[str, str, str], Awaitable[Optional[Dict[str, Any]]]],
+        current_weather: Callable[[str], Awaitable[Optional[Dict[str, Any]]]]
+    ):
+        self._fetchers = {
+            "current_price": current_price,
+            "previous_price": previous_price,
+            "current_weather": current_weather
+        }
+        self._tasks: Dict[Tuple, asyncio.Future] = {}
+
+    @property
+    def fetch_count(self) -> int:
+        return len(self._tasks)
+
+    def _get(self, kind: str, key: Tuple, *args) -> Awaitable[Optional[Dict[str, Any]]]:
+        task = self._tasks.get((kind,) + key)
+        if task is None:
+            task = self._tasks[(kind,) + key] = asyncio.ensure_future(self._fetchers[kind](*args))
+        return task
+
+    def current_price(self, commodity: str, location: str):
+        return self._get("current_price", (_normalize(commodity), _normalize(location)), commodity, location)
+
+    def previous_price(self, commodity: str, location: str, period: str):
+        return self._get(
+            "previous_price", (_normalize(commodity), _normalize(location), period), commodity, location, period
+        )
+
+    def current_weather(self, location: str):
+        return self._get("current_weather", (_normalize(location),), location)
+
+class RuleBucket:
+    """Rules sharing one observed value, kept sorted by threshold"""
+
+    def __init__(self, key: Tuple, config: AlertConfiguration, observation: str):
+        self.key = key
+        self.alert_type = config.alert_type
+        self.condition = config.threshold_condition
+        self.observation = observation
+        self.commodity = config.commodity
+        self.location = config.location
+        self.period = config.comparison_period or "24h"
+        metadata = config.metadata or {}
+        self.data_source = metadata.get('data_source', 'price')
+        self.weather_metric = metadata.get('weather_metric', 'temperature')
+        self.thresholds: List[float] = []
+        self.config_ids: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.config_ids)
+
+    def add(self, threshold: float, config_id: str):
+        position = bisect_right(self.thresholds, threshold)
+        self.thresholds.insert(position, threshold)
+        self.config_ids.insert(position, config_id)
+
+    def remove(self, threshold: float, config_id: str):
+        position = bisect_left(self.thresholds, threshold)
+        while position < len(self.config_ids):
+            if self.config_ids[position] == config_id:
+                del self.thresholds[position]
+                del self.config_ids[position]
+                return
+            position += 1
+
+    def matching(self, value: float) -> List[str]:
+        """Config ids whose threshold condition holds for `value`"""
+        if self.condition == ThresholdCondition.GREATER_THAN:
+            # value > threshold
+            return self.config_ids[:bisect_left(self.thresholds, value)]
+        if self.condition == ThresholdCondition.PERCENTAGE_CHANGE:
+            # value >= threshold
+            return self.config_ids[:bisect_right(self.thresholds, value)]
+        if self.condition == ThresholdCondition.LESS_THAN:
+            # value < threshold
+            return self.config_ids[bisect_right(self.thresholds, value):]
+        if self.condition == ThresholdCondition.EQUALS:
+            # |value - threshold| < tolerance
+            return self.config_ids[
+                bisect_right(self.thresholds, value - EQUALS_TOLERANCE):
+                bisect_left(self.thresholds, value + EQUALS_TOLERANCE)
+            ]
+        return []
+
+    async def observe(self, observations: ObservationCache) -> Optional[float]:
+        """The bucket's observed value this tick, or None when rules cannot be evaluated"""
+        if self.observation == CUSTOM_VALUE:
+            if self.data_source == 'price':
+                current = await observations.current_price(self.commodity, self.location)
+                return current.get('price', 0) if current else 0
+            if self.data_source == 'weather':
+                current = await observations.current_weather(self.location)
+                return current.get(self.weather_metric, 0) if current else 0
+            return None
+
+        current = await observations.current_price(self.commodity, self.location)
+        if not current:
+            return None
+        current_price = current.get('price', 0)
+        if self.observation == PRICE_LEVEL:
+            return current_price
+
+        previous = await observations.previous_price(self.commodity, self.location, self.period)
+        previous_price = previous.get('price', 0) if previous else 0
+        if previous_price == 0:
+            return None
+
+        change = (current_price - previous_price) / previous_price * 100
+        if self.observation == PRICE_MOVEMENT:
+            return abs(change)
+        if self.observation == PRICE_DROP:
+            return -change
+        return change
+
+class AlertRuleIndex:
+    """Active alert configurations grouped into threshold-sorted buckets by market"""
+
+    def __init__(self):
+        self._buckets: Dict[Tuple, RuleBucket] = {}
+        self._rules: Dict[str, Tuple[Tuple, float]] = {}  # config id -> (bucket key, threshold)
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    @property
+    def bucket_count(self) -> int:
+        return len(self._buckets)
+
+    @staticmethod
+    def bucket_key(config: AlertConfiguration) -> Optional[Tuple]:
+        observation = RULE_OBSERVATIONS.get((config.alert_type, config.threshold_condition))
+        if observation is None:
+            return None
+
+        market = (_normalize(config.commodity), _normalize(config.location))
+        if observation in (PRICE_CHANGE, PRICE_MOVEMENT, PRICE_DROP):
+            extra = (config.comparison_period or "24h",)
+        elif observation == CUSTOM_VALUE:
+            metadata = config.metadata or {}
+            data_source = metadata.get('data_source', 'price')
+            if data_source == 'weather':
+                # Weather rules depend on location only
+                market = ("", _normalize(config.location))
+                extra = (data_source, metadata.get('weather_metric', 'temperature'))
+            else:
+                extra = (data_source,)
+        else:
+            extra = ()
+
+        return (config.alert_type, config.threshold_condition) + market + extra
+
+    def add(self, config: AlertConfiguration):
+        self.remove(config.id)
+        key = self.bucket_key(config)
+        if key is None:
+            logger.warning(
+                "Alert configuration can never trigger",
+                config_id=config.id,
+                alert_type=config.alert_type,
+                threshold_condition=config.threshold_condition
+            )
+            return
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = RuleBucket(key, config, RULE_OBSERVATIONS[key[:2]])
+        bucket.add(config.threshold_value, config.id)
+        self._rules[config.id] = (key, config.threshold_value)
+
+    def remove(self, config_id: str):
+        rule = self._rules.pop(config_id, None)
+        if rule is None:
+            return
+        key, threshold = rule
+        bucket = self._buckets[key]
+        bucket.remove(threshold, config_id)
+        if not bucket:
+            del self._buckets[key]
+
+    def rebuild(self, configs: List[AlertConfiguration]):
+        self._buckets.clear()
+        self._rules.clear()
+        for config in configs:
+            self.add(config)
+
+    async def triggered(self, observations: ObservationCache) -> List[str]:
+        """Config ids of every rule whose condition holds this tick"""
+        buckets = list(self._buckets.values())
+        values = await asyncio.gather(
+            *(bucket.observe(observations) for bucket in buckets),
+            return_exceptions=True
+        )
+
+        triggered = []
+        for bucket, value in zip(buckets, values):
+            if isinstance(value, Exception):
+                logger.error("Error observing alert rule market", bucket=bucket.key, error=str(value))
+                continue
+            if value is None:
+                continue
+            triggered.extend(bucket.matching(value))
+        return triggered
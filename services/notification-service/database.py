@@ -13,7 +13,7 @@ import os
 from models import (
     AlertConfiguration, UserAlertPreferences, BaseAlert, AlertHistory,
     NotificationDelivery, NotificationTemplate, WeatherData, PriceData,
-    AlertType, AlertSeverity, NotificationChannel
+    AlertType, AlertSeverity, NotificationChannel, AlertEvent
 )
 
 logger = structlog.get_logger()
@@ -23,6 +23,8 @@ logger = structlog.get_logger()
 _alert_configurations: Dict[str, AlertConfiguration] = {}
 _user_preferences: Dict[str, UserAlertPreferences] = {}
 _alert_history: List[AlertHistory] = []
+_alert_events: Dict[str, AlertEvent] = {}
+_alert_recipients: List[Dict[str, Any]] = []  # event_id, user_id, location, was_read, was_acknowledged
 _notification_deliveries: Dict[str, NotificationDelivery] = {}
 _notification_templates: List[NotificationTemplate] = []
 _weather_data: List[WeatherData] = []
@@ -203,6 +205,33 @@ async def store_alert_history(history: AlertHistory):
         logger.error("Error storing alert history", alert_id=history.id, error=str(e))
         raise
 
+def _event_history(user_id: str) -> List[AlertHistory]:
+    """History records for the alert events a user received, rendered on read"""
+    history = []
+    for recipient in _alert_recipients:
+        if recipient['user_id'] != user_id:
+            continue
+        event = _alert_events.get(recipient['event_id'])
+        if not event:
+            continue
+        
+        rendered = event.render(recipient.get('location'))
+        history.append(AlertHistory(
+            id=f"{event.id}:{user_id}",
+            user_id=user_id,
+            alert_type=event.alert_type,
+            severity=event.severity,
+            title=rendered['title'],
+            message=rendered['message'],
+            commodity=event.commodity,
+            location=recipient.get('location') or event.location,
+            created_at=event.created_at,
+            was_read=recipient.get('was_read', False),
+            was_acknowledged=recipient.get('was_acknowledged', False),
+            metadata=event.metadata
+        ))
+    return history
+
 async def get_alert_history(
     user_id: str, 
     limit: int = 50, 
@@ -212,7 +241,7 @@ async def get_alert_history(
     """Get alert history for a user"""
     try:
         user_history = []
-        for history in _alert_history:
+        for history in _alert_history + _event_history(user_id):
             if history.user_id == user_id:
                 if not alert_type or history.alert_type.value == alert_type:
                     user_history.append(history)
@@ -251,6 +280,32 @@ async def update_notification_delivery(delivery: NotificationDelivery):
         logger.error("Error updating notification delivery", delivery_id=delivery.id, error=str(e))
         raise
 
+async def store_notification_deliveries(deliveries: List[NotificationDelivery]):
+    """Store several notification delivery records in one write"""
+    try:
+        for delivery in deliveries:
+            _notification_deliveries[delivery.id] = delivery
+        logger.info("Notification deliveries stored", count=len(deliveries))
+        
+    except Exception as e:
+        logger.error("Error storing notification deliveries", count=len(deliveries), error=str(e))
+        raise
+
+async def update_notification_deliveries(deliveries: List[NotificationDelivery]):
+    """Update several notification delivery records in one write"""
+    try:
+        missing = [delivery.id for delivery in deliveries if delivery.id not in _notification_deliveries]
+        if missing:
+            raise ValueError(f"Notification deliveries {missing} not found")
+        
+        for delivery in deliveries:
+            _notification_deliveries[delivery.id] = delivery
+        logger.info("Notification deliveries updated", count=len(deliveries))
+        
+    except Exception as e:
+        logger.error("Error updating notification deliveries", count=len(deliveries), error=str(e))
+        raise
+
 # Template operations
 async def get_notification_templates() -> List[NotificationTemplate]:
     """Get all notification templates"""
@@ -277,6 +332,21 @@ async def store_weather_data(weather_data: WeatherData):
         logger.error("Error storing weather data", error=str(e))
         raise
 
+async def store_weather_data_bulk(observations: List[WeatherData]):
+    """Store weather observations from one monitoring pass in a single write"""
+    try:
+        _weather_data.extend(observations)
+        
+        # Keep only last 1000 records to prevent memory issues
+        if len(_weather_data) > 1000:
+            del _weather_data[:len(_weather_data) - 1000]
+        
+        logger.info("Weather data stored", count=len(observations))
+        
+    except Exception as e:
+        logger.error("Error storing weather data", count=len(observations), error=str(e))
+        raise
+
 async def get_weather_data(location: str, limit: int = 10) -> List[WeatherData]:
     """Get recent weather data for a location"""
     try:
@@ -417,6 +487,35 @@ async def store_price_alert(alert: BaseAlert):
         logger.error("Error storing price alert", alert_id=alert.id, error=str(e))
         raise
 
+async def store_alert_event(event: AlertEvent, recipients: List[Dict[str, Any]]):
+    """Store an alert event and write its recipient rows in bulk"""
+    try:
+        _alert_events[event.id] = event
+        _alert_recipients.extend(
+            {
+                'event_id': event.id,
+                'user_id': recipient['user_id'],
+                'location': recipient.get('location'),
+                'was_read': False,
+                'was_acknowledged': False
+            }
+            for recipient in recipients
+        )
+        logger.info("Alert event stored", event_id=event.id, recipients=len(recipients))
+        
+    except Exception as e:
+        logger.error("Error storing alert event", event_id=event.id, error=str(e))
+        raise
+
+async def get_alert_event(event_id: str) -> Optional[AlertEvent]:
+    """Get alert event by ID"""
+    try:
+        return _alert_events.get(event_id)
+        
+    except Exception as e:
+        logger.error("Error getting alert event", event_id=event_id, error=str(e))
+        return None
+
 # Statistics operations
 async def get_alert_statistics(user_id: str, date: datetime) -> Dict[str, Any]:
     """Get alert statistics for a user and date"""
@@ -433,7 +532,7 @@ async def get_alert_statistics(user_id: str, date: datetime) -> Dict[str, Any]:
         target_date = date.date()
         user_alerts = []
         
-        for history in _alert_history:
+        for history in _alert_history + _event_history(user_id):
             if (history.user_id == user_id and 
                 history.created_at.date() == target_date):
                 user_alerts.append(history)
@@ -477,6 +576,8 @@ async def clear_all_data():
     _alert_configurations.clear()
     _user_preferences.clear()
     _alert_history.clear()
+    _alert_events.clear()
+    _alert_recipients.clear()
     _notification_deliveries.clear()
     _weather_data.clear()
     _price_data.clear()
@@ -489,6 +590,8 @@ async def get_data_counts() -> Dict[str, int]:
         'alert_configurations': len(_alert_configurations),
         'user_preferences': len(_user_preferences),
         'alert_history': len(_alert_history),
+        'alert_events': len(_alert_events),
+        'alert_recipients': len(_alert_recipients),
         'notification_deliveries': len(_notification_deliveries),
         'weather_data': len(_weather_data),
         'price_data': len(_price_data),
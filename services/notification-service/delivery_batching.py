@@ -0,0 +1,89 @@
+"""
+Delivery Batching
+Coalesces deliveries per channel over a short window into provider-sized batches
+"""
+
+import asyncio
+import structlog
+from typing import Any, Awaitable, Callable, List, Optional, Set
+
+logger = structlog.get_logger()
+
+BATCH_WINDOW = 0.05  # seconds the first delivery of a batch may wait for company
+# Default bound on unsent items, in batches beyond those that may be flushing at once
+PENDING_BATCHES = 2
+
+class DeliveryBatcher:
+    """Collects items for one channel and hands them to `flush` in batches.
+
+    A batch is flushed once it holds `max_batch_size` items or `window` seconds
+    after its first item arrived, whichever comes first. At most `concurrency`
+    flushes run at a time; later batches wait for a slot.
+
+    At most `max_pending` items are accepted but not yet flushed. Once that
+    many are waiting, as during a provider outage, `submit` blocks until a
+    flush completes, so callers slow down instead of queueing without bound.
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int,
+        flush: Callable[[List[Any]], Awaitable[None]],
+        window: float = BATCH_WINDOW,
+        concurrency: int = 1,
+        max_pending: Optional[int] = None
+    ):
+        self.max_batch_size = max(max_batch_size, 1)
+        self.window = window
+        concurrency = max(concurrency, 1)
+        self.max_pending = max(max_pending or self.max_batch_size * (concurrency + PENDING_BATCHES), 1)
+        self._capacity = asyncio.Semaphore(self.max_pending)
+        self._flush = flush
+        self._pending: List[Any] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._slots = asyncio.Semaphore(concurrency)
+        self._flushing: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    @property
+    def batches_in_flight(self) -> int:
+        return len(self._flushing)
+
+    async def submit(self, item: Any):
+        """Queue an item, waiting while max_pending items are still unsent"""
+        await self._capacity.acquire()
+        self._pending.append(item)
+        if len(self._pending) >= self.max_batch_size:
+            self._release()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._release)
+
+    def _release(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        task = asyncio.create_task(self._run(batch))
+        self._flushing.add(task)
+        task.add_done_callback(self._flushing.discard)
+
+    async def _run(self, batch: List[Any]):
+        try:
+            async with self._slots:
+                await self._flush(batch)
+        except Exception as e:
+            logger.error("Error flushing delivery batch", size=len(batch), error=str(e))
+        finally:
+            for _ in batch:
+                self._capacity.release()
+
+    async def drain(self):
+        """Flush whatever is pending and wait for every batch in flight"""
+        self._release()
+        if self._flushing:
+            await asyncio.gather(*self._flushing, return_exceptions=True)
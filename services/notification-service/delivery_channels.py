@@ -5,13 +5,14 @@ Implements specific delivery mechanisms for different notification channels
 
 import asyncio
 import structlog
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime
 import aiohttp
 import json
+import os
 import smtplib
-from email.mime.text import MimeText
-from email.mime.multipart import MimeMultipart
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
 
 from models import (
     NotificationDelivery, NotificationChannel, UserAlertPreferences,
@@ -20,19 +21,36 @@ from models import (
 
 logger = structlog.get_logger()
 
+# Per-message statuses a batch provider reports for messages it took
+ACCEPTED_STATUSES = {"accepted", "queued", "sent", "delivered"}
+
 class BaseDeliveryChannel:
     """Base class for notification delivery channels"""
     
+    max_batch_size = 1  # messages per provider request
+    
     def __init__(self, channel: NotificationChannel):
         self.channel = channel
         self.is_enabled = True
         self.max_retries = 3
         self.timeout = 30
+        self.session: Optional[aiohttp.ClientSession] = None
+    
+    def use_session(self, session: aiohttp.ClientSession):
+        """Share a pooled HTTP session for provider requests"""
+        self.session = session
     
     async def send(self, delivery: NotificationDelivery, preferences: UserAlertPreferences) -> bool:
         """Send notification through this channel"""
         raise NotImplementedError("Subclasses must implement send method")
     
+    async def send_batch(
+        self,
+        items: List[Tuple[NotificationDelivery, UserAlertPreferences]]
+    ) -> List[bool]:
+        """Send several notifications; one result per item, in order"""
+        return list(await asyncio.gather(*(self.send(delivery, preferences) for delivery, preferences in items)))
+    
     async def validate_delivery_data(self, delivery: NotificationDelivery, preferences: UserAlertPreferences) -> bool:
         """Validate that required data is available for delivery"""
         return True
@@ -60,9 +78,109 @@ class BaseDeliveryChannel:
         """Format content specifically for this channel"""
         return f"{title}\n\n{message}"
 
-class SMSDeliveryChannel(BaseDeliveryChannel):
+class BatchingDeliveryChannel(BaseDeliveryChannel):
+    """Channel whose provider accepts many messages per request.
+    
+    Messages are posted as {"messages": [...]} to the provider's batch endpoint
+    (set through `batch_api_env`) over the shared session; each message carries
+    its delivery id as `reference`, and the provider answers with a status per
+    reference. Without an endpoint, batches are simulated.
+    """
+    
+    max_batch_size = 100
+    batch_api_env = ""
+    simulated_latency = 0.1  # seconds per simulated provider request
+    
+    def __init__(self, channel: NotificationChannel):
+        super().__init__(channel)
+        self.api_key = ""
+        self.batch_api_url: Optional[str] = os.getenv(self.batch_api_env) if self.batch_api_env else None
+    
+    def _build_message(self, delivery: NotificationDelivery, preferences: UserAlertPreferences) -> Dict[str, Any]:
+        """Provider message for one delivery"""
+        raise NotImplementedError("Subclasses must implement _build_message")
+    
+    def _auth_headers(self) -> Dict[str, str]:
+        return {'Authorization': f'Bearer {self.api_key}'}
+    
+    async def send(self, delivery: NotificationDelivery, preferences: UserAlertPreferences) -> bool:
+        """Send a single notification as a batch of one"""
+        results = await self.send_batch([(delivery, preferences)])
+        return results[0]
+    
+    async def send_batch(
+        self,
+        items: List[Tuple[NotificationDelivery, UserAlertPreferences]]
+    ) -> List[bool]:
+        """Send notifications in provider requests of up to max_batch_size messages"""
+        results = [False] * len(items)
+        messages = []
+        positions = []
+        
+        for position, (delivery, preferences) in enumerate(items):
+            try:
+                if not await self.validate_delivery_data(delivery, preferences):
+                    continue
+                message = self._build_message(delivery, preferences)
+                message['reference'] = delivery.id
+                messages.append(message)
+                positions.append(position)
+            except Exception as e:
+                logger.error("Error preparing message", channel=self.channel.value, delivery_id=delivery.id, error=str(e))
+        
+        for start in range(0, len(messages), self.max_batch_size):
+            accepted = await self._submit_batch(messages[start:start + self.max_batch_size])
+            for offset, success in enumerate(accepted):
+                results[positions[start + offset]] = success
+        
+        return results
+    
+    async def _submit_batch(self, messages: List[Dict[str, Any]]) -> List[bool]:
+        """Send one provider request; per-message acceptance in order"""
+        try:
+            if self.session and self.batch_api_url:
+                async with self.session.post(
+                    self.batch_api_url,
+                    json={'messages': messages},
+                    headers=self._auth_headers(),
+                    timeout=aiohttp.ClientTimeout(total=self.timeout)
+                ) as response:
+                    if response.status != 200:
+                        logger.error(
+                            "Provider batch request failed",
+                            channel=self.channel.value,
+                            status=response.status,
+                            messages=len(messages)
+                        )
+                        return [False] * len(messages)
+                    body = await response.json()
+                
+                statuses = {result.get('reference'): result.get('status') for result in body.get('results', [])}
+                accepted = [statuses.get(message['reference']) in ACCEPTED_STATUSES for message in messages]
+            else:
+                # In production, batch_api_url points at the provider's bulk endpoint
+                await asyncio.sleep(self.simulated_latency)
+                accepted = [True] * len(messages)
+            
+            logger.info(
+                "Provider batch sent",
+                channel=self.channel.value,
+                messages=len(messages),
+                accepted=sum(accepted)
+            )
+            return accepted
+            
+        except Exception as e:
+            logger.error("Error sending provider batch", channel=self.channel.value, messages=len(messages), error=str(e))
+            return [False] * len(messages)
+
+class SMSDeliveryChannel(BatchingDeliveryChannel):
     """SMS notification delivery channel"""
     
+    max_batch_size = 500
+    batch_api_env = "SMS_BATCH_API_URL"
+    simulated_latency = 0.1
+    
     def __init__(self):
         super().__init__(NotificationChannel.SMS)
         self.api_url = "https://api.sms-service.com/send"
@@ -83,50 +201,15 @@ class SMSDeliveryChannel(BaseDeliveryChannel):
         
         return True
     
-    async def send(self, delivery: NotificationDelivery, preferences: UserAlertPreferences) -> bool:
-        """Send SMS notification"""
-        try:
-            if not await self.validate_delivery_data(delivery, preferences):
-                return False
-            
-            formatted = self.format_message(delivery, preferences)
-            
-            # Prepare SMS payload
-            payload = {
-                'to': preferences.phone_number,
-                'from': self.sender_id,
-                'message': formatted['formatted_content'],
-                'api_key': self.api_key
-            }
-            
-            # In production, would make actual API call
-            # For now, simulate SMS sending
-            await self._simulate_sms_send(payload)
-            
-            logger.info(
-                "SMS sent successfully",
-                user_id=delivery.user_id,
-                phone=preferences.phone_number,
-                message_length=len(formatted['formatted_content'])
-            )
-            
-            return True
-            
-        except Exception as e:
-            logger.error("Error sending SMS", delivery_id=delivery.id, error=str(e))
-            return False
-    
-    async def _simulate_sms_send(self, payload: Dict[str, Any]):
-        """Simulate SMS sending (for development/testing)"""
-        # Simulate network delay
-        await asyncio.sleep(0.1)
+    def _build_message(self, delivery: NotificationDelivery, preferences: UserAlertPreferences) -> Dict[str, Any]:
+        """Prepare SMS payload"""
+        formatted = self.format_message(delivery, preferences)
         
-        # Log the SMS that would be sent
-        logger.info(
-            "SMS simulation",
-            to=payload['to'],
-            message=payload['message'][:50] + "..." if len(payload['message']) > 50 else payload['message']
-        )
+        return {
+            'to': preferences.phone_number,
+            'from': self.sender_id,
+            'message': formatted['formatted_content']
+        }
     
     def _format_content_for_channel(self, title: str, message: str, metadata: Dict[str, Any]) -> str:
         """Format SMS content with character limits"""
@@ -143,76 +226,57 @@ class SMSDeliveryChannel(BaseDeliveryChannel):
         
         return content
 
-class PushNotificationChannel(BaseDeliveryChannel):
+class PushNotificationChannel(BatchingDeliveryChannel):
     """Push notification delivery channel"""
     
+    max_batch_size = 500
+    batch_api_env = "PUSH_BATCH_API_URL"
+    simulated_latency = 0.05
+    
     def __init__(self):
         super().__init__(NotificationChannel.PUSH)
         self.fcm_url = "https://fcm.googleapis.com/fcm/send"
         self.server_key = "your_fcm_server_key"
     
+    def _auth_headers(self) -> Dict[str, str]:
+        return {'Authorization': f'key={self.server_key}'}
+    
     async def validate_delivery_data(self, delivery: NotificationDelivery, preferences: UserAlertPreferences) -> bool:
         """Validate push notification requirements"""
         # In production, would check for device tokens
         # For now, assume all users have push capability
         return True
     
-    async def send(self, delivery: NotificationDelivery, preferences: UserAlertPreferences) -> bool:
-        """Send push notification"""
-        try:
-            formatted = self.format_message(delivery, preferences)
-            metadata = delivery.metadata or {}
-            
-            # Prepare push notification payload
-            payload = {
-                'to': f"user_device_token_{delivery.user_id}",  # Would be actual device token
-                'notification': {
-                    'title': formatted['title'],
-                    'body': formatted['message'],
-                    'icon': 'mandi_ear_icon',
-                    'sound': 'default'
-                },
-                'data': {
-                    'alert_id': delivery.alert_id,
-                    'alert_type': metadata.get('alert_type', ''),
-                    'commodity': metadata.get('commodity', ''),
-                    'location': metadata.get('location', ''),
-                    'severity': metadata.get('severity', ''),
-                    'timestamp': datetime.utcnow().isoformat()
-                }
+    def _build_message(self, delivery: NotificationDelivery, preferences: UserAlertPreferences) -> Dict[str, Any]:
+        """Prepare push notification payload"""
+        formatted = self.format_message(delivery, preferences)
+        metadata = delivery.metadata or {}
+        
+        payload = {
+            'to': f"user_device_token_{delivery.user_id}",  # Would be actual device token
+            'notification': {
+                'title': formatted['title'],
+                'body': formatted['message'],
+                'icon': 'mandi_ear_icon',
+                'sound': 'default'
+            },
+            'data': {
+                'alert_id': delivery.alert_id,
+                'alert_type': metadata.get('alert_type', ''),
+                'commodity': metadata.get('commodity', ''),
+                'location': metadata.get('location', ''),
+                'severity': metadata.get('severity', ''),
+                'timestamp': datetime.utcnow().isoformat()
             }
-            
-            # Add priority based on alert severity
-            severity = metadata.get('severity', 'medium')
-            if severity in ['critical', 'emergency']:
-                payload['priority'] = 'high'
-                payload['notification']['sound'] = 'emergency_alert'
-            
-            # In production, would make actual FCM API call
-            await self._simulate_push_send(payload)
-            
-            logger.info(
-                "Push notification sent successfully",
-                user_id=delivery.user_id,
-                title=formatted['title']
-            )
-            
-            return True
-            
-        except Exception as e:
-            logger.error("Error sending push notification", delivery_id=delivery.id, error=str(e))
-            return False
-    
-    async def _simulate_push_send(self, payload: Dict[str, Any]):
-        """Simulate push notification sending"""
-        await asyncio.sleep(0.05)
+        }
         
-        logger.info(
-            "Push notification simulation",
-            to=payload['to'],
-            title=payload['notification']['title'],
-            body=payload['notification']['body'][:50] + "..." if len(payload['notification']['body']) > 50 else payload['notification']['body']
-        )
+        # Add priority based on alert severity
+        severity = metadata.get('severity', 'medium')
+        if severity in ['critical', 'emergency']:
+            payload['priority'] = 'high'
+            payload['notification']['sound'] = 'emergency_alert'
+        
+        return payload
 
 class EmailDeliveryChannel(BaseDeliveryChannel):
     """Email notification delivery channel"""
@@ -432,9 +496,13 @@ class VoiceCallChannel(BaseDeliveryChannel):
             script_length=len(payload['script'])
         )
 
-class WhatsAppChannel(BaseDeliveryChannel):
+class WhatsAppChannel(BatchingDeliveryChannel):
     """WhatsApp notification delivery channel"""
     
+    max_batch_size = 100
+    batch_api_env = "WHATSAPP_BATCH_API_URL"
+    simulated_latency = 0.1
+    
     def __init__(self):
         super().__init__(NotificationChannel.WHATSAPP)
         self.whatsapp_api_url = "https://api.whatsapp-business.com/send"
@@ -452,48 +520,17 @@ class WhatsAppChannel(BaseDeliveryChannel):
         
         return True
     
-    async def send(self, delivery: NotificationDelivery, preferences: UserAlertPreferences) -> bool:
-        """Send WhatsApp notification"""
-        try:
-            if not await self.validate_delivery_data(delivery, preferences):
-                return False
-            
-            formatted = self.format_message(delivery, preferences)
-            
-            # Prepare WhatsApp payload
-            payload = {
-                'to': preferences.whatsapp_number,
-                'type': 'text',
-                'text': {
-                    'body': formatted['formatted_content']
-                },
-                'api_key': self.api_key
-            }
-            
-            # In production, would make actual WhatsApp API call
-            await self._simulate_whatsapp_send(payload)
-            
-            logger.info(
-                "WhatsApp message sent successfully",
-                user_id=delivery.user_id,
-                whatsapp=preferences.whatsapp_number
-            )
-            
-            return True
-            
-        except Exception as e:
-            logger.error("Error sending WhatsApp message", delivery_id=delivery.id, error=str(e))
-            return False
-    
-    async def _simulate_whatsapp_send(self, payload: Dict[str, Any]):
-        """Simulate WhatsApp sending"""
-        await asyncio.sleep(0.1)
+    def _build_message(self, delivery: NotificationDelivery, preferences: UserAlertPreferences) -> Dict[str, Any]:
+        """Prepare WhatsApp payload"""
+        formatted = self.format_message(delivery, preferences)
         
-        logger.info(
-            "WhatsApp simulation",
-            to=payload['to'],
-            message=payload['text']['body'][:50] + "..." if len(payload['text']['body']) > 50 else payload['text']['body']
-        )
+        return {
+            'to': preferences.whatsapp_number,
+            'type': 'text',
+            'text': {
+                'body': formatted['formatted_content']
+            }
+        }
     
     def _format_content_for_channel(self, title: str, message: str, metadata: Dict[str, Any]) -> str:
         """Format WhatsApp content with rich formatting"""
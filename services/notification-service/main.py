@@ -20,6 +20,7 @@ from notification_dispatcher import NotificationDispatcher
 from weather_monitor import WeatherEmergencyMonitor
 from price_monitor import PriceMovementMonitor
 from database import init_database, close_database
+from weather_acquisition import WeatherAcquisition
 
 logger = structlog.get_logger()
 
@@ -28,11 +29,12 @@ alert_engine: Optional[CustomizableAlertEngine] = None
 notification_dispatcher: Optional[NotificationDispatcher] = None
 weather_monitor: Optional[WeatherEmergencyMonitor] = None
 price_monitor: Optional[PriceMovementMonitor] = None
+weather: Optional[WeatherAcquisition] = None
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan management"""
-    global alert_engine, notification_dispatcher, weather_monitor, price_monitor
+    global alert_engine, notification_dispatcher, weather_monitor, price_monitor, weather
     
     try:
         # Initialize database
@@ -40,9 +42,11 @@ async def lifespan(app: FastAPI):
         logger.info("Database initialized")
         
         # Initialize core components
-        alert_engine = CustomizableAlertEngine()
+        # Alert rules and the weather monitor share one weather cache
+        weather = WeatherAcquisition.from_env()
+        alert_engine = CustomizableAlertEngine(weather)
         notification_dispatcher = NotificationDispatcher()
-        weather_monitor = WeatherEmergencyMonitor()
+        weather_monitor = WeatherEmergencyMonitor(weather)
         price_monitor = PriceMovementMonitor()
         
         # Initialize all components
@@ -72,6 +76,8 @@ async def lifespan(app: FastAPI):
             await alert_engine.shutdown()
         if notification_dispatcher:
             await notification_dispatcher.shutdown()
+        if weather:
+            await weather.close()
         
         await close_database()
         logger.info("Notification service shutdown complete")
@@ -156,6 +156,49 @@ class CustomThresholdAlert(BaseAlert):
     condition_met: str
     trigger_data: Dict[str, Any]
 
+class AlertEvent(BaseModel):
+    """Alert raised once for a market or weather event and fanned out to its recipients.
+
+    Title and message are rendered once per event with a `{location}` slot that is
+    filled per recipient at delivery time.
+    """
+    id: str = Field(default_factory=lambda: str(uuid4()))
+    alert_type: AlertType
+    severity: AlertSeverity
+    title_template: str
+    message_template: str
+    commodity: Optional[str] = None
+    location: Optional[str] = None  # Used when the recipient has no location of their own
+    recipients: List[str] = []  # User ids
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    metadata: Optional[Dict[str, Any]] = None
+
+    @staticmethod
+    def literal(text: str) -> str:
+        """Escape text so it renders verbatim"""
+        return text.replace('{', '{{').replace('}', '}}')
+
+    @classmethod
+    def from_alert(cls, alert: BaseAlert, recipients: List[str]) -> "AlertEvent":
+        return cls(
+            alert_type=alert.alert_type,
+            severity=alert.severity,
+            title_template=cls.literal(alert.title),
+            message_template=cls.literal(alert.message),
+            commodity=alert.commodity,
+            location=alert.location,
+            recipients=recipients,
+            metadata=alert.metadata
+        )
+
+    def render(self, location: Optional[str] = None) -> Dict[str, str]:
+        """Title and message for one recipient"""
+        variables = {'location': location or self.location or ''}
+        return {
+            'title': self.title_template.format_map(variables),
+            'message': self.message_template.format_map(variables)
+        }
+
 class NotificationDelivery(BaseModel):
     """Notification delivery record"""
     id: str = Field(default_factory=lambda: str(uuid4()))
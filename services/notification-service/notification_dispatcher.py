@@ -5,24 +5,42 @@ Handles multi-channel notification delivery with user preferences
 
 import asyncio
 import structlog
-from typing import List, Dict, Any, Optional
+from collections import OrderedDict, defaultdict, deque
+from functools import partial
+from typing import List, Dict, Any, Optional, Deque, Tuple, Union
 from datetime import datetime, time
 import aiohttp
 import json
 
 from models import (
     BaseAlert, UserAlertPreferences, NotificationChannel, NotificationDelivery,
-    AlertSeverity, NotificationTemplate
+    AlertSeverity, NotificationTemplate, AlertEvent
 )
 from database import (
-    get_user_preferences, store_user_preferences, store_notification_delivery,
-    update_notification_delivery, get_notification_templates
+    get_user_preferences, store_user_preferences, store_notification_deliveries,
+    update_notification_delivery, update_notification_deliveries, get_notification_templates,
+    store_alert_event, get_alert_event
 )
+from delivery_batching import DeliveryBatcher
 from delivery_channels import DeliveryChannelFactory, BaseDeliveryChannel
 from preference_manager import NotificationPreferenceManager
+from retry_scheduler import RetryPolicy, RetryScheduler
 
 logger = structlog.get_logger()
 
+DELIVERY_WORKERS = 8
+# Deliveries one channel may have in flight, so a slow provider cannot hold every worker
+DEFAULT_CHANNEL_CONCURRENCY = 4
+CHANNEL_CONCURRENCY: Dict[NotificationChannel, int] = {
+    NotificationChannel.VOICE: 2
+}
+DEAD_LETTER_LIMIT = 1000
+# Pooled provider connections shared by every channel
+PROVIDER_CONNECTION_LIMIT = 100
+PROVIDER_CONNECTIONS_PER_HOST = 20
+# Recent alert events kept for rendering their deliveries
+EVENT_CACHE_SIZE = 256
+
 class NotificationDispatcher:
     """Enhanced notification dispatcher with multi-channel delivery and intelligent routing"""
     
@@ -34,6 +52,18 @@ class NotificationDispatcher:
         self.templates: Dict[str, NotificationTemplate] = {}
         self.preference_manager = NotificationPreferenceManager()
         self.delivery_channels: Dict[NotificationChannel, BaseDeliveryChannel] = {}
+        # Channels whose provider takes batches coalesce deliveries instead of sending one by one
+        self.batchers: Dict[NotificationChannel, DeliveryBatcher] = {}
+        # Preferences looked up while queueing, so workers need not fetch them again
+        self._queued_preferences: Dict[str, UserAlertPreferences] = {}
+        self._events: "OrderedDict[str, AlertEvent]" = OrderedDict()
+        
+        # Failed deliveries wait in the retry heap, not in a worker
+        self.retry_policy = RetryPolicy()
+        self.retry_scheduler = RetryScheduler(self.delivery_queue.put_nowait)
+        self.dead_letters: Deque[NotificationDelivery] = deque(maxlen=DEAD_LETTER_LIMIT)
+        self._in_flight: Dict[NotificationChannel, int] = defaultdict(int)
+        self._channel_backlog: Dict[NotificationChannel, Deque[NotificationDelivery]] = defaultdict(deque)
         
         # Performance metrics
         self.delivery_stats = {
@@ -47,7 +77,11 @@ class NotificationDispatcher:
         """Initialize the notification dispatcher"""
         try:
             self.session = aiohttp.ClientSession(
-                timeout=aiohttp.ClientTimeout(total=120)
+                timeout=aiohttp.ClientTimeout(total=120),
+                connector=aiohttp.TCPConnector(
+                    limit=PROVIDER_CONNECTION_LIMIT,
+                    limit_per_host=PROVIDER_CONNECTIONS_PER_HOST
+                )
             )
             
             # Initialize delivery channels
@@ -58,7 +92,8 @@ class NotificationDispatcher:
             
             # Start delivery workers
             self.is_running = True
-            for i in range(3):  # 3 worker tasks
+            self.retry_scheduler.start()
+            for i in range(DELIVERY_WORKERS):
                 worker = asyncio.create_task(self._delivery_worker(f"worker-{i}"))
                 self.delivery_workers.append(worker)
             
@@ -78,7 +113,16 @@ class NotificationDispatcher:
             for channel_type in available_channels:
                 try:
                     channel = DeliveryChannelFactory.create_channel(channel_type)
+                    if self.session:
+                        channel.use_session(self.session)
                     self.delivery_channels[channel_type] = channel
+                    
+                    if channel.max_batch_size > 1:
+                        self.batchers[channel_type] = DeliveryBatcher(
+                            channel.max_batch_size,
+                            partial(self._deliver_batch, channel),
+                            concurrency=CHANNEL_CONCURRENCY.get(channel_type, DEFAULT_CHANNEL_CONCURRENCY)
+                        )
                     logger.info("Initialized delivery channel", channel=channel_type.value)
                 except Exception as e:
                     logger.error("Failed to initialize channel", channel=channel_type.value, error=str(e))
@@ -90,6 +134,9 @@ class NotificationDispatcher:
         """Shutdown the notification dispatcher"""
         self.is_running = False
         
+        # Deliveries still waiting for a retry stay pending in the database
+        await self.retry_scheduler.stop()
+        
         # Cancel all workers
         for worker in self.delivery_workers:
             worker.cancel()
@@ -98,6 +145,9 @@ class NotificationDispatcher:
         if self.delivery_workers:
             await asyncio.gather(*self.delivery_workers, return_exceptions=True)
         
+        # Send what the batchers still hold while the session is open
+        await asyncio.gather(*(batcher.drain() for batcher in self.batchers.values()))
+        
         if self.session:
             await self.session.close()
         
@@ -159,26 +209,34 @@ class NotificationDispatcher:
                     timeout=5.0
                 )
                 
-                start_time = datetime.utcnow()
-                success = await self._process_delivery_enhanced(delivery)
-                end_time = datetime.utcnow()
+                channel = delivery.channel
+                batcher = self.batchers.get(channel)
+                if batcher is not None:
+                    # Outcome is recorded when the batch is sent
+                    try:
+                        await self._submit_to_batch(batcher, delivery)
+                    finally:
+                        self.delivery_queue.task_done()
+                    continue
                 
-                # Update performance metrics
-                self.delivery_stats['total_sent'] += 1
-                if success:
-                    self.delivery_stats['successful_deliveries'] += 1
-                else:
-                    self.delivery_stats['failed_deliveries'] += 1
+                if self._in_flight[channel] >= CHANNEL_CONCURRENCY.get(channel, DEFAULT_CHANNEL_CONCURRENCY):
+                    # Park it; the next delivery to finish on this channel re-queues it
+                    self._channel_backlog[channel].append(delivery)
+                    self.delivery_queue.task_done()
+                    continue
                 
-                # Update average delivery time
-                delivery_time = (end_time - start_time).total_seconds()
-                current_avg = self.delivery_stats['average_delivery_time']
-                total_sent = self.delivery_stats['total_sent']
-                self.delivery_stats['average_delivery_time'] = (
-                    (current_avg * (total_sent - 1) + delivery_time) / total_sent
-                )
+                self._in_flight[channel] += 1
+                try:
+                    start_time = datetime.utcnow()
+                    success = await self._process_delivery_enhanced(delivery)
+                    end_time = datetime.utcnow()
+                finally:
+                    self._in_flight[channel] -= 1
+                    if self._channel_backlog[channel]:
+                        self.delivery_queue.put_nowait(self._channel_backlog[channel].popleft())
+                    self.delivery_queue.task_done()
                 
-                self.delivery_queue.task_done()
+                self._record_delivery_stats(success, (end_time - start_time).total_seconds())
                 
             except asyncio.TimeoutError:
                 continue
@@ -189,6 +247,120 @@ class NotificationDispatcher:
         
         logger.info("Enhanced delivery worker stopped", worker_id=worker_id)
     
+    def _record_delivery_stats(self, success: bool, delivery_time: float):
+        """Update performance metrics for one delivery"""
+        self.delivery_stats['total_sent'] += 1
+        if success:
+            self.delivery_stats['successful_deliveries'] += 1
+        else:
+            self.delivery_stats['failed_deliveries'] += 1
+        
+        # Update average delivery time
+        current_avg = self.delivery_stats['average_delivery_time']
+        total_sent = self.delivery_stats['total_sent']
+        self.delivery_stats['average_delivery_time'] = (
+            (current_avg * (total_sent - 1) + delivery_time) / total_sent
+        )
+    
+    async def _get_delivery_preferences(self, delivery: NotificationDelivery) -> UserAlertPreferences:
+        """Preferences for a delivery, reusing the ones looked up when it was queued"""
+        preferences = self._queued_preferences.pop(delivery.id, None)
+        if preferences is None:
+            preferences = await self.preference_manager.get_or_create_preferences(delivery.user_id)
+        return preferences
+    
+    def _remember_event(self, event: AlertEvent):
+        self._events[event.id] = event
+        self._events.move_to_end(event.id)
+        while len(self._events) > EVENT_CACHE_SIZE:
+            self._events.popitem(last=False)
+    
+    async def _rendered(self, delivery: NotificationDelivery) -> NotificationDelivery:
+        """The delivery as sent: event deliveries get their recipient's title and message"""
+        metadata = delivery.metadata or {}
+        event_id = metadata.get('event_id')
+        if not event_id:
+            return delivery
+        
+        event = self._events.get(event_id)
+        if event is None:
+            event = await get_alert_event(event_id)
+            if event is None:
+                raise ValueError(f"Alert event {event_id} not found")
+        self._remember_event(event)
+        
+        # Rendered text goes to the provider only; the stored record stays compact
+        return delivery.model_copy(update={'metadata': {**metadata, **event.render(metadata.get('location'))}})
+    
+    async def _submit_to_batch(self, batcher: DeliveryBatcher, delivery: NotificationDelivery):
+        """Hand a delivery to its channel's batcher"""
+        try:
+            preferences = await self._get_delivery_preferences(delivery)
+            await batcher.submit((delivery, await self._rendered(delivery), preferences))
+        except Exception as e:
+            logger.error("Error batching delivery", delivery_id=delivery.id, error=str(e))
+            self._dead_letter(delivery, str(e))
+            await update_notification_delivery(delivery)
+            self._record_delivery_stats(False, 0.0)
+    
+    async def _deliver_batch(
+        self,
+        channel: BaseDeliveryChannel,
+        items: List[Tuple[NotificationDelivery, NotificationDelivery, UserAlertPreferences]]
+    ):
+        """Send one coalesced batch and record every delivery's outcome"""
+        deliveries = [delivery for delivery, _, _ in items]
+        try:
+            start_time = datetime.utcnow()
+            for delivery in deliveries:
+                delivery.status = "sending"
+                delivery.sent_at = start_time
+            await update_notification_deliveries(deliveries)
+            
+            results = await channel.send_batch([(rendered, preferences) for _, rendered, preferences in items])
+            delivery_time = (datetime.utcnow() - start_time).total_seconds()
+            
+            for delivery, success in zip(deliveries, results):
+                self._apply_delivery_result(delivery, success)
+                self._record_delivery_stats(success, delivery_time)
+            await update_notification_deliveries(deliveries)
+            
+            logger.info(
+                "Notification batch delivery processed",
+                channel=channel.channel.value,
+                batch_size=len(deliveries),
+                delivered=sum(1 for success in results if success)
+            )
+            
+        except Exception as e:
+            logger.error(
+                "Error processing delivery batch",
+                channel=channel.channel.value,
+                batch_size=len(deliveries),
+                error=str(e)
+            )
+            unresolved = [delivery for delivery in deliveries if delivery.status == "sending"]
+            for delivery in unresolved:
+                self._dead_letter(delivery, str(e))
+                self._record_delivery_stats(False, 0.0)
+            await update_notification_deliveries(deliveries)
+    
+    def _apply_delivery_result(self, delivery: NotificationDelivery, success: bool):
+        """Set a delivery's status after a send attempt, scheduling a retry if one is left"""
+        if success:
+            delivery.status = "delivered"
+            delivery.delivered_at = datetime.utcnow()
+        else:
+            delivery.status = "failed"
+            delivery.retry_count += 1
+            
+            # Retry if under limit, after a backoff spent in the retry heap
+            if delivery.retry_count < delivery.max_retries:
+                delivery.status = "pending"
+                self.retry_scheduler.schedule(delivery, self.retry_policy.delay(delivery.retry_count))
+            else:
+                self._dead_letter(delivery, "Retry limit reached")
+    
     async def _process_delivery_enhanced(self, delivery: NotificationDelivery) -> bool:
         """Process a single notification delivery using enhanced channels"""
         try:
@@ -198,34 +370,21 @@ class NotificationDispatcher:
             await update_notification_delivery(delivery)
             
             # Get user preferences
-            preferences = await self.preference_manager.get_or_create_preferences(delivery.user_id)
+            preferences = await self._get_delivery_preferences(delivery)
             
             # Get delivery channel
             channel = self.delivery_channels.get(delivery.channel)
             if not channel:
                 logger.error("Delivery channel not available", channel=delivery.channel.value)
-                delivery.status = "failed"
-                delivery.failure_reason = f"Channel {delivery.channel.value} not available"
+                self._dead_letter(delivery, f"Channel {delivery.channel.value} not available")
                 await update_notification_delivery(delivery)
                 return False
             
             # Send notification using enhanced channel
-            success = await channel.send(delivery, preferences)
+            success = await channel.send(await self._rendered(delivery), preferences)
             
             # Update delivery status
-            if success:
-                delivery.status = "delivered"
-                delivery.delivered_at = datetime.utcnow()
-            else:
-                delivery.status = "failed"
-                delivery.retry_count += 1
-                
-                # Retry if under limit
-                if delivery.retry_count < delivery.max_retries:
-                    delivery.status = "pending"
-                    await asyncio.sleep(min(delivery.retry_count * 30, 300))  # Exponential backoff
-                    await self.delivery_queue.put(delivery)
-            
+            self._apply_delivery_result(delivery, success)
             await update_notification_delivery(delivery)
             
             logger.info(
@@ -240,92 +399,148 @@ class NotificationDispatcher:
             
         except Exception as e:
             logger.error("Error processing enhanced delivery", delivery_id=delivery.id, error=str(e))
-            delivery.status = "failed"
-            delivery.failure_reason = str(e)
+            self._dead_letter(delivery, str(e))
             await update_notification_delivery(delivery)
             return False
     
+    def _dead_letter(self, delivery: NotificationDelivery, reason: str):
+        """Park a delivery that will not be retried automatically"""
+        delivery.status = "failed"
+        delivery.failure_reason = delivery.failure_reason or reason
+        self.dead_letters.append(delivery)
+        
+        logger.warning(
+            "Notification delivery dead-lettered",
+            delivery_id=delivery.id,
+            channel=delivery.channel.value,
+            retry_count=delivery.retry_count,
+            reason=delivery.failure_reason
+        )
+    
     # Public API methods
     
+    def _create_deliveries(
+        self,
+        alert: Union[BaseAlert, AlertEvent],
+        preferences: UserAlertPreferences,
+        metadata: Dict[str, Any]
+    ) -> List[NotificationDelivery]:
+        """Delivery records for an alert on every channel the user should get it on"""
+        # Check if we should send during quiet hours
+        if not self.preference_manager.should_send_during_quiet_hours(alert, preferences):
+            logger.info("Skipping notification due to quiet hours", alert_id=alert.id, user_id=preferences.user_id)
+            return []
+        
+        # Determine channels to use with intelligent routing
+        channels = self.preference_manager.determine_delivery_channels(alert, preferences)
+        
+        deliveries = []
+        for channel in channels:
+            # Check if channel is available
+            if channel not in self.delivery_channels:
+                logger.warning("Channel not available, skipping", channel=channel.value)
+                continue
+            
+            deliveries.append(NotificationDelivery(
+                alert_id=alert.id,
+                user_id=preferences.user_id,
+                channel=channel,
+                status="pending",
+                metadata=dict(metadata)
+            ))
+        
+        return deliveries
+    
+    async def _queue_deliveries(
+        self,
+        deliveries: List[NotificationDelivery],
+        preferences: Dict[str, UserAlertPreferences]
+    ):
+        """Store delivery records in one write and add them to the delivery queue"""
+        if not deliveries:
+            return
+        
+        await store_notification_deliveries(deliveries)
+        for delivery in deliveries:
+            self._queued_preferences[delivery.id] = preferences[delivery.user_id]
+            self.delivery_queue.put_nowait(delivery)
+    
     async def send_notification(self, alert: BaseAlert):
         """Send notification for an alert using enhanced routing"""
         try:
             # Get user preferences
             preferences = await self.preference_manager.get_or_create_preferences(alert.user_id)
             
-            # Check if we should send during quiet hours
-            if not self.preference_manager.should_send_during_quiet_hours(alert, preferences):
-                logger.info("Skipping notification due to quiet hours", alert_id=alert.id)
-                return
-            
-            # Determine channels to use with intelligent routing
-            channels = self.preference_manager.determine_delivery_channels(alert, preferences)
-            
-            # Create delivery tasks for each channel
-            deliveries_created = 0
-            for channel in channels:
-                # Check if channel is available
-                if channel not in self.delivery_channels:
-                    logger.warning("Channel not available, skipping", channel=channel.value)
-                    continue
-                
-                delivery = NotificationDelivery(
-                    alert_id=alert.id,
-                    user_id=alert.user_id,
-                    channel=channel,
-                    status="pending",
-                    metadata={
-                        'alert_type': alert.alert_type.value,
-                        'severity': alert.severity.value,
-                        'title': alert.title,
-                        'message': alert.message,
-                        'commodity': alert.commodity,
-                        'location': alert.location,
-                        'timestamp': alert.created_at.isoformat()
-                    }
-                )
-                
-                # Store delivery record
-                await store_notification_delivery(delivery)
-                
-                # Add to delivery queue
-                await self.delivery_queue.put(delivery)
-                deliveries_created += 1
+            deliveries = self._create_deliveries(alert, preferences, {
+                'alert_type': alert.alert_type.value,
+                'severity': alert.severity.value,
+                'title': alert.title,
+                'message': alert.message,
+                'commodity': alert.commodity,
+                'location': alert.location,
+                'timestamp': alert.created_at.isoformat()
+            })
+            await self._queue_deliveries(deliveries, {alert.user_id: preferences})
             
             logger.info(
                 "Enhanced notification queued for delivery",
                 alert_id=alert.id,
                 user_id=alert.user_id,
-                channels=deliveries_created,
+                channels=len(deliveries),
                 alert_severity=alert.severity.value
             )
             
         except Exception as e:
             logger.error("Error sending enhanced notification", alert_id=alert.id, error=str(e))
     
+    async def send_event(self, event: AlertEvent, recipients: List[Dict[str, Any]]):
+        """Send an alert event to its recipients; text is rendered per recipient when delivered"""
+        try:
+            self._remember_event(event)
+            
+            user_preferences = await asyncio.gather(
+                *(self.preference_manager.get_or_create_preferences(recipient['user_id']) for recipient in recipients),
+                return_exceptions=True
+            )
+            
+            # One store for every recipient's deliveries; channel batchers coalesce the sends
+            deliveries = []
+            preferences_by_user = {}
+            for recipient, preferences in zip(recipients, user_preferences):
+                if isinstance(preferences, Exception):
+                    logger.error("Error getting preferences for alert event", user_id=recipient['user_id'], error=str(preferences))
+                    continue
+                preferences_by_user[recipient['user_id']] = preferences
+                deliveries.extend(self._create_deliveries(event, preferences, {
+                    'event_id': event.id,
+                    'alert_type': event.alert_type.value,
+                    'severity': event.severity.value,
+                    'commodity': event.commodity,
+                    'location': recipient.get('location') or event.location,
+                    'timestamp': event.created_at.isoformat()
+                }))
+            
+            await self._queue_deliveries(deliveries, preferences_by_user)
+            
+            logger.info(
+                "Alert event queued for delivery",
+                event_id=event.id,
+                recipients=len(recipients),
+                deliveries=len(deliveries),
+                alert_severity=event.severity.value
+            )
+            
+        except Exception as e:
+            logger.error("Error sending alert event", event_id=event.id, error=str(e))
+    
     async def send_bulk_notification(self, alert: BaseAlert, user_ids: List[str]):
         """Send notification to multiple users efficiently"""
         try:
-            tasks = []
-            for user_id in user_ids:
-                # Create a copy of the alert for each user
-                user_alert = BaseAlert(
-                    user_id=user_id,
-                    alert_type=alert.alert_type,
-                    severity=alert.severity,
-                    title=alert.title,
-                    message=alert.message,
-                    commodity=alert.commodity,
-                    location=alert.location,
-                    metadata=alert.metadata
-                )
-                
-                # Create task for sending notification
-                task = asyncio.create_task(self.send_notification(user_alert))
-                tasks.append(task)
-            
-            # Send all notifications concurrently
-            await asyncio.gather(*tasks, return_exceptions=True)
+            # One event for every recipient instead of a copy of the alert per user
+            recipients = [{'user_id': user_id} for user_id in user_ids]
+            event = AlertEvent.from_alert(alert, user_ids)
+            await store_alert_event(event, recipients)
+            await self.send_event(event, recipients)
             
             logger.info("Bulk notification sent", user_count=len(user_ids), alert_type=alert.alert_type.value)
             
@@ -370,6 +585,25 @@ class NotificationDispatcher:
             logger.error("Error applying preference recommendation", user_id=user_id, error=str(e))
             return False
     
+    async def retry_dead_letters(self, channel: Optional[NotificationChannel] = None) -> int:
+        """Re-queue dead-lettered deliveries, e.g. once a provider outage is over"""
+        try:
+            retried = [d for d in self.dead_letters if channel is None or d.channel == channel]
+            for delivery in retried:
+                self.dead_letters.remove(delivery)
+                delivery.status = "pending"
+                delivery.retry_count = 0
+                delivery.failure_reason = None
+                await update_notification_delivery(delivery)
+                self.delivery_queue.put_nowait(delivery)
+            
+            logger.info("Dead-lettered deliveries re-queued", count=len(retried))
+            return len(retried)
+            
+        except Exception as e:
+            logger.error("Error re-queueing dead-lettered deliveries", error=str(e))
+            return 0
+    
     async def get_delivery_statistics(self) -> Dict[str, Any]:
         """Get delivery performance statistics"""
         try:
@@ -386,6 +620,14 @@ class NotificationDispatcher:
             
             # Add queue status
             stats['queue_size'] = self.delivery_queue.qsize()
+            stats['scheduled_retries'] = len(self.retry_scheduler)
+            stats['dead_letters'] = len(self.dead_letters)
+            stats['channel_backlog'] = {
+                channel.value: len(backlog) for channel, backlog in self._channel_backlog.items() if backlog
+            }
+            stats['batched_pending'] = {
+                channel.value: len(batcher) for channel, batcher in self.batchers.items() if len(batcher)
+            }
             stats['active_workers'] = len([w for w in self.delivery_workers if not w.done()])
             stats['available_channels'] = len(self.delivery_channels)
             
@@ -204,7 +204,7 @@ class NotificationPreferenceManager:
                 else:
                     logger.warning(
                         "Skipping channel due to missing contact info",
-                        user_id=alert.user_id,
+                        user_id=preferences.user_id,
                         channel=channel.value
                     )
             
@@ -11,11 +11,11 @@ import aiohttp
 import json
 
 from models import (
-    PriceMovementAlert, AlertType, AlertSeverity, PriceData
+    AlertEvent, AlertType, AlertSeverity, PriceData
 )
 from database import (
     get_price_data, store_price_data, get_users_by_commodity,
-    store_price_alert, get_historical_prices
+    store_alert_event, get_historical_prices
 )
 from notification_dispatcher import NotificationDispatcher
 
@@ -160,30 +160,38 @@ class PriceMovementMonitor:
     async def check_price_movements(self):
         """Check for significant price movements across all commodities"""
         try:
-            movement_alerts = []
+            movement_events = []
             
             for commodity in self.monitored_commodities:
                 try:
-                    alerts = await self._check_commodity_price_movement(commodity)
-                    movement_alerts.extend(alerts)
+                    events = await self._check_commodity_price_movement(commodity)
+                    movement_events.extend(events)
                     
                 except Exception as e:
                     logger.error("Error checking commodity price", commodity=commodity, error=str(e))
             
             # Send alerts
-            for alert in movement_alerts:
-                if self.notification_dispatcher:
-                    await self.notification_dispatcher.send_notification(alert)
-                    self.alerts_sent_today += 1
+            await self._send_events(movement_events)
             
-            if movement_alerts:
-                logger.info("Price movement alerts generated", count=len(movement_alerts))
+            if movement_events:
+                logger.info(
+                    "Price movement alerts generated",
+                    events=len(movement_events),
+                    count=sum(len(recipients) for _, recipients in movement_events)
+                )
             
         except Exception as e:
             logger.error("Error checking price movements", error=str(e))
     
-    async def _check_commodity_price_movement(self, commodity: str) -> List[PriceMovementAlert]:
-        """Check price movement for a specific commodity"""
+    async def _send_events(self, events: List[Tuple[AlertEvent, List[Dict[str, Any]]]]):
+        """Hand each price movement event to the dispatcher with its recipients"""
+        for event, recipients in events:
+            if self.notification_dispatcher:
+                await self.notification_dispatcher.send_event(event, recipients)
+                self.alerts_sent_today += len(recipients)
+    
+    async def _check_commodity_price_movement(self, commodity: str) -> List[Tuple[AlertEvent, List[Dict[str, Any]]]]:
+        """Check price movement for a specific commodity; returns events with their recipients"""
         alerts = []
         
         try:
@@ -216,22 +224,21 @@ class PriceMovementMonitor:
                 # Get affected users
                 affected_users = await get_users_by_commodity(commodity)
                 
-                # Create alerts for each affected user
-                for user in affected_users:
-                    alert = await self._create_price_movement_alert(
-                        user_id=user['user_id'],
+                # One event for every affected user; their rows only add where they are
+                if affected_users:
+                    event = await self._create_price_movement_event(
                         commodity=commodity,
                         current_price=current_price,
                         previous_price=previous_price,
                         percentage_change=percentage_change,
                         severity=severity,
-                        location=user.get('location', 'Multiple markets')
+                        recipients=[user['user_id'] for user in affected_users]
                     )
                     
-                    if alert:
-                        alerts.append(alert)
-                        # Store alert in database
-                        await store_price_alert(alert)
+                    if event:
+                        alerts.append((event, affected_users))
+                        # Store event and recipient rows in database
+                        await store_alert_event(event, affected_users)
             
             # Update price cache
             cache_key = f"{commodity}_latest"
@@ -426,17 +433,16 @@ class PriceMovementMonitor:
         else:
             return AlertSeverity.MEDIUM
     
-    async def _create_price_movement_alert(
+    async def _create_price_movement_event(
         self,
-        user_id: str,
         commodity: str,
         current_price: float,
         previous_price: float,
         percentage_change: float,
         severity: AlertSeverity,
-        location: str
-    ) -> Optional[PriceMovementAlert]:
-        """Create a price movement alert"""
+        recipients: List[str]
+    ) -> Optional[AlertEvent]:
+        """Create a price movement alert event; `{location}` is filled per recipient"""
         try:
             # Determine alert type based on direction
             if percentage_change > 0:
@@ -451,12 +457,12 @@ class PriceMovementMonitor:
             # Create title
             title = f"{emoji} {commodity.title()} Price Alert - {abs(percentage_change):.1f}% {direction.title()}"
             
-            # Create detailed message
+            # Create detailed message; interpolated text is escaped so only {location} is a slot
             message = f"""
 🚨 SIGNIFICANT PRICE MOVEMENT DETECTED 🚨
 
-🌾 Commodity: {commodity.title()}
-📍 Location: {location}
+🌾 Commodity: {AlertEvent.literal(commodity.title())}
+📍 Location: {{location}}
 💰 Current Price: ₹{current_price:.2f}/quintal
 📊 Previous Price: ₹{previous_price:.2f}/quintal
 {emoji} Change: {percentage_change:+.1f}% (₹{current_price - previous_price:+.2f})
@@ -470,41 +476,42 @@ class PriceMovementMonitor:
             # Add recommendations based on direction and severity
             if percentage_change > 0:
                 if severity in [AlertSeverity.CRITICAL, AlertSeverity.EMERGENCY]:
-                    message += "\n🔥 URGENT: Consider selling immediately if you have stock. Prices may correct soon."
+                    recommendation = "🔥 URGENT: Consider selling immediately if you have stock. Prices may correct soon."
                 else:
-                    message += "\n📈 Good time to sell if you have inventory. Monitor for further increases."
+                    recommendation = "📈 Good time to sell if you have inventory. Monitor for further increases."
             else:
                 if severity in [AlertSeverity.CRITICAL, AlertSeverity.EMERGENCY]:
-                    message += "\n⚠️ URGENT: Avoid selling at current prices. Wait for market recovery."
+                    recommendation = "⚠️ URGENT: Avoid selling at current prices. Wait for market recovery."
                 else:
-                    message += "\n📉 Consider holding stock if possible. Look for alternative markets."
+                    recommendation = "📉 Consider holding stock if possible. Look for alternative markets."
             
-            message += f"\n\n🕒 Alert generated at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+            message += "\n" + AlertEvent.literal(recommendation)
+            message += AlertEvent.literal(f"\n\n🕒 Alert generated at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
             
-            alert = PriceMovementAlert(
-                user_id=user_id,
+            event = AlertEvent(
                 alert_type=alert_type,
                 severity=severity,
-                title=title,
-                message=message,
+                title_template=AlertEvent.literal(title),
+                message_template=message,
                 commodity=commodity,
-                location=location,
-                current_price=current_price,
-                previous_price=previous_price,
-                percentage_change=percentage_change,
-                absolute_change=current_price - previous_price,
-                price_trend=direction,
+                location='Multiple markets',
+                recipients=recipients,
                 metadata={
+                    'current_price': current_price,
+                    'previous_price': previous_price,
+                    'percentage_change': percentage_change,
+                    'absolute_change': current_price - previous_price,
+                    'price_trend': direction,
                     'threshold_triggered': self.movement_thresholds['significant'],
                     'data_sources': list(self.price_sources.keys()),
                     'monitoring_period': '24h'
                 }
             )
             
-            return alert
+            return event
             
         except Exception as e:
-            logger.error("Error creating price movement alert", error=str(e))
+            logger.error("Error creating price movement event", error=str(e))
             return None
     
     # Public API methods
@@ -514,12 +521,10 @@ class PriceMovementMonitor:
         try:
             if commodity:
                 if commodity in self.monitored_commodities:
-                    alerts = await self._check_commodity_price_movement(commodity)
-                    for alert in alerts:
-                        if self.notification_dispatcher:
-                            await self.notification_dispatcher.send_notification(alert)
+                    events = await self._check_commodity_price_movement(commodity)
+                    await self._send_events(events)
                     
-                    logger.info("Forced price check completed", commodity=commodity, alerts=len(alerts))
+                    logger.info("Forced price check completed", commodity=commodity, alerts=len(events))
                 else:
                     logger.warning("Commodity not monitored", commodity=commodity)
             else:
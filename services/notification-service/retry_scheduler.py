@@ -0,0 +1,81 @@
+"""
+Delivery Retry Scheduler
+Timer heap that re-releases failed deliveries after a backoff without holding a worker
+"""
+
+import asyncio
+import heapq
+import itertools
+import random
+import structlog
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Tuple
+
+logger = structlog.get_logger()
+
+@dataclass
+class RetryPolicy:
+    """Exponential backoff with jitter, capped at max_delay seconds"""
+    base_delay: float = 30.0
+    max_delay: float = 300.0
+    jitter: float = 0.2  # fraction of the backoff randomly shaved off
+
+    def delay(self, retry_count: int) -> float:
+        backoff = min(self.base_delay * (2 ** max(retry_count - 1, 0)), self.max_delay)
+        # Spread retries so deliveries failed by the same outage do not return together
+        return backoff * (1 - self.jitter * random.random())
+
+class RetryScheduler:
+    """Releases scheduled items once their delay has elapsed.
+
+    A single task sleeps until the earliest due time; scheduling an earlier
+    item wakes it. `release` is called synchronously and must not block.
+    """
+
+    def __init__(self, release: Callable[[Any], None]):
+        self._release = release
+        self._heap: List[Tuple[float, int, Any]] = []
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def start(self):
+        if not self._task:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def schedule(self, item: Any, delay: float):
+        due = asyncio.get_running_loop().time() + max(delay, 0.0)
+        entry = (due, next(self._counter), item)
+        heapq.heappush(self._heap, entry)
+        if self._heap[0] is entry:
+            self._wakeup.set()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            while self._heap and self._heap[0][0] <= now:
+                _, _, item = heapq.heappop(self._heap)
+                try:
+                    self._release(item)
+                except Exception as e:
+                    logger.error("Error releasing scheduled retry", error=str(e))
+
+            timeout = self._heap[0][0] - now if self._heap else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,105 @@
+"""
+Unit tests for event-centric alert fan-out
+"""
+
+import asyncio
+
+import pytest
+
+import database
+import price_monitor
+from database import get_alert_history, get_data_counts
+from models import AlertSeverity, NotificationChannel
+from notification_dispatcher import NotificationDispatcher
+from price_monitor import PriceMovementMonitor
+
+FARMERS = [
+    {'user_id': 'farmer-1', 'commodity': 'wheat', 'location': 'Punjab'},
+    {'user_id': 'farmer-2', 'commodity': 'wheat', 'location': 'Haryana'},
+    {'user_id': 'farmer-3', 'commodity': 'wheat'}
+]
+
+@pytest.fixture
+def wheat_move(monkeypatch):
+    async def current_prices(commodity):
+        return [{'price': 2200.0, 'weight': 1.0}]
+
+    async def historical_price(commodity, hours_back=24):
+        return {'price': 2000.0}
+
+    async def users_by_commodity(commodity):
+        return FARMERS
+
+    monitor = PriceMovementMonitor()
+    monkeypatch.setattr(monitor, '_fetch_current_prices', current_prices)
+    monkeypatch.setattr(monitor, '_get_historical_price', historical_price)
+    monkeypatch.setattr(price_monitor, 'get_users_by_commodity', users_by_commodity)
+    return monitor
+
+@pytest.mark.asyncio
+async def test_price_move_stores_one_event_with_recipient_rows(wheat_move):
+    await database.clear_all_data()
+
+    events = await wheat_move._check_commodity_price_movement('wheat')
+
+    assert len(events) == 1
+    event, recipients = events[0]
+    assert event.recipients == ['farmer-1', 'farmer-2', 'farmer-3']
+    assert recipients == FARMERS
+    counts = await get_data_counts()
+    assert counts['alert_events'] == 1
+    assert counts['alert_recipients'] == 3
+    assert counts['alert_history'] == 0
+
+    # History is rendered per recipient on read
+    history = await get_alert_history('farmer-2')
+    assert len(history) == 1
+    assert "📍 Location: Haryana" in history[0].message
+    assert "📍 Location: Multiple markets" in (await get_alert_history('farmer-3'))[0].message
+
+@pytest.mark.asyncio
+async def test_braces_in_commodity_names_render_verbatim():
+    event = await PriceMovementMonitor()._create_price_movement_event(
+        'wheat {sharbati}', 2200.0, 2000.0, 10.0, AlertSeverity.HIGH, ['farmer-1']
+    )
+
+    rendered = event.render('Punjab')
+    assert "🌾 Commodity: Wheat {Sharbati}" in rendered['message']
+    assert "📍 Location: Punjab" in rendered['message']
+    assert "Wheat {Sharbati} Price Alert" in rendered['title']
+
+@pytest.mark.asyncio
+async def test_event_deliveries_are_rendered_per_recipient_when_sent(wheat_move):
+    await database.clear_all_data()
+    dispatcher = NotificationDispatcher()
+    await dispatcher.initialize()
+    sent = []
+    push = dispatcher.delivery_channels[NotificationChannel.PUSH]
+
+    async def send_batch(items):
+        sent.extend(delivery for delivery, _ in items)
+        return [True] * len(items)
+
+    push.send_batch = send_batch
+    try:
+        events = await wheat_move._check_commodity_price_movement('wheat')
+        wheat_move.notification_dispatcher = dispatcher
+        await wheat_move._send_events(events)
+
+        for _ in range(40):
+            if len(sent) == 3:
+                break
+            await asyncio.sleep(0.05)
+    finally:
+        await dispatcher.shutdown()
+
+    assert wheat_move.alerts_sent_today == 3
+    assert {delivery.alert_id for delivery in sent} == {events[0][0].id}
+    messages = {delivery.user_id: delivery.metadata['message'] for delivery in sent}
+    assert "📍 Location: Punjab" in messages['farmer-1']
+    assert "📍 Location: Haryana" in messages['farmer-2']
+
+    # Stored delivery records keep the compact event reference, not the rendered text
+    stored = [d for d in database._notification_deliveries.values() if d.user_id == 'farmer-1']
+    assert stored and 'message' not in stored[0].metadata
+    assert stored[0].status == "delivered"
@@ -0,0 +1,103 @@
+"""
+Unit tests for indexed alert rule evaluation
+"""
+
+import random
+
+import pytest
+
+from alert_rules import AlertRuleIndex, ObservationCache
+from models import AlertConfiguration, AlertType, ThresholdCondition
+
+PRICES = {("wheat", "punjab"): (1100.0, 1000.0), ("rice", "haryana"): (1800.0, 2000.0)}
+
+def make_observations(calls):
+    async def current_price(commodity, location):
+        calls.append(("current", commodity.lower(), location.lower()))
+        return {"price": PRICES[(commodity.lower(), location.lower())][0]}
+
+    async def previous_price(commodity, location, period):
+        calls.append(("previous", commodity.lower(), location.lower(), period))
+        return {"price": PRICES[(commodity.lower(), location.lower())][1]}
+
+    async def current_weather(location):
+        calls.append(("weather", location.lower()))
+        return {"temperature": 41.0}
+
+    return ObservationCache(current_price, previous_price, current_weather)
+
+def rule(alert_type, condition, threshold, commodity="Wheat", location="Punjab", **kwargs):
+    return AlertConfiguration(
+        user_id="farmer", alert_type=alert_type, threshold_condition=condition,
+        threshold_value=threshold, commodity=commodity, location=location, **kwargs
+    )
+
+def expected(config):
+    """The per-configuration semantics the index replaces"""
+    current, previous = PRICES[(config.commodity.lower(), config.location.lower())]
+    change = (current - previous) / previous * 100
+    value = {
+        (AlertType.PRICE_MOVEMENT, ThresholdCondition.GREATER_THAN): (abs(change), "gt"),
+        (AlertType.PRICE_MOVEMENT, ThresholdCondition.PERCENTAGE_CHANGE): (abs(change), "ge"),
+        (AlertType.PRICE_RISE, ThresholdCondition.GREATER_THAN): (current, "gt"),
+        (AlertType.PRICE_RISE, ThresholdCondition.PERCENTAGE_CHANGE): (change, "ge"),
+        (AlertType.PRICE_DROP, ThresholdCondition.LESS_THAN): (current, "lt"),
+        (AlertType.PRICE_DROP, ThresholdCondition.PERCENTAGE_CHANGE): (-change, "ge"),
+    }.get((config.alert_type, config.threshold_condition))
+    if value is None:
+        return False
+    observed, op = value
+    return {"gt": observed > config.threshold_value,
+            "ge": observed >= config.threshold_value,
+            "lt": observed < config.threshold_value}[op]
+
+@pytest.mark.asyncio
+async def test_triggered_rules_match_per_config_evaluation():
+    rng = random.Random(7)
+    combos = [
+        (AlertType.PRICE_MOVEMENT, ThresholdCondition.GREATER_THAN),
+        (AlertType.PRICE_MOVEMENT, ThresholdCondition.PERCENTAGE_CHANGE),
+        (AlertType.PRICE_RISE, ThresholdCondition.GREATER_THAN),
+        (AlertType.PRICE_RISE, ThresholdCondition.PERCENTAGE_CHANGE),
+        (AlertType.PRICE_DROP, ThresholdCondition.LESS_THAN),
+        (AlertType.PRICE_DROP, ThresholdCondition.PERCENTAGE_CHANGE),
+        (AlertType.PRICE_RISE, ThresholdCondition.LESS_THAN),  # never triggers
+    ]
+    configs = []
+    for _ in range(600):
+        alert_type, condition = rng.choice(combos)
+        commodity, location = rng.choice([("Wheat", "Punjab"), ("rice", "HARYANA")])
+        if condition in (ThresholdCondition.GREATER_THAN, ThresholdCondition.LESS_THAN):
+            threshold = float(rng.choice([900, 1100, 1500, 1800, 1900, 2500]))
+        else:
+            threshold = float(rng.choice([5, 10, 12, 20]))
+        configs.append(rule(alert_type, condition, threshold, commodity, location))
+
+    index = AlertRuleIndex()
+    index.rebuild(configs)
+    calls = []
+    triggered = await index.triggered(make_observations(calls))
+
+    assert sorted(triggered) == sorted(c.id for c in configs if expected(c))
+    # One current and one 24h-previous price per market, not per configuration
+    assert len(calls) == 4
+
+@pytest.mark.asyncio
+async def test_equals_and_weather_rules_and_removal():
+    hot = rule(AlertType.CUSTOM_THRESHOLD, ThresholdCondition.GREATER_THAN, 40.0, commodity=None,
+               metadata={"data_source": "weather", "weather_metric": "temperature"})
+    exact = rule(AlertType.CUSTOM_THRESHOLD, ThresholdCondition.EQUALS, 1100.0)
+    near = rule(AlertType.CUSTOM_THRESHOLD, ThresholdCondition.EQUALS, 1100.5)
+    rise = rule(AlertType.PRICE_RISE, ThresholdCondition.PERCENTAGE_CHANGE, 10.0)
+
+    index = AlertRuleIndex()
+    index.rebuild([hot, exact, near, rise])
+    assert sorted(await index.triggered(make_observations([]))) == sorted([hot.id, exact.id, rise.id])
+
+    index.remove(rise.id)
+    index.remove(hot.id)
+    assert len(index) == 2 and index.bucket_count == 1
+    assert await index.triggered(make_observations([])) == [exact.id]
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
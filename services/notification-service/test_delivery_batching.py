@@ -0,0 +1,164 @@
+"""
+Unit tests for batched provider delivery, against a local mock provider
+"""
+
+import asyncio
+
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from delivery_batching import DeliveryBatcher
+from delivery_channels import SMSDeliveryChannel
+from models import (
+    AlertSeverity, AlertType, BaseAlert, NotificationChannel, NotificationDelivery,
+    UserAlertPreferences
+)
+
+class MockProvider:
+    """Bulk messaging endpoint that records each request and rejects chosen references"""
+
+    def __init__(self, rejected=()):
+        self.batches = []
+        self.rejected = set(rejected)
+
+    async def handle(self, request):
+        body = await request.json()
+        messages = body['messages']
+        self.batches.append(messages)
+        return web.json_response({
+            'results': [
+                {
+                    'reference': message['reference'],
+                    'status': 'rejected' if message['reference'] in self.rejected else 'accepted'
+                }
+                for message in messages
+            ]
+        })
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post('/batch', self.handle)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        return str(self.server.make_url('/batch'))
+
+    async def close(self):
+        await self.server.close()
+
+def _sms_delivery(user_id):
+    return NotificationDelivery(
+        alert_id="alert-1",
+        user_id=user_id,
+        channel=NotificationChannel.SMS,
+        status="pending",
+        metadata={'title': 'Heavy rain warning', 'message': 'Harvest and cover produce today'}
+    )
+
+@pytest.mark.asyncio
+async def test_sms_batch_is_split_by_provider_limit_with_per_message_results():
+    provider = MockProvider(rejected={"delivery-7"})
+    url = await provider.start()
+    channel = SMSDeliveryChannel()
+    channel.batch_api_url = url
+    try:
+        async with aiohttp.ClientSession() as session:
+            channel.use_session(session)
+            items = []
+            for i in range(1200):
+                delivery = _sms_delivery(f"user-{i}")
+                delivery.id = f"delivery-{i}"
+                phone = "12345" if i == 3 else f"98765{i:05d}"  # user-3 has an invalid number
+                items.append((delivery, UserAlertPreferences(user_id=f"user-{i}", phone_number=phone)))
+
+            results = await channel.send_batch(items)
+    finally:
+        await provider.close()
+
+    assert [len(batch) for batch in provider.batches] == [500, 500, 199]
+    assert results[3] is False and results[7] is False
+    assert sum(results) == 1198
+    assert provider.batches[0][0]['to'] == "9876500000"
+
+@pytest.mark.asyncio
+async def test_bulk_notification_coalesces_push_deliveries(monkeypatch):
+    provider = MockProvider()
+    url = await provider.start()
+    monkeypatch.setenv("PUSH_BATCH_API_URL", url)
+
+    from notification_dispatcher import NotificationDispatcher
+
+    dispatcher = NotificationDispatcher()
+    await dispatcher.initialize()
+    try:
+        alert = BaseAlert(
+            user_id="district",
+            alert_type=AlertType.WEATHER_EMERGENCY,
+            severity=AlertSeverity.MEDIUM,
+            title="Hailstorm expected",
+            message="Move harvested produce under cover",
+            location="Nashik"
+        )
+        await dispatcher.send_bulk_notification(alert, [f"farmer-{i}" for i in range(300)])
+
+        for _ in range(100):
+            if sum(len(batch) for batch in provider.batches) >= 300:
+                break
+            await asyncio.sleep(0.05)
+        await asyncio.sleep(0.1)
+
+        stats = await dispatcher.get_delivery_statistics()
+    finally:
+        await dispatcher.shutdown()
+        await provider.close()
+
+    assert sum(len(batch) for batch in provider.batches) == 300
+    # A handful of provider requests instead of one per recipient
+    assert len(provider.batches) <= 10
+    assert stats['successful_deliveries'] == 300
+
+@pytest.mark.asyncio
+async def test_submit_blocks_while_the_provider_is_down():
+    outage = asyncio.Event()
+    flushed = []
+
+    async def flush(batch):
+        await outage.wait()
+        flushed.extend(batch)
+
+    batcher = DeliveryBatcher(10, flush, window=0.01, concurrency=2, max_pending=30)
+    accepted = 0
+
+    async def producer():
+        nonlocal accepted
+        for i in range(100):
+            await batcher.submit(i)
+            accepted += 1
+
+    task = asyncio.create_task(producer())
+    await asyncio.sleep(0.1)
+
+    # Only max_pending items are accepted and held while every flush is stuck
+    assert accepted == 30
+    assert batcher.batches_in_flight == 3
+    assert not task.done()
+
+    outage.set()
+    await asyncio.wait_for(task, timeout=5)
+    await batcher.drain()
+
+    assert sorted(flushed) == list(range(100))
+    assert batcher.batches_in_flight == 0
+
+@pytest.mark.asyncio
+async def test_failed_flush_frees_capacity():
+    async def flush(batch):
+        raise RuntimeError("provider unavailable")
+
+    batcher = DeliveryBatcher(5, flush, window=0.01, max_pending=5)
+    for i in range(20):
+        await asyncio.wait_for(batcher.submit(i), timeout=1)
+    await batcher.drain()
+
+    assert len(batcher) == 0
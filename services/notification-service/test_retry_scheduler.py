@@ -0,0 +1,39 @@
+"""
+Unit tests for the delivery retry scheduler
+"""
+
+import asyncio
+
+import pytest
+
+from retry_scheduler import RetryPolicy, RetryScheduler
+
+@pytest.mark.asyncio
+async def test_items_released_in_due_order_without_blocking():
+    queue = asyncio.Queue()
+    scheduler = RetryScheduler(queue.put_nowait)
+    scheduler.start()
+    try:
+        scheduler.schedule("late", 0.2)
+        await asyncio.sleep(0.01)
+        # Scheduling an earlier item wakes the timer instead of waiting out "late"
+        scheduler.schedule("early", 0.02)
+        scheduler.schedule("middle", 0.05)
+        assert len(scheduler) == 3
+
+        released = [await asyncio.wait_for(queue.get(), 1.0) for _ in range(3)]
+        assert released == ["early", "middle", "late"]
+        assert len(scheduler) == 0
+    finally:
+        await scheduler.stop()
+
+def test_backoff_is_exponential_capped_and_jittered():
+    policy = RetryPolicy(base_delay=30.0, max_delay=300.0, jitter=0.2)
+
+    for retry_count, backoff in [(1, 30.0), (2, 60.0), (3, 120.0), (4, 240.0), (5, 300.0), (9, 300.0)]:
+        delays = {policy.delay(retry_count) for _ in range(50)}
+        assert all(backoff * 0.8 <= delay <= backoff for delay in delays)
+        assert len(delays) > 1
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,128 @@
+"""
+Unit tests for the weather acquisition layer, against a local mock provider
+"""
+
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import database
+import weather_monitor
+from weather_acquisition import FETCH_CONCURRENCY, WeatherAcquisition, WeatherCell
+from weather_monitor import WeatherEmergencyMonitor
+
+ROUND_TRIP = 0.2
+
+class MockWeatherProvider:
+    """OpenWeather-style endpoint that answers slowly and counts requests and peak concurrency"""
+
+    def __init__(self):
+        self.requests = []
+        self.failing = False
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    async def handle(self, request):
+        self.requests.append(dict(request.query))
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(ROUND_TRIP)
+        finally:
+            self.in_flight -= 1
+        if self.failing:
+            return web.json_response({'message': 'unavailable'}, status=503)
+        return web.json_response({
+            'main': {'temp': 47.0, 'humidity': 20, 'pressure': 1002},
+            'wind': {'speed': 5.0, 'deg': 90},
+            'rain': {'1h': 0.0},
+            'visibility': 8000
+        })
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/weather', self.handle)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        return str(self.server.make_url(''))
+
+    async def close(self):
+        await self.server.close()
+
+def _districts(count):
+    # Clusters of districts a few kilometres apart fall into the same grid cell
+    return [
+        {'name': f"District {i}", 'lat': 20.0 + (i // 10) * 0.5 + (i % 10) * 0.002, 'lon': 78.0 + (i % 10) * 0.002}
+        for i in range(count)
+    ]
+
+@pytest.mark.asyncio
+async def test_points_in_a_cell_share_one_cached_request():
+    provider = MockWeatherProvider()
+    weather = WeatherAcquisition(api_key="test", base_url=await provider.start(), ttl=60)
+    try:
+        points = [(d['lat'], d['lon']) for d in _districts(200)]
+        assert len({weather.cell(lat, lon) for lat, lon in points}) == 20
+
+        results = await weather.current_many(points)
+
+        assert all(result['main']['temp'] == 47.0 for result in results)
+        assert len(provider.requests) == 20
+        # Cells are fetched concurrently, up to the layer's limit
+        assert provider.peak_in_flight == FETCH_CONCURRENCY
+
+        await weather.current_many(points)
+        assert len(provider.requests) == 20
+        assert weather.cache_hits == 200
+    finally:
+        await weather.close()
+        await provider.close()
+
+@pytest.mark.asyncio
+async def test_failures_are_not_cached_and_disabled_layer_makes_no_requests():
+    provider = MockWeatherProvider()
+    weather = WeatherAcquisition(api_key="test", base_url=await provider.start())
+    try:
+        provider.failing = True
+        assert await weather.current(28.61, 77.21) is None
+        provider.failing = False
+        assert await weather.current(28.61, 77.21) is not None
+        assert len(provider.requests) == 2
+        assert WeatherCell.named(" Pune ").params() == {'q': 'pune'}
+
+        disabled = WeatherAcquisition()
+        assert await disabled.current(28.61, 77.21) is None
+        assert len(provider.requests) == 2
+    finally:
+        await weather.close()
+        await provider.close()
+
+@pytest.mark.asyncio
+async def test_monitor_checks_all_districts_concurrently_with_one_bulk_write(monkeypatch):
+    await database.clear_all_data()
+    stored = []
+
+    async def store_bulk(observations):
+        stored.append(len(observations))
+
+    async def no_users(location):
+        return []
+
+    monkeypatch.setattr(weather_monitor, 'store_weather_data_bulk', store_bulk)
+    monkeypatch.setattr(weather_monitor, 'get_users_by_location', no_users)
+
+    provider = MockWeatherProvider()
+    weather = WeatherAcquisition(api_key="test", base_url=await provider.start())
+    monitor = WeatherEmergencyMonitor(weather)
+    monitor.monitored_locations = _districts(200)
+    try:
+        await monitor.check_weather_emergencies()
+    finally:
+        await weather.close()
+        await provider.close()
+
+    assert stored == [200]
+    assert len(provider.requests) == 20
+    assert provider.peak_in_flight == FETCH_CONCURRENCY
@@ -5,28 +5,28 @@ Monitors weather conditions and generates emergency alerts
 
 import asyncio
 import structlog
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
-import aiohttp
 import json
+import os
 
 from models import (
-    WeatherEmergencyAlert, WeatherEventType, AlertSeverity, WeatherData,
+    AlertEvent, WeatherEventType, AlertSeverity, WeatherData,
     AlertType
 )
 from database import (
-    get_weather_data, store_weather_data, get_users_by_location,
-    store_weather_alert
+    get_weather_data, store_weather_data_bulk, get_users_by_location,
+    store_alert_event
 )
 from notification_dispatcher import NotificationDispatcher
+from weather_acquisition import WeatherAcquisition
 
 logger = structlog.get_logger()
 
 class WeatherEmergencyMonitor:
     """Monitors weather conditions and generates emergency alerts"""
     
-    def __init__(self):
-        self.session: Optional[aiohttp.ClientSession] = None
+    def __init__(self, weather: Optional[WeatherAcquisition] = None):
         self.notification_dispatcher: Optional[NotificationDispatcher] = None
         self.is_monitoring = False
         self.monitoring_task: Optional[asyncio.Task] = None
@@ -36,8 +36,8 @@ class WeatherEmergencyMonitor:
         # Weather API configurations
         self.weather_apis = {
             'primary': {
-                'url': 'https://api.openweathermap.org/data/2.5',
-                'key': 'your_api_key_here',
+                'url': os.getenv('OPENWEATHER_URL', 'https://api.openweathermap.org/data/2.5'),
+                'key': os.getenv('OPENWEATHER_API_KEY', ''),
                 'enabled': True
             },
             'backup': {
@@ -47,6 +47,13 @@ class WeatherEmergencyMonitor:
             }
         }
         
+        # Grid-snapped, cached fetching; may be shared with other components
+        self.weather = weather or WeatherAcquisition(
+            api_key=self.weather_apis['primary']['key'] or None,
+            base_url=self.weather_apis['primary']['url']
+        )
+        self._owns_weather = weather is None
+        
         # Emergency thresholds
         self.emergency_thresholds = {
             WeatherEventType.HEAVY_RAIN: {
@@ -91,10 +98,6 @@ class WeatherEmergencyMonitor:
     async def initialize(self):
         """Initialize the weather monitor"""
         try:
-            self.session = aiohttp.ClientSession(
-                timeout=aiohttp.ClientTimeout(total=60)
-            )
-            
             self.notification_dispatcher = NotificationDispatcher()
             await self.notification_dispatcher.initialize()
             
@@ -111,8 +114,8 @@ class WeatherEmergencyMonitor:
         if self.notification_dispatcher:
             await self.notification_dispatcher.shutdown()
         
-        if self.session:
-            await self.session.close()
+        if self._owns_weather:
+            await self.weather.close()
         
         logger.info("Weather monitor shutdown complete")
     
@@ -158,41 +161,72 @@ class WeatherEmergencyMonitor:
     async def check_weather_emergencies(self):
         """Check for weather emergencies across all monitored locations"""
         try:
-            emergency_alerts = []
-            
-            for location in self.monitored_locations:
-                try:
-                    alerts = await self._check_location_weather(location)
-                    emergency_alerts.extend(alerts)
-                    
-                except Exception as e:
-                    logger.error("Error checking location weather", location=location['name'], error=str(e))
+            emergency_events = await self._check_locations(self.monitored_locations)
             
             # Send alerts
-            for alert in emergency_alerts:
-                if self.notification_dispatcher:
-                    await self.notification_dispatcher.send_notification(alert)
-                    self.alerts_sent_today += 1
+            await self._send_events(emergency_events)
             
-            if emergency_alerts:
-                logger.info("Weather emergency alerts generated", count=len(emergency_alerts))
+            if emergency_events:
+                logger.info(
+                    "Weather emergency alerts generated",
+                    events=len(emergency_events),
+                    count=sum(len(recipients) for _, recipients in emergency_events)
+                )
             
         except Exception as e:
             logger.error("Error checking weather emergencies", error=str(e))
     
-    async def _check_location_weather(self, location: Dict[str, Any]) -> List[WeatherEmergencyAlert]:
-        """Check weather conditions for a specific location"""
+    async def _send_events(self, events: List[Tuple[AlertEvent, List[Dict[str, Any]]]]):
+        """Hand each weather emergency event to the dispatcher with its recipients"""
+        for event, recipients in events:
+            if self.notification_dispatcher:
+                await self.notification_dispatcher.send_event(event, recipients)
+                self.alerts_sent_today += len(recipients)
+    
+    async def _check_locations(self, locations: List[Dict[str, Any]]) -> List[Tuple[AlertEvent, List[Dict[str, Any]]]]:
+        """Fetch weather for all locations concurrently, store it in one write and check each"""
+        readings = await asyncio.gather(
+            *(self._fetch_weather_data(location) for location in locations),
+            return_exceptions=True
+        )
+        
+        checked = []
+        for location, weather_data in zip(locations, readings):
+            if isinstance(weather_data, Exception):
+                logger.error("Error fetching location weather", location=location['name'], error=str(weather_data))
+            elif weather_data:
+                checked.append((location, weather_data))
+        
+        if not checked:
+            return []
+        
+        try:
+            await store_weather_data_bulk([weather_data for _, weather_data in checked])
+        except Exception as e:
+            logger.error("Error storing weather observations", count=len(checked), error=str(e))
+        
+        results = await asyncio.gather(
+            *(self._check_location_weather(location, weather_data) for location, weather_data in checked),
+            return_exceptions=True
+        )
+        
+        events = []
+        for (location, _), result in zip(checked, results):
+            if isinstance(result, Exception):
+                logger.error("Error checking location weather", location=location['name'], error=str(result))
+                continue
+            events.extend(result)
+        return events
+    
+    async def _check_location_weather(
+        self,
+        location: Dict[str, Any],
+        weather_data: WeatherData
+    ) -> List[Tuple[AlertEvent, List[Dict[str, Any]]]]:
+        """Check fetched weather for a specific location; returns events with their recipients"""
         alerts = []
         
         try:
-            # Fetch current weather data
-            weather_data = await self._fetch_weather_data(location)
-            if not weather_data:
-                return alerts
-            
-            # Store weather data
-            await store_weather_data(weather_data)
-            
             # Check for emergency conditions
             emergency_events = await self._detect_weather_emergencies(weather_data)
             
@@ -200,22 +234,24 @@ class WeatherEmergencyMonitor:
                 # Get affected users in this location
                 affected_users = await get_users_by_location(location['name'])
                 
-                # Create alerts for each emergency event
+                # One alert event per emergency for everyone in the location
                 for event in emergency_events:
-                    for user in affected_users:
-                        alert = await self._create_weather_emergency_alert(
-                            user_id=user['user_id'],
-                            location=location['name'],
-                            weather_event=event['type'],
-                            intensity=event['intensity'],
-                            weather_data=weather_data,
-                            event_data=event
-                        )
-                        
-                        if alert:
-                            alerts.append(alert)
-                            # Store alert in database
-                            await store_weather_alert(alert)
+                    if not affected_users:
+                        break
+                    
+                    alert_event = await self._create_weather_emergency_event(
+                        location=location['name'],
+                        weather_event=event['type'],
+                        intensity=event['intensity'],
+                        weather_data=weather_data,
+                        event_data=event,
+                        recipients=[user['user_id'] for user in affected_users]
+                    )
+                    
+                    if alert_event:
+                        alerts.append((alert_event, affected_users))
+                        # Store event and recipient rows in database
+                        await store_alert_event(alert_event, affected_users)
             
         except Exception as e:
             logger.error("Error checking location weather", location=location['name'], error=str(e))
@@ -245,11 +281,33 @@ class WeatherEmergencyMonitor:
             return None
     
     async def _fetch_from_openweather(self, location: Dict[str, Any]) -> Optional[WeatherData]:
-        """Fetch weather data from OpenWeatherMap API"""
+        """Fetch weather data from OpenWeatherMap API through the shared acquisition layer"""
         try:
-            # In production, would use actual API key and make real requests
-            # For now, simulate the response
-            return await self._simulate_weather_data(location)
+            data = await self.weather.current(location['lat'], location['lon'])
+            if not data:
+                return None
+            
+            main = data.get('main', {})
+            wind = data.get('wind', {})
+            temperature = main.get('temp')
+            rainfall = data.get('rain', {}).get('1h', 0.0)
+            wind_speed = wind.get('speed', 0.0) * 3.6  # m/s to km/h
+            directions = ['N', 'NE', 'E', 'SE', 'S', 'SW', 'W', 'NW']
+            
+            return WeatherData(
+                location=location['name'],
+                timestamp=datetime.utcnow(),
+                temperature=temperature,
+                humidity=main.get('humidity'),
+                rainfall=rainfall,
+                wind_speed=wind_speed,
+                wind_direction=directions[int((wind.get('deg', 0) + 22.5) // 45) % 8],
+                pressure=main.get('pressure'),
+                visibility=data.get('visibility', 10000) / 1000,
+                weather_condition=self._determine_weather_condition(temperature or 0.0, rainfall, wind_speed),
+                alerts=[],
+                forecast=None
+            )
             
         except Exception as e:
             logger.error("Error fetching from OpenWeatherMap", error=str(e))
@@ -409,16 +467,16 @@ class WeatherEmergencyMonitor:
         else:
             return 'low'
     
-    async def _create_weather_emergency_alert(
+    async def _create_weather_emergency_event(
         self,
-        user_id: str,
         location: str,
         weather_event: WeatherEventType,
         intensity: str,
         weather_data: WeatherData,
-        event_data: Dict[str, Any]
-    ) -> Optional[WeatherEmergencyAlert]:
-        """Create a weather emergency alert"""
+        event_data: Dict[str, Any],
+        recipients: List[str]
+    ) -> Optional[AlertEvent]:
+        """Create a weather emergency alert event"""
         try:
             # Determine severity based on intensity
             severity_map = {
@@ -470,31 +528,33 @@ class WeatherEmergencyMonitor:
             message += f"\n\n🕒 Alert issued at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
             message += f"\n📱 Stay updated with MANDI EAR for latest conditions"
             
-            alert = WeatherEmergencyAlert(
-                user_id=user_id,
+            alert_event = AlertEvent(
                 alert_type=AlertType.WEATHER_EMERGENCY,
                 severity=severity,
-                title=title,
-                message=message,
+                title_template=AlertEvent.literal(title),
+                message_template=AlertEvent.literal(message),
                 location=location,
-                weather_event=weather_event,
-                intensity=intensity,
-                start_time=datetime.utcnow(),
-                end_time=None,  # Will be updated when conditions improve
-                affected_areas=[location],
-                impact_assessment=event_data.get('description', ''),
-                recommended_actions=recommendations,
-                weather_data={
-                    'temperature': weather_data.temperature,
-                    'humidity': weather_data.humidity,
-                    'rainfall': weather_data.rainfall,
-                    'wind_speed': weather_data.wind_speed,
-                    'wind_direction': weather_data.wind_direction,
-                    'pressure': weather_data.pressure
+                recipients=recipients,
+                metadata={
+                    'weather_event': weather_event.value,
+                    'intensity': intensity,
+                    'start_time': datetime.utcnow().isoformat(),
+                    'end_time': None,  # Will be updated when conditions improve
+                    'affected_areas': [location],
+                    'impact_assessment': event_data.get('description', ''),
+                    'recommended_actions': recommendations,
+                    'weather_data': {
+                        'temperature': weather_data.temperature,
+                        'humidity': weather_data.humidity,
+                        'rainfall': weather_data.rainfall,
+                        'wind_speed': weather_data.wind_speed,
+                        'wind_direction': weather_data.wind_direction,
+                        'pressure': weather_data.pressure
+                    }
                 }
             )
             
-            return alert
+            return alert_event
             
         except Exception as e:
             logger.error("Error creating weather emergency alert", error=str(e))
@@ -581,12 +641,10 @@ class WeatherEmergencyMonitor:
                         break
                 
                 if target_location:
-                    alerts = await self._check_location_weather(target_location)
-                    for alert in alerts:
-                        if self.notification_dispatcher:
-                            await self.notification_dispatcher.send_notification(alert)
+                    events = await self._check_locations([target_location])
+                    await self._send_events(events)
                     
-                    logger.info("Forced weather check completed", location=location, alerts=len(alerts))
+                    logger.info("Forced weather check completed", location=location, alerts=len(events))
                 else:
                     logger.warning("Location not monitored", location=location)
             else:
@@ -10,21 +10,26 @@ from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 import json
 import re
+import time
 from urllib.parse import urljoin
 
 from models import (
-    DataSource, DataSourceType, PricePoint, MandiInfo, 
-    ValidationResult, IngestionStats, QualityGrade
+    DataSource, DataSourceType, PricePoint, MandiInfo, GeoLocation,
+    ValidationResult, IngestionStats, IngestionBatchStats, QualityGrade
 )
-from database import store_price_point, cache_price_data, get_cached_data
+from database import store_price_points_bulk, expire_latest_prices, cache_price_data, get_cached_data
 from validators import PriceDataValidator
 
 logger = structlog.get_logger()
 
+# How often aged-out samples are dropped from latest_prices
+LATEST_PRICE_EXPIRY_INTERVAL_SECONDS = 60 * 60
+
 class DataIngestionPipeline:
     """Main data ingestion pipeline"""
     
-    def __init__(self):
+    def __init__(self, batch_size: int = 500):
+        self.batch_size = batch_size
         self.data_sources: List[DataSource] = []
         self.validator = PriceDataValidator()
         self.session: Optional[aiohttp.ClientSession] = None
@@ -98,6 +103,20 @@ class DataIngestionPipeline:
                 self.ingestion_tasks.append(task)
         
         logger.info("Started ingestion tasks", count=len(self.ingestion_tasks))
+        
+        self.ingestion_tasks.append(asyncio.create_task(self._latest_price_expiry_loop()))
+    
+    async def _latest_price_expiry_loop(self):
+        """Periodically drop samples that have left the latest_prices window"""
+        while self.is_running:
+            try:
+                await expire_latest_prices()
+                await asyncio.sleep(LATEST_PRICE_EXPIRY_INTERVAL_SECONDS)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error("Error expiring latest prices", error=str(e))
+                await asyncio.sleep(60)  # Wait before retry
     
     async def _ingestion_loop(self, source: DataSource):
         """Main ingestion loop for a data source"""
@@ -143,35 +162,16 @@ class DataIngestionPipeline:
             
             stats.records_processed = len(raw_data)
             
-            # Process each record
-            for record in raw_data:
-                try:
-                    # Validate data
-                    validation_result = await self.validator.validate_price_data(record)
-                    if validation_result.is_valid:
-                        stats.records_validated += 1
-                        
-                        # Convert to PricePoint
-                        price_point = await self._convert_to_price_point(
-                            record, source, validation_result
-                        )
-                        
-                        # Store in database
-                        if await store_price_point(price_point):
-                            stats.records_stored += 1
-                        else:
-                            stats.errors += 1
-                    else:
-                        stats.errors += 1
-                        logger.warning(
-                            "Data validation failed",
-                            source_id=source.id,
-                            issues=validation_result.issues
-                        )
-                
-                except Exception as e:
-                    stats.errors += 1
-                    logger.error("Error processing record", error=str(e))
+            # Validate and write in batches; each batch is one COPY + merge
+            for offset in range(0, len(raw_data), self.batch_size):
+                batch = raw_data[offset:offset + self.batch_size]
+                batch_stats = await self._ingest_batch(
+                    batch, source, batch_number=len(stats.batches) + 1
+                )
+                stats.batches.append(batch_stats)
+                stats.records_validated += batch_stats.records_validated
+                stats.records_stored += batch_stats.records_stored
+                stats.errors += batch_stats.errors
             
             # Update processing time
             stats.processing_time = (datetime.utcnow() - start_time).total_seconds()
@@ -190,6 +190,94 @@ class DataIngestionPipeline:
         
         return stats
     
+    async def _ingest_batch(
+        self,
+        batch: List[Dict[str, Any]],
+        source: DataSource,
+        batch_number: int
+    ) -> IngestionBatchStats:
+        """Validate, convert and bulk-store one batch of raw records"""
+        validation_start = time.perf_counter()
+        validated = 0
+        errors = 0
+        price_points: List[PricePoint] = []
+        mandis: Dict[str, MandiInfo] = {}
+        invalid_records = 0
+        invalid_issues: List[str] = []
+        
+        validation_results = await self.validator.validate_batch(batch)
+        for record, validation_result in zip(batch, validation_results):
+            if not validation_result.is_valid:
+                errors += 1
+                invalid_records += 1
+                invalid_issues.extend(validation_result.issues)
+                continue
+            
+            validated += 1
+            try:
+                price_point = await self._convert_to_price_point(
+                    record, source, validation_result
+                )
+                price_points.append(price_point)
+                if price_point.mandi_id not in mandis:
+                    mandi = self._build_mandi_info(price_point.mandi_id, record)
+                    if mandi:
+                        mandis[price_point.mandi_id] = mandi
+            except Exception as e:
+                errors += 1
+                logger.error("Error processing record", error=str(e))
+        
+        if invalid_issues:
+            logger.warning(
+                "Data validation failed",
+                source_id=source.id,
+                batch_number=batch_number,
+                invalid_records=invalid_records,
+                sample_issues=invalid_issues[:5]
+            )
+        
+        validation_time = time.perf_counter() - validation_start
+        write_start = time.perf_counter()
+        stored = 0
+        if price_points:
+            try:
+                stored = await store_price_points_bulk(price_points, list(mandis.values()))
+            except Exception as e:
+                errors += len(price_points)
+                logger.error(
+                    "Failed to store price batch",
+                    source_id=source.id,
+                    batch_number=batch_number,
+                    records=len(price_points),
+                    error=str(e)
+                )
+        
+        return IngestionBatchStats(
+            batch_number=batch_number,
+            records_processed=len(batch),
+            records_validated=validated,
+            records_stored=stored,
+            errors=errors,
+            validation_time=validation_time,
+            write_time=time.perf_counter() - write_start
+        )
+    
+    def _build_mandi_info(self, mandi_id: str, record: Dict[str, Any]) -> Optional[MandiInfo]:
+        """Build mandi details from a raw record so the batch can register it"""
+        if record.get("latitude") is None or record.get("longitude") is None or not record.get("state"):
+            return None
+        
+        return MandiInfo(
+            id=mandi_id,
+            name=record.get("mandi_name") or mandi_id,
+            location=GeoLocation(
+                latitude=float(record["latitude"]),
+                longitude=float(record["longitude"]),
+                district=record.get("district"),
+                state=record["state"]
+            )
+        )
+    
     async def _fetch_government_data(self, source: DataSource) -> List[Dict[str, Any]]:
         """Fetch data from government portals"""
         if not self.session:
@@ -304,6 +392,16 @@ class DataIngestionPipeline:
         from database import get_commodity_prices
         return await get_commodity_prices(commodity, state, limit)
     
+    async def get_latest_prices(
+        self, 
+        commodity: str, 
+        state: Optional[str] = None, 
+        limit: int = 100
+    ) -> List[Any]:
+        """Get precomputed latest prices and aggregates (delegated to database layer)"""
+        from database import get_latest_prices
+        return await get_latest_prices(commodity, state, limit)
+    
     async def get_mandis(self, state: Optional[str] = None) -> List[MandiInfo]:
         """Get mandis (delegated to database layer)"""
         from database import get_mandis
@@ -13,10 +13,25 @@ from models import PricePoint, PriceData, MandiInfo, DataSource, ValidationResul
 
 logger = structlog.get_logger()
 
+# Rolling window behind the min/max/avg kept in latest_prices
+LATEST_PRICE_WINDOW_DAYS = 30
+
 # Global connection pools
 pg_pool: Optional[asyncpg.Pool] = None
 redis_client: Optional[redis.Redis] = None
 
+# Bumped on every mandi insert or update so in-process indexes know to rebuild;
+# any write path that changes mandis must call mark_mandis_changed()
+mandis_version = 0
+
+# Whether the PostGIS extension is installed (detected in create_tables)
+postgis_available = False
+
+def mark_mandis_changed():
+    """Invalidate in-process mandi indexes after a committed mandi write"""
+    global mandis_version
+    mandis_version += 1
+
 async def init_db():
     """Initialize database connections"""
     global pg_pool, redis_client
@@ -61,6 +76,8 @@ async def close_db():
 
 async def create_tables():
     """Create database tables"""
+    global postgis_available
+    
     if not pg_pool:
         raise RuntimeError("Database pool not initialized")
     
@@ -122,11 +139,220 @@ async def create_tables():
             )
         """)
         
+        # Latest price per (commodity, mandi) with rolling aggregates,
+        # maintained incrementally on every write to price_points
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS latest_prices (
+                commodity VARCHAR NOT NULL,
+                mandi_id VARCHAR NOT NULL,
+                state VARCHAR NOT NULL,
+                variety VARCHAR,
+                unit VARCHAR DEFAULT 'quintal',
+                price FLOAT NOT NULL,
+                timestamp TIMESTAMP NOT NULL,
+                min_price FLOAT NOT NULL,
+                max_price FLOAT NOT NULL,
+                avg_price FLOAT NOT NULL,
+                sample_count INTEGER NOT NULL,
+                total_quantity FLOAT,
+                oldest_sample_at TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT NOW(),
+                PRIMARY KEY (commodity, mandi_id),
+                FOREIGN KEY (mandi_id) REFERENCES mandis(id)
+            )
+        """)
+        
+        # Tables created before the rolling aggregates tracked their oldest sample
+        await conn.execute("ALTER TABLE latest_prices ADD COLUMN IF NOT EXISTS oldest_sample_at TIMESTAMP")
+        
         # Create indexes
         await conn.execute("CREATE INDEX IF NOT EXISTS idx_price_points_commodity ON price_points(commodity)")
         await conn.execute("CREATE INDEX IF NOT EXISTS idx_price_points_timestamp ON price_points(timestamp)")
         await conn.execute("CREATE INDEX IF NOT EXISTS idx_price_points_mandi ON price_points(mandi_id)")
+        await conn.execute("CREATE INDEX IF NOT EXISTS idx_price_points_commodity_mandi_ts ON price_points(commodity, mandi_id, timestamp DESC)")
         await conn.execute("CREATE INDEX IF NOT EXISTS idx_mandis_state ON mandis(state)")
+        await conn.execute("CREATE INDEX IF NOT EXISTS idx_latest_prices_commodity_state_ts ON latest_prices(commodity, state, timestamp DESC)")
+        await conn.execute("CREATE INDEX IF NOT EXISTS idx_latest_prices_oldest_sample ON latest_prices(oldest_sample_at)")
+        
+        # Radius queries can use PostGIS when the extension is installed
+        postgis_available = bool(await conn.fetchval(
+            "SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'postgis')"
+        ))
+        if postgis_available:
+            await conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_mandis_geography ON mandis
+                USING GIST ((ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)::geography))
+            """)
+            logger.info("PostGIS detected, mandi radius queries will use ST_DWithin")
+
+# Columns returned by every price_points upsert, consumed by refresh_latest_prices
+WRITTEN_PRICE_COLUMNS = "commodity, mandi_id, variety, unit, price, quantity, timestamp, (xmax = 0) AS inserted"
+
+async def refresh_latest_prices(conn: asyncpg.Connection, written: List[Any]) -> None:
+    """Fold rows just written to price_points into latest_prices.
+    
+    written holds the rows returned by the price_points upsert. Newly
+    inserted rows are merged into the existing aggregates with one upsert,
+    so the cost follows the size of the batch and never rescans history.
+    Rows that overwrote an existing price point change a sample already
+    counted, so only those keys are recomputed from the window.
+    """
+    inserted = [row for row in written if row["inserted"]]
+    recompute_keys = list({(row["commodity"], row["mandi_id"]) for row in written if not row["inserted"]})
+    
+    if inserted:
+        await _merge_latest_prices(conn, inserted)
+    if recompute_keys:
+        await _recompute_latest_prices(conn, recompute_keys)
+
+async def _merge_latest_prices(conn: asyncpg.Connection, rows: List[Any]) -> None:
+    """Upsert per-key aggregates of new price points into latest_prices"""
+    await conn.execute("""
+        WITH batch AS (
+            SELECT *
+            FROM unnest(
+                $1::varchar[], $2::varchar[], $3::varchar[], $4::varchar[],
+                $5::float[], $6::float[], $7::timestamp[]
+            ) AS b(commodity, mandi_id, variety, unit, price, quantity, timestamp)
+            WHERE b.timestamp >= (NOW() AT TIME ZONE 'UTC') - make_interval(days => $8)
+        )
+        INSERT INTO latest_prices (
+            commodity, mandi_id, state, variety, unit, price, timestamp,
+            min_price, max_price, avg_price, sample_count, total_quantity,
+            oldest_sample_at, updated_at
+        )
+        SELECT
+            b.commodity, b.mandi_id, m.state,
+            (array_agg(b.variety ORDER BY b.timestamp DESC))[1],
+            (array_agg(b.unit ORDER BY b.timestamp DESC))[1],
+            (array_agg(b.price ORDER BY b.timestamp DESC))[1],
+            MAX(b.timestamp),
+            MIN(b.price), MAX(b.price), AVG(b.price),
+            COUNT(*), SUM(b.quantity),
+            MIN(b.timestamp), NOW()
+        FROM batch b
+        JOIN mandis m ON m.id = b.mandi_id
+        GROUP BY b.commodity, b.mandi_id, m.state
+        ON CONFLICT (commodity, mandi_id) DO UPDATE SET
+            -- A late or backfilled batch adds to the aggregates but never
+            -- replaces a fresher latest price
+            variety = CASE WHEN EXCLUDED.timestamp >= latest_prices.timestamp
+                           THEN EXCLUDED.variety ELSE latest_prices.variety END,
+            unit = CASE WHEN EXCLUDED.timestamp >= latest_prices.timestamp
+                        THEN EXCLUDED.unit ELSE latest_prices.unit END,
+            price = CASE WHEN EXCLUDED.timestamp >= latest_prices.timestamp
+                         THEN EXCLUDED.price ELSE latest_prices.price END,
+            timestamp = GREATEST(latest_prices.timestamp, EXCLUDED.timestamp),
+            state = EXCLUDED.state,
+            min_price = LEAST(latest_prices.min_price, EXCLUDED.min_price),
+            max_price = GREATEST(latest_prices.max_price, EXCLUDED.max_price),
+            avg_price = (latest_prices.avg_price * latest_prices.sample_count
+                         + EXCLUDED.avg_price * EXCLUDED.sample_count)
+                        / (latest_prices.sample_count + EXCLUDED.sample_count),
+            sample_count = latest_prices.sample_count + EXCLUDED.sample_count,
+            total_quantity = CASE
+                WHEN latest_prices.total_quantity IS NULL AND EXCLUDED.total_quantity IS NULL THEN NULL
+                ELSE COALESCE(latest_prices.total_quantity, 0) + COALESCE(EXCLUDED.total_quantity, 0)
+            END,
+            oldest_sample_at = LEAST(latest_prices.oldest_sample_at, EXCLUDED.oldest_sample_at),
+            updated_at = EXCLUDED.updated_at
+    """,
+        [row["commodity"] for row in rows], [row["mandi_id"] for row in rows],
+        [row["variety"] for row in rows], [row["unit"] for row in rows],
+        [row["price"] for row in rows], [row["quantity"] for row in rows],
+        [row["timestamp"] for row in rows], LATEST_PRICE_WINDOW_DAYS
+    )
+
+async def _recompute_latest_prices(conn: asyncpg.Connection, keys: List[tuple]) -> None:
+    """Rebuild latest_prices rows for the given keys from the rolling window.
+    
+    One statement upserts the recomputed aggregates and deletes keys left
+    with no points inside the window, so a concurrent merge never lands in a
+    gap between a delete and the rebuild.
+    """
+    await conn.execute("""
+        WITH keys AS (
+            SELECT DISTINCT commodity, mandi_id
+            FROM unnest($1::varchar[], $2::varchar[]) AS k(commodity, mandi_id)
+        ),
+        windowed AS (
+            SELECT pp.*
+            FROM keys
+            JOIN price_points pp
+              ON pp.commodity = keys.commodity AND pp.mandi_id = keys.mandi_id
+            WHERE pp.timestamp >= (NOW() AT TIME ZONE 'UTC') - make_interval(days => $3)
+        ),
+        rebuilt AS (
+            INSERT INTO latest_prices (
+                commodity, mandi_id, state, variety, unit, price, timestamp,
+                min_price, max_price, avg_price, sample_count, total_quantity,
+                oldest_sample_at, updated_at
+            )
+            SELECT
+                w.commodity, w.mandi_id, m.state,
+                (array_agg(w.variety ORDER BY w.timestamp DESC))[1],
+                (array_agg(w.unit ORDER BY w.timestamp DESC))[1],
+                (array_agg(w.price ORDER BY w.timestamp DESC))[1],
+                MAX(w.timestamp),
+                MIN(w.price), MAX(w.price), AVG(w.price),
+                COUNT(*), SUM(w.quantity),
+                MIN(w.timestamp), NOW()
+            FROM windowed w
+            JOIN mandis m ON m.id = w.mandi_id
+            GROUP BY w.commodity, w.mandi_id, m.state
+            ON CONFLICT (commodity, mandi_id) DO UPDATE SET
+                state = EXCLUDED.state,
+                variety = EXCLUDED.variety,
+                unit = EXCLUDED.unit,
+                price = EXCLUDED.price,
+                timestamp = EXCLUDED.timestamp,
+                min_price = EXCLUDED.min_price,
+                max_price = EXCLUDED.max_price,
+                avg_price = EXCLUDED.avg_price,
+                sample_count = EXCLUDED.sample_count,
+                total_quantity = EXCLUDED.total_quantity,
+                oldest_sample_at = EXCLUDED.oldest_sample_at,
+                updated_at = EXCLUDED.updated_at
+            RETURNING commodity, mandi_id
+        )
+        DELETE FROM latest_prices lp
+        USING keys
+        WHERE lp.commodity = keys.commodity AND lp.mandi_id = keys.mandi_id
+          AND NOT EXISTS (
+              SELECT 1 FROM rebuilt
+              WHERE rebuilt.commodity = keys.commodity AND rebuilt.mandi_id = keys.mandi_id
+          )
+    """, [key[0] for key in keys], [key[1] for key in keys], LATEST_PRICE_WINDOW_DAYS)
+
+async def expire_latest_prices() -> int:
+    """Drop aged-out samples from latest_prices.
+    
+    Rows whose latest price has left the window are deleted. Rows whose
+    oldest counted sample has left it are recomputed, so min/max/avg stay
+    exact for the window without touching keys that are still current.
+    Returns the number of keys deleted or recomputed.
+    """
+    if not pg_pool:
+        raise RuntimeError("Database pool not initialized")
+    
+    async with pg_pool.acquire() as conn, conn.transaction():
+        deleted = await conn.execute("""
+            DELETE FROM latest_prices
+            WHERE timestamp < (NOW() AT TIME ZONE 'UTC') - make_interval(days => $1)
+        """, LATEST_PRICE_WINDOW_DAYS)
+        aged = await conn.fetch("""
+            SELECT commodity, mandi_id FROM latest_prices
+            WHERE oldest_sample_at IS NULL
+               OR oldest_sample_at < (NOW() AT TIME ZONE 'UTC') - make_interval(days => $1)
+        """, LATEST_PRICE_WINDOW_DAYS)
+        if aged:
+            await _recompute_latest_prices(conn, [(row["commodity"], row["mandi_id"]) for row in aged])
+    
+    # Command status is "DELETE <rows>"
+    expired = int(deleted.split()[-1]) + len(aged)
+    if expired:
+        logger.info("Expired latest prices", keys=expired)
+    return expired
 
 async def store_price_point(price_point: PricePoint) -> bool:
     """Store a price point in the database"""
@@ -134,8 +360,8 @@ async def store_price_point(price_point: PricePoint) -> bool:
         raise RuntimeError("Database pool not initialized")
     
     try:
-        async with pg_pool.acquire() as conn:
-            await conn.execute("""
+        async with pg_pool.acquire() as conn, conn.transaction():
+            written = await conn.fetchrow(f"""
                 INSERT INTO price_points (
                     id, commodity, variety, price, unit, quantity, quality,
                     mandi_id, timestamp, source_id, confidence, metadata
@@ -145,6 +371,7 @@ async def store_price_point(price_point: PricePoint) -> bool:
                     quantity = EXCLUDED.quantity,
                     confidence = EXCLUDED.confidence,
                     metadata = EXCLUDED.metadata
+                RETURNING {WRITTEN_PRICE_COLUMNS}
             """, 
                 price_point.id, price_point.commodity, price_point.variety,
                 price_point.price, price_point.unit, price_point.quantity,
@@ -152,11 +379,126 @@ async def store_price_point(price_point: PricePoint) -> bool:
                 price_point.timestamp, price_point.source_id,
                 price_point.confidence, json.dumps(price_point.metadata) if price_point.metadata else None
             )
+            await refresh_latest_prices(conn, [written])
         return True
     except Exception as e:
         logger.error("Failed to store price point", error=str(e), price_point_id=price_point.id)
         return False
 
+PRICE_POINT_COLUMNS = [
+    "id", "commodity", "variety", "price", "unit", "quantity", "quality",
+    "mandi_id", "timestamp", "source_id", "confidence", "metadata"
+]
+
+async def store_price_points_bulk(
+    price_points: List[PricePoint],
+    mandis: Optional[List[MandiInfo]] = None
+) -> int:
+    """Store a batch of price points with one COPY and one merge.
+    
+    Rows are staged with COPY (or one executemany when the server refuses
+    COPY) into a transaction-scoped temp table and merged into price_points
+    with a single upsert, so a batch costs a fixed number of round-trips
+    instead of one per record. Mandis referenced by the batch are registered
+    (or updated) first so the foreign key holds, and the written rows are
+    folded into latest_prices in the same transaction. Returns the number of
+    rows written; raises on failure so the caller can account for the whole
+    batch.
+    """
+    if not pg_pool:
+        raise RuntimeError("Database pool not initialized")
+    
+    if not price_points:
+        return 0
+    
+    records = [
+        (
+            pp.id, pp.commodity, pp.variety, pp.price, pp.unit, pp.quantity,
+            pp.quality.value, pp.mandi_id, pp.timestamp, pp.source_id,
+            pp.confidence, json.dumps(pp.metadata) if pp.metadata else None
+        )
+        for pp in price_points
+    ]
+    columns = ", ".join(PRICE_POINT_COLUMNS)
+    
+    async with pg_pool.acquire() as conn:
+        async with conn.transaction():
+            mandis_changed = 0
+            if mandis:
+                status = await conn.execute("""
+                    INSERT INTO mandis (id, name, latitude, longitude, district, state, country)
+                    SELECT * FROM unnest(
+                        $1::varchar[], $2::varchar[], $3::float[], $4::float[],
+                        $5::varchar[], $6::varchar[], $7::varchar[]
+                    )
+                    ON CONFLICT (id) DO UPDATE SET
+                        name = EXCLUDED.name,
+                        latitude = EXCLUDED.latitude,
+                        longitude = EXCLUDED.longitude,
+                        district = EXCLUDED.district,
+                        state = EXCLUDED.state,
+                        country = EXCLUDED.country
+                    WHERE (mandis.name, mandis.latitude, mandis.longitude,
+                           mandis.district, mandis.state, mandis.country)
+                          IS DISTINCT FROM
+                          (EXCLUDED.name, EXCLUDED.latitude, EXCLUDED.longitude,
+                           EXCLUDED.district, EXCLUDED.state, EXCLUDED.country)
+                """,
+                    [m.id for m in mandis], [m.name for m in mandis],
+                    [m.location.latitude for m in mandis], [m.location.longitude for m in mandis],
+                    [m.location.district for m in mandis], [m.location.state for m in mandis],
+                    [m.location.country for m in mandis]
+                )
+                # Counts inserted mandis plus those whose details changed
+                mandis_changed = int(status.split()[-1])
+            
+            # staged_seq numbers rows in batch order for the merge below
+            await conn.execute("""
+                CREATE TEMP TABLE price_points_staging
+                (LIKE price_points INCLUDING DEFAULTS, staged_seq BIGSERIAL)
+                ON COMMIT DROP
+            """)
+            try:
+                # Savepoint, so a rejected COPY leaves the batch transaction usable
+                async with conn.transaction():
+                    await conn.copy_records_to_table(
+                        "price_points_staging",
+                        records=records,
+                        columns=PRICE_POINT_COLUMNS
+                    )
+            except (asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                # Poolers in transaction mode may refuse COPY; stage the rows
+                # with one prepared executemany instead
+                logger.warning("COPY unavailable, staging batch with executemany",
+                               records=len(records), error=str(e))
+                placeholders = ", ".join(f"${i}" for i in range(1, len(PRICE_POINT_COLUMNS) + 1))
+                await conn.executemany(
+                    f"INSERT INTO price_points_staging ({columns}) VALUES ({placeholders})",
+                    records
+                )
+            # DISTINCT ON keeps the last staged copy of an id, as one upsert per
+            # record would; ON CONFLICT cannot touch the same target row twice
+            # in one statement
+            written = await conn.fetch(f"""
+                INSERT INTO price_points ({columns})
+                SELECT DISTINCT ON (id) {columns}
+                FROM price_points_staging
+                ORDER BY id, staged_seq DESC
+                ON CONFLICT (id) DO UPDATE SET
+                    price = EXCLUDED.price,
+                    quantity = EXCLUDED.quantity,
+                    confidence = EXCLUDED.confidence,
+                    metadata = EXCLUDED.metadata
+                RETURNING {WRITTEN_PRICE_COLUMNS}
+            """)
+            
+            await refresh_latest_prices(conn, written)
+    
+    if mandis_changed:
+        mark_mandis_changed()
+    
+    return len(written)
+
 async def get_commodity_prices(commodity: str, state: Optional[str] = None, limit: int = 100) -> List[PriceData]:
     """Get current prices for a commodity"""
     if not pg_pool:
@@ -249,6 +591,122 @@ async def get_commodity_prices(commodity: str, state: Optional[str] = None, limi
         logger.error("Failed to get commodity prices", error=str(e))
         return []
 
+async def get_latest_prices(
+    commodity: str,
+    state: Optional[str] = None,
+    limit: int = 100,
+    mandi_ids: Optional[List[str]] = None
+) -> List[PriceData]:
+    """Get the latest price and rolling aggregates per mandi for a commodity.
+    
+    Served straight from latest_prices: one row per mandi, no history scan
+    and no per-point models. price_points is left empty. mandi_ids restricts
+    the result to a candidate set, e.g. from a radius search.
+    """
+    if not pg_pool:
+        raise RuntimeError("Database pool not initialized")
+    
+    try:
+        async with pg_pool.acquire() as conn:
+            query = """
+                SELECT lp.*, m.name as mandi_name, m.latitude, m.longitude,
+                       m.address, m.district, m.country, m.reliability_score
+                FROM latest_prices lp
+                JOIN mandis m ON lp.mandi_id = m.id
+                WHERE lp.commodity = $1
+                  AND lp.timestamp >= (NOW() AT TIME ZONE 'UTC') - make_interval(days => $2)
+            """
+            # Rows aged out since the last expiry pass are never served
+            params = [commodity, LATEST_PRICE_WINDOW_DAYS]
+            
+            if state:
+                params.append(state)
+                query += f" AND lp.state = ${len(params)}"
+            
+            if mandi_ids is not None:
+                params.append(mandi_ids)
+                query += f" AND lp.mandi_id = ANY(${len(params)}::varchar[])"
+            
+            query += " ORDER BY lp.timestamp DESC LIMIT $" + str(len(params) + 1)
+            params.append(limit)
+            
+            rows = await conn.fetch(query, *params)
+            
+            return [
+                PriceData(
+                    commodity=commodity,
+                    variety=row['variety'],
+                    current_price=row['price'],
+                    price_range={
+                        "min": row['min_price'],
+                        "max": row['max_price'],
+                        "avg": row['avg_price']
+                    },
+                    unit=row['unit'],
+                    mandi=MandiInfo(
+                        id=row['mandi_id'],
+                        name=row['mandi_name'],
+                        location={
+                            "latitude": row['latitude'],
+                            "longitude": row['longitude'],
+                            "address": row['address'],
+                            "district": row['district'],
+                            "state": row['state'],
+                            "country": row['country']
+                        },
+                        reliability_score=row['reliability_score']
+                    ),
+                    last_updated=row['timestamp'],
+                    sample_count=row['sample_count'],
+                    total_quantity=row['total_quantity']
+                )
+                for row in rows
+            ]
+            
+    except Exception as e:
+        logger.error("Failed to get latest prices", error=str(e))
+        return []
+
+async def get_price_history(
+    commodities: List[str],
+    since: datetime,
+    states: Optional[List[str]] = None
+) -> List[tuple]:
+    """Get raw price history for several commodities in one query.
+    
+    Returns (commodity, state, price, timestamp, mandi_id) tuples ordered by
+    timestamp, without building per-row models, for callers that group in
+    memory.
+    """
+    if not pg_pool:
+        raise RuntimeError("Database pool not initialized")
+    
+    try:
+        async with pg_pool.acquire() as conn:
+            query = """
+                SELECT pp.commodity, m.state, pp.price, pp.timestamp, pp.mandi_id
+                FROM price_points pp
+                JOIN mandis m ON pp.mandi_id = m.id
+                WHERE pp.commodity = ANY($1::varchar[]) AND pp.timestamp >= $2
+            """
+            params: List[Any] = [commodities, since]
+            
+            if states is not None:
+                query += " AND m.state = ANY($3::varchar[])"
+                params.append(states)
+            
+            query += " ORDER BY pp.timestamp"
+            
+            rows = await conn.fetch(query, *params)
+            return [
+                (row['commodity'], row['state'], row['price'], row['timestamp'], row['mandi_id'])
+                for row in rows
+            ]
+            
+    except Exception as e:
+        logger.error("Failed to get price history", error=str(e))
+        return []
+
 async def get_mandis(state: Optional[str] = None) -> List[MandiInfo]:
     """Get list of mandis"""
     if not pg_pool:
@@ -288,6 +746,49 @@ async def get_mandis(state: Optional[str] = None) -> List[MandiInfo]:
         logger.error("Failed to get mandis", error=str(e))
         return []
 
+async def find_mandis_within_radius(
+    latitude: float,
+    longitude: float,
+    radius_km: float,
+    limit: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Find mandis within radius_km using PostGIS ST_DWithin.
+    
+    Returns dicts with mandi_id and distance_km, nearest first. Only valid
+    when postgis_available is set; callers fall back to the in-process index.
+    """
+    if not pg_pool:
+        raise RuntimeError("Database pool not initialized")
+    if not postgis_available:
+        raise RuntimeError("PostGIS is not available")
+    
+    query = """
+        WITH origin AS (
+            SELECT ST_SetSRID(ST_MakePoint($2, $1), 4326)::geography AS point
+        )
+        SELECT m.id AS mandi_id,
+               ST_Distance(
+                   ST_SetSRID(ST_MakePoint(m.longitude, m.latitude), 4326)::geography,
+                   origin.point
+               ) / 1000.0 AS distance_km
+        FROM mandis m, origin
+        WHERE ST_DWithin(
+            ST_SetSRID(ST_MakePoint(m.longitude, m.latitude), 4326)::geography,
+            origin.point,
+            $3 * 1000.0
+        )
+        ORDER BY distance_km
+    """
+    params: List[Any] = [latitude, longitude, radius_km]
+    if limit is not None:
+        query += " LIMIT $4"
+        params.append(limit)
+    
+    async with pg_pool.acquire() as conn:
+        rows = await conn.fetch(query, *params)
+    
+    return [{"mandi_id": row['mandi_id'], "distance_km": row['distance_km']} for row in rows]
+
 async def cache_price_data(key: str, data: Any, ttl: int = 300):
     """Cache data in Redis"""
     if not redis_client:
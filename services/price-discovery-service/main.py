@@ -10,7 +10,7 @@ from typing import List, Optional
 from datetime import datetime
 
 from data_ingestion import DataIngestionPipeline
-from models import PriceData, MandiInfo, DataSource, GeoLocation
+from models import PriceData, MandiInfo, DataSource, GeoLocation, TrendBatchRequest
 from database import init_db, close_db
 from price_comparison import PriceComparisonEngine
 from trend_analysis import PriceTrendAnalyzer
@@ -40,6 +40,8 @@ async def lifespan(app: FastAPI):
     logger.info("Shutting down Price Discovery Service")
     if pipeline:
         await pipeline.shutdown()
+    if trend_analyzer:
+        trend_analyzer.shutdown()
     await close_db()
 
 app = FastAPI(
@@ -65,13 +67,23 @@ async def health_check():
 async def get_commodity_prices(
     commodity: str,
     state: Optional[str] = None,
-    limit: int = 100
+    limit: int = 100,
+    mode: str = "history"
 ) -> List[PriceData]:
-    """Get current prices for a commodity"""
+    """Get current prices for a commodity
+    
+    mode=history groups recent price points per mandi; mode=latest returns the
+    precomputed latest price and rolling min/max/avg per mandi.
+    """
     if not pipeline:
         raise HTTPException(status_code=503, detail="Service not ready")
     
+    if mode not in ("history", "latest"):
+        raise HTTPException(status_code=400, detail="mode must be 'history' or 'latest'")
+    
     try:
+        if mode == "latest":
+            return await pipeline.get_latest_prices(commodity, state, limit)
         prices = await pipeline.get_commodity_prices(commodity, state, limit)
         return prices
     except Exception as e:
@@ -218,6 +230,24 @@ async def get_trend_analysis(
         logger.error("Failed to analyze trends", error=str(e))
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.post("/trends/batch")
+async def analyze_trends_batch(request: TrendBatchRequest):
+    """Trend analysis and price prediction for many commodities/regions in one pass"""
+    if not trend_analyzer:
+        raise HTTPException(status_code=503, detail="Service not ready")
+    
+    try:
+        return await trend_analyzer.analyze_batch(
+            items=[(item.commodity, item.region) for item in request.items],
+            analysis_period_days=request.analysis_period_days,
+            include_predictions=request.include_predictions,
+            prediction_horizon_days=request.prediction_horizon_days,
+            historical_days=request.historical_days
+        )
+    except Exception as e:
+        logger.error("Failed to run batch trend analysis", error=str(e))
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 @app.post("/predict")
 async def predict_price(
     commodity: str,
@@ -80,6 +80,8 @@ class PriceData(BaseModel):
     mandi: MandiInfo
     last_updated: datetime
     price_points: List[PricePoint] = []
+    sample_count: Optional[int] = None  # Points behind price_range when served from latest_prices
+    total_quantity: Optional[float] = None
     trend_indicator: Optional[str] = None  # "rising", "falling", "stable"
     volume_indicator: Optional[str] = None  # "high", "medium", "low"
 
@@ -90,6 +92,16 @@ class ValidationResult(BaseModel):
     issues: List[str] = []
     corrected_data: Optional[Dict[str, Any]] = None
 
+class IngestionBatchStats(BaseModel):
+    """Statistics for a single ingestion batch"""
+    batch_number: int
+    records_processed: int
+    records_validated: int
+    records_stored: int
+    errors: int
+    validation_time: float = Field(..., description="Seconds spent validating and converting")
+    write_time: float = Field(..., description="Seconds spent in the bulk write")
+
 class IngestionStats(BaseModel):
     """Statistics for data ingestion"""
     source_id: str
@@ -99,6 +111,20 @@ class IngestionStats(BaseModel):
     errors: int
     processing_time: float
     timestamp: datetime
+    batches: List[IngestionBatchStats] = []
+
+class TrendBatchItem(BaseModel):
+    """One commodity/region pair in a batch trend request"""
+    commodity: str
+    region: Optional[str] = None  # None = all states
+
+class TrendBatchRequest(BaseModel):
+    """Batch trend analysis and prediction request"""
+    items: List[TrendBatchItem] = Field(..., min_length=1, max_length=1000)
+    analysis_period_days: int = Field(default=30, gt=0)
+    include_predictions: bool = True
+    prediction_horizon_days: int = Field(default=7, gt=0)
+    historical_days: int = Field(default=60, gt=0)
 
 class PriceAlert(BaseModel):
     """Price alert configuration"""
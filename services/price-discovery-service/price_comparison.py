@@ -12,7 +12,9 @@ from dataclasses import dataclass
 from enum import Enum
 
 from models import PricePoint, PriceData, MandiInfo, GeoLocation
-from database import get_commodity_prices, get_mandis
+from database import get_commodity_prices, get_latest_prices, get_mandis, find_mandis_within_radius
+from spatial_index import MandiSpatialIndex
+import database
 
 logger = structlog.get_logger()
 
@@ -249,6 +251,42 @@ class PriceComparisonEngine:
     def __init__(self):
         self.geo_calculator = GeospatialCalculator()
         self.transport_calculator = TransportationCostCalculator()
+        self.mandi_index = MandiSpatialIndex()
+    
+    async def _find_mandis_in_radius(
+        self,
+        base_location: GeoLocation,
+        radius_km: float
+    ) -> Dict[str, float]:
+        """
+        Find mandis within radius of a location
+        
+        Uses PostGIS ST_DWithin when the database supports it, otherwise the
+        in-process grid index (rebuilt when mandis change).
+        
+        Returns:
+            Mapping of mandi id to distance in km, nearest first
+        """
+        if database.postgis_available:
+            try:
+                rows = await find_mandis_within_radius(
+                    base_location.latitude, base_location.longitude, radius_km
+                )
+                return {row["mandi_id"]: row["distance_km"] for row in rows}
+            except Exception as e:
+                logger.warning("PostGIS radius query failed, using in-process index", error=str(e))
+        
+        if self.mandi_index.is_stale(database.mandis_version):
+            # Read the version first so a concurrent insert triggers another rebuild
+            version = database.mandis_version
+            self.mandi_index.build(await get_mandis(), source_version=version)
+        
+        return {
+            mandi.id: distance
+            for mandi, distance in self.mandi_index.query_radius(
+                base_location.latitude, base_location.longitude, radius_km
+            )
+        }
     
     async def compare_prices(
         self,
@@ -266,32 +304,43 @@ class PriceComparisonEngine:
             base_location: Base location for comparison
             radius_km: Search radius in kilometers
             max_results: Maximum number of results to return
-            min_quantity: Minimum quantity threshold
+            min_quantity: Minimum quantity a mandi must have traded. Checked
+                against latest_prices.total_quantity, i.e. the quantity over
+                the rolling 30-day window, rather than the sum of the 10 most
+                recent price points used before. Mandis with no recorded
+                quantity are not filtered out.
             
         Returns:
             Comprehensive price comparison
         """
         try:
-            # Get price data from all relevant mandis
-            price_data_list = await get_commodity_prices(commodity, limit=max_results * 2)
+            # Radius search first, then latest prices for just those mandis
+            mandi_distances = await self._find_mandis_in_radius(base_location, radius_km)
+            if not mandi_distances:
+                return PriceComparison(
+                    commodity=commodity,
+                    base_location=base_location,
+                    comparisons=[]
+                )
+            
+            price_data_list = await get_latest_prices(
+                commodity,
+                limit=len(mandi_distances),
+                mandi_ids=list(mandi_distances)
+            )
             
-            # Filter by radius and create comparisons
             comparisons = []
             
             for price_data in price_data_list:
-                # Calculate distance
-                distance = self.geo_calculator.calculate_distance(
-                    base_location, price_data.mandi.location
-                )
-                
-                # Skip if outside radius
-                if distance > radius_km:
-                    continue
+                distance = mandi_distances[price_data.mandi.id]
                 
                 # Skip if insufficient quantity
-                if price_data.price_points and min_quantity > 0:
-                    total_quantity = sum(p.quantity or 0 for p in price_data.price_points)
-                    if total_quantity < min_quantity:
+                if min_quantity > 0:
+                    if price_data.price_points:
+                        total_quantity = sum(p.quantity or 0 for p in price_data.price_points)
+                    else:
+                        total_quantity = price_data.total_quantity
+                    if total_quantity is not None and total_quantity < min_quantity:
                         continue
                 
                 # Calculate transportation cost
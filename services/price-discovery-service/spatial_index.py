@@ -0,0 +1,138 @@
+"""
+Spatial index for mandi radius queries
+Buckets mandi coordinates into a lat/lon grid and computes distances for
+candidate sets with vectorized Haversine
+"""
+
+import math
+import time
+import structlog
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+from models import MandiInfo
+
+logger = structlog.get_logger()
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE_LAT = 111.32
+
+def haversine_km(
+    latitude: float,
+    longitude: float,
+    latitudes: np.ndarray,
+    longitudes: np.ndarray
+) -> np.ndarray:
+    """Distances in km from one point to arrays of points (Haversine)"""
+    lat1 = math.radians(latitude)
+    lon1 = math.radians(longitude)
+    lat2 = np.radians(latitudes)
+    lon2 = np.radians(longitudes)
+
+    a = (np.sin((lat2 - lat1) / 2) ** 2 +
+         math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+class MandiSpatialIndex:
+    """In-process grid index over mandi coordinates.
+
+    Mandis are bucketed into cells of cell_size_deg degrees. A radius query
+    only visits the cells overlapping the query's bounding box and then
+    computes exact Haversine distances for those candidates in one NumPy pass.
+    """
+
+    def __init__(self, cell_size_deg: float = 1.0, refresh_interval: float = 900.0):
+        self.cell_size_deg = cell_size_deg
+        self.refresh_interval = refresh_interval
+        self.mandis: List[MandiInfo] = []
+        self.latitudes = np.empty(0)
+        self.longitudes = np.empty(0)
+        self.cells: Dict[Tuple[int, int], np.ndarray] = {}
+        self.built_at: Optional[float] = None
+        self.source_version: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self.mandis)
+
+    def is_stale(self, source_version: Optional[int] = None) -> bool:
+        """Whether the index should be rebuilt before serving queries"""
+        if self.built_at is None:
+            return True
+        if source_version is not None and source_version != self.source_version:
+            return True
+        return time.monotonic() - self.built_at >= self.refresh_interval
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return (
+            int(math.floor(latitude / self.cell_size_deg)),
+            int(math.floor(longitude / self.cell_size_deg))
+        )
+
+    def build(self, mandis: List[MandiInfo], source_version: Optional[int] = None):
+        """Rebuild the index from a full mandi list"""
+        self.mandis = list(mandis)
+        self.latitudes = np.array([m.location.latitude for m in self.mandis], dtype=float)
+        self.longitudes = np.array([m.location.longitude for m in self.mandis], dtype=float)
+
+        buckets: Dict[Tuple[int, int], List[int]] = {}
+        for position, mandi in enumerate(self.mandis):
+            cell = self._cell(mandi.location.latitude, mandi.location.longitude)
+            buckets.setdefault(cell, []).append(position)
+        self.cells = {cell: np.array(positions, dtype=np.intp) for cell, positions in buckets.items()}
+
+        self.built_at = time.monotonic()
+        self.source_version = source_version
+        logger.info("Mandi spatial index built", mandis=len(self.mandis), cells=len(self.cells))
+
+    def _candidate_positions(self, latitude: float, longitude: float, radius_km: float) -> np.ndarray:
+        """Positions of mandis in cells overlapping the query bounding box"""
+        lat_delta = radius_km / KM_PER_DEGREE_LAT
+        # Longitude degrees shrink towards the poles; clamp to avoid blow-up
+        cos_lat = max(math.cos(math.radians(latitude)), 0.01)
+        lon_delta = radius_km / (KM_PER_DEGREE_LAT * cos_lat)
+
+        min_cell = self._cell(latitude - lat_delta, longitude - lon_delta)
+        max_cell = self._cell(latitude + lat_delta, longitude + lon_delta)
+
+        # A very large radius covers most cells; scanning all points is cheaper
+        cell_span = (max_cell[0] - min_cell[0] + 1) * (max_cell[1] - min_cell[1] + 1)
+        if cell_span >= len(self.cells):
+            return np.arange(len(self.mandis), dtype=np.intp)
+
+        parts = [
+            self.cells[(lat_cell, lon_cell)]
+            for lat_cell in range(min_cell[0], max_cell[0] + 1)
+            for lon_cell in range(min_cell[1], max_cell[1] + 1)
+            if (lat_cell, lon_cell) in self.cells
+        ]
+        if not parts:
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate(parts)
+
+    def query_radius(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        limit: Optional[int] = None
+    ) -> List[Tuple[MandiInfo, float]]:
+        """Mandis within radius_km of a point, nearest first, with distances"""
+        if not self.mandis:
+            return []
+
+        positions = self._candidate_positions(latitude, longitude, radius_km)
+        if positions.size == 0:
+            return []
+
+        distances = haversine_km(
+            latitude, longitude, self.latitudes[positions], self.longitudes[positions]
+        )
+        within = distances <= radius_km
+        positions = positions[within]
+        distances = distances[within]
+
+        order = np.argsort(distances, kind="stable")
+        if limit is not None:
+            order = order[:limit]
+
+        return [(self.mandis[positions[i]], float(distances[i])) for i in order]
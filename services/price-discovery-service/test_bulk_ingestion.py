@@ -0,0 +1,237 @@
+"""
+Unit tests for batched price ingestion and the COPY/executemany bulk write,
+against a mocked asyncpg connection
+"""
+
+from datetime import datetime
+from unittest.mock import AsyncMock
+
+import asyncpg
+import pytest
+
+import data_ingestion
+import database
+from data_ingestion import DataIngestionPipeline
+from database import store_price_points_bulk
+from models import DataSource, DataSourceType, GeoLocation, MandiInfo, PricePoint
+
+class FakeTransaction:
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def __aenter__(self):
+        self.conn.transactions += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+class FakeConnection:
+    """Records every statement; COPY can be made to fail like a pooler that refuses it"""
+
+    def __init__(self, copy_error=None, existing_ids=(), aged_keys=(), deleted=0):
+        self.copy_error = copy_error
+        self.existing_ids = set(existing_ids)
+        self.aged_keys = list(aged_keys)
+        self.deleted = deleted
+        self.executed = []
+        self.fetched = []
+        self.copies = []
+        self.executemanys = []
+        self.transactions = 0
+        self.staged = []
+
+    def transaction(self):
+        return FakeTransaction(self)
+
+    async def execute(self, query, *args):
+        self.executed.append((query, args))
+        if query.strip().startswith("DELETE"):
+            return f"DELETE {self.deleted}"
+        return "INSERT 0 0"
+
+    async def fetch(self, query, *args):
+        self.fetched.append((query, args))
+        if "INSERT INTO price_points (" in query:
+            # Mirrors RETURNING WRITTEN_PRICE_COLUMNS for each staged record
+            columns = database.PRICE_POINT_COLUMNS
+            rows = [dict(zip(columns, record)) for record in self.staged]
+            return [
+                {**{key: row[key] for key in
+                    ("commodity", "mandi_id", "variety", "unit", "price", "quantity", "timestamp")},
+                 "inserted": row["id"] not in self.existing_ids}
+                for row in rows
+            ]
+        if "FROM latest_prices" in query:
+            return [{"commodity": c, "mandi_id": m} for c, m in self.aged_keys]
+        return []
+
+    async def copy_records_to_table(self, table, records, columns):
+        if self.copy_error is not None:
+            raise self.copy_error
+        self.copies.append((table, list(records), columns))
+        self.staged.extend(records)
+
+    async def executemany(self, query, records):
+        self.executemanys.append((query, list(records)))
+        self.staged.extend(records)
+
+    def merges(self):
+        return [q for q, _ in self.fetched if "INSERT INTO price_points (" in q]
+
+    def statements(self, fragment):
+        return [args for q, args in self.executed if fragment in q]
+
+class FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+        self.acquired = 0
+
+    def acquire(self):
+        pool = self
+
+        class _Acquire:
+            async def __aenter__(self):
+                pool.acquired += 1
+                return pool.conn
+
+            async def __aexit__(self, exc_type, exc, tb):
+                return False
+
+        return _Acquire()
+
+@pytest.fixture
+def fake_pool(monkeypatch):
+    def install(conn):
+        pool = FakePool(conn)
+        monkeypatch.setattr(database, "pg_pool", pool)
+        return pool
+    return install
+
+def make_price_point(index: int, mandi_id: str = "mandi_punjab_1") -> PricePoint:
+    return PricePoint(
+        commodity="Wheat",
+        price=2000.0 + index,
+        quantity=10.0,
+        mandi_id=mandi_id,
+        timestamp=datetime(2026, 10, 1, 10, index % 60),
+        source_id="agmarknet"
+    )
+
+def make_record(index: int) -> dict:
+    return {
+        "commodity": "Wheat",
+        "variety": "Wheat Grade A",
+        "price": 2000.0 + index,
+        "unit": "quintal",
+        "quantity": 50.0,
+        "quality": "average",
+        "mandi_name": f"Mandi {index % 2}",
+        "district": "Ludhiana",
+        "state": "Punjab",
+        "latitude": 30.9,
+        "longitude": 75.85,
+        "timestamp": datetime.utcnow().isoformat(),
+        "source": "agmarknet"
+    }
+
+SOURCE = DataSource(
+    id="agmarknet",
+    name="AGMARKNET",
+    type=DataSourceType.GOVERNMENT_PORTAL,
+    update_frequency=15
+)
+
+class TestStorePricePointsBulk:
+    """One COPY and one merge per batch, with executemany when COPY is refused"""
+
+    @pytest.mark.asyncio
+    async def test_batch_is_one_copy_and_one_merge(self, fake_pool):
+        conn = FakeConnection()
+        pool = fake_pool(conn)
+        points = [make_price_point(i) for i in range(25)]
+
+        stored = await store_price_points_bulk(points)
+
+        assert stored == 25
+        assert pool.acquired == 1
+        assert len(conn.copies) == 1
+        table, records, columns = conn.copies[0]
+        assert table == "price_points_staging"
+        assert len(records) == 25
+        assert columns == database.PRICE_POINT_COLUMNS
+        assert conn.executemanys == []
+        assert len(conn.merges()) == 1
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_executemany_when_copy_fails(self, fake_pool):
+        conn = FakeConnection(copy_error=asyncpg.exceptions.FeatureNotSupportedError("COPY not supported"))
+        fake_pool(conn)
+        points = [make_price_point(i) for i in range(10)]
+
+        stored = await store_price_points_bulk(points)
+
+        assert stored == 10
+        assert conn.copies == []
+        assert len(conn.executemanys) == 1
+        query, records = conn.executemanys[0]
+        assert query.startswith("INSERT INTO price_points_staging")
+        assert len(records) == 10
+        assert len(conn.merges()) == 1
+
+    @pytest.mark.asyncio
+    async def test_registers_batch_mandis_in_one_statement(self, fake_pool):
+        conn = FakeConnection()
+        fake_pool(conn)
+        mandis = [
+            MandiInfo(id=f"mandi_{i}", name=f"Mandi {i}",
+                      location=GeoLocation(latitude=30.0, longitude=75.0, state="Punjab"))
+            for i in range(3)
+        ]
+
+        await store_price_points_bulk([make_price_point(0, "mandi_0")], mandis)
+
+        mandi_inserts = [args for q, args in conn.executed if "INSERT INTO mandis" in q]
+        assert len(mandi_inserts) == 1
+        assert mandi_inserts[0][0] == ["mandi_0", "mandi_1", "mandi_2"]
+
+    @pytest.mark.asyncio
+    async def test_empty_batch_does_not_touch_the_database(self, fake_pool):
+        conn = FakeConnection()
+        pool = fake_pool(conn)
+
+        assert await store_price_points_bulk([]) == 0
+        assert pool.acquired == 0
+
+class TestIngestionBatching:
+    """The pipeline splits a fetch into batch_size bulk writes"""
+
+    @pytest.mark.asyncio
+    async def test_one_bulk_write_per_batch(self, monkeypatch):
+        pipeline = DataIngestionPipeline(batch_size=3)
+        monkeypatch.setattr(pipeline, "_fetch_government_data",
+                            AsyncMock(return_value=[make_record(i) for i in range(7)]))
+        bulk = AsyncMock(side_effect=lambda points, mandis: len(points))
+        monkeypatch.setattr(data_ingestion, "store_price_points_bulk", bulk)
+
+        stats = await pipeline._ingest_from_source(SOURCE)
+
+        assert bulk.await_count == 3
+        assert [len(call.args[0]) for call in bulk.await_args_list] == [3, 3, 1]
+        assert stats.records_processed == 7
+        assert stats.records_stored == 7
+        assert [batch.batch_number for batch in stats.batches] == [1, 2, 3]
+
+    @pytest.mark.asyncio
+    async def test_failed_write_counts_the_whole_batch_as_errors(self, monkeypatch):
+        pipeline = DataIngestionPipeline(batch_size=10)
+        monkeypatch.setattr(data_ingestion, "store_price_points_bulk",
+                            AsyncMock(side_effect=RuntimeError("connection lost")))
+
+        batch_stats = await pipeline._ingest_batch(
+            [make_record(i) for i in range(4)], SOURCE, batch_number=1
+        )
+
+        assert batch_stats.records_validated == 4
+        assert batch_stats.records_stored == 0
+        assert batch_stats.errors == 4
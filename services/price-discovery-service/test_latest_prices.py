@@ -0,0 +1,265 @@
+"""
+Unit tests for incremental latest_prices maintenance and expiry,
+against a mocked asyncpg connection that keeps the tables in memory
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+import database
+from database import (
+    LATEST_PRICE_WINDOW_DAYS, expire_latest_prices, get_latest_prices,
+    store_price_points_bulk
+)
+from models import PricePoint
+from test_bulk_ingestion import FakeConnection, fake_pool
+
+def window_start() -> datetime:
+    return datetime.utcnow() - timedelta(days=LATEST_PRICE_WINDOW_DAYS)
+
+def aggregate(points):
+    """latest_prices columns for points of one key, as the SQL aggregates compute them"""
+    latest = max(points, key=lambda p: p["timestamp"])
+    prices = [p["price"] for p in points]
+    quantities = [p["quantity"] for p in points if p["quantity"] is not None]
+    return {
+        "variety": latest["variety"],
+        "unit": latest["unit"],
+        "price": latest["price"],
+        "timestamp": latest["timestamp"],
+        "min_price": min(prices),
+        "max_price": max(prices),
+        "avg_price": sum(prices) / len(prices),
+        "sample_count": len(points),
+        "total_quantity": sum(quantities) if quantities else None,
+        "oldest_sample_at": min(p["timestamp"] for p in points)
+    }
+
+class TableConnection(FakeConnection):
+    """Applies the price_points merge and the latest_prices statements to in-memory tables.
+
+    on_delete_latest, when set, runs once right after the first statement
+    that deletes from latest_prices, standing in for a concurrent writer.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.price_points = {}
+        self.latest = {}
+        self.on_delete_latest = None
+
+    async def execute(self, query, *args):
+        await super().execute(query, *args)
+        if "LEAST(latest_prices.min_price" in query:
+            commodities, mandi_ids, varieties, units, prices, quantities, timestamps, _ = args
+            self.merge([
+                {"commodity": c, "mandi_id": m, "variety": v, "unit": u,
+                 "price": p, "quantity": q, "timestamp": t}
+                for c, m, v, u, p, q, t in zip(commodities, mandi_ids, varieties, units,
+                                               prices, quantities, timestamps)
+            ])
+        elif "JOIN price_points pp" in query:
+            self.recompute(list(zip(args[0], args[1])), replace="DO NOTHING" not in query)
+        elif "DELETE FROM latest_prices lp" in query:
+            for key in zip(args[0], args[1]):
+                self.latest.pop(key, None)
+        elif query.strip().startswith("DELETE FROM latest_prices\n"):
+            stale = [key for key, row in self.latest.items() if row["timestamp"] < window_start()]
+            for key in stale:
+                del self.latest[key]
+            return f"DELETE {len(stale)}"
+
+        if "DELETE FROM latest_prices" in query and self.on_delete_latest is not None:
+            hook, self.on_delete_latest = self.on_delete_latest, None
+            hook()
+        return "INSERT 0 0"
+
+    async def fetch(self, query, *args):
+        if "INSERT INTO price_points (" in query:
+            # The last staged copy of an id is the one written
+            staged = {}
+            for record in self.staged:
+                staged[record[0]] = dict(zip(database.PRICE_POINT_COLUMNS, record))
+            self.staged = []
+            written = []
+            for row in staged.values():
+                written.append({**row, "inserted": row["id"] not in self.price_points})
+                self.price_points[row["id"]] = row
+            return written
+        if "oldest_sample_at <" in query:
+            return [
+                {"commodity": c, "mandi_id": m}
+                for (c, m), row in self.latest.items()
+                if row["oldest_sample_at"] is None or row["oldest_sample_at"] < window_start()
+            ]
+        return await super().fetch(query, *args)
+
+    def merge(self, rows):
+        groups = {}
+        for row in rows:
+            if row["timestamp"] >= window_start():
+                groups.setdefault((row["commodity"], row["mandi_id"]), []).append(row)
+        for key, points in groups.items():
+            batch = aggregate(points)
+            current = self.latest.get(key)
+            if current is None:
+                self.latest[key] = batch
+                continue
+            fresher = batch["timestamp"] >= current["timestamp"]
+            count = current["sample_count"] + batch["sample_count"]
+            quantities = [q for q in (current["total_quantity"], batch["total_quantity"]) if q is not None]
+            self.latest[key] = {
+                "variety": batch["variety"] if fresher else current["variety"],
+                "unit": batch["unit"] if fresher else current["unit"],
+                "price": batch["price"] if fresher else current["price"],
+                "timestamp": max(current["timestamp"], batch["timestamp"]),
+                "min_price": min(current["min_price"], batch["min_price"]),
+                "max_price": max(current["max_price"], batch["max_price"]),
+                "avg_price": (current["avg_price"] * current["sample_count"]
+                              + batch["avg_price"] * batch["sample_count"]) / count,
+                "sample_count": count,
+                "total_quantity": sum(quantities) if quantities else None,
+                "oldest_sample_at": min(current["oldest_sample_at"], batch["oldest_sample_at"])
+            }
+
+    def recompute(self, keys, replace=True):
+        for key in set(keys):
+            points = [
+                row for row in self.price_points.values()
+                if (row["commodity"], row["mandi_id"]) == key and row["timestamp"] >= window_start()
+            ]
+            if not points:
+                self.latest.pop(key, None)
+            elif replace or key not in self.latest:
+                self.latest[key] = aggregate(points)
+
+    def write_concurrently(self, point):
+        """A price point committed by another writer, merged as its own batch"""
+        row = {column: getattr(point, column) for column in database.PRICE_POINT_COLUMNS}
+        row["quality"] = point.quality.value
+        self.price_points[row["id"]] = row
+        self.merge([row])
+
+def make_point(price, age_days=1.0, mandi_id="mandi_a", point_id=None):
+    point = PricePoint(
+        commodity="Wheat",
+        price=price,
+        quantity=10.0,
+        mandi_id=mandi_id,
+        timestamp=datetime.utcnow() - timedelta(days=age_days),
+        source_id="agmarknet"
+    )
+    if point_id is not None:
+        point.id = point_id
+    return point
+
+class TestIncrementalRefresh:
+    """Writes fold the batch into latest_prices instead of rescanning the window"""
+
+    @pytest.mark.asyncio
+    async def test_new_rows_are_merged_per_key(self, fake_pool):
+        conn = TableConnection()
+        fake_pool(conn)
+
+        await store_price_points_bulk([make_point(2000.0, 3), make_point(2100.0, 1), make_point(1800.0, 2, "mandi_b")])
+        await store_price_points_bulk([make_point(2300.0, 2)])
+
+        row = conn.latest[("Wheat", "mandi_a")]
+        assert row["price"] == 2100.0
+        assert (row["min_price"], row["max_price"], row["sample_count"]) == (2000.0, 2300.0, 3)
+        assert row["avg_price"] == pytest.approx(2133.33, abs=0.01)
+        assert row["total_quantity"] == 30.0
+        assert conn.latest[("Wheat", "mandi_b")]["sample_count"] == 1
+
+    @pytest.mark.asyncio
+    async def test_late_rows_never_replace_a_fresher_price(self, fake_pool):
+        conn = TableConnection()
+        fake_pool(conn)
+
+        await store_price_points_bulk([make_point(2000.0, 1)])
+        await store_price_points_bulk([make_point(2500.0, 5)])
+
+        row = conn.latest[("Wheat", "mandi_a")]
+        assert row["price"] == 2000.0
+        assert (row["max_price"], row["sample_count"]) == (2500.0, 2)
+
+    @pytest.mark.asyncio
+    async def test_overwritten_points_recompute_their_key(self, fake_pool):
+        conn = TableConnection()
+        fake_pool(conn)
+        await store_price_points_bulk([make_point(2000.0, 2, point_id="p1"), make_point(2200.0, 1)])
+
+        await store_price_points_bulk([make_point(3000.0, 2, point_id="p1")])
+
+        row = conn.latest[("Wheat", "mandi_a")]
+        assert (row["min_price"], row["max_price"], row["sample_count"]) == (2200.0, 3000.0, 2)
+        assert row["avg_price"] == 2600.0
+
+    @pytest.mark.asyncio
+    async def test_overwrite_out_of_the_window_removes_the_key(self, fake_pool):
+        conn = TableConnection()
+        fake_pool(conn)
+        await store_price_points_bulk([make_point(2000.0, 2, point_id="p1")])
+
+        await store_price_points_bulk([make_point(2000.0, LATEST_PRICE_WINDOW_DAYS + 5, point_id="p1")])
+
+        assert ("Wheat", "mandi_a") not in conn.latest
+
+    @pytest.mark.asyncio
+    async def test_recompute_keeps_a_concurrent_merge(self, fake_pool):
+        conn = TableConnection()
+        fake_pool(conn)
+        await store_price_points_bulk([make_point(2000.0, 2, point_id="p1"), make_point(2200.0, 1)])
+
+        # Another writer's batch commits while the overwrite's recompute runs
+        conn.on_delete_latest = lambda: conn.write_concurrently(make_point(2600.0, 0.5))
+        await store_price_points_bulk([make_point(2400.0, 2, point_id="p1")])
+
+        row = conn.latest[("Wheat", "mandi_a")]
+        assert row["price"] == 2600.0
+        assert (row["min_price"], row["max_price"], row["sample_count"]) == (2200.0, 2600.0, 3)
+        assert row["avg_price"] == pytest.approx(2400.0)
+
+class TestExpiry:
+    """Aged-out rows are deleted and partially aged aggregates are recomputed"""
+
+    @pytest.mark.asyncio
+    async def test_deletes_stale_rows_and_recomputes_aged_keys(self, fake_pool):
+        conn = TableConnection()
+        fake_pool(conn)
+        await store_price_points_bulk([make_point(2000.0, 5), make_point(2400.0, 3), make_point(1800.0, 4, "mandi_b")])
+        # Age the oldest mandi_a sample and every mandi_b sample out of the window
+        for row in conn.price_points.values():
+            if row["price"] in (2000.0, 1800.0):
+                row["timestamp"] -= timedelta(days=LATEST_PRICE_WINDOW_DAYS)
+        conn.latest[("Wheat", "mandi_a")]["oldest_sample_at"] -= timedelta(days=LATEST_PRICE_WINDOW_DAYS)
+        conn.latest[("Wheat", "mandi_b")]["timestamp"] -= timedelta(days=LATEST_PRICE_WINDOW_DAYS)
+
+        expired = await expire_latest_prices()
+
+        assert expired == 2
+        assert list(conn.latest) == [("Wheat", "mandi_a")]
+        row = conn.latest[("Wheat", "mandi_a")]
+        assert (row["min_price"], row["max_price"], row["sample_count"]) == (2400.0, 2400.0, 1)
+
+    @pytest.mark.asyncio
+    async def test_nothing_aged_leaves_rows_untouched(self, fake_pool):
+        conn = TableConnection()
+        fake_pool(conn)
+        await store_price_points_bulk([make_point(2000.0, 2), make_point(2200.0, 1)])
+        before = dict(conn.latest)
+
+        assert await expire_latest_prices() == 0
+        assert conn.latest == before
+
+    @pytest.mark.asyncio
+    async def test_reads_exclude_rows_outside_the_window(self, fake_pool):
+        conn = FakeConnection()
+        fake_pool(conn)
+
+        await get_latest_prices("Wheat", state="Punjab")
+
+        query, args = conn.fetched[0]
+        assert "lp.timestamp >=" in query
+        assert args[:3] == ("Wheat", LATEST_PRICE_WINDOW_DAYS, "Punjab")
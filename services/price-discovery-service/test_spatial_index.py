@@ -0,0 +1,146 @@
+"""
+Equivalence tests for the mandi grid index against a brute-force Haversine scan,
+plus index invalidation on mandi writes
+"""
+
+import math
+import random
+
+import pytest
+
+import database
+from database import store_price_points_bulk
+from models import GeoLocation, MandiInfo
+from spatial_index import EARTH_RADIUS_KM, MandiSpatialIndex
+from test_bulk_ingestion import FakeConnection, fake_pool, make_price_point
+
+def brute_force_haversine(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = math.radians(lat2 - lat1)
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+def brute_force_radius(mandis, latitude, longitude, radius_km):
+    hits = [
+        (mandi, brute_force_haversine(latitude, longitude, mandi.location.latitude, mandi.location.longitude))
+        for mandi in mandis
+    ]
+    return sorted((hit for hit in hits if hit[1] <= radius_km), key=lambda hit: hit[1])
+
+def make_mandis(count, rng, lat_range=(8.0, 37.0), lon_range=(68.0, 97.0)):
+    return [
+        MandiInfo(
+            id=f"mandi_{i}",
+            name=f"Mandi {i}",
+            location=GeoLocation(
+                latitude=rng.uniform(*lat_range),
+                longitude=rng.uniform(*lon_range),
+                state="Test State"
+            )
+        )
+        for i in range(count)
+    ]
+
+@pytest.fixture
+def mandis():
+    return make_mandis(800, random.Random(42))
+
+class TestRadiusEquivalence:
+    """query_radius must return exactly the brute-force result set"""
+
+    @pytest.mark.parametrize("radius_km", [5, 50, 150, 400, 1200, 5000])
+    def test_matches_brute_force(self, mandis, radius_km):
+        index = MandiSpatialIndex()
+        index.build(mandis)
+        rng = random.Random(radius_km)
+
+        for _ in range(25):
+            latitude, longitude = rng.uniform(8.0, 37.0), rng.uniform(68.0, 97.0)
+            expected = brute_force_radius(mandis, latitude, longitude, radius_km)
+            actual = index.query_radius(latitude, longitude, radius_km)
+
+            assert [m.id for m, _ in actual] == [m.id for m, _ in expected]
+            for (_, got), (_, want) in zip(actual, expected):
+                assert math.isclose(got, want, rel_tol=1e-9, abs_tol=1e-6)
+
+    def test_nearest_k_matches_brute_force(self, mandis):
+        index = MandiSpatialIndex()
+        index.build(mandis)
+
+        expected = brute_force_radius(mandis, 22.5, 79.0, 600)[:10]
+        actual = index.query_radius(22.5, 79.0, 600, limit=10)
+
+        assert [m.id for m, _ in actual] == [m.id for m, _ in expected]
+
+    def test_cell_boundaries_and_small_cells(self):
+        rng = random.Random(7)
+        # Points clustered on whole-degree lines exercise cell edges
+        mandis = make_mandis(300, rng, lat_range=(19.9, 21.1), lon_range=(74.9, 77.1))
+        index = MandiSpatialIndex(cell_size_deg=0.25)
+        index.build(mandis)
+
+        for latitude, longitude in [(20.0, 75.0), (21.0, 77.0), (20.5, 76.0)]:
+            for radius_km in (1, 30, 90):
+                expected = brute_force_radius(mandis, latitude, longitude, radius_km)
+                actual = index.query_radius(latitude, longitude, radius_km)
+                assert [m.id for m, _ in actual] == [m.id for m, _ in expected]
+
+    def test_high_latitude_longitude_span(self):
+        rng = random.Random(3)
+        mandis = make_mandis(200, rng, lat_range=(60.0, 70.0), lon_range=(0.0, 40.0))
+        index = MandiSpatialIndex()
+        index.build(mandis)
+
+        expected = brute_force_radius(mandis, 65.0, 20.0, 300)
+        actual = index.query_radius(65.0, 20.0, 300)
+
+        assert [m.id for m, _ in actual] == [m.id for m, _ in expected]
+
+    def test_empty_index(self):
+        index = MandiSpatialIndex()
+        index.build([])
+
+        assert index.query_radius(20.0, 78.0, 100) == []
+
+class TestIndexInvalidation:
+    """Every committed mandi write must make the in-process index stale"""
+
+    def test_version_change_makes_index_stale(self, mandis):
+        index = MandiSpatialIndex()
+        index.build(mandis, source_version=database.mandis_version)
+        assert not index.is_stale(database.mandis_version)
+
+        database.mark_mandis_changed()
+
+        assert index.is_stale(database.mandis_version)
+
+    @pytest.mark.asyncio
+    async def test_bulk_write_bumps_version_when_mandis_change(self, fake_pool):
+        class MandiWriteConnection(FakeConnection):
+            async def execute(self, query, *args):
+                if "INSERT INTO mandis" in query:
+                    self.executed.append((query, args))
+                    return "INSERT 0 1"
+                return await super().execute(query, *args)
+
+        fake_pool(MandiWriteConnection())
+        mandi = make_mandis(1, random.Random(1))[0]
+        before = database.mandis_version
+
+        await store_price_points_bulk([make_price_point(0, mandi.id)], [mandi])
+
+        assert database.mandis_version == before + 1
+
+    @pytest.mark.asyncio
+    async def test_bulk_write_keeps_version_when_mandis_unchanged(self, fake_pool):
+        conn = FakeConnection()
+        fake_pool(conn)
+        mandi = make_mandis(1, random.Random(1))[0]
+        before = database.mandis_version
+
+        await store_price_points_bulk([make_price_point(0, mandi.id)], [mandi])
+
+        assert database.mandis_version == before
+        mandi_sql = next(q for q, _ in conn.executed if "INSERT INTO mandis" in q)
+        assert "IS DISTINCT FROM" in mandi_sql
@@ -0,0 +1,115 @@
+"""
+Unit tests for batched trend analysis through the process pool
+"""
+
+import threading
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock
+
+import pytest
+
+import trend_analysis
+from trend_analysis import POINTS_PER_MANDI, PriceTrendAnalyzer, recent_per_mandi
+
+def make_rows(commodity, state, count=40, base=2000.0, mandis=4):
+    now = datetime.utcnow()
+    return [
+        (commodity, state, base + (i % 7) * 15.0 + i, now - timedelta(days=count - i), f"mandi_{i % mandis}")
+        for i in range(count)
+    ]
+
+def with_bad_price(rows, value):
+    """Replace the price of the middle row with value"""
+    middle = len(rows) // 2
+    commodity, state, _, timestamp, mandi_id = rows[middle]
+    return rows[:middle] + [(commodity, state, value, timestamp, mandi_id)] + rows[middle + 1:]
+
+@pytest.fixture
+def analyzer():
+    analyzer = PriceTrendAnalyzer(max_workers=2)
+    yield analyzer
+    analyzer.shutdown()
+
+def by_commodity(result):
+    return {item["commodity"]: item for item in result["items"]}
+
+class TestBatchTrendAnalysis:
+    """Every item gets a result; one bad series never fails the batch"""
+
+    @pytest.mark.asyncio
+    async def test_process_pool_computes_each_item(self, analyzer, monkeypatch):
+        rows = make_rows("Wheat", "Punjab") + make_rows("Rice", "Punjab", base=3000.0)
+        rows.sort(key=lambda row: row[3])
+        monkeypatch.setattr(trend_analysis, "get_price_history", AsyncMock(return_value=rows))
+
+        result = await analyzer.analyze_batch([("Wheat", None), ("Rice", "Punjab")])
+
+        items = by_commodity(result)
+        assert result["item_count"] == 2
+        assert result["failed_count"] == 0
+        assert items["Wheat"]["trend"].commodity == "Wheat"
+        assert items["Rice"]["region"] == "Punjab"
+        assert items["Rice"]["prediction"] is not None
+
+    @pytest.mark.asyncio
+    async def test_insufficient_data_is_a_per_item_error(self, analyzer, monkeypatch):
+        rows = make_rows("Wheat", "Punjab") + make_rows("Gram", "Punjab", count=2)
+        monkeypatch.setattr(trend_analysis, "get_price_history", AsyncMock(return_value=rows))
+
+        result = await analyzer.analyze_batch([("Wheat", None), ("Gram", None)])
+
+        items = by_commodity(result)
+        assert result["failed_count"] == 1
+        assert items["Wheat"]["error"] is None
+        assert "Insufficient data points" in items["Gram"]["error"]
+
+    @pytest.mark.asyncio
+    async def test_unexpected_worker_exception_is_a_per_item_error(self, analyzer, monkeypatch):
+        # None makes the statistics raise TypeError inside the worker
+        rows = make_rows("Wheat", "Punjab") + with_bad_price(make_rows("Maize", "Punjab"), None)
+        monkeypatch.setattr(trend_analysis, "get_price_history", AsyncMock(return_value=rows))
+
+        result = await analyzer.analyze_batch([("Wheat", None), ("Maize", None)])
+
+        items = by_commodity(result)
+        assert result["failed_count"] == 1
+        assert items["Wheat"]["error"] is None
+        assert items["Maize"]["error"].startswith("TypeError")
+
+    @pytest.mark.asyncio
+    async def test_unpicklable_job_is_a_per_item_error(self, analyzer, monkeypatch):
+        rows = make_rows("Wheat", "Punjab") + with_bad_price(make_rows("Onion", "Punjab"), threading.Lock())
+        monkeypatch.setattr(trend_analysis, "get_price_history", AsyncMock(return_value=rows))
+
+        result = await analyzer.analyze_batch([("Wheat", None), ("Onion", None)])
+
+        items = by_commodity(result)
+        assert result["item_count"] == 2
+        assert result["failed_count"] == 1
+        assert items["Wheat"]["trend"] is not None
+        assert items["Onion"]["trend"] is None
+        assert items["Onion"]["error"]
+        assert items["Onion"]["compute_time_ms"] == 0.0
+
+    @pytest.mark.asyncio
+    async def test_items_see_the_newest_points_per_mandi(self, analyzer, monkeypatch):
+        # One mandi reports daily; the single-item analyses only see its newest ten
+        rows = make_rows("Wheat", "Punjab", count=25, mandis=1)
+        monkeypatch.setattr(trend_analysis, "get_price_history", AsyncMock(return_value=rows))
+
+        result = await analyzer.analyze_batch([("Wheat", None)], include_predictions=False)
+
+        item = by_commodity(result)["Wheat"]
+        assert item["data_points"] == POINTS_PER_MANDI
+        assert item["trend"].current_price == rows[-1][2]
+        assert item["trend"].average_price == pytest.approx(
+            sum(row[2] for row in rows[-POINTS_PER_MANDI:]) / POINTS_PER_MANDI
+        )
+
+    def test_recent_per_mandi_caps_rows_then_mandis(self):
+        timestamps = list(range(8))
+        prices = [float(i) for i in timestamps]
+        mandis = ["a", "b", "a", "a", "b", "a", "b", "a"]
+
+        assert recent_per_mandi(timestamps, prices, mandis, row_limit=8, per_mandi=2) == ([4, 5, 6, 7], [4.0, 5.0, 6.0, 7.0])
+        assert recent_per_mandi(timestamps, prices, mandis, row_limit=3, per_mandi=10)[0] == [5, 6, 7]
@@ -4,6 +4,8 @@ Implements historical trend analysis, price prediction algorithms, and market vo
 """
 
 import asyncio
+import bisect
+import time
 import structlog
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
@@ -11,13 +13,38 @@ import math
 import statistics
 from dataclasses import dataclass
 from enum import Enum
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import numpy as np
 
 from models import PricePoint, PriceData, MandiInfo
-from database import get_commodity_prices
+from database import get_commodity_prices, get_price_history
 
 logger = structlog.get_logger()
 
+# History the single-item analyses see through get_commodity_prices: the
+# newest rows for the commodity, of which each mandi contributes its newest few
+HISTORY_ROW_LIMIT = 1000
+POINTS_PER_MANDI = 10
+
+def recent_per_mandi(
+    timestamps: List[datetime],
+    prices: List[float],
+    mandis: List[str],
+    row_limit: int = HISTORY_ROW_LIMIT,
+    per_mandi: int = POINTS_PER_MANDI
+) -> Tuple[List[datetime], List[float]]:
+    """The points of a time-ordered series that get_commodity_prices would return"""
+    kept = []
+    taken: Dict[str, int] = {}
+    for position in range(len(timestamps) - 1, max(0, len(timestamps) - row_limit) - 1, -1):
+        mandi = mandis[position]
+        if taken.get(mandi, 0) < per_mandi:
+            taken[mandi] = taken.get(mandi, 0) + 1
+            kept.append(position)
+    kept.reverse()
+    return [timestamps[i] for i in kept], [prices[i] for i in kept]
+
 class TrendDirection(str, Enum):
     """Price trend directions"""
     BULLISH = "bullish"      # Strong upward trend
@@ -187,7 +214,8 @@ class TechnicalAnalyzer:
         
         for i in range(window - 1, len(prices)):
             price_slice = prices[i - window + 1:i + 1]
-            std_dev = statistics.stdev(price_slice)
+            # A single-point window has no spread; stdev needs two points
+            std_dev = statistics.stdev(price_slice) if window > 1 else 0.0
             ma = moving_avg[i - window + 1]
             
             upper_band.append(ma + num_std * std_dev)
@@ -199,6 +227,115 @@ class TechnicalAnalyzer:
             "lower": lower_band
         }
 
+class VectorizedTechnicalAnalyzer:
+    """NumPy backend for TechnicalAnalyzer with the same outputs.
+    
+    Window statistics use cumulative sums and sliding-window views, so SMA,
+    Bollinger bands and support/resistance are O(n) or run in C instead of
+    re-slicing Python lists per window. EMA and RSI are recursive filters
+    and stay sequential, but run over plain floats with vectorized set-up.
+    """
+    
+    @staticmethod
+    def calculate_moving_average(prices: List[float], window: int) -> List[float]:
+        """Calculate simple moving average"""
+        if len(prices) < window:
+            return []
+        
+        values = np.asarray(prices, dtype=float)
+        cumulative = np.concatenate(([0.0], np.cumsum(values)))
+        return ((cumulative[window:] - cumulative[:-window]) / window).tolist()
+    
+    @staticmethod
+    def calculate_exponential_moving_average(prices: List[float], window: int) -> List[float]:
+        """Calculate exponential moving average"""
+        if len(prices) < window:
+            return []
+        
+        alpha = 2 / (window + 1)
+        decay = 1 - alpha
+        values = np.asarray(prices, dtype=float).tolist()
+        
+        ema = [values[0]]
+        last = values[0]
+        for price in values[1:]:
+            last = alpha * price + decay * last
+            ema.append(last)
+        
+        return ema
+    
+    @staticmethod
+    def calculate_rsi(prices: List[float], window: int = 14) -> List[float]:
+        """Calculate Relative Strength Index"""
+        if len(prices) < window + 1:
+            return []
+        
+        changes = np.diff(np.asarray(prices, dtype=float))
+        gains = np.clip(changes, 0, None).tolist()
+        losses = np.clip(-changes, 0, None).tolist()
+        
+        avg_gain = sum(gains[:window]) / window
+        avg_loss = sum(losses[:window]) / window
+        
+        rsi_values = []
+        for gain, loss in zip(gains[window:], losses[window:]):
+            avg_gain = (avg_gain * (window - 1) + gain) / window
+            avg_loss = (avg_loss * (window - 1) + loss) / window
+            
+            if avg_loss == 0:
+                rsi_values.append(100)
+            else:
+                rsi_values.append(100 - (100 / (1 + avg_gain / avg_loss)))
+        
+        return rsi_values
+    
+    @staticmethod
+    def find_support_resistance(prices: List[float], window: int = 20) -> Tuple[float, float]:
+        """Find support and resistance levels"""
+        if len(prices) < window:
+            return min(prices), max(prices)
+        
+        values = np.asarray(prices, dtype=float)
+        span = 2 * window + 1
+        if len(values) < span:
+            return min(prices), max(prices)
+        
+        # Window k is centred on index k + window, matching the loop bounds
+        windows = np.lib.stride_tricks.sliding_window_view(values, span)
+        centres = values[window:len(values) - window]
+        local_mins = centres[centres == windows.min(axis=1)]
+        local_maxs = centres[centres == windows.max(axis=1)]
+        
+        support = statistics.median(local_mins[-5:].tolist()) if local_mins.size else min(prices)
+        resistance = statistics.median(local_maxs[-5:].tolist()) if local_maxs.size else max(prices)
+        
+        return support, resistance
+    
+    @staticmethod
+    def calculate_bollinger_bands(prices: List[float], window: int = 20, num_std: float = 2) -> Dict[str, List[float]]:
+        """Calculate Bollinger Bands"""
+        if len(prices) < window:
+            return {"upper": [], "middle": [], "lower": []}
+        
+        values = np.asarray(prices, dtype=float)
+        moving_avg = np.asarray(VectorizedTechnicalAnalyzer.calculate_moving_average(prices, window))
+        
+        # Two-pass rolling variance over strided windows; the one-pass
+        # sum-of-squares form leaves residue on flat windows
+        if window > 1:
+            windows = np.lib.stride_tricks.sliding_window_view(values, window)
+            deviations = windows - moving_avg[:, None]
+            std_dev = np.sqrt((deviations * deviations).sum(axis=1) / (window - 1))
+        else:
+            # A single-point window has no spread (and window - 1 would divide by zero)
+            std_dev = np.zeros_like(moving_avg)
+        
+        return {
+            "upper": (moving_avg + num_std * std_dev).tolist(),
+            "middle": moving_avg.tolist(),
+            "lower": (moving_avg - num_std * std_dev).tolist()
+        }
+
 class SeasonalAnalyzer:
     """Analyzes seasonal patterns in agricultural prices"""
     
@@ -254,9 +391,134 @@ class SeasonalAnalyzer:
 class PriceTrendAnalyzer:
     """Main class for price trend analysis and prediction"""
     
-    def __init__(self):
-        self.technical_analyzer = TechnicalAnalyzer()
+    def __init__(self, vectorized: bool = True, max_workers: Optional[int] = None):
+        self.technical_analyzer = VectorizedTechnicalAnalyzer() if vectorized else TechnicalAnalyzer()
         self.seasonal_analyzer = SeasonalAnalyzer()
+        self.max_workers = max_workers
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+    
+    def shutdown(self):
+        """Release the batch analysis process pool"""
+        if self._process_pool:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+    
+    async def analyze_batch(
+        self,
+        items: List[Tuple[str, Optional[str]]],
+        analysis_period_days: int = 30,
+        include_predictions: bool = True,
+        prediction_horizon_days: int = 7,
+        historical_days: int = 60
+    ) -> Dict[str, Any]:
+        """
+        Trend analysis and prediction for many commodity/region pairs at once
+        
+        Loads the history for every requested commodity in one query, groups
+        it in memory and computes each item in a process pool. Each item
+        sees the same points as analyze_price_trends and predict_price: the
+        newest HISTORY_ROW_LIMIT rows, at most POINTS_PER_MANDI per mandi.
+        
+        Args:
+            items: (commodity, region) pairs; region None covers all states
+            analysis_period_days: Window for the trend analysis
+            include_predictions: Also compute a price prediction per item
+            prediction_horizon_days: Days ahead to predict
+            historical_days: Window for the prediction's trend analysis
+            
+        Returns:
+            Combined results with per-item and per-stage timings
+        """
+        started = time.perf_counter()
+        now = datetime.utcnow()
+        lookback_days = max(analysis_period_days, historical_days if include_predictions else 0)
+        
+        commodities = sorted({commodity for commodity, _ in items})
+        regions = {region for _, region in items}
+        states = None if None in regions else sorted(regions)
+        
+        rows = await get_price_history(commodities, now - timedelta(days=lookback_days), states)
+        load_time = time.perf_counter() - started
+        
+        # Rows arrive in timestamp order, so each series is already sorted
+        series: Dict[Tuple[str, Optional[str]], Tuple[List[datetime], List[float], List[str]]] = {}
+        wanted = set(items)
+        for commodity, state, price, timestamp, mandi_id in rows:
+            for key in ((commodity, None), (commodity, state)):
+                if key in wanted:
+                    timestamps, prices, mandis = series.setdefault(key, ([], [], []))
+                    timestamps.append(timestamp)
+                    prices.append(price)
+                    mandis.append(mandi_id)
+        group_time = time.perf_counter() - started - load_time
+        
+        trend_cutoff = now - timedelta(days=analysis_period_days)
+        prediction_cutoff = now - timedelta(days=historical_days)
+        jobs = []
+        for commodity, region in items:
+            timestamps, prices = recent_per_mandi(*series.get((commodity, region), ([], [], [])))
+            jobs.append({
+                "commodity": commodity,
+                "region": region,
+                "prices": prices,
+                "trend_start": bisect.bisect_left(timestamps, trend_cutoff),
+                "prediction_start": bisect.bisect_left(timestamps, prediction_cutoff),
+                "analysis_period_days": analysis_period_days,
+                "include_prediction": include_predictions,
+                "prediction_horizon_days": prediction_horizon_days,
+                "historical_days": historical_days,
+                "vectorized": isinstance(self.technical_analyzer, VectorizedTechnicalAnalyzer)
+            })
+        
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        
+        loop = asyncio.get_running_loop()
+        outcomes = await asyncio.gather(*[
+            loop.run_in_executor(self._process_pool, analyze_series, job) for job in jobs
+        ], return_exceptions=True)
+        
+        # The worker reports its own failures; anything raised here came from
+        # the pool itself (pickling, a dead worker) and only fails that item
+        results = []
+        for job, outcome in zip(jobs, outcomes):
+            if isinstance(outcome, BaseException):
+                if isinstance(outcome, BrokenProcessPool):
+                    self.shutdown()
+                outcome = {
+                    "commodity": job["commodity"],
+                    "region": job["region"],
+                    "data_points": len(job["prices"]) - job["trend_start"],
+                    "trend": None,
+                    "prediction": None,
+                    "error": f"{type(outcome).__name__}: {outcome}",
+                    "compute_time_ms": 0.0
+                }
+            results.append(outcome)
+        
+        total_time = time.perf_counter() - started
+        failed = sum(1 for result in results if result["error"])
+        logger.info(
+            "Batch trend analysis completed",
+            items=len(items),
+            failed=failed,
+            rows=len(rows),
+            total_time_ms=round(total_time * 1000, 1)
+        )
+        
+        return {
+            "items": results,
+            "item_count": len(results),
+            "failed_count": failed,
+            "rows_loaded": len(rows),
+            "timings_ms": {
+                "load": load_time * 1000,
+                "group": group_time * 1000,
+                "compute": (total_time - load_time - group_time) * 1000,
+                "total": total_time * 1000
+            },
+            "analysis_timestamp": now.isoformat()
+        }
     
     async def analyze_price_trends(
         self,
@@ -298,61 +560,131 @@ class PriceTrendAnalyzer:
             recent_points.sort(key=lambda x: x.timestamp)
             prices = [p.price for p in recent_points]
             
-            # Basic statistics
-            current_price = prices[-1]
-            average_price = statistics.mean(prices)
-            min_price = min(prices)
-            max_price = max(prices)
-            
-            # Calculate trend direction and strength
-            trend_direction, trend_strength = self._calculate_trend(prices)
-            
-            # Calculate volatility
-            volatility_level, volatility_score = self._calculate_volatility(prices)
-            
-            # Technical analysis
-            support_level, resistance_level = self.technical_analyzer.find_support_resistance(prices)
-            
-            # Price change percentage
-            if len(prices) > 1:
-                price_change_percent = ((current_price - prices[0]) / prices[0]) * 100
-            else:
-                price_change_percent = 0.0
-            
-            # Identify key factors
-            key_factors = self._identify_key_factors(
-                commodity, recent_points, trend_direction, volatility_level
-            )
-            
-            # Calculate confidence score
-            confidence_score = self._calculate_confidence_score(
-                len(recent_points), analysis_period_days, volatility_score
-            )
-            
-            return TrendAnalysis(
-                commodity=commodity,
-                region=region,
-                analysis_period_days=analysis_period_days,
-                trend_direction=trend_direction,
-                trend_strength=trend_strength,
-                price_change_percent=price_change_percent,
-                volatility_level=volatility_level,
-                volatility_score=volatility_score,
-                current_price=current_price,
-                average_price=average_price,
-                min_price=min_price,
-                max_price=max_price,
-                support_level=support_level,
-                resistance_level=resistance_level,
-                confidence_score=confidence_score,
-                key_factors=key_factors,
-                analysis_timestamp=datetime.utcnow()
-            )
+            return self._build_trend_analysis(commodity, region, analysis_period_days, prices)
             
         except Exception as e:
             logger.error("Failed to analyze price trends", error=str(e))
             raise
     
+    def _build_trend_analysis(
+        self,
+        commodity: str,
+        region: Optional[str],
+        analysis_period_days: int,
+        prices: List[float]
+    ) -> TrendAnalysis:
+        """Trend analysis over a time-ordered price series (no I/O)"""
+        if len(prices) < 5:
+            raise ValueError("Insufficient data points for trend analysis")
+        
+        # Basic statistics
+        current_price = prices[-1]
+        average_price = statistics.mean(prices)
+        min_price = min(prices)
+        max_price = max(prices)
+        
+        # Calculate trend direction and strength
+        trend_direction, trend_strength = self._calculate_trend(prices)
+        
+        # Calculate volatility
+        volatility_level, volatility_score = self._calculate_volatility(prices)
+        
+        # Technical analysis
+        support_level, resistance_level = self.technical_analyzer.find_support_resistance(prices)
+        
+        # Price change percentage
+        if len(prices) > 1:
+            price_change_percent = ((current_price - prices[0]) / prices[0]) * 100
+        else:
+            price_change_percent = 0.0
+        
+        # Identify key factors
+        key_factors = self._identify_key_factors(
+            commodity, len(prices), trend_direction, volatility_level
+        )
+        
+        # Calculate confidence score
+        confidence_score = self._calculate_confidence_score(
+            len(prices), analysis_period_days, volatility_score
+        )
+        
+        return TrendAnalysis(
+            commodity=commodity,
+            region=region,
+            analysis_period_days=analysis_period_days,
+            trend_direction=trend_direction,
+            trend_strength=trend_strength,
+            price_change_percent=price_change_percent,
+            volatility_level=volatility_level,
+            volatility_score=volatility_score,
+            current_price=current_price,
+            average_price=average_price,
+            min_price=min_price,
+            max_price=max_price,
+            support_level=support_level,
+            resistance_level=resistance_level,
+            confidence_score=confidence_score,
+            key_factors=key_factors,
+            analysis_timestamp=datetime.utcnow()
+        )
+    
+    def _build_price_prediction(
+        self,
+        commodity: str,
+        region: Optional[str],
+        prediction_horizon_days: int,
+        prices: List[float],
+        trend_analysis: TrendAnalysis
+    ) -> PricePrediction:
+        """Price prediction from a time-ordered price series and its trend analysis (no I/O)"""
+        if len(prices) < 10:
+            raise ValueError("Insufficient data for price prediction")
+        
+        # Apply prediction algorithms
+        predicted_price = self._predict_using_trend_analysis(
+            prices, trend_analysis, prediction_horizon_days
+        )
+        
+        # Calculate prediction confidence
+        confidence_score = self._calculate_prediction_confidence(
+            trend_analysis, len(prices), prediction_horizon_days
+        )
+        
+        # Calculate price range with confidence intervals
+        price_variance = statistics.variance(prices[-30:])  # Last 30 data points
+        std_dev = math.sqrt(price_variance)
+        
+        # Confidence interval (assuming normal distribution)
+        confidence_interval = 1.96 * std_dev  # 95% confidence
+        
+        price_range = {
+            "min": max(0, predicted_price - confidence_interval),
+            "max": predicted_price + confidence_interval,
+            "confidence_interval": confidence_interval
+        }
+        
+        # Identify key drivers and risk factors
+        key_drivers = self._identify_price_drivers(commodity, trend_analysis)
+        risk_factors = self._identify_risk_factors(commodity, trend_analysis)
+        
+        # Calculate trend continuation probability
+        trend_continuation_prob = self._calculate_trend_continuation_probability(
+            trend_analysis, prediction_horizon_days
+        )
+        
+        return PricePrediction(
+            commodity=commodity,
+            region=region,
+            prediction_horizon_days=prediction_horizon_days,
+            predicted_price=predicted_price,
+            price_range=price_range,
+            confidence_score=confidence_score,
+            trend_continuation_probability=trend_continuation_prob,
+            key_drivers=key_drivers,
+            risk_factors=risk_factors,
+            prediction_timestamp=datetime.utcnow()
+        )
+    
     async def predict_price(
         self,
         commodity: str,
@@ -391,52 +723,8 @@ class PriceTrendAnalyzer:
             recent_points.sort(key=lambda x: x.timestamp)
             prices = [p.price for p in recent_points]
             
-            if len(prices) < 10:
-                raise ValueError("Insufficient data for price prediction")
-            
-            # Apply prediction algorithms
-            predicted_price = self._predict_using_trend_analysis(
-                prices, trend_analysis, prediction_horizon_days
-            )
-            
-            # Calculate prediction confidence
-            confidence_score = self._calculate_prediction_confidence(
-                trend_analysis, len(prices), prediction_horizon_days
-            )
-            
-            # Calculate price range with confidence intervals
-            price_variance = statistics.variance(prices[-30:])  # Last 30 data points
-            std_dev = math.sqrt(price_variance)
-            
-            # Confidence interval (assuming normal distribution)
-            confidence_interval = 1.96 * std_dev  # 95% confidence
-            
-            price_range = {
-                "min": max(0, predicted_price - confidence_interval),
-                "max": predicted_price + confidence_interval,
-                "confidence_interval": confidence_interval
-            }
-            
-            # Identify key drivers and risk factors
-            key_drivers = self._identify_price_drivers(commodity, trend_analysis)
-            risk_factors = self._identify_risk_factors(commodity, trend_analysis)
-            
-            # Calculate trend continuation probability
-            trend_continuation_prob = self._calculate_trend_continuation_probability(
-                trend_analysis, prediction_horizon_days
-            )
-            
-            return PricePrediction(
-                commodity=commodity,
-                region=region,
-                prediction_horizon_days=prediction_horizon_days,
-                predicted_price=predicted_price,
-                price_range=price_range,
-                confidence_score=confidence_score,
-                trend_continuation_probability=trend_continuation_prob,
-                key_drivers=key_drivers,
-                risk_factors=risk_factors,
-                prediction_timestamp=datetime.utcnow()
+            return self._build_price_prediction(
+                commodity, region, prediction_horizon_days, prices, trend_analysis
             )
             
         except Exception as e:
@@ -608,7 +896,7 @@ class PriceTrendAnalyzer:
     def _identify_key_factors(
         self,
         commodity: str,
-        price_points: List[PricePoint],
+        data_point_count: int,
         trend_direction: TrendDirection,
         volatility_level: VolatilityLevel
     ) -> List[str]:
@@ -636,7 +924,7 @@ class PriceTrendAnalyzer:
             factors.append("Extreme volatility suggesting major market disruption")
         
         # Data quality factors
-        if len(price_points) < 20:
+        if data_point_count < 20:
             factors.append("Limited data availability affecting analysis reliability")
         
         return factors
@@ -807,4 +1095,50 @@ class PriceTrendAnalyzer:
         
         probability = (base_prob + direction_bonus) * time_decay - volatility_penalty
         
-        return max(0.1, min(0.9, probability))
\ No newline at end of file
+        return max(0.1, min(0.9, probability))
+
+_worker_analyzers: Dict[bool, PriceTrendAnalyzer] = {}
+
+def analyze_series(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Process-pool worker for PriceTrendAnalyzer.analyze_batch
+    
+    Computes the trend analysis (and optionally a prediction) for one
+    time-ordered price series. Failures are reported per item.
+    """
+    started = time.perf_counter()
+    analyzer = _worker_analyzers.get(job["vectorized"])
+    if analyzer is None:
+        analyzer = _worker_analyzers[job["vectorized"]] = PriceTrendAnalyzer(vectorized=job["vectorized"])
+    
+    commodity = job["commodity"]
+    region = job["region"]
+    trend_prices = job["prices"][job["trend_start"]:]
+    result = {
+        "commodity": commodity,
+        "region": region,
+        "data_points": len(trend_prices),
+        "trend": None,
+        "prediction": None,
+        "error": None
+    }
+    
+    try:
+        result["trend"] = analyzer._build_trend_analysis(
+            commodity, region, job["analysis_period_days"], trend_prices
+        )
+        
+        if job["include_prediction"]:
+            prediction_prices = job["prices"][job["prediction_start"]:]
+            prediction_trend = analyzer._build_trend_analysis(
+                commodity, region, job["historical_days"], prediction_prices
+            )
+            result["prediction"] = analyzer._build_price_prediction(
+                commodity, region, job["prediction_horizon_days"], prediction_prices, prediction_trend
+            )
+    except Exception as e:
+        # One bad series must not fail the rest of the batch
+        result["error"] = f"{type(e).__name__}: {e}"
+    
+    result["compute_time_ms"] = (time.perf_counter() - started) * 1000
+    return result
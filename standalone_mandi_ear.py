@@ -11,6 +11,9 @@ import json
 from datetime import datetime, timedelta
 import random
 import time
+import hashlib
+import gzip
+from email.utils import formatdate
 
 # Auto-install dependencies
 def install_dependencies():
@@ -19,7 +22,8 @@ def install_dependencies():
         'fastapi==0.104.1',
         'uvicorn[standard]==0.24.0',
         'python-multipart==0.0.6',
-        'requests==2.31.0'
+        'requests==2.31.0',
+        'brotli==1.1.0'
     ]
     
     print("🔧 Installing dependencies...")
@@ -42,10 +46,16 @@ except ImportError:
 
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from typing import Dict, List, Optional, Any
 import asyncio
 
+# Brotli is optional; gzip alone still covers every browser
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 # ============================================================================
 # MANDI EAR™ APPLICATION
 # ============================================================================
@@ -100,6 +110,20 @@ MOCK_MANDIS = [
     {"name": "Panipat Mandi", "location": "Haryana", "distance": "90 km"}
 ]
 
+# Indian states with major mandis (50 total mandis across key states)
+STATES_MANDIS = {
+    "punjab": ["Ludhiana", "Amritsar", "Jalandhar", "Patiala", "Bathinda"],
+    "haryana": ["Karnal", "Hisar", "Panipat", "Rohtak", "Gurgaon"],
+    "uttar_pradesh": ["Meerut", "Agra", "Kanpur", "Lucknow", "Varanasi"],
+    "bihar": ["Patna", "Muzaffarpur", "Darbhanga", "Bhagalpur", "Gaya"],
+    "west_bengal": ["Kolkata", "Siliguri", "Durgapur", "Asansol", "Malda"],
+    "maharashtra": ["Mumbai", "Pune", "Nashik", "Aurangabad", "Nagpur"],
+    "gujarat": ["Ahmedabad", "Surat", "Rajkot", "Vadodara", "Bhavnagar"],
+    "rajasthan": ["Jaipur", "Jodhpur", "Kota", "Bikaner", "Udaipur"],
+    "madhya_pradesh": ["Bhopal", "Indore", "Gwalior", "Jabalpur", "Ujjain"],
+    "karnataka": ["Bangalore", "Mysore", "Hubli", "Belgaum", "Mangalore"]
+}
+
 # Mock users
 MOCK_USERS = {}
 
@@ -120,13 +144,273 @@ def get_current_time():
     return datetime.utcnow().isoformat()
 
 # ============================================================================
-# API ENDPOINTS
+# PRICE SNAPSHOT ENGINE
 # ============================================================================
 
-@app.get("/", response_class=HTMLResponse)
-async def root():
-    """Root endpoint with enhanced HTML interface"""
-    html_content = """
+# The UI advertises "updated every 15 minutes"; the snapshot honours that
+PRICE_REFRESH_INTERVAL_SECONDS = 15 * 60
+SNAPSHOT_SOURCE = "MANDI EAR™ Real-time Network"
+MAX_RENDERED_VIEWS = 512
+
+class PriceSnapshot:
+    """Immutable price table for one refresh interval with indexed filtered views"""
+    
+    def __init__(self, version: int, prices: Dict[str, Dict], market_overview: Dict,
+                 generated_at: datetime, refresh_interval: int):
+        self.version = version
+        self.prices = prices
+        self.market_overview = market_overview
+        self.timestamp = generated_at.isoformat()
+        self.last_modified = formatdate(generated_at.timestamp(), usegmt=True)
+        self.refresh_interval = refresh_interval
+        self.expires_at = time.monotonic() + refresh_interval
+        
+        # (commodity, state) -> {mandi name (lowercase) -> mandi record}
+        self.mandi_index: Dict[tuple, Dict[str, Dict]] = {}
+        for commodity_name, price_data in prices.items():
+            for state_name, state_data in price_data["state_wise_prices"].items():
+                self.mandi_index[(commodity_name, state_name)] = {
+                    mandi_info["mandi_name"].lower(): mandi_info
+                    for mandi_info in state_data["major_mandis"]
+                }
+        
+        digest = hashlib.sha256(
+            json.dumps([prices, market_overview], sort_keys=True).encode("utf-8")
+        ).hexdigest()[:16]
+        self.etag = f'"prices-v{version}-{digest}"'
+        self._rendered: Dict[tuple, bytes] = {}
+    
+    def is_stale(self) -> bool:
+        return time.monotonic() >= self.expires_at
+    
+    def seconds_until_stale(self) -> int:
+        return max(0, int(self.expires_at - time.monotonic()))
+    
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """Evaluate an If-None-Match header against this snapshot's ETag"""
+        if not if_none_match:
+            return False
+        for candidate in if_none_match.split(","):
+            candidate = candidate.strip()
+            if candidate.startswith("W/"):
+                candidate = candidate[2:]
+            if candidate == "*" or candidate == self.etag:
+                return True
+        return False
+    
+    def find_mandi(self, commodity: str, state: str, mandi: str) -> Optional[Dict]:
+        """Exact name lookup first, then the partial-name match clients rely on"""
+        state_mandis = self.mandi_index.get((commodity, state), {})
+        mandi_lower = mandi.lower()
+        if mandi_lower in state_mandis:
+            return state_mandis[mandi_lower]
+        for mandi_name, mandi_info in state_mandis.items():
+            if mandi_lower in mandi_name:
+                return mandi_info
+        return None
+    
+    def build_view(self, commodity: Optional[str], state: Optional[str], mandi: Optional[str]) -> Dict:
+        """Build the response payload for a filter combination"""
+        if not commodity:
+            return {
+                "prices": self.prices,
+                "summary": {
+                    "total_commodities": len(self.prices),
+                    "total_states": len(STATES_MANDIS),
+                    "total_mandis": sum(len(mandis) for mandis in STATES_MANDIS.values()),
+                    "last_updated": self.timestamp,
+                    "data_freshness": "Real-time (updated every 15 minutes)"
+                },
+                "market_overview": self.market_overview,
+                "timestamp": self.timestamp,
+                "source": SNAPSHOT_SOURCE
+            }
+        
+        commodity_lower = commodity.lower()
+        result = self.prices.get(commodity_lower)
+        if result is None:
+            raise HTTPException(status_code=404, detail=f"Commodity '{commodity}' not found")
+        
+        if state and state.lower() in result["state_wise_prices"]:
+            state_lower = state.lower()
+            if mandi:
+                mandi_data = self.find_mandi(commodity_lower, state_lower, mandi)
+                if mandi_data is None:
+                    raise HTTPException(status_code=404, detail=f"Mandi '{mandi}' not found in {state}")
+                return {
+                    "commodity": commodity,
+                    "state": state,
+                    "mandi": mandi_data,
+                    "trend_analysis": result["trend_analysis"],
+                    "predictions": result["predictions"],
+                    "market_intelligence": result["market_intelligence"],
+                    "timestamp": self.timestamp,
+                    "source": SNAPSHOT_SOURCE
+                }
+            
+            return {
+                "commodity": commodity,
+                "state": state,
+                "state_data": result["state_wise_prices"][state_lower],
+                "trend_analysis": result["trend_analysis"],
+                "predictions": result["predictions"],
+                "market_intelligence": result["market_intelligence"],
+                "timestamp": self.timestamp,
+                "source": SNAPSHOT_SOURCE
+            }
+        
+        return {
+            "commodity": commodity,
+            "price_data": result,
+            "timestamp": self.timestamp,
+            "source": SNAPSHOT_SOURCE
+        }
+    
+    def render(self, commodity: Optional[str], state: Optional[str], mandi: Optional[str]) -> bytes:
+        """Serialized JSON for a view, encoded once per snapshot"""
+        key = (commodity, state, mandi)
+        body = self._rendered.get(key)
+        if body is None:
+            body = JSONResponse(content=self.build_view(commodity, state, mandi)).body
+            if len(self._rendered) < MAX_RENDERED_VIEWS:
+                self._rendered[key] = body
+        return body
+
+class PriceSnapshotEngine:
+    """Builds the full commodity x state x mandi price table once per refresh interval"""
+    
+    def __init__(self, refresh_interval: int = PRICE_REFRESH_INTERVAL_SECONDS):
+        self.refresh_interval = refresh_interval
+        self._snapshot: Optional[PriceSnapshot] = None
+        self._version = 0
+        self._lock = asyncio.Lock()
+    
+    async def get_snapshot(self) -> PriceSnapshot:
+        """Return the current snapshot, rebuilding it once when stale"""
+        snapshot = self._snapshot
+        if snapshot is not None and not snapshot.is_stale():
+            return snapshot
+        async with self._lock:
+            # Another request may have rebuilt while we waited
+            if self._snapshot is None or self._snapshot.is_stale():
+                self._snapshot = self.build_snapshot()
+            return self._snapshot
+    
+    def invalidate(self):
+        """Force the next request to rebuild the snapshot"""
+        self._snapshot = None
+    
+    def build_snapshot(self) -> PriceSnapshot:
+        """Generate the enhanced price table for every commodity, state and mandi"""
+        generated_at = datetime.utcnow()
+        last_updated = generated_at.isoformat()
+        enhanced_prices = {}
+        
+        for commodity_name, base_data in MOCK_PRICES.items():
+            enhanced_prices[commodity_name] = {
+                "commodity": commodity_name,
+                "category": base_data["category"],
+                "national_average": base_data["price"],
+                "unit": base_data["unit"],
+                "trend": base_data["trend"],
+                "change_percentage": base_data["change"],
+                "last_updated": last_updated,
+                
+                # Trend Analysis (last 7 days)
+                "trend_analysis": {
+                    "7_day_trend": base_data["trend"],
+                    "price_history": [
+                        base_data["price"] - random.randint(50, 200),
+                        base_data["price"] - random.randint(30, 150),
+                        base_data["price"] - random.randint(20, 100),
+                        base_data["price"] - random.randint(10, 80),
+                        base_data["price"] - random.randint(5, 50),
+                        base_data["price"] - random.randint(0, 30),
+                        base_data["price"]
+                    ],
+                    "volatility": "medium" if base_data["trend"] == "stable" else "high",
+                    "seasonal_factor": random.choice(["harvest_season", "sowing_season", "normal", "festival_demand"])
+                },
+                
+                # Predictions (next 7 days)
+                "predictions": {
+                    "next_7_days": [
+                        base_data["price"] + random.randint(-50, 100) for _ in range(7)
+                    ],
+                    "confidence_level": random.uniform(0.75, 0.95),
+                    "predicted_trend": random.choice(["upward", "downward", "stable"]),
+                    "factors": [
+                        "Weather conditions",
+                        "Seasonal demand",
+                        "Transportation costs",
+                        "Government policies"
+                    ]
+                },
+                
+                # State-wise prices
+                "state_wise_prices": {},
+                
+                # Market intelligence
+                "market_intelligence": {
+                    "demand_level": random.choice(["high", "medium", "low"]),
+                    "supply_level": random.choice(["abundant", "adequate", "scarce"]),
+                    "quality_grade": random.choice(["premium", "standard", "below_standard"]),
+                    "storage_availability": random.choice(["high", "medium", "low"]),
+                    "transportation_cost_factor": random.uniform(0.95, 1.15)
+                }
+            }
+            
+            # Generate state-wise prices
+            for state, mandis in STATES_MANDIS.items():
+                state_multiplier = random.uniform(0.85, 1.25)  # Price variation by state
+                state_price = int(base_data["price"] * state_multiplier)
+                
+                state_entry = {
+                    "average_price": state_price,
+                    "price_range": {
+                        "min": int(state_price * 0.9),
+                        "max": int(state_price * 1.1)
+                    },
+                    "major_mandis": []
+                }
+                enhanced_prices[commodity_name]["state_wise_prices"][state] = state_entry
+                
+                # Generate mandi-wise prices for each state
+                for mandi_name in mandis[:3]:  # Top 3 mandis per state
+                    mandi_multiplier = random.uniform(0.92, 1.08)
+                    mandi_price = int(state_price * mandi_multiplier)
+                    
+                    state_entry["major_mandis"].append({
+                        "mandi_name": mandi_name,
+                        "price": mandi_price,
+                        "arrival_quantity": f"{random.randint(50, 500)} quintals",
+                        "quality": random.choice(["FAQ", "Good", "Average"]),
+                        "last_updated": last_updated
+                    })
+        
+        market_overview = {
+            "overall_trend": random.choice(["bullish", "bearish", "stable"]),
+            "active_mandis": random.randint(45, 55),
+            "daily_transactions": f"₹{random.randint(500, 800)} Crores",
+            "weather_impact": random.choice(["positive", "negative", "neutral"])
+        }
+        
+        self._version += 1
+        return PriceSnapshot(
+            version=self._version,
+            prices=enhanced_prices,
+            market_overview=market_overview,
+            generated_at=generated_at,
+            refresh_interval=self.refresh_interval
+        )
+
+price_snapshot_engine = PriceSnapshotEngine()
+
+# ============================================================================
+# SPA STATIC ASSET
+# ============================================================================
+
+INDEX_HTML = """
     <!DOCTYPE html>
     <html lang="en">
     <head>
@@ -6660,7 +6944,138 @@ async def root():
     </body>
     </html>
     """
-    return HTMLResponse(content=html_content)
+
+class StaticAsset:
+    """Immutable in-memory asset with precompressed variants, built once at startup"""
+    
+    # Preferred order when the client accepts several encodings equally
+    ENCODING_PREFERENCE = ("br", "gzip", "identity")
+    
+    def __init__(self, content: bytes, media_type: str, cache_control: str = "public, no-cache"):
+        self.media_type = media_type
+        self.cache_control = cache_control
+        self.last_modified = formatdate(time.time(), usegmt=True)
+        
+        self.variants: Dict[str, bytes] = {
+            "identity": content,
+            "gzip": gzip.compress(content, compresslevel=9, mtime=0)
+        }
+        if brotli is not None:
+            self.variants["br"] = brotli.compress(content, quality=11)
+        
+        # Each encoding is a distinct representation and needs its own strong ETag
+        digest = hashlib.sha256(content).hexdigest()[:20]
+        self.etags = {
+            encoding: f'"{digest}"' if encoding == "identity" else f'"{digest}-{encoding}"'
+            for encoding in self.variants
+        }
+    
+    def negotiate_encoding(self, accept_encoding: Optional[str]) -> str:
+        """Pick the best available encoding for an Accept-Encoding header"""
+        if not accept_encoding:
+            return "identity"
+        
+        weights: Dict[str, float] = {}
+        for part in accept_encoding.split(","):
+            name, _, params = part.strip().partition(";")
+            name = name.strip().lower()
+            quality = 1.0
+            params = params.strip()
+            if params.startswith("q="):
+                try:
+                    quality = float(params[2:])
+                except ValueError:
+                    quality = 0.0
+            if name:
+                weights[name] = quality
+        
+        wildcard = weights.get("*")
+        best, best_quality = "identity", 0.0
+        for encoding in self.ENCODING_PREFERENCE:
+            if encoding not in self.variants:
+                continue
+            quality = weights.get(encoding, wildcard if wildcard is not None else (1.0 if encoding == "identity" else 0.0))
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+    
+    def _not_modified(self, if_none_match: Optional[str], encoding: str) -> bool:
+        """Only the ETag of the variant being served validates a cached copy"""
+        if not if_none_match:
+            return False
+        etag = self.etags[encoding]
+        for candidate in if_none_match.split(","):
+            candidate = candidate.strip()
+            if candidate.startswith("W/"):
+                candidate = candidate[2:]
+            if candidate == "*" or candidate == etag:
+                return True
+        return False
+    
+    @staticmethod
+    def _parse_range(range_header: str, size: int) -> Optional[tuple]:
+        """Parse a single 'bytes=' range; returns (start, end) inclusive or None if unsatisfiable"""
+        unit, _, spec = range_header.partition("=")
+        if unit.strip().lower() != "bytes" or "," in spec:
+            raise ValueError("unsupported range")
+        start_text, _, end_text = spec.strip().partition("-")
+        if not start_text:
+            # Suffix range: the last N bytes
+            length = int(end_text)
+            if length <= 0:
+                return None
+            return max(0, size - length), size - 1
+        start = int(start_text)
+        end = int(end_text) if end_text else size - 1
+        if start >= size or end < start:
+            return None
+        return start, min(end, size - 1)
+    
+    def respond(self, request: Request) -> Response:
+        """Serve the asset honouring Accept-Encoding, If-None-Match and Range"""
+        encoding = self.negotiate_encoding(request.headers.get("accept-encoding"))
+        body = self.variants[encoding]
+        headers = {
+            "ETag": self.etags[encoding],
+            "Cache-Control": self.cache_control,
+            "Last-Modified": self.last_modified,
+            "Vary": "Accept-Encoding",
+            "Accept-Ranges": "bytes"
+        }
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        
+        if self._not_modified(request.headers.get("if-none-match"), encoding):
+            return Response(status_code=304, headers=headers)
+        
+        range_header = request.headers.get("range")
+        if_range = request.headers.get("if-range")
+        if range_header and (not if_range or if_range.strip() == self.etags[encoding]):
+            try:
+                byte_range = self._parse_range(range_header, len(body))
+            except ValueError:
+                byte_range = ()  # Malformed or multi-range: fall back to the full body
+            if byte_range is None:
+                headers["Content-Range"] = f"bytes */{len(body)}"
+                return Response(status_code=416, headers=headers)
+            if byte_range:
+                start, end = byte_range
+                headers["Content-Range"] = f"bytes {start}-{end}/{len(body)}"
+                return Response(content=body[start:end + 1], status_code=206,
+                                media_type=self.media_type, headers=headers)
+        
+        return Response(content=body, media_type=self.media_type, headers=headers)
+
+index_asset = StaticAsset(INDEX_HTML.encode("utf-8"), media_type="text/html; charset=utf-8")
+
+# ============================================================================
+# API ENDPOINTS
+# ============================================================================
+
+@app.get("/", response_class=HTMLResponse)
+async def root(request: Request):
+    """Root endpoint with enhanced HTML interface"""
+    return index_asset.respond(request)
 
 @app.get("/health")
 async def health_check():
@@ -6680,179 +7095,24 @@ async def health_check():
     }
 
 @app.get("/api/v1/prices/current")
-async def get_current_prices(commodity: Optional[str] = None, state: Optional[str] = None, mandi: Optional[str] = None):
+async def get_current_prices(request: Request, commodity: Optional[str] = None, state: Optional[str] = None, mandi: Optional[str] = None):
     """Get current market prices with trend analysis and predictions"""
-    
-    # Enhanced mock data with state-wise mandis and trend analysis
-    enhanced_prices = {}
-    
-    # Indian states with major mandis (50 total mandis across key states)
-    states_mandis = {
-        "punjab": ["Ludhiana", "Amritsar", "Jalandhar", "Patiala", "Bathinda"],
-        "haryana": ["Karnal", "Hisar", "Panipat", "Rohtak", "Gurgaon"],
-        "uttar_pradesh": ["Meerut", "Agra", "Kanpur", "Lucknow", "Varanasi"],
-        "bihar": ["Patna", "Muzaffarpur", "Darbhanga", "Bhagalpur", "Gaya"],
-        "west_bengal": ["Kolkata", "Siliguri", "Durgapur", "Asansol", "Malda"],
-        "maharashtra": ["Mumbai", "Pune", "Nashik", "Aurangabad", "Nagpur"],
-        "gujarat": ["Ahmedabad", "Surat", "Rajkot", "Vadodara", "Bhavnagar"],
-        "rajasthan": ["Jaipur", "Jodhpur", "Kota", "Bikaner", "Udaipur"],
-        "madhya_pradesh": ["Bhopal", "Indore", "Gwalior", "Jabalpur", "Ujjain"],
-        "karnataka": ["Bangalore", "Mysore", "Hubli", "Belgaum", "Mangalore"]
+    snapshot = await price_snapshot_engine.get_snapshot()
+    cache_headers = {
+        "ETag": snapshot.etag,
+        "Cache-Control": f"public, max-age={snapshot.seconds_until_stale()}",
+        "Last-Modified": snapshot.last_modified
     }
     
-    # Generate enhanced price data for each commodity
-    for commodity_name, base_data in MOCK_PRICES.items():
-        enhanced_prices[commodity_name] = {
-            "commodity": commodity_name,
-            "category": base_data["category"],
-            "national_average": base_data["price"],
-            "unit": base_data["unit"],
-            "trend": base_data["trend"],
-            "change_percentage": base_data["change"],
-            "last_updated": get_current_time(),
-            
-            # Trend Analysis (last 7 days)
-            "trend_analysis": {
-                "7_day_trend": base_data["trend"],
-                "price_history": [
-                    base_data["price"] - random.randint(50, 200),
-                    base_data["price"] - random.randint(30, 150),
-                    base_data["price"] - random.randint(20, 100),
-                    base_data["price"] - random.randint(10, 80),
-                    base_data["price"] - random.randint(5, 50),
-                    base_data["price"] - random.randint(0, 30),
-                    base_data["price"]
-                ],
-                "volatility": "medium" if base_data["trend"] == "stable" else "high",
-                "seasonal_factor": random.choice(["harvest_season", "sowing_season", "normal", "festival_demand"])
-            },
-            
-            # Predictions (next 7 days)
-            "predictions": {
-                "next_7_days": [
-                    base_data["price"] + random.randint(-50, 100) for _ in range(7)
-                ],
-                "confidence_level": random.uniform(0.75, 0.95),
-                "predicted_trend": random.choice(["upward", "downward", "stable"]),
-                "factors": [
-                    "Weather conditions",
-                    "Seasonal demand",
-                    "Transportation costs",
-                    "Government policies"
-                ]
-            },
-            
-            # State-wise prices
-            "state_wise_prices": {},
-            
-            # Market intelligence
-            "market_intelligence": {
-                "demand_level": random.choice(["high", "medium", "low"]),
-                "supply_level": random.choice(["abundant", "adequate", "scarce"]),
-                "quality_grade": random.choice(["premium", "standard", "below_standard"]),
-                "storage_availability": random.choice(["high", "medium", "low"]),
-                "transportation_cost_factor": random.uniform(0.95, 1.15)
-            }
-        }
-        
-        # Generate state-wise prices
-        for state, mandis in states_mandis.items():
-            state_multiplier = random.uniform(0.85, 1.25)  # Price variation by state
-            state_price = int(base_data["price"] * state_multiplier)
-            
-            enhanced_prices[commodity_name]["state_wise_prices"][state] = {
-                "average_price": state_price,
-                "price_range": {
-                    "min": int(state_price * 0.9),
-                    "max": int(state_price * 1.1)
-                },
-                "major_mandis": []
-            }
-            
-            # Generate mandi-wise prices for each state
-            for mandi_name in mandis[:3]:  # Top 3 mandis per state
-                mandi_multiplier = random.uniform(0.92, 1.08)
-                mandi_price = int(state_price * mandi_multiplier)
-                
-                enhanced_prices[commodity_name]["state_wise_prices"][state]["major_mandis"].append({
-                    "mandi_name": mandi_name,
-                    "price": mandi_price,
-                    "arrival_quantity": f"{random.randint(50, 500)} quintals",
-                    "quality": random.choice(["FAQ", "Good", "Average"]),
-                    "last_updated": get_current_time()
-                })
+    # Render first so an unknown commodity or mandi is a 404 even with a matching ETag;
+    # views are cached per snapshot, so this costs nothing on a poll
+    body = snapshot.render(commodity, state, mandi)
     
-    # Filter by commodity if specified
-    if commodity:
-        commodity_lower = commodity.lower()
-        if commodity_lower in enhanced_prices:
-            result = enhanced_prices[commodity_lower]
-            
-            # Filter by state if specified
-            if state and state.lower() in result["state_wise_prices"]:
-                state_data = result["state_wise_prices"][state.lower()]
-                
-                # Filter by mandi if specified
-                if mandi:
-                    mandi_data = None
-                    for mandi_info in state_data["major_mandis"]:
-                        if mandi.lower() in mandi_info["mandi_name"].lower():
-                            mandi_data = mandi_info
-                            break
-                    
-                    if mandi_data:
-                        return {
-                            "commodity": commodity,
-                            "state": state,
-                            "mandi": mandi_data,
-                            "trend_analysis": result["trend_analysis"],
-                            "predictions": result["predictions"],
-                            "market_intelligence": result["market_intelligence"],
-                            "timestamp": get_current_time(),
-                            "source": "MANDI EAR™ Real-time Network"
-                        }
-                    else:
-                        raise HTTPException(status_code=404, detail=f"Mandi '{mandi}' not found in {state}")
-                
-                return {
-                    "commodity": commodity,
-                    "state": state,
-                    "state_data": state_data,
-                    "trend_analysis": result["trend_analysis"],
-                    "predictions": result["predictions"],
-                    "market_intelligence": result["market_intelligence"],
-                    "timestamp": get_current_time(),
-                    "source": "MANDI EAR™ Real-time Network"
-                }
-            
-            return {
-                "commodity": commodity,
-                "price_data": result,
-                "timestamp": get_current_time(),
-                "source": "MANDI EAR™ Real-time Network"
-            }
-        else:
-            raise HTTPException(status_code=404, detail=f"Commodity '{commodity}' not found")
+    # Dashboards poll constantly; an unchanged snapshot costs them nothing
+    if snapshot.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=cache_headers)
     
-    # Return all prices with enhanced data
-    return {
-        "prices": enhanced_prices,
-        "summary": {
-            "total_commodities": len(enhanced_prices),
-            "total_states": len(states_mandis),
-            "total_mandis": sum(len(mandis) for mandis in states_mandis.values()),
-            "last_updated": get_current_time(),
-            "data_freshness": "Real-time (updated every 15 minutes)"
-        },
-        "market_overview": {
-            "overall_trend": random.choice(["bullish", "bearish", "stable"]),
-            "active_mandis": random.randint(45, 55),
-            "daily_transactions": f"₹{random.randint(500, 800)} Crores",
-            "weather_impact": random.choice(["positive", "negative", "neutral"])
-        },
-        "timestamp": get_current_time(),
-        "source": "MANDI EAR™ Real-time Network"
-    }
+    return Response(content=body, media_type="application/json", headers=cache_headers)
 
 @app.get("/api/v1/mandis")
 async def get_mandis():
@@ -6860,19 +7120,7 @@ async def get_mandis():
     # Generate comprehensive mandi list from states_mandis
     all_mandis = []
     
-    # States with major mandis (50 total mandis across key states)
-    states_mandis = {
-        "punjab": ["Ludhiana", "Amritsar", "Jalandhar", "Patiala", "Bathinda"],
-        "haryana": ["Karnal", "Hisar", "Panipat", "Rohtak", "Gurgaon"],
-        "uttar_pradesh": ["Meerut", "Agra", "Kanpur", "Lucknow", "Varanasi"],
-        "bihar": ["Patna", "Muzaffarpur", "Darbhanga", "Bhagalpur", "Gaya"],
-        "west_bengal": ["Kolkata", "Siliguri", "Durgapur", "Asansol", "Malda"],
-        "maharashtra": ["Mumbai", "Pune", "Nashik", "Aurangabad", "Nagpur"],
-        "gujarat": ["Ahmedabad", "Surat", "Rajkot", "Vadodara", "Bhavnagar"],
-        "rajasthan": ["Jaipur", "Jodhpur", "Kota", "Bikaner", "Udaipur"],
-        "madhya_pradesh": ["Bhopal", "Indore", "Gwalior", "Jabalpur", "Ujjain"],
-        "karnataka": ["Bangalore", "Mysore", "Hubli", "Belgaum", "Mangalore"]
-    }
+    states_mandis = STATES_MANDIS
     
     # Generate mandi list with details
     mandi_id = 1
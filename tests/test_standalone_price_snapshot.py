@@ -0,0 +1,96 @@
+"""
+Tests for the versioned price snapshot behind /api/v1/prices/current
+Covers ETag revalidation (200/304), 404 precedence and ETag rotation on refresh
+
+**Validates: Requirements 3.4**
+"""
+
+import pytest
+
+# Skip rather than let the standalone app auto-install its dependencies
+pytest.importorskip("fastapi")
+pytest.importorskip("uvicorn")
+pytest.importorskip("httpx")
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from fastapi.testclient import TestClient
+
+from standalone_mandi_ear import app, price_snapshot_engine
+
+PRICES_URL = "/api/v1/prices/current"
+
+@pytest.fixture
+def client():
+    price_snapshot_engine.invalidate()
+    yield TestClient(app)
+    price_snapshot_engine.invalidate()
+
+class TestPriceSnapshotCaching:
+    """Conditional GET semantics for the current-prices endpoint"""
+
+    def test_first_request_returns_body_and_validators(self, client):
+        response = client.get(PRICES_URL, params={"commodity": "wheat"})
+
+        assert response.status_code == 200
+        assert response.json()["commodity"] == "wheat"
+        assert response.headers["etag"].startswith('"prices-v')
+        assert "last-modified" in response.headers
+        assert response.headers["cache-control"].startswith("public, max-age=")
+
+    def test_matching_etag_returns_304(self, client):
+        etag = client.get(PRICES_URL, params={"commodity": "wheat"}).headers["etag"]
+
+        response = client.get(PRICES_URL, params={"commodity": "wheat"},
+                              headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+    def test_weak_and_listed_etags_match(self, client):
+        etag = client.get(PRICES_URL).headers["etag"]
+
+        response = client.get(PRICES_URL, headers={"If-None-Match": f'"other", W/{etag}'})
+
+        assert response.status_code == 304
+
+    def test_stale_etag_returns_200(self, client):
+        response = client.get(PRICES_URL, params={"commodity": "wheat"},
+                              headers={"If-None-Match": '"prices-v0-0000000000000000"'})
+
+        assert response.status_code == 200
+        assert response.json()["commodity"] == "wheat"
+
+    def test_unknown_commodity_is_404_even_with_matching_etag(self, client):
+        etag = client.get(PRICES_URL).headers["etag"]
+
+        response = client.get(PRICES_URL, params={"commodity": "unobtainium"},
+                              headers={"If-None-Match": etag})
+
+        assert response.status_code == 404
+
+    def test_unknown_mandi_is_404_even_with_wildcard(self, client):
+        response = client.get(PRICES_URL,
+                              params={"commodity": "wheat", "state": "punjab", "mandi": "nowhere"},
+                              headers={"If-None-Match": "*"})
+
+        assert response.status_code == 404
+
+    def test_etag_changes_when_snapshot_is_rebuilt(self, client):
+        first = client.get(PRICES_URL).headers["etag"]
+
+        price_snapshot_engine.invalidate()
+        response = client.get(PRICES_URL, headers={"If-None-Match": first})
+
+        assert response.status_code == 200
+        assert response.headers["etag"] != first
+
+    def test_snapshot_is_reused_within_refresh_interval(self, client):
+        first = client.get(PRICES_URL)
+        second = client.get(PRICES_URL)
+
+        assert first.headers["etag"] == second.headers["etag"]
+        assert first.content == second.content
@@ -0,0 +1,143 @@
+"""
+Tests for the precompressed in-memory SPA asset served at /
+Covers Accept-Encoding negotiation, per-variant ETag revalidation and Range requests
+
+**Validates: Requirements 10.1**
+"""
+
+import pytest
+
+# Skip rather than let the standalone app auto-install its dependencies
+pytest.importorskip("fastapi")
+pytest.importorskip("uvicorn")
+pytest.importorskip("httpx")
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from standalone_mandi_ear import StaticAsset, brotli
+
+CONTENT = ("<html><body>" + "MANDI EAR " * 500 + "</body></html>").encode("utf-8")
+
+@pytest.fixture
+def asset():
+    return StaticAsset(CONTENT, media_type="text/html; charset=utf-8")
+
+@pytest.fixture
+def client(asset):
+    app = FastAPI()
+
+    @app.get("/")
+    async def index(request: Request):
+        return asset.respond(request)
+
+    return TestClient(app)
+
+class TestEncodingNegotiation:
+    """Accept-Encoding picks the best available precompressed variant"""
+
+    def test_no_header_serves_identity(self, asset):
+        assert asset.negotiate_encoding(None) == "identity"
+
+    def test_gzip_only(self, asset):
+        assert asset.negotiate_encoding("gzip") == "gzip"
+
+    def test_zero_quality_excludes_encoding(self, asset):
+        assert asset.negotiate_encoding("gzip;q=0, identity") == "identity"
+
+    def test_higher_quality_wins(self, asset):
+        assert asset.negotiate_encoding("identity;q=1, gzip;q=0.5") == "identity"
+
+    def test_brotli_preferred_when_available(self, asset):
+        expected = "br" if brotli is not None else "gzip"
+        assert asset.negotiate_encoding("gzip, br") == expected
+
+    def test_wildcard(self, asset):
+        expected = "br" if brotli is not None else "gzip"
+        assert asset.negotiate_encoding("*") == expected
+
+    def test_gzip_response_decodes_to_original(self, client, asset):
+        response = client.get("/", headers={"Accept-Encoding": "gzip"})
+
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["etag"] == asset.etags["gzip"]
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.content == CONTENT
+
+class TestConditionalRequests:
+    """If-None-Match only validates the representation actually being served"""
+
+    def test_matching_identity_etag_returns_304(self, client, asset):
+        response = client.get("/", headers={"Accept-Encoding": "identity",
+                                            "If-None-Match": asset.etags["identity"]})
+
+        assert response.status_code == 304
+
+    def test_matching_gzip_etag_returns_304(self, client, asset):
+        response = client.get("/", headers={"Accept-Encoding": "gzip",
+                                            "If-None-Match": asset.etags["gzip"]})
+
+        assert response.status_code == 304
+        assert response.headers["etag"] == asset.etags["gzip"]
+
+    def test_gzip_etag_does_not_validate_identity(self, client, asset):
+        response = client.get("/", headers={"Accept-Encoding": "identity",
+                                            "If-None-Match": asset.etags["gzip"]})
+
+        assert response.status_code == 200
+        assert response.content == CONTENT
+
+    def test_identity_etag_does_not_validate_gzip(self, client, asset):
+        response = client.get("/", headers={"Accept-Encoding": "gzip",
+                                            "If-None-Match": asset.etags["identity"]})
+
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+
+    def test_wildcard_matches(self, client):
+        response = client.get("/", headers={"If-None-Match": "*"})
+
+        assert response.status_code == 304
+
+class TestRangeRequests:
+    """Byte ranges are served from the selected variant"""
+
+    def test_range_returns_partial_content(self, client):
+        response = client.get("/", headers={"Accept-Encoding": "identity", "Range": "bytes=0-9"})
+
+        assert response.status_code == 206
+        assert response.content == CONTENT[:10]
+        assert response.headers["content-range"] == f"bytes 0-9/{len(CONTENT)}"
+
+    def test_suffix_range(self, client):
+        response = client.get("/", headers={"Accept-Encoding": "identity", "Range": "bytes=-5"})
+
+        assert response.status_code == 206
+        assert response.content == CONTENT[-5:]
+
+    def test_unsatisfiable_range_returns_416(self, client):
+        response = client.get("/", headers={"Accept-Encoding": "identity",
+                                            "Range": f"bytes={len(CONTENT)}-"})
+
+        assert response.status_code == 416
+        assert response.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+    def test_multi_range_falls_back_to_full_body(self, client):
+        response = client.get("/", headers={"Accept-Encoding": "identity",
+                                            "Range": "bytes=0-1,4-5"})
+
+        assert response.status_code == 200
+        assert response.content == CONTENT
+
+    def test_if_range_mismatch_serves_full_body(self, client):
+        response = client.get("/", headers={"Accept-Encoding": "identity",
+                                            "Range": "bytes=0-9",
+                                            "If-Range": '"stale"'})
+
+        assert response.status_code == 200
+        assert response.content == CONTENT
@@ -0,0 +1,128 @@
+"""
+Equivalence tests for the vectorized technical analysis backend
+Checks VectorizedTechnicalAnalyzer against the list-based TechnicalAnalyzer
+
+**Validates: Requirements 1.4**
+"""
+
+import pytest
+import math
+from hypothesis import given, strategies as st, settings
+
+import sys
+import os
+import importlib.util
+
+SERVICE_DIR = os.path.join(os.path.dirname(__file__), '..', 'services', 'price-discovery-service')
+
+def load_trend_analysis():
+    """Import the service's trend_analysis under a private name.
+
+    The service's own `models` and `database` are only visible while the
+    module executes; sys.path and sys.modules are restored afterwards so other
+    services' tests keep resolving their own modules.
+    """
+    saved_path = list(sys.path)
+    saved_modules = {name: sys.modules.get(name) for name in ("models", "database")}
+    sys.path.insert(0, SERVICE_DIR)
+    try:
+        spec = importlib.util.spec_from_file_location(
+            "price_discovery_trend_analysis", os.path.join(SERVICE_DIR, "trend_analysis.py")
+        )
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    finally:
+        sys.path[:] = saved_path
+        for name, saved in saved_modules.items():
+            if saved is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = saved
+
+trend_analysis = load_trend_analysis()
+TechnicalAnalyzer = trend_analysis.TechnicalAnalyzer
+VectorizedTechnicalAnalyzer = trend_analysis.VectorizedTechnicalAnalyzer
+PriceTrendAnalyzer = trend_analysis.PriceTrendAnalyzer
+
+REL_TOL = 1e-9
+ABS_TOL = 1e-6
+
+# Prices with a small set of repeated values so ties in local min/max occur
+price_series = st.lists(
+    st.one_of(
+        st.floats(min_value=100.0, max_value=10000.0, allow_nan=False, allow_infinity=False),
+        st.sampled_from([1500.0, 2000.0, 2500.0])
+    ),
+    min_size=1,
+    max_size=300
+)
+windows = st.integers(min_value=2, max_value=40)
+
+def assert_series_close(expected, actual):
+    assert len(expected) == len(actual)
+    for e, a in zip(expected, actual):
+        assert math.isclose(e, a, rel_tol=REL_TOL, abs_tol=ABS_TOL), (e, a)
+
+class TestVectorizedEquivalence:
+    """The NumPy backend must reproduce the reference implementation"""
+
+    @given(prices=price_series, window=windows)
+    @settings(max_examples=200, deadline=None)
+    def test_moving_average(self, prices, window):
+        assert_series_close(
+            TechnicalAnalyzer.calculate_moving_average(prices, window),
+            VectorizedTechnicalAnalyzer.calculate_moving_average(prices, window)
+        )
+
+    @given(prices=price_series, window=windows)
+    @settings(max_examples=200, deadline=None)
+    def test_exponential_moving_average(self, prices, window):
+        assert_series_close(
+            TechnicalAnalyzer.calculate_exponential_moving_average(prices, window),
+            VectorizedTechnicalAnalyzer.calculate_exponential_moving_average(prices, window)
+        )
+
+    @given(prices=price_series, window=windows)
+    @settings(max_examples=200, deadline=None)
+    def test_rsi(self, prices, window):
+        assert_series_close(
+            TechnicalAnalyzer.calculate_rsi(prices, window),
+            VectorizedTechnicalAnalyzer.calculate_rsi(prices, window)
+        )
+
+    @given(prices=price_series, window=windows)
+    @settings(max_examples=200, deadline=None)
+    def test_support_resistance(self, prices, window):
+        expected = TechnicalAnalyzer.find_support_resistance(prices, window)
+        actual = VectorizedTechnicalAnalyzer.find_support_resistance(prices, window)
+        assert_series_close(list(expected), list(actual))
+
+    @given(prices=price_series, window=windows)
+    @settings(max_examples=200, deadline=None)
+    def test_bollinger_bands(self, prices, window):
+        expected = TechnicalAnalyzer.calculate_bollinger_bands(prices, window)
+        actual = VectorizedTechnicalAnalyzer.calculate_bollinger_bands(prices, window)
+        for band in ("upper", "middle", "lower"):
+            assert_series_close(expected[band], actual[band])
+
+    @given(prices=price_series)
+    @settings(max_examples=50, deadline=None)
+    def test_bollinger_bands_single_point_window(self, prices):
+        expected = TechnicalAnalyzer.calculate_bollinger_bands(prices, 1)
+        actual = VectorizedTechnicalAnalyzer.calculate_bollinger_bands(prices, 1)
+        for band in ("upper", "middle", "lower"):
+            assert_series_close(expected[band], actual[band])
+        assert_series_close(prices, actual["upper"])
+        assert_series_close(prices, actual["lower"])
+
+    def test_constant_series_has_zero_band_width(self):
+        bands = VectorizedTechnicalAnalyzer.calculate_bollinger_bands([2000.0] * 50, 20)
+        assert bands["upper"] == bands["middle"] == bands["lower"]
+
+    def test_trend_analyzer_uses_vectorized_backend_by_default(self):
+        assert isinstance(PriceTrendAnalyzer().technical_analyzer, VectorizedTechnicalAnalyzer)
+        assert isinstance(PriceTrendAnalyzer(vectorized=False).technical_analyzer, TechnicalAnalyzer)
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
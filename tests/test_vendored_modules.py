@@ -0,0 +1,22 @@
+"""
+Checks that modules vendored into several services have not drifted apart
+"""
+
+import os
+
+import pytest
+
+SERVICES_DIR = os.path.join(os.path.dirname(__file__), '..', 'services')
+
+VENDORED = {
+    "sampled_logging.py": ["anti-hoarding-service", "msp-enforcement-service"],
+}
+
+@pytest.mark.parametrize("module", sorted(VENDORED))
+def test_vendored_copies_are_identical(module):
+    copies = {}
+    for service in VENDORED[module]:
+        with open(os.path.join(SERVICES_DIR, service, module), "rb") as f:
+            copies[service] = f.read()
+
+    assert len(set(copies.values())) == 1, f"{module} differs between {', '.join(copies)}"